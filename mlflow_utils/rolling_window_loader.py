@@ -10,9 +10,18 @@ from datetime import date, datetime
 import pandas as pd
 import os
 import numpy as np
+import pyarrow.parquet as pq
 from graphdatascience import GraphDataScience
 from dotenv import load_dotenv
 
+from rolling_windows.dataset import DATASET_DIRNAME, latest_params_hash, open_window_dataset, read_window_frame
+
+# Rolling window columns used by load_training_data_with_rolling_windows
+ROLLING_WINDOW_COLUMNS = [
+    'Id', 'nodeLabels', 'in_degree', 'out_degree', 'page_rank',
+    'community_louvain', 'wcc', 'window_start_year', 'window_end_year_inclusive'
+]
+
 
 class RollingWindowDataLoader:
     """
@@ -39,17 +48,104 @@ class RollingWindowDataLoader:
         if not self.rolling_window_dir:
             raise ValueError("ROLLING_WINDOW_DIR not set in .env")
             
-        self.nodes_dir = os.path.join(self.rolling_window_dir, "output", "nodes")
-        if not os.path.exists(self.nodes_dir):
+        self.output_dir = os.path.join(self.rolling_window_dir, "output")
+        self.nodes_dir = os.path.join(self.output_dir, "nodes")
+        # Runs with --output-layout dataset write a partitioned dataset instead of per-window files
+        self.dataset_dir = os.path.join(self.output_dir, DATASET_DIRNAME, "nodes")
+        # Runs with --bank-panel also write the Bank rows' scalar metrics to one sorted file
+        self.bank_panel_dir = os.path.join(self.output_dir, "bank_panel")
+        if not os.path.exists(self.nodes_dir) and not os.path.exists(self.dataset_dir):
             raise ValueError(f"Rolling window nodes directory not found: {self.nodes_dir}")
+
+    def load_bank_panel(
+        self,
+        columns: Optional[List[str]] = None,
+        params_hash: Optional[str] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Load the bank panel of run `params_hash` (bank_panel/bank_panel_{params_hash}.parquet),
+        or the most recent one if None.
+
+        The panel holds Bank rows only; `nodeLabels` and `community_louvain`
+        (its first Louvain level) are rebuilt when requested.
+
+        Returns:
+            DataFrame with `columns` (all if None), or None if there is no panel
+            or it lacks one of the requested columns.
+        """
+        if not os.path.isdir(self.bank_panel_dir):
+            return None
+        panels = sorted(
+            (f for f in os.listdir(self.bank_panel_dir) if f.startswith('bank_panel_') and f.endswith('.parquet')),
+            key=lambda f: os.path.getmtime(os.path.join(self.bank_panel_dir, f))
+        )
+        if params_hash is not None:
+            panels = [f for f in panels if f == f'bank_panel_{params_hash}.parquet']
+        if not panels:
+            return None
+        path = os.path.join(self.bank_panel_dir, panels[-1])
+        available = set(pq.read_schema(path).names)
+
+        wanted = list(columns) if columns is not None else None
+        read = None
+        if wanted is not None:
+            read = [c for c in wanted if c not in ('nodeLabels', 'community_louvain')]
+            if 'community_louvain' in wanted:
+                read.append('louvain_level_0')
+            if not set(read) <= available:
+                return None
+
+        print(f"Loading bank panel from {path}...")
+        df = pd.read_parquet(path, columns=read)
+        if wanted is None or 'community_louvain' in wanted:
+            df['community_louvain'] = df.get('louvain_level_0')
+        if wanted is None or 'nodeLabels' in wanted:
+            df['nodeLabels'] = [['Bank']] * len(df)
+        if wanted is not None:
+            df = df[wanted]
+        print(f"Total rolling window observations: {len(df)}")
+        return df
     
-    def load_all_rolling_windows(self) -> pd.DataFrame:
+    def load_all_rolling_windows(
+        self,
+        columns: Optional[List[str]] = None,
+        labels: Optional[List[str]] = None,
+        params_hash: Optional[str] = None
+    ) -> pd.DataFrame:
         """
         Load all rolling window node feature parquet files and concatenate them.
         
+        Args:
+            columns: Columns to read from the partitioned dataset (all if None)
+            labels: Node labels to read from the partitioned dataset (all if None)
+            params_hash: Run to read from the partitioned dataset and bank panel
+                (the run with the newest manifest if None)
+        
         Returns:
             DataFrame with all rolling window features across all time periods.
+            With labels=['Bank'] the bank panel is used when it exists. Per-window files are read in full; from the partitioned dataset only
+            the column chunks of `columns` in row groups of `labels` of one run are read. Columns the run
+            did not compute (e.g. `wcc` without --run-wcc) are left out.
         """
+        if labels is not None and list(labels) == ['Bank']:
+            panel_df = self.load_bank_panel(columns, params_hash=params_hash)
+            if panel_df is not None:
+                return panel_df
+
+        if os.path.exists(self.dataset_dir):
+            if params_hash is None:
+                params_hash = latest_params_hash(self.output_dir)
+            print(f"Loading rolling window dataset from {self.dataset_dir} (params_hash={params_hash})...")
+            if columns is not None:
+                available = set(open_window_dataset(self.output_dir, params_hash=params_hash).schema.names)
+                missing = [c for c in columns if c not in available]
+                if missing:
+                    print(f"  Run {params_hash} has no columns {missing}; skipping them")
+                columns = [c for c in columns if c in available]
+            combined_df = read_window_frame(self.output_dir, columns, labels=labels, params_hash=params_hash)
+            print(f"Total rolling window observations: {len(combined_df)}")
+            return combined_df
+        
         print(f"Loading rolling window data from {self.nodes_dir}...")
         
         parquet_files = sorted([
@@ -165,7 +261,7 @@ class RollingWindowDataLoader:
         print(f"Accounting data filtered to {len(acc_df)} observations in date range")
         
         # 3. Load Rolling Window Features
-        rolling_df = self.load_all_rolling_windows()
+        rolling_df = self.load_all_rolling_windows(columns=ROLLING_WINDOW_COLUMNS, labels=['Bank'])
         
         # 4. Merge Banking Population with Accounting
         banks_df['regn'] = banks_df['regn_cbr'].astype(str)
@@ -21,6 +21,13 @@ import numpy as np
 import os
 from graphdatascience import GraphDataScience
 
+from rolling_windows.node_identity import (
+    IDENTITY_DIRNAME,
+    NodeIdentityIndex,
+    latest_node_identity,
+    load_or_fetch_node_identity,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,7 +54,8 @@ class TemporalFCRLoader:
     def __init__(
         self,
         base_dir: str = 'data_processing/rolling_windows/output/production_run_1990_2022_v6',
-        gds_client: Optional[GraphDataScience] = None
+        gds_client: Optional[GraphDataScience] = None,
+        node_identity: Optional[NodeIdentityIndex] = None
     ):
         """
         Initialize loader.
@@ -55,11 +63,15 @@ class TemporalFCRLoader:
         Args:
             base_dir: Path to temporal FCR data directory
             gds_client: Optional GDS client for CAMEL data fetching
+            node_identity: Optional node identity cache (gds_id -> regn_cbr/labels). Defaults to
+                the run's sidecar in `<base_dir>/node_identity/` (matched to the database when
+                a GDS client is given, otherwise the latest one).
         """
         self.base_dir = Path(base_dir)
         self.nodes_dir = self.base_dir / 'nodes'
         self.edges_dir = self.base_dir / 'edges'
         self.gds = gds_client
+        self._node_identity = node_identity
         
         # Accounting path handling (similar to QuarterlyWindowDataLoader)
         self.accounting_path = None
@@ -174,6 +186,19 @@ class TemporalFCRLoader:
         
         return pd.concat(dfs, ignore_index=True)
     
+    def node_identity(self) -> Optional[NodeIdentityIndex]:
+        """Run-level gds_id -> regn_cbr/labels cache, shared with the pipeline instead of re-querying Neo4j."""
+        if self._node_identity is None:
+            cache_dir = self.base_dir / IDENTITY_DIRNAME
+            try:
+                if self.gds is not None:
+                    self._node_identity = load_or_fetch_node_identity(self.gds, cache_dir)
+                else:
+                    self._node_identity = latest_node_identity(cache_dir)
+            except Exception as e:
+                logger.error("Failed to load node identity cache from %s: %s", cache_dir, e)
+        return self._node_identity
+    
     def _assign_window_midpoints(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Assign window midpoint as observation date.
@@ -192,7 +217,7 @@ class TemporalFCRLoader:
         Rename columns and map gds_id to regn_cbr.
         
         The parquet files have entity_id which includes non-Bank nodes (GDS_X).
-        We need to query Neo4j to get regn_cbr for Bank nodes only.
+        regn_cbr for Bank nodes comes from the run-level node identity cache.
         """
         # FCR column (from pipeline.py line 480)
         if 'fcr_temporal' in df.columns:
@@ -203,55 +228,25 @@ class TemporalFCRLoader:
         if 'community_louvain' in df.columns:
             df = df.rename(columns={'community_louvain': 'rw_community_louvain'})
         
-        # Get regn_cbr mapping from Neo4j if we have gds_id
-        if 'gds_id' in df.columns and self.gds is not None:
-            logger.info("Fetching regn_cbr mapping from Neo4j for GDS IDs...")
-            
-            # Get unique gds_ids from the DataFrame
-            unique_gds_ids = df['gds_id'].unique().tolist()
+        # Map gds_id -> regn_cbr (Banks only) via the run-level node identity cache
+        identity = self.node_identity() if 'gds_id' in df.columns else None
+        if identity is not None:
+            logger.info("Mapping GDS IDs to regn_cbr via node identity cache (%d nodes)...", len(identity))
+            df['regn'] = identity.bank_regn(df['gds_id'].to_numpy(dtype='int64'))
             
-            # Query Neo4j for regn_cbr for these gds_ids
-            # We only care about nodes that are Banks and have a regn_cbr
-            query = f"""
-            MATCH (b:Bank)
-            WHERE id(b) IN {unique_gds_ids} AND b.regn_cbr IS NOT NULL
-            RETURN id(b) AS gds_id, b.regn_cbr AS regn_cbr
-            """
-            
-            try:
-                regn_map_df = self.gds.run_cypher(query)
-                regn_map_df['gds_id'] = regn_map_df['gds_id'].astype('int64')
-                
-                logger.info("Fetched regn_cbr for %d GDS IDs", len(regn_map_df))
-                
-                # Merge regn_cbr into the main DataFrame
-                df = df.merge(regn_map_df, on='gds_id', how='left')
-                
-                # Rename regn_cbr to regn
-                df = df.rename(columns={'regn_cbr': 'regn'})
-                
-                # Drop rows where regn is NaN (i.e., not a Bank or no regn_cbr)
-                initial_rows = len(df)
-                df.dropna(subset=['regn'], inplace=True)
-                if len(df) < initial_rows:
-                    logger.warning(
-                        "Dropped %d rows that were not identified as Banks or had no regn_cbr.",
-                        initial_rows - len(df)
-                    )
-                
-            except Exception as e:
-                logger.error("Failed to fetch regn_cbr mapping from Neo4j: %s", e)
-                # Fallback to entity_id if Neo4j query fails
-                if 'entity_id' in df.columns:
-                    df['regn'] = df['entity_id']
-                else:
-                    logger.warning("No 'entity_id' or 'gds_id' to use for 'regn' after Neo4j failure.")
-                    df['regn'] = np.nan # Ensure 'regn' column exists, but with NaNs
+            # Drop rows where regn is missing (i.e., not a Bank or no regn_cbr)
+            initial_rows = len(df)
+            df.dropna(subset=['regn'], inplace=True)
+            if len(df) < initial_rows:
+                logger.warning(
+                    "Dropped %d rows that were not identified as Banks or had no regn_cbr.",
+                    initial_rows - len(df)
+                )
         else:
-            # If no gds_id or GDS client, fallback to entity_id
+            # If no gds_id or identity cache, fallback to entity_id
             if 'entity_id' in df.columns:
                 df['regn'] = df['entity_id']
-                logger.info("Using 'entity_id' as 'regn' (no gds_id or GDS client for mapping).")
+                logger.info("Using 'entity_id' as 'regn' (no gds_id or node identity cache for mapping).")
             else:
                 logger.warning("No 'entity_id' or 'gds_id' available to create 'regn' column.")
                 df['regn'] = np.nan # Ensure 'regn' column exists, but with NaNs
@@ -19,6 +19,39 @@ def setup_experiment(experiment_name: str, tracking_uri: Optional[str] = None):
     print(f"Setting MLflow experiment to: {experiment_name}")
     mlflow.set_experiment(experiment_name)
 
+def log_metrics_run(
+    experiment_name: str,
+    run_name: str,
+    metrics_by_step: Dict[Optional[int], Dict[str, float]],
+    params: Optional[Dict[str, Any]] = None,
+    tracking_uri: Optional[str] = None,
+):
+    """
+    Logs metrics to a new run of the experiment; metrics under the key None are logged without a step.
+    """
+    setup_experiment(experiment_name, tracking_uri)
+    with mlflow.start_run(run_name=run_name):
+        if params:
+            mlflow.log_params(params)
+        for step, metrics in metrics_by_step.items():
+            if metrics:
+                mlflow.log_metrics(metrics, step=step)
+
+def create_parent_run(
+    experiment_name: str,
+    run_name: str,
+    params: Optional[Dict[str, Any]] = None,
+    tracking_uri: Optional[str] = None,
+) -> str:
+    """
+    Creates a run of the experiment for nested runs logged later (possibly from other threads) and returns its id.
+    """
+    setup_experiment(experiment_name, tracking_uri)
+    with mlflow.start_run(run_name=run_name) as run:
+        if params:
+            mlflow.log_params(params)
+    return run.info.run_id
+
 def log_pydantic_params(model: BaseModel, prefix: str = ""):
     """
     Logs fields of a Pydantic model as MLflow parameters.
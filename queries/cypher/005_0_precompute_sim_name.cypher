@@ -10,6 +10,8 @@
 //   - is_common_surname: 1 if either person has a common Russian surname, 0 otherwise
 //
 // Run with: bash scripts/run_cypher.sh -f queries/cypher/005_0_precompute_sim_name.cypher
+// Offline equivalent (same pairs, rapidfuzz over a process pool):
+//   python rolling_windows/run_pipeline.py --precompute-sim-name [--sim-name-write-back]
 // ============================================================================
 
 // Common surnames flagged with is_common_surname = 1:
@@ -0,0 +1,149 @@
+"""
+Approximate betweenness and closeness for wide windows.
+
+Exact betweenness and closeness need a BFS from every node of the window
+graph and dominate the run time on the wider windows. With
+``RollingWindowConfig.centrality_mode="approximate"``:
+
+- betweenness accumulates Brandes dependencies from a uniform sample of
+  source nodes only (GDS ``samplingSize``). The sample size is
+  ``betweenness_sampling_size`` or, when that is 0, the Riondato–Kornaropoulos
+  bound for an additive error of ``betweenness_target_error`` (normalised
+  scale) with probability ``1 - BETWEENNESS_FAILURE_PROBABILITY``, using the
+  node count as the vertex-diameter bound. Values are the sums over the
+  sampled sources (not rescaled), as GDS reports them;
+- closeness uses ``closeness_landmarks`` uniformly sampled landmarks: a node's
+  score is ``reached landmarks / summed distance to them``, which estimates the
+  exact ``component / farness`` ratio on the same scale.
+
+One calibration window (``calibration_window``) is computed both ways and the
+Spearman rank correlation of each approximation against the exact values is
+recorded in its manifest row. Approximate runs have their own ``params_hash``
+(``centrality_metadata``); exact runs keep the hash they had before.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Any
+
+import numpy as np
+from scipy.stats import spearmanr
+
+import local_algorithms as la
+from config import RollingWindowConfig
+from dates import Window
+
+CENTRALITY_MODES: tuple[str, ...] = ("exact", "approximate")
+BETWEENNESS_FAILURE_PROBABILITY = 0.1
+
+
+def validate_centrality_config(cfg: RollingWindowConfig) -> None:
+    if cfg.centrality_mode not in CENTRALITY_MODES:
+        raise ValueError(f"Unknown centrality_mode {cfg.centrality_mode!r}; expected one of {CENTRALITY_MODES}")
+    if cfg.betweenness_sampling_size < 0:
+        raise ValueError(f"betweenness_sampling_size must be >= 0, got {cfg.betweenness_sampling_size}")
+    if not 0.0 < cfg.betweenness_target_error < 1.0:
+        raise ValueError(f"betweenness_target_error must be in (0, 1), got {cfg.betweenness_target_error}")
+    if cfg.closeness_landmarks < 1:
+        raise ValueError(f"closeness_landmarks must be >= 1, got {cfg.closeness_landmarks}")
+
+
+def is_approximate(cfg: RollingWindowConfig) -> bool:
+    return cfg.centrality_mode == "approximate"
+
+
+def betweenness_sample_size(n: int, cfg: RollingWindowConfig) -> int:
+    """Number of betweenness source nodes for a window graph with ``n`` nodes."""
+    if n <= 0:
+        return 0
+    if cfg.betweenness_sampling_size > 0:
+        return min(n, int(cfg.betweenness_sampling_size))
+    # r = c / eps^2 * (floor(log2(VD - 2)) + 1 + ln(1 / delta)) with c = 0.5 and VD <= n.
+    vd_term = math.floor(math.log2(max(n - 2, 1))) + 1
+    r = 0.5 / cfg.betweenness_target_error**2 * (vd_term + math.log(1.0 / BETWEENNESS_FAILURE_PROBABILITY))
+    return min(n, int(math.ceil(r)))
+
+
+def landmark_count(n: int, cfg: RollingWindowConfig) -> int:
+    return min(max(n, 0), int(cfg.closeness_landmarks))
+
+
+def sample_nodes(n: int, k: int, seed: int) -> np.ndarray:
+    """``k`` distinct local node indices out of ``n``, sorted, reproducible for ``seed``."""
+    if k >= n:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size=k, replace=False))
+
+
+def approximate_betweenness(n: int, src: np.ndarray, dst: np.ndarray, cfg: RollingWindowConfig) -> tuple[np.ndarray, int]:
+    """Sampled-source betweenness and the sample size used."""
+    k = betweenness_sample_size(n, cfg)
+    sources = sample_nodes(n, k, cfg.centrality_sampling_seed)
+    return la.betweenness(n, src, dst, sources=sources), k
+
+
+def landmark_closeness(n: int, src: np.ndarray, dst: np.ndarray, cfg: RollingWindowConfig) -> tuple[np.ndarray, int]:
+    """Landmark closeness and the number of landmarks used."""
+    k = landmark_count(n, cfg)
+    landmarks = sample_nodes(n, k, cfg.centrality_sampling_seed)
+    return la.closeness(n, src, dst, sources=landmarks), k
+
+
+def rank_correlation(approx: np.ndarray, exact: np.ndarray) -> float:
+    """Spearman correlation; NaN when either side is constant or has fewer than two values."""
+    approx = np.asarray(approx, dtype=np.float64)
+    exact = np.asarray(exact, dtype=np.float64)
+    if len(exact) < 2 or np.ptp(approx) == 0 or np.ptp(exact) == 0:
+        return float("nan")
+    return float(spearmanr(approx, exact).statistic)
+
+
+def calibrate_centrality(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    *,
+    betweenness: np.ndarray,
+    closeness: np.ndarray,
+) -> dict[str, Any]:
+    """Compute exact betweenness/closeness and rank-correlate the approximations against them."""
+    t0 = time.perf_counter()
+    exact_bc = la.betweenness(n, src, dst)
+    betweenness_exact_time_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    exact_cl = la.closeness(n, src, dst)
+    closeness_exact_time_s = time.perf_counter() - t0
+    return {
+        "centrality_calibration": True,
+        "betweenness_spearman": rank_correlation(betweenness, exact_bc),
+        "closeness_spearman": rank_correlation(closeness, exact_cl),
+        "betweenness_exact_time_s": betweenness_exact_time_s,
+        "closeness_exact_time_s": closeness_exact_time_s,
+    }
+
+
+def calibration_window(windows: list[Window], cfg: RollingWindowConfig) -> Window | None:
+    """The window computed both exactly and approximately (``None`` in exact mode)."""
+    if not is_approximate(cfg) or not windows:
+        return None
+    if cfg.centrality_calibration_start_year is None:
+        return windows[0]
+    for w in windows:
+        if w.start_year == cfg.centrality_calibration_start_year:
+            return w
+    raise ValueError(f"No window starts in centrality_calibration_start_year={cfg.centrality_calibration_start_year}")
+
+
+def centrality_metadata(cfg: RollingWindowConfig) -> dict[str, Any]:
+    """Entries of ``gds_config_metadata`` describing the centrality mode."""
+    if not is_approximate(cfg):
+        return {}
+    return {
+        "centrality_mode": cfg.centrality_mode,
+        "betweenness_sampling_size": int(cfg.betweenness_sampling_size),
+        "betweenness_target_error": float(cfg.betweenness_target_error),
+        "closeness_landmarks": int(cfg.closeness_landmarks),
+        "centrality_sampling_seed": int(cfg.centrality_sampling_seed),
+    }
@@ -0,0 +1,502 @@
+"""
+Arrow-native streaming and post-processing of GDS windows.
+
+With ``RollingWindowConfig.arrow_streaming`` a window's node properties and
+relationships are kept as ``pyarrow.Table`` from the stream to the Parquet
+file:
+
+- node properties and relationships are streamed without
+  ``db_node_properties``. Over Arrow Flight (``Neo4jConfig.arrow``) the GDS
+  client hands back Arrow-backed frames (``pd.ArrowDtype``), which
+  ``to_arrow_table`` unwraps without copying; over Bolt the result is
+  converted once.
+- the database properties a window used to fetch per window (``Id``,
+  ``bank_feats``, ``network_feats``) come from an ``ArrowNodeStore`` built
+  once per run from the node identity cache and one feature query, and are
+  joined by Neo4j id with ``searchsorted`` index arrays. The same index
+  arrays replace the two pandas merges of the edge export.
+- ``finalise_node_table`` / ``finalise_edge_table`` apply the transformations
+  of ``frames.finalise_node_frame`` / ``finalise_edge_frame`` with Arrow
+  compute and NumPy matrices (vector columns follow ``vector_storage``, see
+  ``vectors``), and ``parquet.write_table`` writes the result.
+
+The written files hold the same columns and values as the pandas path.
+``benchmark_streaming_paths`` compares both paths on a synthetic window
+(``run_pipeline.py --benchmark-arrow-streaming NODES``).
+"""
+
+from __future__ import annotations
+
+import logging
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from config import RollingWindowConfig
+from dates import Window
+from feature_blocks import BANK_FEATS_BLOCKS, BANK_FEATS_DIM, other_bank_feats_indices
+from frames import finalise_edge_frame, finalise_node_frame, join_edge_endpoint_ids
+from node_identity import NodeIdentityIndex
+from parquet import write_parquet, write_table
+from vectors import (
+    EMBEDDING_COLUMNS,
+    fixed_size_column,
+    is_fixed_size,
+    list_array,
+    vector_dimensions,
+    vector_matrix,
+)
+
+logger = logging.getLogger(__name__)
+
+# Database id properties available from the node identity cache without a per-window query.
+ARROW_ID_PROPERTIES: tuple[str, ...] = ("Id",)
+
+_FLOAT_LIST = pa.list_(pa.float64())
+
+
+def validate_arrow_streaming(cfg: RollingWindowConfig) -> None:
+    id_properties = {cfg.id_property}
+    if cfg.export_edges:
+        id_properties.add(cfg.edge_id_property)
+    unsupported = sorted(id_properties.difference(ARROW_ID_PROPERTIES))
+    if unsupported:
+        raise ValueError(
+            f"arrow_streaming joins id properties from the node identity cache, which holds {ARROW_ID_PROPERTIES}; "
+            f"got {unsupported}"
+        )
+
+
+def node_feature_properties(cfg: RollingWindowConfig) -> list[str]:
+    """Array properties read from the database rather than the projection (as ``db_node_properties``)."""
+    if cfg.export_feature_vectors:
+        return ["bank_feats", "network_feats"]
+    if cfg.export_feature_blocks:
+        return ["bank_feats"]
+    return []
+
+
+def store_properties(cfg: RollingWindowConfig) -> list[str]:
+    """Columns the pandas path streams with ``db_node_properties``, in the same order."""
+    properties = [cfg.id_property]
+    if cfg.export_edges and cfg.edge_id_property != cfg.id_property:
+        properties.append(cfg.edge_id_property)
+    return properties + node_feature_properties(cfg)
+
+
+def _positions(sorted_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Index of each id in ``sorted_ids``, ``-1`` where it is missing."""
+    if len(sorted_ids) == 0:
+        return np.full(len(ids), -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return np.where(sorted_ids[pos] == ids, pos, -1)
+
+
+def _int64_ids(column: pa.ChunkedArray | pa.Array) -> np.ndarray:
+    return pc.cast(column, pa.int64()).to_numpy(zero_copy_only=False)
+
+
+def to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    """
+    ``df`` as an Arrow table with dictionary columns decoded.
+
+    Arrow-backed frames (what the GDS client returns over Arrow Flight) are
+    unwrapped without copying; other frames are converted.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, pc.cast(table.column(i), field.type.value_type))
+    return table
+
+
+def _set_column(table: pa.Table, name: str, values: pa.Array | pa.ChunkedArray) -> pa.Table:
+    """Replace ``name`` in place or append it, like assigning a DataFrame column."""
+    i = table.schema.get_field_index(name)
+    if i >= 0:
+        return table.set_column(i, name, values)
+    return table.append_column(name, values)
+
+
+def stream_node_table(gds: Any, G: Any, properties: list[str]) -> pa.Table:
+    """Node properties and labels of ``G``, without database properties (see ``ArrowNodeStore``)."""
+    df = gds.graph.nodeProperties.stream(G, properties, separate_property_columns=True, listNodeLabels=True)
+    return to_arrow_table(df)
+
+
+def stream_relationship_table(gds: Any, G: Any, rel_types: tuple[str, ...]) -> pa.Table:
+    return to_arrow_table(gds.graph.relationships.stream(G, relationship_types=list(rel_types)))
+
+
+def fetch_node_features(gds: Any, properties: list[str]) -> pa.Table | None:
+    """``gds_id`` and ``properties`` of every node that has one of them, read once per run."""
+    if not properties:
+        return None
+    predicate = " OR ".join(f"n.`{p}` IS NOT NULL" for p in properties)
+    returns = ", ".join(f"n.`{p}` AS `{p}`" for p in properties)
+    df = gds.run_cypher(f"MATCH (n) WHERE {predicate} RETURN id(n) AS gds_id, {returns}")
+    return pa.table(
+        {
+            "gds_id": pa.array(df["gds_id"].to_numpy(dtype=np.int64)),
+            **{p: pa.array(df[p].tolist(), type=_FLOAT_LIST) for p in properties},
+        }
+    )
+
+
+class ArrowNodeStore:
+    """
+    Node columns of the whole database as Arrow arrays, joined onto windows by Neo4j id.
+
+    Identity columns (``entity_id``, ``Id``) are aligned with the node identity
+    cache; array features with the ``gds_id`` of ``fetch_node_features``.
+    """
+
+    def __init__(self) -> None:
+        self._columns: dict[str, tuple[np.ndarray, pa.Array]] = {}
+
+    @classmethod
+    def build(cls, identity: NodeIdentityIndex, features: pa.Table | None = None) -> "ArrowNodeStore":
+        store = cls()
+        store.add(identity.gds_id, {name: pa.array(getattr(identity, name), from_pandas=True) for name in ("entity_id", "Id")})
+        if features is not None:
+            store.add(
+                _int64_ids(features["gds_id"]),
+                {name: features[name].combine_chunks() for name in features.column_names if name != "gds_id"},
+            )
+        return store
+
+    def add(self, gds_ids: np.ndarray, columns: dict[str, pa.Array]) -> None:
+        order = np.argsort(gds_ids, kind="stable")
+        sorted_ids = np.asarray(gds_ids, dtype=np.int64)[order]
+        indices = pa.array(order)
+        for name, values in columns.items():
+            self._columns[name] = (sorted_ids, values.take(indices))
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._columns
+
+    def take(self, gds_ids: np.ndarray, column: str) -> pa.Array:
+        """Values of ``column`` for ``gds_ids``; null where a node is unknown."""
+        sorted_ids, values = self._columns[column]
+        pos = _positions(sorted_ids, np.asarray(gds_ids, dtype=np.int64))
+        return values.take(pa.array(pos, mask=pos < 0))
+
+
+def append_client_properties(table: pa.Table, client_properties: dict[str, pd.Series]) -> pa.Table:
+    """``metrics.attach_client_properties`` on a node table: values by ``nodeId``, ``0.0`` where missing."""
+    if not client_properties:
+        return table
+    node_ids = _int64_ids(table["nodeId"])
+    for name, values in client_properties.items():
+        keys = values.index.to_numpy(dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        pos = _positions(keys[order], node_ids)
+        column = np.zeros(len(node_ids), dtype=np.float64)
+        hit = pos >= 0
+        column[hit] = values.to_numpy(dtype=np.float64)[order][pos[hit]]
+        column[np.isnan(column)] = 0.0
+        table = _set_column(table, name, pa.array(column))
+    return table
+
+
+def attach_store_columns(table: pa.Table, store: ArrowNodeStore, *, cfg: RollingWindowConfig) -> pa.Table:
+    """Database properties by ``nodeId`` and ``entity_id`` by ``gds_id``, as the pandas path joins them."""
+    node_ids = _int64_ids(table["nodeId"])
+    for name in store_properties(cfg):
+        values = store.take(node_ids, name) if name in store else pa.nulls(table.num_rows)
+        table = _set_column(table, name, values)
+    if "gds_id" in table.column_names:
+        gds_ids = _int64_ids(table["gds_id"])
+        table = _set_column(table, "gds_id", pa.array(gds_ids))
+        table = _set_column(table, "entity_id", store.take(gds_ids, "entity_id"))
+    else:
+        logger.error("gds_id missing from node table! Cannot merge IDs.")
+    return table
+
+
+def join_edge_ids(rels: pa.Table, store: ArrowNodeStore, *, edge_id_property: str) -> pa.Table:
+    """``frames.join_edge_endpoint_ids`` with index arrays instead of two merges."""
+    for end in ("source", "target"):
+        ids = _int64_ids(rels[f"{end}NodeId"])
+        rels = _set_column(rels, f"{end}_{edge_id_property}", store.take(ids, edge_id_property))
+    return rels
+
+
+def add_window_metadata_table(table: pa.Table, *, w: Window, window_graph_name: str, params_hash: str) -> pa.Table:
+    for name, value in (
+        ("window_start_ms", w.start_ms),
+        ("window_end_ms", w.end_ms),
+        ("window_start_year", w.start_year),
+        ("window_end_year_inclusive", w.end_year_inclusive),
+        ("window_graph_name", window_graph_name),
+        ("params_hash", params_hash),
+    ):
+        table = _set_column(table, name, pa.repeat(value, table.num_rows))
+    return table
+
+
+def _fcr_column(gds_ids: np.ndarray, fcr_map: dict[Any, float] | None) -> np.ndarray:
+    out = np.zeros(len(gds_ids), dtype=np.float64)
+    if fcr_map:
+        keys = np.fromiter(fcr_map.keys(), dtype=np.int64, count=len(fcr_map))
+        values = np.fromiter(fcr_map.values(), dtype=np.float64, count=len(fcr_map))
+        order = np.argsort(keys, kind="stable")
+        pos = _positions(keys[order], gds_ids)
+        hit = pos >= 0
+        out[hit] = values[order][pos[hit]]
+        out[np.isnan(out)] = 0.0
+        logger.info("Applied fcr_temporal to %d nodes", int((out > 0).sum()))
+    return out
+
+
+def finalise_node_table(
+    table: pa.Table,
+    *,
+    cfg: RollingWindowConfig,
+    w: Window,
+    window_graph_name: str,
+    params_hash: str,
+    fcr_map: dict[Any, float] | None,
+    expand_embeddings: bool = False,
+) -> pa.Table:
+    """``frames.finalise_node_frame`` on an Arrow node table."""
+    table = add_window_metadata_table(table, w=w, window_graph_name=window_graph_name, params_hash=params_hash)
+    names = set(table.column_names)
+
+    if {"in_degree", "out_degree"} <= names:
+        table = _set_column(table, "total_degree", pc.add(table["in_degree"], table["out_degree"]))
+
+    table = _set_column(table, "fcr_temporal", pa.array(_fcr_column(_int64_ids(table["gds_id"]), fcr_map)))
+
+    if is_fixed_size(cfg):
+        # FixedSizeList<float32>; feature blocks are resolved from bank_feats when read (vectors.py).
+        for column, dim in vector_dimensions(cfg).items():
+            if column in names:
+                table = _set_column(table, column, fixed_size_column(table[column], column=column, dim=dim))
+    else:
+        for column in EMBEDDING_COLUMNS + ("bank_feats", "network_feats"):
+            if column in names:
+                table = _set_column(table, column, pc.cast(table[column], _FLOAT_LIST))
+
+        if "bank_feats" in names and (cfg.export_feature_vectors or cfg.export_feature_blocks):
+            # Persons and Companies have no bank_feats; like the pandas path they count as zeros.
+            bank, _ = vector_matrix(table["bank_feats"], column="bank_feats", dim=BANK_FEATS_DIM, fill_missing=True)
+            if cfg.export_feature_vectors:
+                table = _set_column(table, "bank_feats", list_array(bank))
+            if cfg.export_feature_blocks:
+                for block_name, indices in BANK_FEATS_BLOCKS.items():
+                    table = _set_column(table, block_name, list_array(bank[:, indices]))
+                table = _set_column(table, "other_feats", list_array(bank[:, other_bank_feats_indices()]))
+
+    if expand_embeddings and "fastrp_embedding" in names:
+        emb, _ = vector_matrix(table["fastrp_embedding"], column="fastrp_embedding", dim=cfg.embedding_dimension)
+        for i in range(emb.shape[1]):
+            table = _set_column(table, f"emb_{i}", pa.array(emb[:, i]))
+    return table
+
+
+def finalise_edge_table(
+    rels: pa.Table,
+    *,
+    cfg: RollingWindowConfig,
+    w: Window,
+    window_graph_name: str,
+    params_hash: str,
+) -> pa.Table:
+    rels = add_window_metadata_table(rels, w=w, window_graph_name=window_graph_name, params_hash=params_hash)
+    return _set_column(rels, "edge_id_property", pa.repeat(str(cfg.edge_id_property), rels.num_rows))
+
+
+def as_frame(data: pd.DataFrame | pa.Table | None) -> pd.DataFrame | None:
+    """A pandas frame for consumers that need one (link prediction)."""
+    return data.to_pandas() if isinstance(data, pa.Table) else data
+
+
+@dataclass(frozen=True)
+class SyntheticWindow:
+    """A window as each path receives it: the pandas path's streamed frames, the Arrow path's tables and store."""
+
+    nodes: pd.DataFrame
+    relationships: pd.DataFrame
+    node_table: pa.Table
+    relationship_table: pa.Table
+    identity: NodeIdentityIndex
+    store: ArrowNodeStore
+    fcr_map: dict[int, float]
+
+
+def synthetic_window(
+    n_nodes: int,
+    n_edges: int,
+    *,
+    cfg: RollingWindowConfig,
+    network_feats_dim: int = 16,
+    bank_share: float = 0.05,
+    seed: int = 0,
+) -> SyntheticWindow:
+    """A random window with the columns a GDS run streams (Id and feature arrays as ``db_node_properties``)."""
+    rng = np.random.default_rng(seed)
+    node_ids = rng.permutation(n_nodes).astype(np.int64) * 3 + 10
+    is_bank = rng.random(n_nodes) < bank_share
+    labels = np.where(is_bank, "Bank", np.where(rng.random(n_nodes) < 0.5, "Company", "Person"))
+    ids = np.array([f"E{i}" for i in node_ids], dtype=object)
+    bank_feats = [rng.random(BANK_FEATS_DIM).tolist() if bank else None for bank in is_bank]
+    network_feats = rng.random((n_nodes, network_feats_dim))
+
+    identity = NodeIdentityIndex.from_frame(
+        pd.DataFrame(
+            {
+                "gds_id": node_ids,
+                "entity_id": ids,
+                "Id": ids,
+                "regn_cbr": [str(i) if bank else None for i, bank in zip(node_ids, is_bank)],
+                "labels": [[label] for label in labels],
+            }
+        ),
+        fingerprint="synthetic",
+    )
+    features = pa.table(
+        {
+            "gds_id": pa.array(node_ids),
+            "bank_feats": pa.array(bank_feats, type=_FLOAT_LIST),
+            "network_feats": pa.array(network_feats.tolist(), type=_FLOAT_LIST),
+        }
+    )
+    graph_columns: dict[str, Any] = {
+        "nodeId": node_ids,
+        "in_degree": rng.integers(0, 20, n_nodes).astype(np.float64),
+        "out_degree": rng.integers(0, 20, n_nodes).astype(np.float64),
+        "pagerank": rng.random(n_nodes),
+        "betweenness": rng.random(n_nodes),
+        "louvain_community": rng.integers(0, 50, n_nodes),
+        "wcc_component": rng.integers(0, 10, n_nodes),
+        "is_dead": rng.integers(0, 2, n_nodes),
+        "gds_id": node_ids,
+    }
+    embedding = rng.random((n_nodes, cfg.embedding_dimension))
+    node_table = pa.table(
+        {
+            **{name: pa.array(values) for name, values in graph_columns.items()},
+            "fastrp_embedding": list_array(embedding),
+            "nodeLabels": pa.array([[label] for label in labels]),
+        }
+    )
+    # What the Bolt path returns: Python lists in object columns, database properties joined on.
+    nodes = pd.DataFrame(
+        {
+            **graph_columns,
+            "fastrp_embedding": embedding.tolist(),
+            "nodeLabels": [[label] for label in labels],
+            cfg.id_property: ids,
+            "bank_feats": bank_feats,
+            "network_feats": network_feats.tolist(),
+        }
+    )
+
+    rel_types = np.asarray(cfg.rel_types)
+    relationships = pd.DataFrame(
+        {
+            "sourceNodeId": node_ids[rng.integers(0, n_nodes, n_edges)],
+            "targetNodeId": node_ids[rng.integers(0, n_nodes, n_edges)],
+            "relationshipType": rel_types[rng.integers(0, len(rel_types), n_edges)],
+        }
+    )
+    relationship_table = pa.Table.from_pandas(relationships, preserve_index=False).replace_schema_metadata(None)
+    # Flight sends relationship types dictionary-encoded.
+    relationship_table = relationship_table.set_column(
+        2, "relationshipType", relationship_table["relationshipType"].dictionary_encode()
+    )
+    banks = node_ids[is_bank]
+    return SyntheticWindow(
+        nodes=nodes,
+        relationships=relationships,
+        node_table=node_table,
+        relationship_table=relationship_table,
+        identity=identity,
+        store=ArrowNodeStore.build(identity, features),
+        fcr_map=dict(zip(banks.tolist(), rng.random(len(banks)).tolist())),
+    )
+
+
+def _best_of(repeat: int, fn) -> tuple[float, Any]:
+    best = float("inf")
+    result = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def benchmark_streaming_paths(
+    n_nodes: int,
+    n_edges: int | None = None,
+    *,
+    cfg: RollingWindowConfig | None = None,
+    repeat: int = 3,
+    directory: Path | None = None,
+) -> pd.DataFrame:
+    """
+    Best-of-``repeat`` wall time of the pandas and Arrow post-processing of one synthetic window.
+
+    Covers what happens after the stream: the identity/property joins, frame
+    finalisation and the Parquet write. The per-window ``db_node_properties``
+    query of the pandas path is not included, so its real cost is higher.
+    """
+    cfg = cfg or RollingWindowConfig()
+    n_edges = 4 * n_nodes if n_edges is None else n_edges
+    window = synthetic_window(n_nodes, n_edges, cfg=cfg)
+    w = Window(start_year=2014, end_year_inclusive=2016, start_ms=1_388_534_400_000, end_ms=1_483_228_800_000)
+    meta = dict(cfg=cfg, w=w, window_graph_name="rw_benchmark", params_hash="benchmark")
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        tmp_path = Path(tmp)
+
+        def pandas_nodes() -> int:
+            df = window.identity.attach(window.nodes.copy(), ["entity_id"])
+            df = finalise_node_frame(df, fcr_map=window.fcr_map, **meta)
+            write_parquet(df, tmp_path / "nodes_pandas.parquet")
+            return len(df)
+
+        def arrow_nodes() -> int:
+            table = attach_store_columns(window.node_table, window.store, cfg=cfg)
+            table = finalise_node_table(table, fcr_map=window.fcr_map, **meta)
+            write_table(table, tmp_path / "nodes_arrow.parquet")
+            return table.num_rows
+
+        def pandas_edges() -> int:
+            node_map = window.nodes[["nodeId", cfg.edge_id_property]]
+            df = join_edge_endpoint_ids(window.relationships, node_map, edge_id_property=cfg.edge_id_property)
+            df = finalise_edge_frame(df, **meta)
+            write_parquet(df, tmp_path / "edges_pandas.parquet")
+            return len(df)
+
+        def arrow_edges() -> int:
+            table = join_edge_ids(window.relationship_table, window.store, edge_id_property=cfg.edge_id_property)
+            table = finalise_edge_table(table, **meta)
+            write_table(table, tmp_path / "edges_arrow.parquet")
+            return table.num_rows
+
+        rows: list[dict[str, Any]] = []
+        for part, pandas_fn, arrow_fn in (("nodes", pandas_nodes, arrow_nodes), ("edges", pandas_edges, arrow_edges)):
+            pandas_s, n_rows = _best_of(repeat, pandas_fn)
+            arrow_s, _ = _best_of(repeat, arrow_fn)
+            for path, wall_s in (("pandas", pandas_s), ("arrow", arrow_s)):
+                rows.append(
+                    {
+                        "part": part,
+                        "path": path,
+                        "rows": n_rows,
+                        "wall_time_s": wall_s,
+                        "rows_per_s": n_rows / wall_s if wall_s > 0 else float("nan"),
+                        "speedup": pandas_s / wall_s if wall_s > 0 else float("nan"),
+                    }
+                )
+    return pd.DataFrame(rows)
@@ -0,0 +1,96 @@
+"""
+Bounded background queue for per-window post-processing.
+
+The GDS window loop hands each window's streamed frames to a
+``BackgroundWriter`` as soon as the window graph is dropped; ID merging,
+FCR joins, embedding coercion, feature-block slicing, Parquet writes and link
+prediction then run here while the next window is filtered and computed.
+
+``submit`` blocks once ``max_pending`` jobs are queued or running, so streamed
+frames never pile up in memory. ``close`` always waits for accepted jobs
+(also when the loop is interrupted), so every window that finished streaming
+is written; Parquet files are written atomically, so an interrupted write
+never leaves a partial file that ``skip_existing`` would accept. A job that
+failed on a writer thread is raised again by ``close`` on the calling thread.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BackgroundWriter:
+    """
+    Run post-processing jobs on ``workers`` background threads, at most ``max_pending`` at a time.
+
+    With ``max_pending=0`` jobs run inline in ``submit`` (the serial behaviour).
+    """
+
+    def __init__(self, max_pending: int, *, workers: int = 1):
+        if max_pending < 0:
+            raise ValueError(f"max_pending must be >= 0, got {max_pending}")
+        if workers < 1:
+            raise ValueError(f"workers must be >= 1, got {workers}")
+        self.max_pending = int(max_pending)
+        self._slots = threading.BoundedSemaphore(max(self.max_pending, 1))
+        self._executor = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="window-writer") if self.max_pending else None
+        )
+        self._errors_lock = threading.Lock()
+        self._errors: list[BaseException] = []
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future[T]:
+        if self._executor is None:
+            fut: Future[T] = Future()
+            try:
+                fut.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                fut.set_exception(e)
+            self._record_failure(fut)
+            return fut
+
+        self._slots.acquire()
+        try:
+            fut = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        fut.add_done_callback(self._record_failure)
+        return fut
+
+    def _record_failure(self, fut: Future) -> None:
+        if not fut.cancelled() and fut.exception() is not None:
+            with self._errors_lock:
+                self._errors.append(fut.exception())
+
+    def close(self, *, raise_errors: bool = True) -> None:
+        """
+        Wait for every accepted job to finish, then raise the first failure not raised yet.
+
+        With ``raise_errors=False`` failures are left to the jobs' futures (for
+        cleanup while another exception is propagating).
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if not raise_errors:
+            return
+        with self._errors_lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            if len(errors) > 1:
+                logger.error("%d background jobs failed; raising the first", len(errors))
+            raise errors[0]
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(raise_errors=exc_type is None)
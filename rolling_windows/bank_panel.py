@@ -0,0 +1,198 @@
+"""
+Slim per-run bank panel next to the full window outputs.
+
+The survival loaders only use Bank rows and a few scalar metrics, but the
+window files hold every node with its embeddings and feature vectors. With
+``RollingWindowConfig.bank_panel`` each window also writes its Bank rows as a
+small part, ``bank_panel/parts_{params_hash}/{window_graph_name}.parquet``,
+as soon as its node output is written (by whichever thread or worker process
+wrote it). A part holds:
+
+- the window metadata (``window_graph_name``, ``window_start_ms``, ...),
+- the identities (``regn_cbr``, ``Id``, ``entity_id``, ``gds_id``, ``nodeId``),
+- every scalar metric column (``page_rank``, degrees, centralities, ``wcc``,
+  ``is_dead``, ``fcr_temporal``, ...); embeddings, ``emb_*``, feature vectors
+  and blocks are left out,
+- the Louvain hierarchy flattened to ``louvain_level_{i}`` columns.
+
+At the end of the run (also after an interrupt) ``compact_bank_panel`` folds
+the parts into ``bank_panel/bank_panel_{params_hash}.parquet``, one file
+sorted by ``regn_cbr``, ``window_start_ms`` and ``Id`` across all windows of
+this and earlier runs. Windows skipped as already written and missing from
+the panel are read back from their node files (only the panel's columns).
+"""
+
+from __future__ import annotations
+
+import logging
+import shutil
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from config import RollingWindowConfig
+from dataset import LABEL_COLUMN, primary_label
+from parquet import write_table
+
+logger = logging.getLogger(__name__)
+
+BANK_PANEL_DIRNAME = "bank_panel"
+LOUVAIN_COLUMN = "community_louvain"
+# Scalar columns of the node outputs that are not bank metrics.
+_EXCLUDED_COLUMNS = frozenset({"params_hash", "period_type", LABEL_COLUMN})
+SORT_COLUMNS: tuple[str, ...] = ("regn_cbr", "window_start_ms", "Id")
+
+# ``regn_cbr`` of the Bank rows of a node table (aligned with its rows).
+RegnLookup = Callable[[pa.Table], np.ndarray]
+
+
+def bank_panel_path(cfg: RollingWindowConfig, params_hash: str) -> Path:
+    return cfg.output_dir / BANK_PANEL_DIRNAME / f"bank_panel_{params_hash}.parquet"
+
+
+def bank_panel_parts_dir(cfg: RollingWindowConfig, params_hash: str) -> Path:
+    return cfg.output_dir / BANK_PANEL_DIRNAME / f"parts_{params_hash}"
+
+
+def _is_scalar(arrow_type: pa.DataType) -> bool:
+    return not (pa.types.is_nested(arrow_type) or pa.types.is_dictionary(arrow_type) or pa.types.is_null(arrow_type))
+
+
+def panel_columns(schema: pa.Schema) -> list[str]:
+    """The node output columns that go into the panel."""
+    return [
+        field.name
+        for field in schema
+        if field.name == LOUVAIN_COLUMN
+        or (_is_scalar(field.type) and field.name not in _EXCLUDED_COLUMNS and not field.name.startswith("emb_"))
+    ]
+
+
+def louvain_levels(column: pa.Array | pa.ChunkedArray) -> dict[str, pa.Array]:
+    """``louvain_level_{i}``: the ``i``-th intermediate community of each row (null past its last level)."""
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    if not pa.types.is_list(column.type) and not pa.types.is_large_list(column.type):
+        return {"louvain_level_0": column.cast(pa.int64())}
+    lengths = pc.fill_null(pc.list_value_length(column), 0).to_numpy(zero_copy_only=False)
+    flat = pc.list_flatten(column).cast(pa.int64()).to_numpy(zero_copy_only=False)
+    parents = pc.list_parent_indices(column).to_numpy(zero_copy_only=False)
+    position = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    levels: dict[str, pa.Array] = {}
+    for level in range(int(lengths.max()) if len(lengths) else 0):
+        at_level = position == level
+        values = np.zeros(len(column), dtype=np.int64)
+        values[parents[at_level]] = flat[at_level]
+        levels[f"louvain_level_{level}"] = pa.array(values, mask=lengths <= level)
+    return levels
+
+
+def bank_panel_table(
+    nodes: pd.DataFrame | pa.Table,
+    *,
+    window_graph_name: str,
+    regn_lookup: RegnLookup | None = None,
+) -> pa.Table:
+    """The panel rows of one window's node output: Bank rows, scalar metrics, Louvain levels, ``regn_cbr``."""
+    table = nodes if isinstance(nodes, pa.Table) else pa.Table.from_pandas(nodes, preserve_index=False)
+    if "nodeLabels" not in table.column_names:
+        raise ValueError(f"Node output of {window_graph_name} has no nodeLabels; cannot select Bank rows")
+    table = table.filter(pc.equal(primary_label(table["nodeLabels"]), "Bank"))
+    table = table.select(panel_columns(table.schema)).replace_schema_metadata(None)
+
+    if LOUVAIN_COLUMN in table.column_names:
+        levels = louvain_levels(table[LOUVAIN_COLUMN])
+        table = table.drop_columns([LOUVAIN_COLUMN])
+        for name, values in levels.items():
+            table = table.append_column(name, values)
+    # Partition keys of the dataset layout are not stored in the node file.
+    if "window_graph_name" not in table.column_names:
+        table = table.append_column("window_graph_name", pa.array([window_graph_name] * table.num_rows, pa.string()))
+    regn = regn_lookup(table) if regn_lookup is not None else np.full(table.num_rows, None, dtype=object)
+    table = table.append_column("regn_cbr", pa.array(regn, type=pa.string()))
+
+    leading = [c for c in ("window_graph_name", "regn_cbr", "Id", "entity_id") if c in table.column_names]
+    return table.select(leading + [c for c in table.column_names if c not in leading])
+
+
+def write_bank_panel_part(
+    nodes: pd.DataFrame | pa.Table,
+    *,
+    cfg: RollingWindowConfig,
+    params_hash: str,
+    window_graph_name: str,
+    regn_lookup: RegnLookup | None = None,
+) -> int:
+    """Write the panel part of one window; returns its Bank row count."""
+    part = bank_panel_table(nodes, window_graph_name=window_graph_name, regn_lookup=regn_lookup)
+    write_table(part, bank_panel_parts_dir(cfg, params_hash) / f"{window_graph_name}.parquet")
+    return part.num_rows
+
+
+def _concat(tables: list[pa.Table]) -> pa.Table:
+    # Windows can differ in their Louvain depth, so missing level columns become nulls.
+    table = pa.concat_tables(tables, promote_options="permissive")
+    levels = sorted(
+        (c for c in table.column_names if c.startswith("louvain_level_")),
+        key=lambda c: int(c.rsplit("_", 1)[1]),
+    )
+    return table.select([c for c in table.column_names if not c.startswith("louvain_level_")] + levels)
+
+
+def compact_bank_panel(
+    cfg: RollingWindowConfig,
+    params_hash: str,
+    *,
+    node_paths: dict[str, Path],
+    regn_lookup: Callable[[], RegnLookup | None] | None = None,
+) -> pa.Table:
+    """
+    Fold the parts of this run into the sorted panel file and remove them.
+
+    ``node_paths`` maps every window of the run to its node output; windows
+    with neither a part nor panel rows are read back from those files.
+    ``regn_lookup`` is only called when such a window exists.
+    """
+    path = bank_panel_path(cfg, params_hash)
+    parts_dir = bank_panel_parts_dir(cfg, params_hash)
+    parts = {p.stem: pq.read_table(p) for p in sorted(parts_dir.glob("*.parquet"))} if parts_dir.exists() else {}
+
+    tables = list(parts.values())
+    covered = set(parts)
+    if path.exists():
+        previous = pq.read_table(path)
+        keep = pc.invert(pc.is_in(previous["window_graph_name"], value_set=pa.array(sorted(covered), pa.string())))
+        previous = previous.filter(keep)
+        covered.update(previous["window_graph_name"].unique().to_pylist())
+        tables.append(previous)
+
+    missing = {name: p for name, p in node_paths.items() if name not in covered and p.exists()}
+    if missing:
+        logger.info("Adding %d windows to the bank panel from their node outputs", len(missing))
+        lookup = regn_lookup() if regn_lookup is not None else None
+        for name, node_path in sorted(missing.items()):
+            schema = pq.read_schema(node_path)
+            columns = panel_columns(schema) + ["nodeLabels"]
+            table = pq.read_table(node_path, columns=[c for c in schema.names if c in columns])
+            tables.append(bank_panel_table(table, window_graph_name=name, regn_lookup=lookup))
+
+    if not tables:
+        return pa.table({})
+    panel = _concat(tables)
+    sort_keys = [(c, "ascending") for c in SORT_COLUMNS if c in panel.column_names]
+    panel = panel.take(pc.sort_indices(panel, sort_keys=sort_keys))
+    logger.info("Writing bank panel: %s (rows=%d windows=%d)", path, panel.num_rows, len(covered) + len(missing))
+    write_table(panel, path)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    return panel
+
+
+def read_bank_panel(output_dir: Path, params_hash: str, columns: Iterable[str] | None = None) -> pd.DataFrame:
+    """The bank panel of a run (``columns`` only, all by default)."""
+    path = Path(output_dir) / BANK_PANEL_DIRNAME / f"bank_panel_{params_hash}.parquet"
+    return pq.read_table(path, columns=None if columns is None else list(columns)).to_pandas()
@@ -0,0 +1,274 @@
+"""
+Append-only checkpoint log of a GDS run.
+
+Every window that finishes writing its outputs appends one JSON line to
+``manifest/checkpoint_{params_hash}.jsonl`` (flushed and fsynced), so a hard
+kill loses at most the windows still in flight. A record holds the window's
+manifest row (row counts, algorithm statistics, stage timings) and, per output
+file written, its row count, size, SHA-256 and column set.
+
+On resume ``outputs_needed`` decides from the log alone: an output is reused
+when its latest entry has the required columns and the file still has the
+recorded size. Outputs written before the log existed are checked once via
+their Parquet footer and then adopted into the log.
+
+``compact`` folds the log into ``manifest_{params_hash}.parquet`` (one row
+per window, latest record wins over earlier runs) and rewrites the log with
+one line per window.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from config import RollingWindowConfig
+from frames import required_edge_columns, required_node_columns
+from parquet import write_parquet
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+def checkpoint_path(cfg: RollingWindowConfig, params_hash: str) -> Path:
+    return cfg.output_dir / "manifest" / f"checkpoint_{params_hash}.jsonl"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def output_entry(path: Path, *, root: Path) -> dict[str, Any]:
+    """Log entry of a Parquet file that has just been written (or is being adopted)."""
+    parquet_file = pq.ParquetFile(path)
+    return {
+        "path": os.path.relpath(path, root),
+        "rows": int(parquet_file.metadata.num_rows),
+        "bytes": int(path.stat().st_size),
+        "sha256": file_sha256(path),
+        "columns": list(parquet_file.schema_arrow.names),
+    }
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (np.ndarray, tuple)):
+        return list(value)
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"Not JSON serialisable: {type(value).__name__}")
+
+
+class CheckpointLog:
+    """
+    The checkpoint log of one ``params_hash``, loaded once and appended to by any thread.
+
+    Per window it keeps the last record and the last entry per output kind,
+    so a window whose nodes were recomputed keeps the entry of its edges.
+    """
+
+    def __init__(self, path: Path, *, root: Path):
+        self.path = path
+        self.root = root
+        self._lock = threading.Lock()
+        self._records: dict[str, dict[str, Any]] = {}
+        self._outputs: dict[str, dict[str, dict[str, Any]]] = {}
+        for record in self._read():
+            self._remember(record)
+
+    @classmethod
+    def for_run(cls, cfg: RollingWindowConfig, params_hash: str) -> "CheckpointLog":
+        return cls(checkpoint_path(cfg, params_hash), root=cfg.output_dir)
+
+    def _read(self) -> list[dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        records: list[dict[str, Any]] = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for lineno, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A hard kill can leave a truncated last line; everything before it is intact.
+                    logger.warning("Ignoring unreadable checkpoint line %d in %s", lineno, self.path)
+        return records
+
+    def _remember(self, record: dict[str, Any]) -> None:
+        name = record["window_graph_name"]
+        self._records[name] = record
+        outputs = self._outputs.setdefault(name, {})
+        outputs.update(record.get("outputs") or {})
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def latest(self, window_graph_name: str) -> dict[str, Any] | None:
+        with self._lock:
+            return self._records.get(window_graph_name)
+
+    def output(self, window_graph_name: str, kind: str) -> dict[str, Any] | None:
+        with self._lock:
+            return self._outputs.get(window_graph_name, {}).get(kind)
+
+    def append(
+        self,
+        window_graph_name: str,
+        *,
+        status: str,
+        row: dict[str, Any] | None = None,
+        outputs: dict[str, dict[str, Any]] | None = None,
+        error: str | None = None,
+    ) -> dict[str, Any]:
+        record: dict[str, Any] = {
+            "window_graph_name": window_graph_name,
+            "status": status,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "row": row or {},
+            "outputs": outputs or {},
+        }
+        if error is not None:
+            record["error"] = error
+        line = json.dumps(record, default=_json_default, separators=(",", ":")) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._remember(json.loads(line))
+        return record
+
+    def reusable(self, window_graph_name: str, kind: str, path: Path, required: set[str]) -> dict[str, Any] | None:
+        """The logged entry of ``path`` if it can be reused without opening the file."""
+        entry = self.output(window_graph_name, kind)
+        if entry is None:
+            return None
+        missing = required.difference(entry.get("columns", []))
+        if missing:
+            logger.info("Logged %s of %s lacks required columns %s; recomputing", kind, window_graph_name, sorted(missing))
+            return None
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return None
+        if size != entry.get("bytes"):
+            logger.info("%s changed since it was logged (%d != %s bytes); recomputing", path, size, entry.get("bytes"))
+            return None
+        return entry
+
+    def compact(self, manifest_path: Path) -> pd.DataFrame:
+        """Fold the log into ``manifest_path`` and rewrite the log with one line per window."""
+        with self._lock:
+            previous: dict[str, dict[str, Any]] = {}
+            if manifest_path.exists():
+                for row in pd.read_parquet(manifest_path).to_dict("records"):
+                    previous[row["window_graph_name"]] = row
+
+            # Adopted records carry no row of their own; they keep the window's earlier manifest row.
+            for name, record in self._records.items():
+                row = {**previous.get(name, {}), **record.get("row", {})}
+                row["window_graph_name"] = name
+                row["status"] = record["status"]
+                if "error" in record:
+                    row["error"] = record["error"]
+                for kind, entry in self._outputs.get(name, {}).items():
+                    row[f"{kind}_rows"] = entry.get("rows")
+                    row[f"{kind}_bytes"] = entry.get("bytes")
+                    row[f"{kind}_sha256"] = entry.get("sha256")
+                previous[name] = row
+
+            manifest = pd.DataFrame(list(previous.values()))
+            if not manifest.empty and "window_start_ms" in manifest.columns:
+                manifest = manifest.sort_values("window_start_ms", kind="stable").reset_index(drop=True)
+            logger.info("Writing manifest: %s (windows=%d)", manifest_path, manifest.shape[0])
+            write_parquet(manifest, manifest_path)
+
+            compacted = [
+                {**record, "outputs": self._outputs.get(name, {})} for name, record in self._records.items()
+            ]
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for record in compacted:
+                        f.write(json.dumps(record, default=_json_default, separators=(",", ":")) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+            return manifest
+
+
+def outputs_needed(
+    checkpoint: CheckpointLog,
+    cfg: RollingWindowConfig,
+    *,
+    window_graph_name: str,
+    node_out_path: Path,
+    edges_out_path: Path,
+    skip_existing: bool,
+) -> tuple[bool, bool]:
+    """
+    ``(need_nodes, need_edges)`` from the checkpoint log.
+
+    Files without a log entry (written before the log existed) are checked
+    through their Parquet footer once and adopted into the log when complete.
+    """
+    need_edges_at_all = bool(cfg.export_edges)
+    if not skip_existing:
+        return True, need_edges_at_all
+
+    adopted: dict[str, dict[str, Any]] = {}
+    needed: dict[str, bool] = {}
+    for kind, path, required, wanted in (
+        ("nodes", node_out_path, required_node_columns(cfg), True),
+        ("edges", edges_out_path, required_edge_columns(cfg), need_edges_at_all),
+    ):
+        if not wanted:
+            needed[kind] = False
+            continue
+        if checkpoint.reusable(window_graph_name, kind, path, required) is not None:
+            needed[kind] = False
+            continue
+        if checkpoint.output(window_graph_name, kind) is None and path.exists():
+            entry = output_entry(path, root=checkpoint.root)
+            if required.issubset(entry["columns"]):
+                adopted[kind] = entry
+                needed[kind] = False
+                continue
+            logger.info(
+                "Existing %s parquet is missing required columns %s; recomputing: %s",
+                kind,
+                sorted(required.difference(entry["columns"])),
+                path,
+            )
+        needed[kind] = True
+
+    if adopted:
+        logger.info("Adopting existing %s of %s into the checkpoint log", "/".join(adopted), window_graph_name)
+        checkpoint.append(window_graph_name, status="adopted", outputs=adopted)
+    return needed["nodes"], needed["edges"]
+
+
+def logged_row_count(checkpoint: CheckpointLog, window_graph_name: str, kind: str) -> int:
+    entry = checkpoint.output(window_graph_name, kind)
+    return int(entry["rows"]) if entry is not None else 0
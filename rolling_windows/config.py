@@ -46,6 +46,80 @@ class RollingWindowConfig:
 
     pagerank_max_iterations: int = 20
     pagerank_damping_factor: float = 0.85
+    pagerank_tolerance: float = 1e-7
+
+    eigenvector_max_iterations: int = 20
+    eigenvector_tolerance: float = 1e-7
+
+    louvain_max_iterations: int = 20
+    louvain_tolerance: float = 1e-4
+
+    # Seed PageRank/eigenvector/Louvain from the previous window (local engine only)
+    warm_start: bool = False
+
+    # How window graphs are built in GDS: "filter_chain" (base graph -> temp filter ->
+    # degree mutate -> participant filter) or "single_pass" (one Cypher aggregation projection)
+    window_materialisation: str = "filter_chain"
+
+    # Filter windows from a graph per block of this many start years instead of from the
+    # base graph (filter_chain only; 0 disables)
+    super_window_years: int = 0
+
+    # "exact" or "approximate" betweenness/closeness (see approximation.py). Approximate mode
+    # samples betweenness sources (a fixed size, or the size for a target error when 0) and uses
+    # landmark closeness; the window starting in centrality_calibration_start_year (default: the
+    # first window) is also computed exactly and the rank correlations are recorded.
+    centrality_mode: str = "exact"
+    betweenness_sampling_size: int = 0
+    betweenness_target_error: float = 0.05
+    closeness_landmarks: int = 256
+    centrality_sampling_seed: int = 42
+    centrality_calibration_start_year: int | None = None
+
+    # Write a pre-flight plan (window sizes, GDS memory estimates, per-window concurrency and
+    # order) before projecting anything, and follow it. The budget defaults to a share of the
+    # free GDS heap.
+    preflight_plan: bool = False
+    gds_memory_budget_gb: float | None = None
+
+    # Fingerprint every window graph (nodes, relationships, algorithm config) and reuse the
+    # outputs of an earlier window with the same fingerprint instead of recomputing (see dedup.py)
+    dedup_windows: bool = False
+    # Clear the dedup index of this params_hash before the run, e.g. after editing node
+    # properties the fingerprint does not cover (bank_feats/network_feats on the GDS engine)
+    dedup_invalidate: bool = False
+
+    # Trace wall time, rows and RSS of every stage of every window to profile/trace_<run_id>.jsonl
+    # (and .parquet at the end of the run); optionally log the trace to this MLflow experiment
+    profile_stages: bool = False
+    profile_mlflow_experiment: str | None = None
+
+    # Keep streamed nodes/relationships as Arrow tables up to the Parquet write: database
+    # properties and edge ids are joined from a run-level store instead of per-window queries
+    # and pandas merges (see arrow_stream.py; fastest with Neo4jConfig.arrow)
+    arrow_streaming: bool = False
+    # Stream, finalise and write the nodes of a window in batches of this many nodes, one Parquet
+    # row group each, so peak memory follows the batch and not the window (0: whole window at
+    # once; needs arrow_streaming; see node_export.py)
+    node_export_batch_size: int = 0
+
+    # How embeddings and feature vectors are written: "list" (list<double>, feature blocks as
+    # columns) or "fixed_size" (FixedSizeList<float32>, blocks resolved from bank_feats when
+    # read; see vectors.py)
+    vector_storage: str = "list"
+
+    # Where window outputs go: "files" (nodes/node_features_{window}.parquet, edges/...) or
+    # "dataset" (hive-partitioned dataset/{nodes,edges}/params_hash=/period_type=/window_graph_name=,
+    # rows sorted by label and entity id in row groups of dataset_row_group_size; see dataset.py)
+    output_layout: str = "files"
+    dataset_row_group_size: int = 16_384
+
+    # Also write the Bank rows' scalar metrics, Louvain levels, FCR and regn_cbr of every window
+    # into one sorted bank_panel/bank_panel_{params_hash}.parquet (see bank_panel.py)
+    bank_panel: bool = False
+
+    # Compute temporal FCR for all windows in one pass instead of one Cypher query per window
+    fcr_bulk: bool = True
 
     embedding_dimension: int = 128
     embedding_random_seed: int = 42
@@ -78,6 +152,9 @@ class RollingWindowConfig:
 
     run_link_prediction: bool = False
     lp_threshold: float = 0.7
+    # Run the link prediction horse race once per this many windows (in time order) and score the
+    # windows in between with the cached model and scaler; 0 trains once per run
+    lp_retrain_every: int = 0
 
 
 def load_neo4j_config(
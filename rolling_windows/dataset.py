@@ -0,0 +1,218 @@
+"""
+Hive-partitioned window outputs and a reader that pushes projections and filters down.
+
+With ``RollingWindowConfig.output_layout = "dataset"`` the node and edge files
+of a window are written to::
+
+    dataset/{nodes,edges}/params_hash={h}/period_type={p}/window_graph_name={name}/part-0.parquet
+
+instead of ``nodes/node_features_{name}.parquet`` and
+``edges/edge_list_{name}.parquet``. ``params_hash`` and ``window_graph_name``
+become partition keys instead of columns repeated on every row, and
+``period_type`` is added as one. Node rows get a ``node_label`` column (the
+first of ``NODE_LABELS`` in ``nodeLabels``) and are sorted by ``node_label``
+and ``entity_id`` (nulls last); edges are sorted by ``relationshipType`` and
+``sourceNodeId``. Label columns are dictionary-encoded in the Parquet pages
+and row groups are small (``dataset_row_group_size``), so the min/max
+statistics of ``node_label`` and of the window bounds let a filter skip row
+groups without reading them.
+
+``read_window_table`` / ``read_window_frame`` read only the requested columns
+of the row groups that can match the partition keys, labels and time range:
+a survival loader asking for five scalar columns of banks reads those column
+chunks of the bank row groups and nothing else. Runs with different settings
+share the dataset under their own ``params_hash``; ``latest_params_hash``
+picks the most recent one.
+
+This module has no flat imports so that loaders outside ``rolling_windows``
+can import it as ``rolling_windows.dataset`` (like ``node_identity``).
+"""
+
+from __future__ import annotations
+
+import functools
+import operator
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+DATASET_DIRNAME = "dataset"
+OUTPUT_LAYOUTS: tuple[str, ...] = ("files", "dataset")
+DATASET_PARTS: tuple[str, ...] = ("nodes", "edges")
+
+# Explicit types: inferred keys would turn an all-digit params_hash into an integer.
+PARTITION_SCHEMA = pa.schema(
+    [
+        ("params_hash", pa.string()),
+        ("period_type", pa.string()),
+        ("window_graph_name", pa.string()),
+    ]
+)
+PARTITION_COLUMNS: tuple[str, ...] = tuple(PARTITION_SCHEMA.names)
+
+# ``node_label`` is the first of these in a node's ``nodeLabels``.
+NODE_LABELS: tuple[str, ...] = ("Bank", "Company", "Person")
+LABEL_COLUMN = "node_label"
+
+SORT_COLUMNS: dict[str, tuple[str, ...]] = {
+    "nodes": (LABEL_COLUMN, "entity_id"),
+    "edges": ("relationshipType", "sourceNodeId"),
+}
+
+
+def dataset_root(output_dir: Path, part: str = "nodes") -> Path:
+    if part not in DATASET_PARTS:
+        raise ValueError(f"Unknown dataset part {part!r}; expected one of {DATASET_PARTS}")
+    return Path(output_dir) / DATASET_DIRNAME / part
+
+
+def partition_path(
+    output_dir: Path,
+    part: str,
+    *,
+    params_hash: str,
+    period_type: str,
+    window_graph_name: str,
+) -> Path:
+    """The file of one window in the ``part`` dataset."""
+    return (
+        dataset_root(output_dir, part)
+        / f"params_hash={params_hash}"
+        / f"period_type={period_type}"
+        / f"window_graph_name={window_graph_name}"
+        / "part-0.parquet"
+    )
+
+
+def primary_label(node_labels: pa.Array | pa.ChunkedArray) -> pa.Array:
+    """The first of ``NODE_LABELS`` in each ``nodeLabels`` list (null if there is none)."""
+    if isinstance(node_labels, pa.ChunkedArray):
+        node_labels = node_labels.combine_chunks()
+    ranks = np.full(len(node_labels), len(NODE_LABELS), dtype=np.int64)
+    if len(node_labels) and not pa.types.is_null(node_labels.type):
+        flat_ranks = pc.index_in(pc.list_flatten(node_labels), value_set=pa.array(NODE_LABELS))
+        flat_ranks = pc.fill_null(flat_ranks, len(NODE_LABELS)).to_numpy(zero_copy_only=False)
+        parents = pc.list_parent_indices(node_labels).to_numpy(zero_copy_only=False)
+        np.minimum.at(ranks, parents, flat_ranks)
+    labels = np.array(NODE_LABELS + (None,), dtype=object)[ranks]
+    return pa.array(labels, type=pa.string())
+
+
+def dataset_table(table: pa.Table, part: str) -> pa.Table:
+    """
+    ``table`` as written to the dataset: partition columns dropped, ``node_label``
+    added to nodes, rows sorted by ``SORT_COLUMNS`` and no pandas metadata.
+    """
+    table = table.replace_schema_metadata(None)
+    table = table.drop_columns([c for c in PARTITION_COLUMNS if c in table.column_names])
+    if part == "nodes" and "nodeLabels" in table.column_names:
+        if LABEL_COLUMN in table.column_names:  # rewritten from an earlier window (dedup)
+            table = table.drop_columns([LABEL_COLUMN])
+        table = table.append_column(LABEL_COLUMN, primary_label(table["nodeLabels"]))
+    sort_keys = [(c, "ascending") for c in SORT_COLUMNS[part] if c in table.column_names]
+    if sort_keys and table.num_rows:
+        table = table.take(pc.sort_indices(table, sort_keys=sort_keys))
+    return table
+
+
+def window_filter(
+    *,
+    period_type: str | None = None,
+    windows: Iterable[str] | None = None,
+    labels: Iterable[str] | None = None,
+    start_ms: int | None = None,
+    end_ms: int | None = None,
+) -> ds.Expression | None:
+    """
+    Filter on partition keys, ``node_label`` and windows overlapping ``[start_ms, end_ms)``.
+
+    Partition keys prune directories; the label and time conditions prune row
+    groups through their statistics. ``params_hash`` is selected by directory
+    in ``open_window_dataset``.
+    """
+    conditions = []
+    if period_type is not None:
+        conditions.append(ds.field("period_type") == period_type)
+    if windows is not None:
+        conditions.append(ds.field("window_graph_name").isin(list(windows)))
+    if labels is not None:
+        conditions.append(ds.field(LABEL_COLUMN).isin(list(labels)))
+    if start_ms is not None:
+        conditions.append(ds.field("window_end_ms") > int(start_ms))
+    if end_ms is not None:
+        conditions.append(ds.field("window_start_ms") < int(end_ms))
+    return functools.reduce(operator.and_, conditions) if conditions else None
+
+
+def open_window_dataset(output_dir: Path, part: str = "nodes", *, params_hash: str | None = None) -> ds.Dataset:
+    """
+    The ``part`` dataset under ``output_dir``; with ``params_hash`` only that run's directory is listed.
+
+    The schema is that of the first file; files of one run share it.
+    """
+    root = dataset_root(output_dir, part)
+    source = root / f"params_hash={params_hash}" if params_hash is not None else root
+    if not source.exists():
+        raise FileNotFoundError(f"No window dataset at {source}")
+    partitioning = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+    return ds.dataset(str(source), format="parquet", partitioning=partitioning, partition_base_dir=str(root))
+
+
+def latest_params_hash(output_dir: Path, part: str = "nodes") -> str:
+    """
+    The run in the ``part`` dataset whose manifest (``manifest/manifest_{params_hash}.parquet``) is newest.
+
+    Runs without a manifest (still running or interrupted) only count when no run has one.
+    """
+    root = dataset_root(output_dir, part)
+    runs = {path.name.split("=", 1)[1]: path for path in root.glob("params_hash=*") if path.is_dir()}
+    if not runs:
+        raise FileNotFoundError(f"No window dataset at {root}")
+
+    def recency(params_hash: str) -> tuple[bool, float]:
+        manifest = Path(output_dir) / "manifest" / f"manifest_{params_hash}.parquet"
+        if manifest.exists():
+            return True, manifest.stat().st_mtime
+        return False, runs[params_hash].stat().st_mtime
+
+    return max(runs, key=recency)
+
+
+def read_window_table(
+    output_dir: Path,
+    columns: Iterable[str] | None = None,
+    *,
+    part: str = "nodes",
+    params_hash: str | None = None,
+    period_type: str | None = None,
+    windows: Iterable[str] | None = None,
+    labels: Iterable[str] | None = None,
+    start_ms: int | None = None,
+    end_ms: int | None = None,
+) -> pa.Table:
+    """
+    ``columns`` (all by default) of the rows matching the filters (see ``window_filter``).
+
+    Filter columns need not be among ``columns``. ``labels`` only applies to nodes.
+    """
+    if labels is not None and part != "nodes":
+        raise ValueError("labels can only filter the nodes dataset")
+    dataset = open_window_dataset(output_dir, part, params_hash=params_hash)
+    expression = window_filter(
+        period_type=period_type,
+        windows=windows,
+        labels=labels,
+        start_ms=start_ms,
+        end_ms=end_ms,
+    )
+    return dataset.to_table(columns=None if columns is None else list(columns), filter=expression)
+
+
+def read_window_frame(output_dir: Path, columns: Iterable[str] | None = None, **filters) -> pd.DataFrame:
+    """``read_window_table`` as pandas."""
+    return read_window_table(output_dir, columns, **filters).to_pandas()
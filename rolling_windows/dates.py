@@ -250,3 +250,49 @@ def iter_year_windows(
         period_type="yearly",
     )
 
+
+@dataclass(frozen=True)
+class SuperWindow:
+    """An enclosing interval filtered once, from which its inner windows are derived."""
+    start_year: int
+    end_year_inclusive: int
+    start_ms: int
+    end_ms: int
+    windows: tuple[Window, ...]
+
+    @property
+    def name_suffix(self) -> str:
+        return f"sw_{self.start_year}_{self.end_year_inclusive}"
+
+
+def group_super_windows(windows: list[Window], *, years: int) -> list[SuperWindow]:
+    """
+    Group windows by the ``years``-year block their start falls in (aligned to the earliest window's year).
+
+    Each group's interval spans from its earliest window start to its latest
+    window end, so every inner window lies inside it. Groups are in time order;
+    windows keep their input order within a group.
+    """
+    if years <= 0:
+        raise ValueError("years must be positive")
+    if not windows:
+        return []
+
+    first_year = min(w.start_year for w in windows)
+    groups: dict[int, list[Window]] = {}
+    for w in windows:
+        groups.setdefault((w.start_year - first_year) // years, []).append(w)
+
+    out: list[SuperWindow] = []
+    for key in sorted(groups):
+        members = groups[key]
+        out.append(
+            SuperWindow(
+                start_year=first_year + key * years,
+                end_year_inclusive=first_year + (key + 1) * years - 1,
+                start_ms=min(w.start_ms for w in members),
+                end_ms=max(w.end_ms for w in members),
+                windows=tuple(members),
+            )
+        )
+    return out
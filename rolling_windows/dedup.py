@@ -0,0 +1,248 @@
+"""
+Content-addressed deduplication of identical window graphs.
+
+In sparse periods consecutive windows often contain exactly the same
+participant graph, and every algorithm then produces exactly the same values.
+With ``RollingWindowConfig.dedup_windows`` each window graph is fingerprinted
+before its algorithms run: a SHA-256 of the run's ``params_hash`` (the
+algorithm configuration), the sorted node ids with a checksum of each node's
+properties (``node_property_checksums``) and the sorted
+``(source, target, type, weight)`` relationship tuples. The first window with
+a fingerprint is computed and registered in
+``dedup/{params_hash}/{fingerprint}.json``; later windows with the same
+fingerprint copy its node/edge Parquet and only rewrite the window metadata
+columns and ``fcr_temporal`` (which reads OWNERSHIP/FAMILY outside the window
+graph, so it is recomputed for every window).
+
+The index is one small file per fingerprint, written atomically, so it is
+shared by worker processes and by later runs with the same ``params_hash``.
+The calibration window of approximate centrality is always computed.
+
+The node checksums cover the properties known before the algorithms run:
+every snapshot column on the local engine; the projected properties and the
+node identity cache (``entity_id``, ``Id``, ``regn_cbr``, labels) on the GDS
+engine. ``bank_feats``/``network_feats`` are read from the database only when
+a window is written, so after editing them run once with
+``RollingWindowConfig.dedup_invalidate`` (``--dedup-invalidate``), which
+clears the index of the run's ``params_hash`` before any window is looked up.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+import pandas as pd
+
+from config import RollingWindowConfig
+from dates import Window
+from frames import add_window_metadata, attach_fcr_temporal, write_window_output
+from vectors import read_frame
+
+logger = logging.getLogger(__name__)
+
+DEDUP_DIRNAME = "dedup"
+
+
+def _hashable(value: Any) -> Any:
+    # Lists and arrays (labels, feature vectors) as bytes; scalars as they are.
+    if value is None or isinstance(value, (str, bytes, int, float, np.generic)):
+        return value
+    arr = np.asarray(value)
+    if arr.dtype.kind in "biuf":
+        return arr.astype("<f8").tobytes()
+    return "\x1f".join(map(str, arr.ravel().tolist()))
+
+
+def node_property_checksums(columns: Mapping[str, Any]) -> np.ndarray:
+    """A uint64 checksum of each node's values of ``columns`` (aligned arrays), in column-name order."""
+    names = sorted(columns)
+    frame = pd.DataFrame({name: pd.Series(np.asarray(columns[name], dtype=object)).map(_hashable) for name in names})
+    if frame.empty:
+        return np.zeros(len(frame), dtype=np.uint64)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+def window_fingerprint(
+    *,
+    params_hash: str,
+    node_ids: np.ndarray,
+    source_ids: np.ndarray,
+    target_ids: np.ndarray,
+    rel_types: np.ndarray,
+    weights: np.ndarray,
+    node_checksums: np.ndarray | None = None,
+) -> str:
+    """
+    Order-independent SHA-256 of a window graph's nodes and relationships under ``params_hash``.
+
+    ``node_checksums`` (``node_property_checksums``, aligned with ``node_ids``)
+    make windows with the same graph but different node properties differ.
+    """
+    type_names, type_codes = np.unique(np.asarray(rel_types).astype(str), return_inverse=True)
+    source_ids = np.asarray(source_ids, dtype="<i8")
+    target_ids = np.asarray(target_ids, dtype="<i8")
+    type_codes = np.asarray(type_codes, dtype="<i8")
+    weights = np.asarray(weights, dtype="<f8")
+    order = np.lexsort((weights, type_codes, target_ids, source_ids))
+    node_ids = np.asarray(node_ids, dtype="<i8")
+    node_order = np.argsort(node_ids, kind="stable")
+
+    digest = hashlib.sha256()
+    digest.update(params_hash.encode("ascii"))
+    digest.update(json.dumps(type_names.tolist()).encode("utf-8"))
+    if node_checksums is not None:
+        digest.update(np.ascontiguousarray(np.asarray(node_checksums, dtype="<u8")[node_order]).tobytes())
+    for values in (
+        node_ids[node_order],
+        source_ids[order],
+        target_ids[order],
+        type_codes[order],
+        weights[order],
+    ):
+        digest.update(np.int64(len(values)).tobytes())
+        digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class DedupHit:
+    """Outputs of an earlier window with the same fingerprint (``None`` for outputs not needed)."""
+
+    fingerprint: str
+    source_window: str
+    node_path: Path | None
+    edges_path: Path | None
+
+
+class WindowDedupIndex:
+    """The fingerprint → computed window index of one ``params_hash``."""
+
+    def __init__(self, directory: Path, *, root: Path):
+        self.directory = directory
+        self.root = root
+
+    @classmethod
+    def for_run(cls, cfg: RollingWindowConfig, params_hash: str) -> "WindowDedupIndex":
+        return cls(cfg.output_dir / DEDUP_DIRNAME / params_hash, root=cfg.output_dir)
+
+    def clear(self) -> int:
+        """Forget every registered window (their outputs stay); returns how many were registered."""
+        if not self.directory.exists():
+            return 0
+        count = sum(1 for _ in self.directory.glob("*.json"))
+        shutil.rmtree(self.directory)
+        logger.info("Cleared %d window fingerprints from %s", count, self.directory)
+        return count
+
+    def _entry_path(self, fingerprint: str) -> Path:
+        return self.directory / f"{fingerprint}.json"
+
+    def lookup(
+        self,
+        fingerprint: str,
+        *,
+        window_graph_name: str,
+        need_nodes: bool,
+        need_edges: bool,
+    ) -> DedupHit | None:
+        """The registered window for ``fingerprint`` if it has every needed output on disk."""
+        try:
+            entry = json.loads(self._entry_path(fingerprint).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if entry["window_graph_name"] == window_graph_name:
+            # A window never reuses itself; recomputing it is what was asked for.
+            return None
+
+        paths: dict[str, Path | None] = {}
+        for kind, needed in (("nodes", need_nodes), ("edges", need_edges)):
+            paths[kind] = None
+            if not needed:
+                continue
+            if entry.get(kind) is None or not (self.root / entry[kind]).exists():
+                return None
+            paths[kind] = self.root / entry[kind]
+        return DedupHit(
+            fingerprint=fingerprint,
+            source_window=entry["window_graph_name"],
+            node_path=paths["nodes"],
+            edges_path=paths["edges"],
+        )
+
+    def record(self, fingerprint: str, window_graph_name: str, *, node_path: Path, edges_path: Path) -> None:
+        """Register a computed window; the first window registered for a fingerprint is kept."""
+        path = self._entry_path(fingerprint)
+        if path.exists():
+            return
+        entry = {
+            "window_graph_name": window_graph_name,
+            "nodes": os.path.relpath(node_path, self.root) if node_path.exists() else None,
+            "edges": os.path.relpath(edges_path, self.root) if edges_path.exists() else None,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(entry), encoding="utf-8")
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+def reuse_window_outputs(
+    hit: DedupHit,
+    *,
+    w: Window,
+    window_graph_name: str,
+    params_hash: str,
+    node_out_path: Path,
+    edges_out_path: Path,
+    fcr_map: dict[Any, float] | None,
+    cfg: RollingWindowConfig,
+) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """Write this window's outputs from those of ``hit``; returns the written node and edge frames."""
+    df = None
+    df_edges = None
+    if hit.node_path is not None:
+        df = read_frame(hit.node_path)
+        df = add_window_metadata(df, w=w, window_graph_name=window_graph_name, params_hash=params_hash)
+        df = attach_fcr_temporal(df, fcr_map)
+        logger.info("Writing %s from %s (rows=%d cols=%d)", node_out_path, hit.source_window, df.shape[0], df.shape[1])
+        write_window_output(df, node_out_path, cfg=cfg, part="nodes")
+    if hit.edges_path is not None:
+        df_edges = read_frame(hit.edges_path)
+        df_edges = add_window_metadata(df_edges, w=w, window_graph_name=window_graph_name, params_hash=params_hash)
+        logger.info("Writing %s from %s (rows=%d)", edges_out_path, hit.source_window, df_edges.shape[0])
+        write_window_output(df_edges, edges_out_path, cfg=cfg, part="edges")
+    return df, df_edges
+
+
+def dedup_stats(fingerprint: str, hit: DedupHit | None, fingerprint_time_s: float) -> dict[str, Any]:
+    """Manifest columns of a fingerprinted window."""
+    return {
+        "window_fingerprint": fingerprint,
+        "dedup_hit": hit is not None,
+        "dedup_source_window": hit.source_window if hit is not None else None,
+        "fingerprint_time_s": fingerprint_time_s,
+    }
+
+
+def log_dedup_rate(manifest: pd.DataFrame) -> None:
+    if manifest.empty or "dedup_hit" not in manifest.columns:
+        return
+    fingerprinted = manifest["dedup_hit"].notna()
+    total = int(fingerprinted.sum())
+    hits = int(manifest.loc[fingerprinted, "dedup_hit"].astype(bool).sum())
+    logger.info(
+        "Window dedup: %d of %d fingerprinted windows reused an identical graph (hit rate %.1f%%)",
+        hits,
+        total,
+        100.0 * hits / total if total else 0.0,
+    )
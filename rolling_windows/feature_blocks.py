@@ -19,3 +19,7 @@ def other_bank_feats_indices() -> list[int]:
 
     return [i for i in range(BANK_FEATS_DIM) if i not in used]
 
+
+def feature_block_indices() -> dict[str, list[int]]:
+    """Every feature block of ``bank_feats``, including ``other_feats``."""
+    return {**BANK_FEATS_BLOCKS, "other_feats": other_bank_feats_indices()}
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import RollingWindowConfig
+from dataset import OUTPUT_LAYOUTS, dataset_table, partition_path
+from dates import Window
+from feature_blocks import BANK_FEATS_BLOCKS, BANK_FEATS_DIM, other_bank_feats_indices
+from parquet import coerce_float_list_column, expand_embedding_column, slice_vector_column, write_parquet, write_table
+from vectors import fixed_size_vector_columns, is_fixed_size
+
+logger = logging.getLogger(__name__)
+
+
+def window_graph_name_for(w: Window) -> str:
+    return f"rw_{w.name_suffix}"
+
+
+def required_node_columns(cfg: RollingWindowConfig) -> set[str]:
+    required: set[str] = set()
+    if cfg.export_feature_vectors:
+        required.update({"bank_feats", "network_feats", "is_dead"})
+    if cfg.export_feature_blocks and is_fixed_size(cfg):
+        # Blocks are resolved from bank_feats when the file is read.
+        required.add("bank_feats")
+    elif cfg.export_feature_blocks:
+        required.update(BANK_FEATS_BLOCKS.keys())
+        required.add("other_feats")
+    if cfg.run_hashgnn:
+        required.add("hash_gnn_embedding")
+    if cfg.run_node2vec:
+        required.add("node2vec_embedding")
+    return required
+
+
+def required_edge_columns(cfg: RollingWindowConfig) -> set[str]:
+    return {
+        "sourceNodeId",
+        "targetNodeId",
+        "relationshipType",
+        f"source_{cfg.edge_id_property}",
+        f"target_{cfg.edge_id_property}",
+    }
+
+
+def validate_output_layout(cfg: RollingWindowConfig) -> None:
+    if cfg.output_layout not in OUTPUT_LAYOUTS:
+        raise ValueError(f"Unknown output_layout {cfg.output_layout!r}; expected one of {OUTPUT_LAYOUTS}")
+    if cfg.dataset_row_group_size < 1:
+        raise ValueError("dataset_row_group_size must be positive")
+
+
+def is_dataset_layout(cfg: RollingWindowConfig) -> bool:
+    return cfg.output_layout == "dataset"
+
+
+def window_output_paths(cfg: RollingWindowConfig, window_graph_name: str, *, params_hash: str) -> tuple[Path, Path]:
+    """``(node_out_path, edges_out_path)`` of one window."""
+    if is_dataset_layout(cfg):
+        node_path, edges_path = (
+            partition_path(
+                cfg.output_dir,
+                part,
+                params_hash=params_hash,
+                period_type=cfg.period_type,
+                window_graph_name=window_graph_name,
+            )
+            for part in ("nodes", "edges")
+        )
+        return node_path, edges_path
+    return (
+        cfg.output_dir / "nodes" / f"node_features_{window_graph_name}.parquet",
+        cfg.output_dir / "edges" / f"edge_list_{window_graph_name}.parquet",
+    )
+
+
+def outputs_needed(
+    cfg: RollingWindowConfig,
+    *,
+    node_out_path: Path,
+    edges_out_path: Path,
+    skip_existing: bool,
+) -> tuple[bool, bool]:
+    """Return ``(need_nodes, need_edges)`` after checking existing outputs' columns."""
+    need_nodes = True
+    if skip_existing and node_out_path.exists():
+        existing_node_cols = set(pq.ParquetFile(node_out_path).schema_arrow.names)
+        missing_node_cols = required_node_columns(cfg).difference(existing_node_cols)
+        if missing_node_cols:
+            logger.info(
+                "Existing node parquet is missing required columns %s; recomputing: %s",
+                sorted(missing_node_cols),
+                node_out_path,
+            )
+        else:
+            need_nodes = False
+
+    need_edges = bool(cfg.export_edges)
+    if need_edges and skip_existing and edges_out_path.exists():
+        existing_edge_cols = set(pq.ParquetFile(edges_out_path).schema_arrow.names)
+        missing_edge_cols = required_edge_columns(cfg).difference(existing_edge_cols)
+        if missing_edge_cols:
+            logger.info(
+                "Existing edge parquet is missing required columns %s; recomputing: %s",
+                sorted(missing_edge_cols),
+                edges_out_path,
+            )
+        else:
+            need_edges = False
+
+    return need_nodes, need_edges
+
+
+def write_window_output(data: pd.DataFrame | pa.Table, path: Path, *, cfg: RollingWindowConfig, part: str) -> None:
+    """Write the ``part`` (``nodes`` or ``edges``) output of a window to ``path`` in the configured layout."""
+    if is_dataset_layout(cfg):
+        table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+        write_table(dataset_table(table, part), path, row_group_size=cfg.dataset_row_group_size)
+    elif isinstance(data, pa.Table):
+        write_table(data, path)
+    else:
+        write_parquet(data, path)
+
+
+def existing_row_count(path: Path) -> int:
+    return int(pq.ParquetFile(path).metadata.num_rows) if path.exists() else 0
+
+
+def add_window_metadata(df: pd.DataFrame, *, w: Window, window_graph_name: str, params_hash: str) -> pd.DataFrame:
+    df["window_start_ms"] = w.start_ms
+    df["window_end_ms"] = w.end_ms
+    df["window_start_year"] = w.start_year
+    df["window_end_year_inclusive"] = w.end_year_inclusive
+    df["window_graph_name"] = window_graph_name
+    df["params_hash"] = params_hash
+    return df
+
+
+def attach_fcr_temporal(df: pd.DataFrame, fcr_map: dict[Any, float] | None) -> pd.DataFrame:
+    if fcr_map:
+        # Use gds_id (Persistent Internal ID) to map FCR for robustness
+        df["fcr_temporal"] = df["gds_id"].map(fcr_map).fillna(0.0)
+        applied = df["fcr_temporal"].gt(0).sum()
+        logger.info("Applied fcr_temporal to %d nodes", applied)
+    else:
+        df["fcr_temporal"] = 0.0
+    return df
+
+
+def finalise_node_frame(
+    df: pd.DataFrame,
+    *,
+    cfg: RollingWindowConfig,
+    w: Window,
+    window_graph_name: str,
+    params_hash: str,
+    fcr_map: dict[Any, float],
+    expand_embeddings: bool = False,
+) -> pd.DataFrame:
+    """
+    Apply the per-window node transformations shared by every engine:
+    window metadata, total degree, ``fcr_temporal`` (keyed by ``gds_id``),
+    embedding coercion, feature-vector padding and feature-block slicing.
+
+    With ``vector_storage="fixed_size"`` the vectors become
+    ``FixedSizeList<float32>`` columns instead and no blocks are sliced.
+    """
+    df = add_window_metadata(df, w=w, window_graph_name=window_graph_name, params_hash=params_hash)
+
+    # Degrees & Labels
+    if "in_degree" in df.columns and "out_degree" in df.columns:
+        df["total_degree"] = df["in_degree"] + df["out_degree"]
+
+    df = attach_fcr_temporal(df, fcr_map)
+
+    if is_fixed_size(cfg):
+        df = fixed_size_vector_columns(df, cfg=cfg)
+        return _expand_embeddings(df, cfg=cfg) if expand_embeddings else df
+
+    # --- Feature Transformations ---
+    if "fastrp_embedding" in df.columns:
+        df = coerce_float_list_column(df, column="fastrp_embedding")
+    if "hash_gnn_embedding" in df.columns:
+        df = coerce_float_list_column(df, column="hash_gnn_embedding")
+    if "node2vec_embedding" in df.columns:
+        df = coerce_float_list_column(df, column="node2vec_embedding")
+
+    if cfg.export_feature_vectors:
+        df = coerce_float_list_column(df, column="bank_feats")
+        df = coerce_float_list_column(df, column="network_feats")
+
+        # Fill missing bank_feats (e.g. for Persons) with zeros for slicing
+        if "bank_feats" in df.columns:
+            zero_vec = [0.0] * BANK_FEATS_DIM
+            df["bank_feats"] = df["bank_feats"].apply(lambda x: zero_vec if x is None or (isinstance(x, list) and not x) else x)
+
+    if cfg.export_feature_blocks and "bank_feats" in df.columns:
+        for block_name, indices in BANK_FEATS_BLOCKS.items():
+            df = slice_vector_column(
+                df,
+                column="bank_feats",
+                indices=indices,
+                out_column=block_name,
+                expected_dim=BANK_FEATS_DIM,
+            )
+        df = slice_vector_column(
+            df,
+            column="bank_feats",
+            indices=other_bank_feats_indices(),
+            out_column="other_feats",
+            expected_dim=BANK_FEATS_DIM,
+        )
+
+    return _expand_embeddings(df, cfg=cfg) if expand_embeddings else df
+
+
+def _expand_embeddings(df: pd.DataFrame, *, cfg: RollingWindowConfig) -> pd.DataFrame:
+    if "fastrp_embedding" not in df.columns:
+        return df
+    emb_df = expand_embedding_column(
+        df[["fastrp_embedding"]],
+        column="fastrp_embedding",
+        dim=cfg.embedding_dimension,
+        prefix="emb_",
+    )
+    return pd.concat([df, emb_df], axis=1)
+
+
+def finalise_edge_frame(
+    df_edges: pd.DataFrame,
+    *,
+    cfg: RollingWindowConfig,
+    w: Window,
+    window_graph_name: str,
+    params_hash: str,
+) -> pd.DataFrame:
+    df_edges = add_window_metadata(df_edges, w=w, window_graph_name=window_graph_name, params_hash=params_hash)
+    df_edges["edge_id_property"] = str(cfg.edge_id_property)
+    return df_edges
+
+
+def join_edge_endpoint_ids(rels: pd.DataFrame, node_map: pd.DataFrame, *, edge_id_property: str) -> pd.DataFrame:
+    """Add ``source_{edge_id_property}`` / ``target_{edge_id_property}`` to ``rels`` from ``node_map`` (``nodeId`` → id)."""
+    source_col = f"source_{edge_id_property}"
+    target_col = f"target_{edge_id_property}"
+    return rels.merge(
+        node_map.rename(columns={"nodeId": "sourceNodeId", edge_id_property: source_col}),
+        on="sourceNodeId",
+        how="left",
+    ).merge(
+        node_map.rename(columns={"nodeId": "targetNodeId", edge_id_property: target_col}),
+        on="targetNodeId",
+        how="left",
+    )
+
+
+def manifest_row(
+    *,
+    cfg: RollingWindowConfig,
+    w: Window,
+    window_graph_name: str,
+    params_hash: str,
+    node_count: int,
+    edge_count: int,
+    skipped_existing: bool,
+) -> dict[str, Any]:
+    return {
+        "window_graph_name": window_graph_name,
+        "window_start_ms": w.start_ms,
+        "window_end_ms": w.end_ms,
+        "window_start_year": w.start_year,
+        "window_end_year_inclusive": w.end_year_inclusive,
+        "node_count": int(node_count),
+        "edge_count": int(edge_count),
+        "rel_types": list(cfg.rel_types),
+        "include_imputed01": int(cfg.include_imputed01),
+        "export_edges": bool(cfg.export_edges),
+        "edge_id_property": str(cfg.edge_id_property),
+        "export_feature_vectors": bool(cfg.export_feature_vectors),
+        "export_feature_blocks": bool(cfg.export_feature_blocks),
+        "run_hashgnn": bool(cfg.run_hashgnn),
+        "run_node2vec": bool(cfg.run_node2vec),
+        "params_hash": params_hash,
+        "skipped_existing": bool(skipped_existing),
+    }
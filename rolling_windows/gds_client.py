@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
 from graphdatascience import GraphDataScience
-from neo4j import GraphDatabase
+from neo4j import Driver, GraphDatabase
 
 from config import Neo4jConfig
 
+logger = logging.getLogger(__name__)
 
-def connect_gds(cfg: Neo4jConfig) -> GraphDataScience:
+
+def connect_driver(cfg: Neo4jConfig) -> Driver:
     driver_kwargs: dict[str, object] = {
         "keep_alive": cfg.keep_alive,
         "max_connection_lifetime": cfg.max_connection_lifetime_s,
@@ -15,10 +23,90 @@ def connect_gds(cfg: Neo4jConfig) -> GraphDataScience:
     if cfg.connection_acquisition_timeout_s is not None:
         driver_kwargs["connection_acquisition_timeout"] = cfg.connection_acquisition_timeout_s
 
-    driver = GraphDatabase.driver(cfg.uri, auth=(cfg.user, cfg.password), **driver_kwargs)
+    return GraphDatabase.driver(cfg.uri, auth=(cfg.user, cfg.password), **driver_kwargs)
+
+
+def gds_for_driver(driver: Driver, cfg: Neo4jConfig) -> GraphDataScience:
     return GraphDataScience(
         driver,
         database=cfg.database,
         arrow=cfg.arrow,
         show_progress=cfg.show_progress,
     )
+
+
+def connect_gds(cfg: Neo4jConfig) -> GraphDataScience:
+    return gds_for_driver(connect_driver(cfg), cfg)
+
+
+class GdsSession:
+    """
+    The GDS client a single window works with.
+
+    ``reconnect`` replaces the client after a transient failure; the window
+    keeps using ``session.gds`` so it always sees the current one.
+    """
+
+    def __init__(self, gds: GraphDataScience, reconnect: Callable[[], GraphDataScience]):
+        self.gds = gds
+        self._reconnect = reconnect
+
+    def reconnect(self) -> GraphDataScience:
+        self.gds = self._reconnect()
+        return self.gds
+
+
+class GdsSessionPool:
+    """
+    A fixed number of ``GraphDataScience`` clients sharing one driver.
+
+    All clients borrow connections from the driver's pool
+    (``Neo4jConfig.max_connection_pool_size``), so ``size`` windows can talk to
+    the server at once without opening a driver per window. ``session()``
+    blocks until a client is idle and hands it out for the duration of one
+    window.
+    """
+
+    def __init__(self, cfg: Neo4jConfig, size: int):
+        if size < 1:
+            raise ValueError(f"size must be >= 1, got {size}")
+        if size > cfg.max_connection_pool_size:
+            raise ValueError(
+                f"size={size} exceeds Neo4jConfig.max_connection_pool_size={cfg.max_connection_pool_size}"
+            )
+        self._cfg = cfg
+        self._driver = connect_driver(cfg)
+        self._lock = threading.Lock()
+        self._idle: queue.Queue[GraphDataScience] = queue.Queue()
+        for _ in range(size):
+            self._idle.put(gds_for_driver(self._driver, cfg))
+
+    @contextmanager
+    def session(self) -> Iterator[GdsSession]:
+        session = GdsSession(self._idle.get(), self._new_client)
+        try:
+            yield session
+        finally:
+            self._idle.put(session.gds)
+
+    def _new_client(self) -> GraphDataScience:
+        with self._lock:
+            try:
+                self._driver.verify_connectivity()
+            except Exception as e:
+                logger.warning("Neo4j driver lost connectivity (%s); creating a new driver", e)
+                stale, self._driver = self._driver, connect_driver(self._cfg)
+                try:
+                    stale.close()
+                except Exception as close_error:
+                    logger.debug("Closing the stale Neo4j driver failed: %s", close_error)
+            return gds_for_driver(self._driver, self._cfg)
+
+    def close(self) -> None:
+        self._driver.close()
+
+    def __enter__(self) -> "GdsSessionPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
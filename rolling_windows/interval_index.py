@@ -0,0 +1,322 @@
+"""
+Persistent temporal interval index over the base-graph snapshot.
+
+Node and relationship validity intervals (``tStart``/``tEnd``, i.e. the
+projected bounds with open ends set to ±MAX_SAFE_INTEGER) are stored in
+centred interval trees flattened into NumPy arrays. A window query returns the
+snapshot row positions whose interval overlaps ``[start_ms, end_ms)`` using
+the same half-open predicate as ``pipeline.build_filter_predicates``
+(``tStart < end AND tEnd > start``) in O(log n + k).
+
+Relationships are indexed per group (relationship type, with imputed FAMILY
+edges in their own group), so ``rel_types`` and the ``include_imputed01`` rule
+select whole trees instead of filtering rows.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from local_engine import TemporalSnapshot
+
+logger = logging.getLogger(__name__)
+
+INDEX_ARRAYS_FILE = "interval_index.npz"
+INDEX_META_FILE = "interval_index.json"
+INDEX_VERSION = 1
+
+NODE_GROUP = "nodes"
+IMPUTED_FAMILY_GROUP = "FAMILY#imputed"
+
+_TREE_ARRAYS = (
+    "center",
+    "left",
+    "right",
+    "offset",
+    "length",
+    "by_start",
+    "start_sorted",
+    "ends_by_start",
+    "by_end",
+    "neg_end_sorted",
+)
+
+
+@dataclass(frozen=True)
+class IntervalTree:
+    """
+    Centred interval tree in flat arrays.
+
+    Each tree node stores the intervals containing its ``center`` twice: by
+    ascending start (``by_start``/``start_sorted``) and by descending end
+    (``by_end``/``neg_end_sorted``), as a segment ``[offset, offset+length)``.
+    Leaves (``center`` is NaN) hold at most ``leaf_size`` intervals and are
+    scanned with a vectorised mask. Stored values are row positions.
+    """
+
+    center: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    offset: np.ndarray
+    length: np.ndarray
+    by_start: np.ndarray
+    start_sorted: np.ndarray
+    ends_by_start: np.ndarray
+    by_end: np.ndarray
+    neg_end_sorted: np.ndarray
+
+    @classmethod
+    def build(cls, rows: np.ndarray, starts: np.ndarray, ends: np.ndarray, *, leaf_size: int = 64) -> "IntervalTree":
+        """Build a tree over ``rows`` whose intervals are ``[starts, ends)`` (aligned arrays)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64)
+
+        center: list[float] = []
+        left: list[int] = []
+        right: list[int] = []
+        offset: list[int] = []
+        length: list[int] = []
+        by_start: list[np.ndarray] = []
+        by_end: list[np.ndarray] = []
+        cursor = 0
+
+        # (member positions into rows/starts/ends, parent tree node, is_left_child)
+        stack: list[tuple[np.ndarray, int, bool]] = [(np.arange(len(rows)), -1, False)] if len(rows) else []
+        while stack:
+            members, parent, is_left = stack.pop()
+            node = len(center)
+            if parent >= 0:
+                if is_left:
+                    left[parent] = node
+                else:
+                    right[parent] = node
+
+            s, e = starts[members], ends[members]
+            here, c = members, np.nan
+            lo = hi = members[:0]
+            if len(members) > leaf_size:
+                split = float(np.median(np.concatenate([s, e])))
+                go_left = e < split
+                go_right = (s > split) & ~go_left
+                # Inverted intervals (tStart > tEnd) can defeat the median split; keep them in a leaf.
+                if go_left.sum() < len(members) and go_right.sum() < len(members):
+                    c = split
+                    here = members[~(go_left | go_right)]
+                    lo, hi = members[go_left], members[go_right]
+
+            center.append(c)
+            left.append(-1)
+            right.append(-1)
+            offset.append(cursor)
+            length.append(len(here))
+            by_start.append(here[np.argsort(starts[here], kind="stable")])
+            by_end.append(here[np.argsort(-ends[here], kind="stable")])
+            cursor += len(here)
+
+            if len(lo):
+                stack.append((lo, node, True))
+            if len(hi):
+                stack.append((hi, node, False))
+
+        by_start_pos = np.concatenate(by_start) if by_start else np.empty(0, dtype=np.int64)
+        by_end_pos = np.concatenate(by_end) if by_end else np.empty(0, dtype=np.int64)
+        return cls(
+            center=np.asarray(center, dtype=np.float64),
+            left=np.asarray(left, dtype=np.int64),
+            right=np.asarray(right, dtype=np.int64),
+            offset=np.asarray(offset, dtype=np.int64),
+            length=np.asarray(length, dtype=np.int64),
+            by_start=rows[by_start_pos],
+            start_sorted=starts[by_start_pos],
+            ends_by_start=ends[by_start_pos],
+            by_end=rows[by_end_pos],
+            neg_end_sorted=-ends[by_end_pos],
+        )
+
+    def __len__(self) -> int:
+        return int(len(self.by_start))
+
+    def query(self, start_ms: float, end_ms: float) -> np.ndarray:
+        """Sorted rows whose interval satisfies ``tStart < end_ms AND tEnd > start_ms``."""
+        if len(self.center) == 0:
+            return np.empty(0, dtype=np.int64)
+        if end_ms <= start_ms:
+            # Degenerate window: the pruning below assumes start_ms < end_ms.
+            mask = (self.start_sorted < end_ms) & (self.ends_by_start > start_ms)
+            return np.sort(self.by_start[mask])
+
+        out: list[np.ndarray] = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            lo = int(self.offset[node])
+            hi = lo + int(self.length[node])
+            c = self.center[node]
+            if np.isnan(c):
+                mask = (self.start_sorted[lo:hi] < end_ms) & (self.ends_by_start[lo:hi] > start_ms)
+                out.append(self.by_start[lo:hi][mask])
+                continue
+            if end_ms <= c:
+                # Every interval here ends at or after c >= end_ms > start_ms.
+                n = int(np.searchsorted(self.start_sorted[lo:hi], end_ms, side="left"))
+                out.append(self.by_start[lo : lo + n])
+                if self.left[node] >= 0:
+                    stack.append(int(self.left[node]))
+            elif start_ms >= c:
+                # Every interval here starts at or before c <= start_ms < end_ms.
+                n = int(np.searchsorted(self.neg_end_sorted[lo:hi], -start_ms, side="left"))
+                out.append(self.by_end[lo : lo + n])
+                if self.right[node] >= 0:
+                    stack.append(int(self.right[node]))
+            else:
+                out.append(self.by_start[lo:hi])
+                if self.left[node] >= 0:
+                    stack.append(int(self.left[node]))
+                if self.right[node] >= 0:
+                    stack.append(int(self.right[node]))
+
+        return np.sort(np.concatenate(out)) if out else np.empty(0, dtype=np.int64)
+
+    def to_arrays(self, prefix: str) -> dict[str, np.ndarray]:
+        return {f"{prefix}/{name}": getattr(self, name) for name in _TREE_ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str) -> "IntervalTree":
+        return cls(**{name: arrays[f"{prefix}/{name}"] for name in _TREE_ARRAYS})
+
+
+def relationship_group(rel_type: str, imputed_flag: float) -> str:
+    """Index group of a relationship; imputed FAMILY edges are kept apart for ``include_imputed01``."""
+    if rel_type == "FAMILY" and imputed_flag != 0.0:
+        return IMPUTED_FAMILY_GROUP
+    return rel_type
+
+
+def snapshot_fingerprint(snapshot: TemporalSnapshot) -> str:
+    """Content hash of the ids and validity intervals the index is built from."""
+    h = hashlib.sha256()
+    node_cols = snapshot.nodes[["nodeId", "tStart", "tEnd"]]
+    rel_cols = snapshot.rels[["relId", "relationshipType", "tStart", "tEnd", "imputedFlag"]]
+    h.update(pd.util.hash_pandas_object(node_cols, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(rel_cols, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class TemporalIntervalIndex:
+    """Interval trees for snapshot nodes and relationship groups, keyed by snapshot fingerprint."""
+
+    fingerprint: str
+    node_tree: IntervalTree
+    rel_trees: dict[str, IntervalTree]
+    leaf_size: int = 64
+
+    @classmethod
+    def build(
+        cls,
+        snapshot: TemporalSnapshot,
+        *,
+        leaf_size: int = 64,
+        fingerprint: str | None = None,
+    ) -> "TemporalIntervalIndex":
+        nodes, rels = snapshot.nodes, snapshot.rels
+        node_tree = IntervalTree.build(
+            np.arange(len(nodes)),
+            nodes["tStart"].to_numpy(),
+            nodes["tEnd"].to_numpy(),
+            leaf_size=leaf_size,
+        )
+
+        groups = np.array(
+            [
+                relationship_group(t, f)
+                for t, f in zip(rels["relationshipType"].to_numpy(), rels["imputedFlag"].to_numpy())
+            ],
+            dtype=object,
+        )
+        r_start, r_end = rels["tStart"].to_numpy(), rels["tEnd"].to_numpy()
+        rel_trees: dict[str, IntervalTree] = {}
+        for group in sorted(set(groups.tolist())):
+            rows = np.flatnonzero(groups == group)
+            rel_trees[group] = IntervalTree.build(rows, r_start[rows], r_end[rows], leaf_size=leaf_size)
+
+        return cls(
+            fingerprint=fingerprint or snapshot_fingerprint(snapshot),
+            node_tree=node_tree,
+            rel_trees=rel_trees,
+            leaf_size=leaf_size,
+        )
+
+    def active_nodes(self, start_ms: float, end_ms: float) -> np.ndarray:
+        """Sorted snapshot node rows active in ``[start_ms, end_ms)``."""
+        return self.node_tree.query(float(start_ms), float(end_ms))
+
+    def active_relationships(
+        self,
+        start_ms: float,
+        end_ms: float,
+        *,
+        rel_types: tuple[str, ...],
+        include_imputed01: int,
+    ) -> np.ndarray:
+        """Sorted snapshot relationship rows passing the window relationship filter."""
+        groups = [t for t in rel_types if t in self.rel_trees]
+        if "FAMILY" in rel_types and float(include_imputed01) == 1.0 and IMPUTED_FAMILY_GROUP in self.rel_trees:
+            groups.append(IMPUTED_FAMILY_GROUP)
+        parts = [self.rel_trees[g].query(float(start_ms), float(end_ms)) for g in groups]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def save(self, index_dir: Path) -> None:
+        index_dir.mkdir(parents=True, exist_ok=True)
+        arrays = self.node_tree.to_arrays(NODE_GROUP)
+        for group, tree in self.rel_trees.items():
+            arrays.update(tree.to_arrays(f"rel/{group}"))
+        np.savez(index_dir / INDEX_ARRAYS_FILE, **arrays)
+        meta = {
+            "version": INDEX_VERSION,
+            "fingerprint": self.fingerprint,
+            "leaf_size": self.leaf_size,
+            "node_count": len(self.node_tree),
+            "relationship_groups": {g: len(t) for g, t in self.rel_trees.items()},
+        }
+        (index_dir / INDEX_META_FILE).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "TemporalIntervalIndex":
+        meta = json.loads((index_dir / INDEX_META_FILE).read_text(encoding="utf-8"))
+        with np.load(index_dir / INDEX_ARRAYS_FILE) as arrays:
+            node_tree = IntervalTree.from_arrays(arrays, NODE_GROUP)
+            rel_trees = {g: IntervalTree.from_arrays(arrays, f"rel/{g}") for g in meta["relationship_groups"]}
+        return cls(
+            fingerprint=meta["fingerprint"],
+            node_tree=node_tree,
+            rel_trees=rel_trees,
+            leaf_size=int(meta["leaf_size"]),
+        )
+
+
+def load_or_build_interval_index(snapshot: TemporalSnapshot, index_dir: Path) -> TemporalIntervalIndex:
+    """Load the index in ``index_dir`` if it matches ``snapshot``; otherwise (re)build and persist it."""
+    fingerprint = snapshot_fingerprint(snapshot)
+    meta_path = index_dir / INDEX_META_FILE
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") == INDEX_VERSION and meta.get("fingerprint") == fingerprint:
+            logger.info("Loading temporal interval index: %s", index_dir)
+            return TemporalIntervalIndex.load(index_dir)
+        logger.info("Temporal interval index is stale; rebuilding: %s", index_dir)
+
+    logger.info("Building temporal interval index: %s", index_dir)
+    index = TemporalIntervalIndex.build(snapshot, fingerprint=fingerprint)
+    index.save(index_dir)
+    return index
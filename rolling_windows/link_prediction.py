@@ -9,8 +9,12 @@ This module implements link prediction for family relationships using:
 """
 
 import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Optional, Any
+from typing import Optional, Any, Sequence
 
 import mlflow
 import numpy as np
@@ -20,9 +24,13 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
 from mlflow_utils.tracking import log_metrics_classification
+from rolling_windows.pair_features import DEFAULT_CHUNK_SIZE, PairFeatureEngine, PairFeatures, STRING_FEATURES as PAIR_STRING_FEATURES
+from rolling_windows.pair_keys import PairKeyCodec, isin_keys
 
 logger = logging.getLogger(__name__)
 
+STRING_FEATURES = list(PAIR_STRING_FEATURES)
+
 
 @dataclass
 class LinkPredictionConfig:
@@ -39,6 +47,10 @@ class LinkPredictionConfig:
     test_split: float = 0.2
     random_state: int = 42
     min_training_samples: int = 100
+    # Candidates featurised and scored at a time (bounds the gathered embeddings)
+    feature_chunk_size: int = DEFAULT_CHUNK_SIZE
+    # Processes training the variants of a horse race (None: one per variant, up to the CPU count; 1: in-process)
+    max_workers: Optional[int] = None
 
 
 def fetch_sim_name_pairs(gds, include_family: bool = False) -> pd.DataFrame:
@@ -119,12 +131,23 @@ def fetch_official_family_edges(gds) -> pd.DataFrame:
     return df
 
 
+def _pair_codec(sim_name_df: pd.DataFrame, family_df: pd.DataFrame, entity_ids=None) -> PairKeyCodec:
+    return PairKeyCodec.from_ids(
+        sim_name_df['source_id'],
+        sim_name_df['target_id'],
+        family_df['source_id'],
+        family_df['target_id'],
+        vocabulary=entity_ids,
+    )
+
+
 def build_training_data(
     sim_name_df: pd.DataFrame,
     family_df: pd.DataFrame,
     include_hard_negatives: bool = True,
     max_negatives_ratio: float = 1.0,
     random_state: int = 42,
+    codec: Optional[PairKeyCodec] = None,
 ) -> pd.DataFrame:
     """
     Build training dataset for link prediction.
@@ -138,15 +161,14 @@ def build_training_data(
         include_hard_negatives: Use SIM_NAME non-family pairs as negatives
         max_negatives_ratio: Max ratio of negatives to positives
         random_state: Random seed for sampling
+        codec: Pair keys of the run (built from the two frames if omitted)
         
     Returns:
         Training DataFrame with label column
     """
-    # Create family edge set (both directions) for filtering negatives
-    family_set = set()
-    for _, row in family_df.iterrows():
-        family_set.add((row['source_id'], row['target_id']))
-        family_set.add((row['target_id'], row['source_id']))
+    # FAMILY pairs (either direction) as order-independent keys for filtering negatives
+    codec = codec or _pair_codec(sim_name_df, family_df)
+    family_keys = codec.frame_keys(family_df)
     
     # Positives: Official FAMILY edges
     positives = family_df.copy()
@@ -156,13 +178,8 @@ def build_training_data(
     positives = positives[cols]
     
     # Negatives: SIM_NAME pairs that are NOT FAMILY (hard negatives)
-    sim_name_df = sim_name_df.copy()
-    sim_name_df['is_family'] = sim_name_df.apply(
-        lambda row: (row['source_id'], row['target_id']) in family_set or 
-                    (row['target_id'], row['source_id']) in family_set,
-        axis=1
-    )
-    negatives = sim_name_df[~sim_name_df['is_family']].copy()
+    is_family = isin_keys(codec.frame_keys(sim_name_df), family_keys)
+    negatives = sim_name_df[~is_family].copy()
     negatives['label'] = 0
     negatives = negatives[cols]
     
@@ -188,176 +205,138 @@ def build_training_data(
     return train_df
 
 
+def _pair_engine(node_df: pd.DataFrame | PairFeatureEngine) -> PairFeatureEngine:
+    return node_df if isinstance(node_df, PairFeatureEngine) else PairFeatureEngine(node_df)
+
+
 def compute_embedding_features(
     pairs_df: pd.DataFrame,
-    node_df: pd.DataFrame,
+    node_df: pd.DataFrame | PairFeatureEngine,
     embedding_col: str = "fastrp_embedding",
 ) -> np.ndarray:
     """
     Compute link features from node embeddings.
     
-    Returns: Array of [hadamard..., l2_distance, cosine_similarity]
+    Returns: Array of [hadamard..., l2_distance, cosine_similarity], None for
+    pairs where either embedding is missing
     """
-    # Build embedding lookup as dict (handles duplicates, faster lookup)
-    emb_dict = {}
-    for _, row in node_df.iterrows():
-        eid = row['entity_id']
-        emb = row.get(embedding_col)
-        if eid is not None and emb is not None:
-            if isinstance(emb, (list, np.ndarray)) and len(emb) > 0:
-                emb_dict[eid] = emb
-    
-    # Get embeddings for pairs
-    source_ids = pairs_df['source_id'].values
-    target_ids = pairs_df['target_id'].values
-    
-    source_emb = []
-    target_emb = []
-    
-    for src, tgt in zip(source_ids, target_ids):
-        src_e = emb_dict.get(src)
-        tgt_e = emb_dict.get(tgt)
-        if src_e is not None and tgt_e is not None:
-            source_emb.append(src_e)
-            target_emb.append(tgt_e)
-        else:
-            source_emb.append(None)
-            target_emb.append(None)
-    
-    # Build feature matrix
-    features = []
-    for src_e, tgt_e in zip(source_emb, target_emb):
-        if src_e is None or tgt_e is None:
-            features.append(None)
-            continue
-            
-        src_arr = np.array(src_e)
-        tgt_arr = np.array(tgt_e)
-        
-        # Hadamard product
-        hadamard = src_arr * tgt_arr
-        
-        # L2 distance
-        l2 = np.linalg.norm(src_arr - tgt_arr)
-        
-        # Cosine similarity
-        denom = (np.linalg.norm(src_arr) * np.linalg.norm(tgt_arr))
-        cosine = np.dot(src_arr, tgt_arr) / denom if denom > 0 else 0.0
-        
-        feat_vec = list(hadamard) + [l2, cosine]
-        features.append(feat_vec)
-        
-    return np.array(features, dtype=object)
+    if isinstance(node_df, pd.DataFrame):
+        node_df = PairFeatureEngine(node_df, embedding_col=embedding_col)
+    engine = node_df
+    features, valid = engine.embedding_features(
+        engine.positions(pairs_df['source_id']), engine.positions(pairs_df['target_id'])
+    )
+    rows = np.empty(len(pairs_df), dtype=object)
+    for i in np.flatnonzero(valid):
+        rows[i] = features[i]
+    return rows
 
 
 def compute_community_features(
     pairs_df: pd.DataFrame,
-    node_df: pd.DataFrame,
+    node_df: pd.DataFrame | PairFeatureEngine,
     community_col: str = "community_louvain",
 ) -> pd.DataFrame:
     """
     Compute binary feature: same_community.
     """
-    # Build lookup
-    comm_dict = node_df.set_index('entity_id')[community_col].to_dict()
-    
-    same_comm = []
-    for _, row in pairs_df.iterrows():
-        c1 = comm_dict.get(row['source_id'])
-        c2 = comm_dict.get(row['target_id'])
-        
-        if c1 is not None and c2 is not None and c1 == c2 and c1 != -1:
-            same_comm.append(1)
-        else:
-            same_comm.append(0)
-            
-    return pd.DataFrame({f"same_{community_col}": same_comm})
+    if isinstance(node_df, pd.DataFrame):
+        node_df = PairFeatureEngine(node_df, community_cols=(community_col,))
+    engine = node_df
+    same = engine.same_community(
+        engine.positions(pairs_df['source_id']), engine.positions(pairs_df['target_id']), community_col
+    )
+    return pd.DataFrame({f"same_{community_col}": same.astype(np.int64)})
 
 
 def compute_network_features(
     pairs_df: pd.DataFrame,
-    node_df: pd.DataFrame,
+    node_df: pd.DataFrame | PairFeatureEngine,
 ) -> pd.DataFrame:
     """Compute network-based features for pairs."""
-    node_df = node_df.set_index('entity_id')
-    
-    feature_cols = ['degree', 'pagerank', 'betweenness_centrality', 'closeness_centrality']
-    available_cols = [c for c in feature_cols if c in node_df.columns]
-    
-    features = []
-    for _, row in pairs_df.iterrows():
-        src, tgt = row['source_id'], row['target_id']
-        
-        feat = {}
-        for col in available_cols:
-            src_val = node_df.loc[src, col] if src in node_df.index else 0
-            tgt_val = node_df.loc[tgt, col] if tgt in node_df.index else 0
-            
-            feat[f'{col}_sum'] = src_val + tgt_val
-            feat[f'{col}_diff'] = abs(src_val - tgt_val)
-        
-        features.append(feat)
-    
-    return pd.DataFrame(features)
+    engine = _pair_engine(node_df)
+    features = engine.network_features(
+        engine.positions(pairs_df['source_id']), engine.positions(pairs_df['target_id'])
+    )
+    return pd.DataFrame(features, columns=list(engine.block_columns("network")))
+
+
+def non_family_candidates(
+    sim_name_df: pd.DataFrame,
+    family_df: pd.DataFrame,
+    codec: Optional[PairKeyCodec] = None,
+) -> pd.DataFrame:
+    """SIM_NAME pairs that are not FAMILY in either direction, with missing string features as 0.0."""
+    codec = codec or _pair_codec(sim_name_df, family_df)
+    is_family = isin_keys(codec.frame_keys(sim_name_df), codec.frame_keys(family_df))
+    candidates = sim_name_df[~is_family].copy()
+    candidates[STRING_FEATURES] = candidates[STRING_FEATURES].fillna(0.0)
+    return candidates.reset_index(drop=True)
+
+
+def variant_blocks(variant_name: str) -> list[str]:
+    """The ``PairFeatureEngine`` blocks of a variant, in column order."""
+    blocks = []
+    # String features (always included except for baseline_fastrp)
+    if variant_name != "baseline_fastrp":
+        blocks.append("string")
+    if "fastrp" in variant_name:
+        blocks.append("fastrp")
+    if "louvain" in variant_name:
+        blocks.append("community_louvain")
+    if "wcc" in variant_name:
+        blocks.append("wcc")
+    if "full" in variant_name:
+        blocks.append("network")
+    return blocks
+
+
+def union_blocks(variants: Sequence[str]) -> list[str]:
+    """Every block used by ``variants``, in column order of the first variant using it."""
+    return list(dict.fromkeys(block for variant in variants for block in variant_blocks(variant)))
+
+
+def variant_features(
+    variant_name: str,
+    pairs_df: pd.DataFrame,
+    node_df: pd.DataFrame | PairFeatureEngine,
+) -> tuple[np.ndarray, pd.DataFrame]:
+    """
+    Feature matrix of a variant for ``pairs_df``.
+
+    Returns:
+        (X, pairs): pairs without embeddings are dropped for variants using
+        FastRP, so ``pairs`` are the rows of ``X``.
+    """
+    features = _pair_engine(node_df).pair_features(pairs_df, variant_blocks(variant_name))
+    if not features.valid.all():
+        logger.warning("Dropping %d pairs without embeddings", int((~features.valid).sum()))
+        return features.matrix[features.valid], pairs_df[features.valid].reset_index(drop=True)
+    return features.matrix, pairs_df
 
 
 def run_model_variant(
     variant_name: str,
     train_df: pd.DataFrame,
-    node_df: pd.DataFrame,
+    node_df: pd.DataFrame | PairFeatureEngine,
     cfg: LinkPredictionConfig,
 ) -> tuple[Any, dict[str, float], Any]:
     """
     Train and evaluate a specific model variant.
     """
+    X, train_df = variant_features(variant_name, train_df, node_df)
+    return fit_variant(variant_name, X, train_df['label'].values, cfg)
+
+
+def fit_variant(
+    variant_name: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    cfg: LinkPredictionConfig,
+) -> tuple[Any, dict[str, float], Any]:
+    """Split, scale, train and evaluate one variant on its feature matrix ``X``."""
     logger.info("Training variant: %s", variant_name)
     
-    feature_sets = []
-    
-    # String features (always included except for baseline_fastrp)
-    if variant_name != "baseline_fastrp":
-        feature_sets.append(train_df[['lev_dist_last_name', 'lev_dist_patronymic', 'is_common_surname']].values)
-    
-    # Embedding features
-    if "fastrp" in variant_name:
-        emb_features = compute_embedding_features(train_df, node_df, "fastrp_embedding")
-        # Filter out rows where embeddings are missing
-        valid_mask = [f is not None for f in emb_features]
-        if sum(valid_mask) < len(emb_features):
-            logger.warning("Dropping %d rows without embeddings", len(emb_features) - sum(valid_mask))
-            train_df = train_df[valid_mask]
-            
-            # Re-filter string features if we subsetted
-            if variant_name != "baseline_fastrp":
-                feature_sets = [train_df[['lev_dist_last_name', 'lev_dist_patronymic', 'is_common_surname']].values]
-            else:
-                feature_sets = []
-                
-            # Re-compute embeddings for valid subset
-            emb_features = compute_embedding_features(train_df, node_df, "fastrp_embedding")
-            
-        # Stack embedding features
-        emb_matrix = np.stack([np.array(f) for f in emb_features if f is not None])
-        feature_sets.append(emb_matrix)
-        
-    # Community features
-    if "louvain" in variant_name:
-        comm_df = compute_community_features(train_df, node_df, "community_louvain")
-        feature_sets.append(comm_df.values)
-        
-    if "wcc" in variant_name:
-        wcc_df = compute_community_features(train_df, node_df, "wcc")
-        feature_sets.append(wcc_df.values)
-        
-    # Network features
-    if "full" in variant_name:
-        net_df = compute_network_features(train_df, node_df)
-        feature_sets.append(net_df.values)
-    
-    # Combine features
-    X = np.hstack(feature_sets)
-    y = train_df['label'].values
-    
     # Train-test split
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, 
@@ -399,28 +378,33 @@ def run_model_variant(
     return model, metrics, scaler
 
 
-def run_link_prediction_workflow(
+@dataclass
+class LinkPredictionInputs:
+    """Run-level inputs of link prediction: the global SIM_NAME/FAMILY queries and what is built from them."""
+    sim_name_df: pd.DataFrame
+    family_df: pd.DataFrame
+    train_df: pd.DataFrame
+    # SIM_NAME pairs that are not FAMILY, scored in every window
+    candidates: pd.DataFrame
+    # Pair keys of the SIM_NAME/FAMILY ids
+    codec: Optional[PairKeyCodec] = None
+
+
+def fetch_link_prediction_inputs(
     gds,
-    cfg,
-    window_graph_name: str,
-    df_nodes: pd.DataFrame,
-    df_edges: pd.DataFrame,
-) -> Optional[pd.DataFrame]:
+    lp_config: LinkPredictionConfig,
+    entity_ids: Optional[Sequence] = None,
+) -> Optional[LinkPredictionInputs]:
     """
-    Main workflow for per-window link prediction with model horse race.
-    
-    Args:
-        gds: GDS client
-        cfg: RollingWindowConfig
-        window_graph_name: Name of current window graph
-        df_nodes: Node features DataFrame
-        df_edges: Edge list DataFrame
-        
+    Fetch SIM_NAME pairs and official FAMILY edges and build the training set and candidates.
+
+    None of it depends on the window, so a run does this once. Pairs are
+    matched on keys coded with ``entity_ids`` (the run's node identity
+    dictionary), extended by the fetched ids it lacks.
+
     Returns:
-        DataFrame of predicted edges (best model)
+        The inputs, or None if there is nothing to train on.
     """
-    lp_config = LinkPredictionConfig()
-    
     # 1. Fetch SIM_NAME data
     sim_name_df = fetch_sim_name_pairs(gds, include_family=False)
     if sim_name_df.empty:
@@ -434,7 +418,8 @@ def run_link_prediction_workflow(
         return None
     
     # 3. Build training data
-    train_df = build_training_data(sim_name_df, family_df, random_state=lp_config.random_state)
+    codec = _pair_codec(sim_name_df, family_df, entity_ids)
+    train_df = build_training_data(sim_name_df, family_df, random_state=lp_config.random_state, codec=codec)
     
     if len(train_df) < lp_config.min_training_samples:
         logger.warning(
@@ -442,126 +427,333 @@ def run_link_prediction_workflow(
             len(train_df), lp_config.min_training_samples
         )
         return None
-    
-    # 4. Run horse race
-    best_model = None
-    best_scaler = None
-    best_auc = -1
-    best_variant = None
-    
-    for variant in lp_config.variants:
-        with mlflow.start_run(run_name=f"{window_graph_name}_{variant}", nested=True):
+
+    return LinkPredictionInputs(
+        sim_name_df=sim_name_df,
+        family_df=family_df,
+        train_df=train_df,
+        candidates=non_family_candidates(sim_name_df, family_df, codec),
+        codec=codec,
+    )
+
+
+@dataclass
+class FittedLinkModel:
+    """Winner of a horse race: its model and scaler score the candidates of later windows."""
+    variant: str
+    model: Any
+    scaler: Any
+    auc: float
+    # Window whose embeddings and communities the model was trained on
+    trained_on: str
+
+
+# Feature cache of the horse race in a worker process (set by its initializer).
+_WORKER_FEATURES: Optional[tuple[PairFeatures, np.ndarray, LinkPredictionConfig]] = None
+
+
+def _init_variant_worker(features: PairFeatures, labels: np.ndarray, lp_config: LinkPredictionConfig) -> None:
+    global _WORKER_FEATURES
+    _WORKER_FEATURES = (features, labels, lp_config)
+
+
+def _fit_cached_variant(
+    variant_name: str,
+    features: PairFeatures,
+    labels: np.ndarray,
+    lp_config: LinkPredictionConfig,
+) -> tuple[Any, dict[str, float], Any]:
+    selected = features.select(variant_blocks(variant_name))
+    if not selected.valid.all():
+        logger.warning("Dropping %d pairs without embeddings", int((~selected.valid).sum()))
+    return fit_variant(variant_name, selected.matrix[selected.valid], labels[selected.valid], lp_config)
+
+
+def _fit_variant_in_worker(variant_name: str) -> tuple[Any, dict[str, float], Any]:
+    assert _WORKER_FEATURES is not None, "worker feature cache not initialised"
+    return _fit_cached_variant(variant_name, *_WORKER_FEATURES)
+
+
+def fit_variants(
+    features: PairFeatures,
+    labels: np.ndarray,
+    lp_config: LinkPredictionConfig,
+) -> dict[str, tuple[Any, dict[str, float], Any] | Exception]:
+    """
+    Train every variant of ``lp_config`` on its columns of the feature cache.
+
+    Variants are trained in parallel over ``lp_config.max_workers`` processes,
+    each receiving the cache once; a variant that fails maps to its exception.
+    """
+    variants = list(lp_config.variants)
+    workers = lp_config.max_workers or min(len(variants), os.cpu_count() or 1)
+    results: dict[str, tuple[Any, dict[str, float], Any] | Exception] = {}
+    if workers <= 1:
+        for variant in variants:
             try:
-                model, metrics, scaler = run_model_variant(variant, train_df.copy(), df_nodes, lp_config)
-                
-                # Log to MLflow
-                mlflow.log_param("variant", variant)
-                mlflow.log_param("window", window_graph_name)
-                mlflow.log_param("n_positives", int((train_df['label'] == 1).sum()))
-                mlflow.log_param("n_negatives", int((train_df['label'] == 0).sum()))
-                mlflow.log_param("threshold", cfg.lp_threshold)
-                mlflow.log_metrics(metrics)
-                
-                if metrics['auc'] > best_auc:
-                    best_auc = metrics['auc']
-                    best_model = model
-                    best_scaler = scaler
-                    best_variant = variant
-                    
+                results[variant] = _fit_cached_variant(variant, features, labels, lp_config)
             except Exception as e:
-                logger.error("Failed to train variant %s: %s", variant, e)
-                mlflow.log_param("error", str(e))
+                results[variant] = e
+        return results
+
+    # Spawned, not forked: the pipeline post-processes windows on threads.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_variant_worker,
+        initargs=(features, labels, lp_config),
+    ) as pool:
+        futures = {variant: pool.submit(_fit_variant_in_worker, variant) for variant in variants}
+        for variant, future in futures.items():
+            try:
+                results[variant] = future.result()
+            except Exception as e:
+                results[variant] = e
+    return results
+
+
+def run_horse_race(
+    inputs: LinkPredictionInputs,
+    df_nodes: pd.DataFrame | PairFeatureEngine,
+    lp_config: LinkPredictionConfig,
+    *,
+    cfg,
+    window_graph_name: str,
+    epoch: int = 0,
+    parent_run_id: Optional[str] = None,
+) -> Optional[FittedLinkModel]:
+    """
+    Train every variant on the features of ``df_nodes`` and return the one with the best test AUC.
+
+    The features of every variant are computed once into one cache, the
+    variants are trained in parallel (``fit_variants``), and each variant's
+    nested MLflow run is logged from this process with one params and one
+    metrics call. The runs nest under ``parent_run_id`` when given: on a
+    writer thread there is no active run to nest under.
+    """
+    train_df = inputs.train_df
+    features = _pair_engine(df_nodes).pair_features(train_df, union_blocks(lp_config.variants))
+    results = fit_variants(features, train_df['label'].to_numpy(), lp_config)
+    best: Optional[FittedLinkModel] = None
     
-    if best_model is None:
+    for variant in lp_config.variants:
+        result = results[variant]
+        with mlflow.start_run(run_name=f"{window_graph_name}_{variant}", nested=True, parent_run_id=parent_run_id):
+            if isinstance(result, Exception):
+                logger.error("Failed to train variant %s: %s", variant, result)
+                mlflow.log_params({"error": str(result)})
+                continue
+            model, metrics, scaler = result
+            mlflow.log_params({
+                "variant": variant,
+                "window": window_graph_name,
+                "epoch": epoch,
+                "n_positives": int((train_df['label'] == 1).sum()),
+                "n_negatives": int((train_df['label'] == 0).sum()),
+                "threshold": cfg.lp_threshold,
+            })
+            mlflow.log_metrics(metrics)
+            
+            if best is None or metrics['auc'] > best.auc:
+                best = FittedLinkModel(
+                    variant=variant,
+                    model=model,
+                    scaler=scaler,
+                    auc=metrics['auc'],
+                    trained_on=window_graph_name,
+                )
+    
+    if best is None:
         logger.error("All model variants failed")
         return None
     
-    logger.info("Best model: %s with AUC=%.3f", best_variant, best_auc)
-    
-    # 5. Predict on all SIM_NAME pairs (that aren't already FAMILY)
-    # Build candidate set
-    family_set = set()
-    for _, row in family_df.iterrows():
-        family_set.add((row['source_id'], row['target_id']))
-        family_set.add((row['target_id'], row['source_id']))
-    
-    candidates = sim_name_df[
-        ~sim_name_df.apply(
-            lambda row: (row['source_id'], row['target_id']) in family_set or 
-                        (row['target_id'], row['source_id']) in family_set,
-            axis=1
-        )
-    ].copy()
-    
+    logger.info("Best model: %s with AUC=%.3f", best.variant, best.auc)
+    return best
+
+
+def score_candidates(
+    fitted: FittedLinkModel,
+    candidates: pd.DataFrame,
+    df_nodes: pd.DataFrame,
+    *,
+    cfg,
+    window_graph_name: str,
+    engine: Optional[PairFeatureEngine] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """
+    Score ``candidates`` with the window's features and keep those above ``cfg.lp_threshold``.
+
+    Candidates are featurised and scored ``chunk_size`` at a time, so only one
+    chunk of gathered embeddings is held at once.
+    """
     if candidates.empty:
         logger.info("No candidates for prediction (all SIM_NAME pairs are already FAMILY)")
         return pd.DataFrame()
     
     logger.info("Predicting on %d candidate pairs...", len(candidates))
-    
-    # Fill NaNs in string features for candidates
-    # (Same as training)
-    str_cols = ['lev_dist_last_name', 'lev_dist_patronymic', 'is_common_surname']
-    candidates[str_cols] = candidates[str_cols].fillna(0.0)
-    
-    feature_sets = []
-    
-    # String features
-    if best_variant != "baseline_fastrp":
-        feature_sets.append(candidates[str_cols].values)
-    
-    # Embedding features
-    if "fastrp" in best_variant:
-        emb_features = compute_embedding_features(candidates, df_nodes, "fastrp_embedding")
-        valid_mask = [f is not None for f in emb_features]
-        if sum(valid_mask) < len(emb_features):
-            logger.warning("Dropping %d candidates without embeddings", len(emb_features) - sum(valid_mask))
-            candidates = candidates.iloc[valid_mask].reset_index(drop=True)
-            
-            # Re-filter string features if subsetted
-            if best_variant != "baseline_fastrp":
-                feature_sets = [candidates[str_cols].values]
-            else:
-                feature_sets = []
-                
-            # Re-compute embeddings
-            emb_features = compute_embedding_features(candidates, df_nodes, "fastrp_embedding")
-            
-        emb_matrix = np.stack([np.array(f) for f in emb_features if f is not None])
-        feature_sets.append(emb_matrix)
-        
-    # Community features
-    if "louvain" in best_variant:
-        comm_df = compute_community_features(candidates, df_nodes, "community_louvain")
-        feature_sets.append(comm_df.values)
-        
-    if "wcc" in best_variant:
-        wcc_df = compute_community_features(candidates, df_nodes, "wcc")
-        feature_sets.append(wcc_df.values)
-        
-    # Network features
-    if "full" in best_variant:
-        net_df = compute_network_features(candidates, df_nodes)
-        feature_sets.append(net_df.values)
-        
-    X_cand = np.hstack(feature_sets)
-    X_cand = best_scaler.transform(X_cand)
-    
-    # Predict
-    probs = best_model.predict_proba(X_cand)[:, 1]
-    
-    # Filter by threshold
-    mask = probs > cfg.lp_threshold
-    
-    predicted_edges = candidates[mask].copy()
-    predicted_edges['probability'] = probs[mask]
+    engine = engine or PairFeatureEngine(df_nodes)
+    blocks = variant_blocks(fitted.variant)
+    kept: list[pd.DataFrame] = []
+    n_scored = 0
+    for offset, features in engine.iter_pair_features(candidates, blocks, chunk_size=chunk_size):
+        if not features.valid.any():
+            continue
+        X_cand = fitted.scaler.transform(features.matrix[features.valid])
+        probs = fitted.model.predict_proba(X_cand)[:, 1]
+        n_scored += len(probs)
+
+        # Filter by threshold
+        mask = probs > cfg.lp_threshold
+        chunk = candidates.iloc[offset : offset + len(features.valid)][features.valid]
+        chunk = chunk[mask].copy()
+        chunk['probability'] = probs[mask]
+        kept.append(chunk)
+
+    if n_scored < len(candidates):
+        logger.warning("Dropping %d pairs without embeddings", len(candidates) - n_scored)
+    if n_scored == 0:
+        logger.info("No candidates with features in %s", window_graph_name)
+        return pd.DataFrame()
+
+    predicted_edges = pd.concat(kept, ignore_index=True)
     predicted_edges['window_graph_name'] = window_graph_name
-    predicted_edges['model_variant'] = best_variant
+    predicted_edges['model_variant'] = fitted.variant
+    predicted_edges['model_window'] = fitted.trained_on
     predicted_edges['window_start_ms'] = df_nodes['window_start_ms'].iloc[0] if not df_nodes.empty else 0
     
     logger.info(
         "Found %d predicted edges above threshold %.2f (using %s model)",
-        len(predicted_edges), cfg.lp_threshold, best_variant
+        len(predicted_edges), cfg.lp_threshold, fitted.variant
     )
     
     return predicted_edges
+
+
+class LinkPredictor:
+    """
+    Run-level state of per-window link prediction: train once, score many.
+
+    The SIM_NAME/FAMILY inputs are fetched, and the training set and
+    candidates built, on the first window. The horse race runs once per
+    epoch of ``cfg.lp_retrain_every`` windows in ``window_names`` order (once
+    per run with 0), on the embeddings and communities of the first window of
+    the epoch to reach it; the winning model and scaler score every window of
+    the epoch. Windows post-processed concurrently wait for the training of
+    their own epoch instead of repeating it; other epochs train and score
+    meanwhile. A failed training is raised to the windows waiting for it and
+    retried by the next window of the epoch. SIM_NAME and FAMILY pairs are
+    matched on pair keys coded with ``entity_ids`` (see ``pair_keys``). The
+    horse races' MLflow runs nest under ``parent_run_id``.
+    """
+
+    def __init__(
+        self,
+        cfg,
+        *,
+        window_names: Sequence[str] = (),
+        lp_config: Optional[LinkPredictionConfig] = None,
+        entity_ids: Optional[Sequence] = None,
+        parent_run_id: Optional[str] = None,
+    ):
+        if cfg.lp_retrain_every < 0:
+            raise ValueError(f"lp_retrain_every must be >= 0, got {cfg.lp_retrain_every}")
+        self.cfg = cfg
+        self.lp_config = lp_config or LinkPredictionConfig()
+        self._order = {name: i for i, name in enumerate(window_names)}
+        self._entity_ids = entity_ids
+        self._parent_run_id = parent_run_id
+        self._lock = threading.Lock()
+        self._fetched = False
+        self._inputs: Optional[LinkPredictionInputs] = None
+        # The lock only guards this dict: a training runs outside it, its callers wait on its future.
+        self._models: dict[int, Future] = {}
+
+    def epoch(self, window_graph_name: str) -> int:
+        if self.cfg.lp_retrain_every == 0:
+            return 0
+        with self._lock:
+            # Windows not announced up front are numbered in arrival order.
+            index = self._order.setdefault(window_graph_name, len(self._order))
+        return index // self.cfg.lp_retrain_every
+
+    def inputs(self, gds) -> Optional[LinkPredictionInputs]:
+        with self._lock:
+            if not self._fetched:
+                self._inputs = fetch_link_prediction_inputs(gds, self.lp_config, self._entity_ids)
+                self._fetched = True
+            return self._inputs
+
+    def model(
+        self, epoch: int, df_nodes: pd.DataFrame | PairFeatureEngine, *, window_graph_name: str
+    ) -> Optional[FittedLinkModel]:
+        with self._lock:
+            future = self._models.get(epoch)
+            trains = future is None
+            if trains:
+                future = self._models[epoch] = Future()
+        if trains:
+            logger.info("Training link prediction epoch %d on %s", epoch, window_graph_name)
+            try:
+                fitted = run_horse_race(
+                    self._inputs,
+                    df_nodes,
+                    self.lp_config,
+                    cfg=self.cfg,
+                    window_graph_name=window_graph_name,
+                    epoch=epoch,
+                    parent_run_id=self._parent_run_id,
+                )
+            except BaseException as e:
+                with self._lock:
+                    del self._models[epoch]
+                future.set_exception(e)
+                raise
+            future.set_result(fitted)
+        return future.result()
+
+    def predict(self, gds, window_graph_name: str, df_nodes: pd.DataFrame) -> Optional[pd.DataFrame]:
+        inputs = self.inputs(gds)
+        if inputs is None:
+            return None
+        # Node features are indexed once per window, for training and scoring.
+        engine = PairFeatureEngine(df_nodes)
+        fitted = self.model(self.epoch(window_graph_name), engine, window_graph_name=window_graph_name)
+        if fitted is None:
+            return None
+        return score_candidates(
+            fitted,
+            inputs.candidates,
+            df_nodes,
+            cfg=self.cfg,
+            window_graph_name=window_graph_name,
+            engine=engine,
+            chunk_size=self.lp_config.feature_chunk_size,
+        )
+
+
+def run_link_prediction_workflow(
+    gds,
+    cfg,
+    window_graph_name: str,
+    df_nodes: pd.DataFrame,
+    df_edges: pd.DataFrame,
+    predictor: Optional[LinkPredictor] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Main workflow for per-window link prediction with model horse race.
+    
+    Args:
+        gds: GDS client
+        cfg: RollingWindowConfig
+        window_graph_name: Name of current window graph
+        df_nodes: Node features DataFrame
+        df_edges: Edge list DataFrame
+        predictor: Run-level LinkPredictor reusing inputs and models across
+            windows; without one, everything is fetched and trained for this window
+        
+    Returns:
+        DataFrame of predicted edges (best model)
+    """
+    predictor = predictor or LinkPredictor(cfg)
+    return predictor.predict(gds, window_graph_name, df_nodes)
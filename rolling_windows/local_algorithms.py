@@ -0,0 +1,417 @@
+"""
+Sparse NumPy/SciPy implementations of the per-window graph algorithms.
+
+Every function takes a window topology as parallel ``src``/``dst`` arrays of
+local node indices (0..n-1, NATURAL orientation, parallel relationships kept)
+and mirrors the semantics of the GDS procedure called for the same metric in
+``metrics.run_window_algorithms``.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+# Upper bound on the number of cells in the dense (nodes x sources) matrices
+# used by the batched BFS kernels (~32 MiB per float64 matrix).
+_BFS_BATCH_CELLS = 1 << 22
+
+
+def adjacency(n: int, src: np.ndarray, dst: np.ndarray, weight: np.ndarray | None = None) -> sp.csr_matrix:
+    """Build an ``n x n`` CSR adjacency; parallel relationships are summed."""
+    data = np.ones(len(src), dtype=np.float64) if weight is None else np.asarray(weight, dtype=np.float64)
+    return sp.csr_matrix((data, (src, dst)), shape=(n, n))
+
+
+def degree(n: int, src: np.ndarray, dst: np.ndarray, *, orientation: str = "NATURAL") -> np.ndarray:
+    """Unweighted degree (relationship count), as ``gds.degree`` without a weight property."""
+    if orientation == "NATURAL":
+        return np.bincount(src, minlength=n).astype(np.float64)
+    if orientation == "REVERSE":
+        return np.bincount(dst, minlength=n).astype(np.float64)
+    if orientation == "UNDIRECTED":
+        return (np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)).astype(np.float64)
+    raise ValueError(f"Unsupported orientation: {orientation!r}")
+
+
+def page_rank(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    weight: np.ndarray | None = None,
+    *,
+    damping_factor: float = 0.85,
+    max_iterations: int = 20,
+    tolerance: float = 1e-7,
+    initial: np.ndarray | None = None,
+) -> tuple[np.ndarray, int]:
+    """
+    Weighted, non-normalised PageRank (GDS semantics).
+
+    ``PR(v) = (1 - d) + d * sum_{u->v} PR(u) * w(u, v) / W_out(u)``, starting
+    from ``1 - d`` (or ``initial``) and stopping once no score moves by more
+    than ``tolerance``. Mass on dangling nodes is not redistributed.
+
+    Returns:
+        (scores, iterations_run)
+    """
+    if n == 0:
+        return np.zeros(0, dtype=np.float64), 0
+
+    w = np.ones(len(src), dtype=np.float64) if weight is None else np.clip(np.asarray(weight, dtype=np.float64), 0.0, None)
+    out_w = np.bincount(src, weights=w, minlength=n)
+    denom = out_w[src]
+    share = np.divide(w, denom, out=np.zeros_like(w), where=denom > 0)
+    transition = sp.csr_matrix((share, (dst, src)), shape=(n, n))
+
+    alpha = 1.0 - damping_factor
+    scores = np.full(n, alpha) if initial is None else np.asarray(initial, dtype=np.float64).copy()
+
+    iterations = 0
+    for iterations in range(1, max(int(max_iterations), 1) + 1):
+        updated = alpha + damping_factor * (transition @ scores)
+        delta = float(np.max(np.abs(updated - scores)))
+        scores = updated
+        if delta < tolerance:
+            break
+    return scores, iterations
+
+
+def eigenvector(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    *,
+    max_iterations: int = 20,
+    tolerance: float = 1e-7,
+    initial: np.ndarray | None = None,
+) -> tuple[np.ndarray, int]:
+    """
+    Unweighted eigenvector centrality by power iteration over incoming
+    relationships, L2-normalised after every iteration (GDS semantics).
+
+    Returns:
+        (scores, iterations_run)
+    """
+    if n == 0:
+        return np.zeros(0, dtype=np.float64), 0
+
+    incoming = sp.csr_matrix((np.ones(len(src)), (dst, src)), shape=(n, n))
+    scores = np.full(n, 1.0 / n) if initial is None else np.asarray(initial, dtype=np.float64).copy()
+
+    iterations = 0
+    for iterations in range(1, max(int(max_iterations), 1) + 1):
+        updated = incoming @ scores
+        norm = float(np.linalg.norm(updated))
+        if norm > 0:
+            updated /= norm
+        delta = float(np.max(np.abs(updated - scores)))
+        scores = updated
+        if delta < tolerance:
+            break
+    return scores, iterations
+
+
+def _bfs_batch_size(n: int) -> int:
+    return int(max(1, min(n, _BFS_BATCH_CELLS // max(n, 1))))
+
+
+def _source_batches(sources: np.ndarray, batch_size: int):
+    for i in range(0, len(sources), batch_size):
+        yield sources[i : i + batch_size]
+
+
+def betweenness(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    *,
+    sources: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Unweighted, directed betweenness centrality (Brandes), not normalised.
+
+    Runs the forward BFS and the dependency back-propagation for a batch of
+    sources at once as sparse x dense products, so the Python loop is over BFS
+    levels rather than nodes. ``sources`` restricts the accumulation to a
+    subset of source nodes (used by the sampled approximation).
+    """
+    bc = np.zeros(n, dtype=np.float64)
+    if n == 0 or len(src) == 0:
+        return bc
+
+    forward = adjacency(n, src, dst)
+    backward = forward.T.tocsr()
+
+    if sources is None:
+        sources = np.arange(n)
+    # Sources without outgoing relationships reach nobody and add nothing.
+    out_deg = np.bincount(src, minlength=n)
+    sources = np.asarray(sources)[out_deg[np.asarray(sources)] > 0]
+
+    for batch in _source_batches(sources, _bfs_batch_size(n)):
+        cols = np.arange(len(batch))
+        sigma = np.zeros((n, len(batch)), dtype=np.float64)
+        sigma[batch, cols] = 1.0
+        depth = np.full((n, len(batch)), -1, dtype=np.int32)
+        depth[batch, cols] = 0
+
+        frontier = sigma.copy()
+        level = 0
+        while True:
+            reached = backward @ frontier
+            reached[depth >= 0] = 0.0
+            if not reached.any():
+                break
+            level += 1
+            depth[reached > 0] = level
+            sigma += reached
+            frontier = reached
+
+        dependency = np.zeros_like(sigma)
+        safe_sigma = np.where(sigma > 0, sigma, 1.0)
+        for d in range(level, 0, -1):
+            coeff = np.where(depth == d, (1.0 + dependency) / safe_sigma, 0.0)
+            contribution = forward @ coeff
+            dependency += np.where(depth == d - 1, sigma * contribution, 0.0)
+
+        dependency[batch, cols] = 0.0
+        bc += dependency.sum(axis=1)
+
+    return bc
+
+
+def closeness(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    *,
+    sources: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Closeness centrality as computed by GDS (``useWassermanFaust=false``).
+
+    A multi-source BFS follows NATURAL relationships; every node ``v`` reached
+    from source ``s`` at depth ``d`` accumulates ``farness(v) += d`` and
+    ``component(v) += 1``. The score is ``component / farness`` (0 when
+    unreachable).
+    """
+    farness, component = closeness_accumulators(n, src, dst, sources=sources)
+    return np.divide(component, farness, out=np.zeros(n, dtype=np.float64), where=farness > 0)
+
+
+def closeness_accumulators(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    *,
+    sources: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the ``(farness, component)`` sums behind :func:`closeness`."""
+    farness = np.zeros(n, dtype=np.float64)
+    component = np.zeros(n, dtype=np.float64)
+    if n == 0 or len(src) == 0:
+        return farness, component
+
+    backward = adjacency(n, src, dst).T.tocsr()
+    if sources is None:
+        sources = np.arange(n)
+    out_deg = np.bincount(src, minlength=n)
+    sources = np.asarray(sources)[out_deg[np.asarray(sources)] > 0]
+
+    for batch in _source_batches(sources, _bfs_batch_size(n)):
+        cols = np.arange(len(batch))
+        visited = np.zeros((n, len(batch)), dtype=bool)
+        visited[batch, cols] = True
+        frontier = visited.astype(np.float64)
+        level = 0
+        while True:
+            reached = (backward @ frontier) > 0
+            reached &= ~visited
+            if not reached.any():
+                break
+            level += 1
+            visited |= reached
+            hits = reached.sum(axis=1)
+            farness += level * hits
+            component += hits
+            frontier = reached.astype(np.float64)
+
+    return farness, component
+
+
+def wcc(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Weakly connected components; each component is labelled by its smallest local index."""
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    _, labels = connected_components(adjacency(n, src, dst), directed=True, connection="weak")
+    first = np.full(labels.max() + 1, n, dtype=np.int64)
+    np.minimum.at(first, labels, np.arange(n, dtype=np.int64))
+    return first[labels]
+
+
+def _modularity(sym: sp.csr_matrix, communities: np.ndarray, total_weight: float) -> float:
+    if total_weight <= 0:
+        return 0.0
+    k = np.asarray(sym.sum(axis=1)).ravel()
+    coo = sym.tocoo()
+    inside = coo.data[communities[coo.row] == communities[coo.col]].sum()
+    tot = np.bincount(communities, weights=k)
+    return float(inside / total_weight - np.sum((tot / total_weight) ** 2))
+
+
+def _louvain_local_moving(
+    sym: sp.csr_matrix,
+    communities: np.ndarray,
+    *,
+    max_iterations: int,
+    tolerance: float,
+) -> tuple[np.ndarray, int]:
+    n = sym.shape[0]
+    k = np.asarray(sym.sum(axis=1)).ravel()
+    total_weight = float(k.sum())
+    tot = np.bincount(communities, weights=k, minlength=n).astype(np.float64)
+    indptr, indices, data = sym.indptr, sym.indices, sym.data
+
+    modularity = _modularity(sym, communities, total_weight)
+    iterations = 0
+    for iterations in range(1, max(int(max_iterations), 1) + 1):
+        moved = False
+        for u in range(n):
+            lo, hi = indptr[u], indptr[u + 1]
+            nbrs = indices[lo:hi]
+            ws = data[lo:hi]
+            keep = nbrs != u
+            nbrs, ws = nbrs[keep], ws[keep]
+
+            current = communities[u]
+            tot[current] -= k[u]
+            if len(nbrs) == 0:
+                tot[current] += k[u]
+                continue
+
+            cand, inverse = np.unique(communities[nbrs], return_inverse=True)
+            links = np.bincount(inverse, weights=ws)
+            gains = links - tot[cand] * k[u] / total_weight
+
+            own = np.searchsorted(cand, current)
+            own_gain = gains[own] if own < len(cand) and cand[own] == current else -tot[current] * k[u] / total_weight
+
+            best = int(np.argmax(gains))
+            if gains[best] > own_gain + 1e-12:
+                communities[u] = cand[best]
+                moved = True
+            tot[communities[u]] += k[u]
+
+        updated = _modularity(sym, communities, total_weight)
+        gain = updated - modularity
+        modularity = updated
+        if not moved or gain < tolerance:
+            break
+    return communities, iterations
+
+
+def louvain(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    weight: np.ndarray | None = None,
+    *,
+    max_levels: int = 10,
+    max_iterations: int = 20,
+    tolerance: float = 1e-4,
+    seed_communities: np.ndarray | None = None,
+) -> tuple[list[np.ndarray], int]:
+    """
+    Weighted Louvain modularity optimisation on the undirected view of the graph.
+
+    Mirrors ``gds.louvain`` with ``includeIntermediateCommunities=True``: the
+    first return value holds one community array (over the original nodes) per
+    level, the last one being the final assignment. ``seed_communities``
+    starts the first level from an existing partition.
+
+    Returns:
+        (levels, total_local_moving_iterations)
+    """
+    if n == 0:
+        return [np.zeros(0, dtype=np.int64)], 0
+
+    directed = adjacency(n, src, dst, weight)
+    sym = (directed + directed.T).tocsr()
+    total_weight = float(sym.sum())
+
+    if seed_communities is not None:
+        _, start = np.unique(np.asarray(seed_communities), return_inverse=True)
+    else:
+        start = np.arange(n)
+
+    levels: list[np.ndarray] = []
+    membership = np.arange(n)
+    graph = sym
+    communities = start.astype(np.int64)
+    modularity = _modularity(sym, membership, total_weight)
+    total_iterations = 0
+
+    for _ in range(max(int(max_levels), 1)):
+        communities, iterations = _louvain_local_moving(
+            graph, communities, max_iterations=max_iterations, tolerance=tolerance
+        )
+        total_iterations += iterations
+        _, communities = np.unique(communities, return_inverse=True)
+        membership = communities[membership]
+
+        updated = _modularity(sym, membership, total_weight)
+        if levels and updated - modularity < tolerance:
+            break
+        levels.append(membership.astype(np.int64))
+        modularity = updated
+
+        n_comm = int(communities.max()) + 1
+        if n_comm == graph.shape[0]:
+            break
+        assign = sp.csr_matrix((np.ones(graph.shape[0]), (np.arange(graph.shape[0]), communities)), shape=(graph.shape[0], n_comm))
+        graph = (assign.T @ graph @ assign).tocsr()
+        communities = np.arange(n_comm)
+
+    return levels, total_iterations
+
+
+def fast_rp(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    weight: np.ndarray | None = None,
+    *,
+    embedding_dimension: int = 128,
+    iteration_weights: tuple[float, ...] = (0.2, 0.2, 0.2, 0.2, 0.2),
+    node_self_influence: float = 0.7,
+    random_seed: int = 42,
+) -> np.ndarray:
+    """
+    FastRP embeddings: very sparse random projection followed by repeated
+    averaging over NATURAL neighbours, each iterate L2-normalised and summed
+    with ``iteration_weights``. Seeded, but not bit-identical to GDS.
+    """
+    rng = np.random.default_rng(random_seed)
+    density = 1.0 / np.sqrt(max(embedding_dimension, 1))
+    draws = rng.random((n, embedding_dimension))
+    signs = np.where(draws < density / 2, 1.0, np.where(draws < density, -1.0, 0.0))
+    initial = signs / np.sqrt(density)
+
+    w = np.ones(len(src), dtype=np.float64) if weight is None else np.asarray(weight, dtype=np.float64)
+    out_w = np.bincount(src, weights=w, minlength=n)
+    denom = out_w[src]
+    share = np.divide(w, denom, out=np.zeros_like(w), where=denom > 0)
+    averaging = sp.csr_matrix((share, (src, dst)), shape=(n, n))
+
+    def _normalise(mat: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        return np.divide(mat, norms, out=np.zeros_like(mat), where=norms > 0)
+
+    embedding = node_self_influence * _normalise(initial)
+    current = initial
+    for iteration_weight in iteration_weights:
+        current = _normalise(averaging @ current)
+        embedding += iteration_weight * current
+    return embedding.astype(np.float32)
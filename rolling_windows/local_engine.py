@@ -0,0 +1,1135 @@
+"""
+Offline rolling-window engine.
+
+Computes the ``metrics.run_window_algorithms`` metric set from a local snapshot
+of the temporal base graph (the Bank/Company/Person nodes and the
+relationships projected by ``pipeline.ensure_base_graph``) using the sparse
+kernels in ``local_algorithms``. Windows are sliced with the same predicates
+as ``pipeline.build_filter_predicates`` and the participant filter of
+``run_windows``, and node/edge Parquet is written with the same schema, so
+windows can be processed in parallel on any machine without a GDS server.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import pandas as pd
+from tqdm.auto import tqdm
+
+import local_algorithms as la
+from approximation import (
+    approximate_betweenness,
+    calibrate_centrality,
+    calibration_window,
+    is_approximate,
+    landmark_closeness,
+    validate_centrality_config,
+)
+from bank_panel import compact_bank_panel, write_bank_panel_part
+from config import RollingWindowConfig, validate_rel_types
+from dates import Window, iter_period_windows
+from dedup import (
+    WindowDedupIndex,
+    dedup_stats,
+    log_dedup_rate,
+    node_property_checksums,
+    reuse_window_outputs,
+    window_fingerprint,
+)
+from frames import (
+    existing_row_count,
+    finalise_edge_frame,
+    finalise_node_frame,
+    manifest_row,
+    outputs_needed,
+    validate_output_layout,
+    window_graph_name_for,
+    window_output_paths,
+    write_window_output,
+)
+from hashing import stable_hash_dict
+from interval_index import TemporalIntervalIndex, load_or_build_interval_index
+from metrics import FcrIntervals, gds_config_metadata
+from parquet import write_parquet
+from profiling import NO_PROFILER, NO_TRACE, StageProfiler, WindowTrace
+from vectors import validate_vector_storage
+
+if TYPE_CHECKING:
+    from incremental import IncrementalWindowState
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_NODES_FILE = "nodes.parquet"
+SNAPSHOT_RELS_FILE = "relationships.parquet"
+SNAPSHOT_META_FILE = "snapshot.json"
+INDEX_DIRNAME = "index"
+
+# Relationship types the temporal FCR needs regardless of ``cfg.rel_types``.
+FCR_REL_TYPES: tuple[str, ...] = ("OWNERSHIP", "FAMILY")
+
+_MIN_T = -9_007_199_254_740_991.0
+_MAX_T = 9_007_199_254_740_991.0
+
+_SNAPSHOT_NODES_QUERY = """
+MATCH (n:Bank|Company|Person)
+RETURN
+    id(n) AS nodeId,
+    [l IN labels(n) WHERE l IN ['Bank', 'Company', 'Person']] AS nodeLabels,
+    toFloat(coalesce(n.temporal_start, $minT)) AS tStart,
+    toFloat(coalesce(n.temporal_end, $maxT)) AS tEnd,
+    toFloat(n.temporal_start) AS temporal_start,
+    toFloat(n.temporal_end) AS temporal_end,
+    coalesce(n.is_dead_int, 0) AS is_dead,
+    coalesce(n.gds_id, -1) AS gds_id,
+    coalesce(n.Id, n.neo4jImportId, "GDS_" + toString(id(n))) AS entity_id,
+    n[$idProperty] AS id_value,
+    n[$edgeIdProperty] AS edge_id_value,
+    n.bank_feats AS bank_feats,
+    n.network_feats AS network_feats,
+    n.regn_cbr AS regn_cbr
+"""
+
+_SNAPSHOT_RELS_QUERY = """
+MATCH (s:Bank|Company|Person)-[r]->(t:Bank|Company|Person)
+WHERE type(r) IN $relTypes
+RETURN
+    id(r) AS relId,
+    id(s) AS sourceNodeId,
+    id(t) AS targetNodeId,
+    type(r) AS relationshipType,
+    toFloat(coalesce(r.Size, 1.0)) AS weight,
+    toFloat(coalesce(r.temporal_start, $minT)) AS tStart,
+    toFloat(coalesce(r.temporal_end, $maxT)) AS tEnd,
+    toFloat(coalesce(r.imputed_flag, 0.0)) AS imputedFlag,
+    toFloat(r.temporal_start) AS temporal_start,
+    toFloat(r.temporal_end) AS temporal_end,
+    coalesce(r.source, '') = 'imputed' AS source_imputed
+"""
+
+
+@dataclass(frozen=True)
+class TemporalSnapshot:
+    """
+    Local copy of the temporal base graph.
+
+    ``nodes`` holds one row per Bank/Company/Person (``nodeId`` is the Neo4j
+    internal id, i.e. the GDS ``nodeId``); ``rels`` holds one row per
+    relationship with the projected ``weight``/``tStart``/``tEnd``/
+    ``imputedFlag`` plus the raw (nullable) temporal bounds and imputed-source
+    flag used by the temporal FCR.
+    """
+
+    nodes: pd.DataFrame
+    rels: pd.DataFrame
+    id_property: str = "Id"
+    edge_id_property: str = "Id"
+
+    def save(self, snapshot_dir: Path) -> None:
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        write_parquet(self.nodes, snapshot_dir / SNAPSHOT_NODES_FILE)
+        write_parquet(self.rels, snapshot_dir / SNAPSHOT_RELS_FILE)
+        meta = {
+            "id_property": self.id_property,
+            "edge_id_property": self.edge_id_property,
+            "node_count": int(len(self.nodes)),
+            "relationship_count": int(len(self.rels)),
+        }
+        (snapshot_dir / SNAPSHOT_META_FILE).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, snapshot_dir: Path) -> "TemporalSnapshot":
+        meta = json.loads((snapshot_dir / SNAPSHOT_META_FILE).read_text(encoding="utf-8"))
+        nodes = pd.read_parquet(snapshot_dir / SNAPSHOT_NODES_FILE)
+        rels = pd.read_parquet(snapshot_dir / SNAPSHOT_RELS_FILE)
+        return cls.from_frames(
+            nodes,
+            rels,
+            id_property=meta["id_property"],
+            edge_id_property=meta["edge_id_property"],
+        )
+
+    @classmethod
+    def from_frames(
+        cls,
+        nodes: pd.DataFrame,
+        rels: pd.DataFrame,
+        *,
+        id_property: str = "Id",
+        edge_id_property: str = "Id",
+    ) -> "TemporalSnapshot":
+        """Normalise dtypes and sort nodes by ``nodeId`` so lookups can use ``searchsorted``."""
+        nodes = nodes.sort_values("nodeId", kind="stable").reset_index(drop=True)
+        nodes["nodeId"] = nodes["nodeId"].astype("int64")
+        nodes["is_dead"] = nodes["is_dead"].fillna(0).astype("int64")
+        nodes["gds_id"] = nodes["gds_id"].fillna(-1).astype("int64")
+        for col in ("tStart", "tEnd", "temporal_start", "temporal_end"):
+            nodes[col] = nodes[col].astype("float64")
+        if "regn_cbr" in nodes.columns:
+            # Stored as text on some nodes and as a number on others (as in node_identity).
+            nodes["regn_cbr"] = [None if v is None or pd.isna(v) else str(v) for v in nodes["regn_cbr"]]
+
+        rels = rels.reset_index(drop=True)
+        for col in ("relId", "sourceNodeId", "targetNodeId"):
+            rels[col] = rels[col].astype("int64")
+        for col in ("weight", "tStart", "tEnd", "imputedFlag", "temporal_start", "temporal_end"):
+            rels[col] = rels[col].astype("float64")
+        rels["source_imputed"] = rels["source_imputed"].fillna(False).astype(bool)
+        return cls(nodes=nodes, rels=rels, id_property=id_property, edge_id_property=edge_id_property)
+
+    @cached_property
+    def node_checksums(self) -> np.ndarray:
+        """``dedup.node_property_checksums`` of every node over all of its snapshot columns."""
+        return node_property_checksums({c: self.nodes[c].to_numpy() for c in self.nodes.columns if c != "nodeId"})
+
+    def node_positions(self, node_ids: np.ndarray) -> np.ndarray:
+        """Map Neo4j node ids to row positions in ``nodes`` (-1 when absent)."""
+        ids = self.nodes["nodeId"].to_numpy()
+        if len(ids) == 0:
+            return np.full(len(node_ids), -1, dtype=np.int64)
+        pos = np.clip(np.searchsorted(ids, node_ids), 0, len(ids) - 1)
+        return np.where(ids[pos] == node_ids, pos, -1)
+
+    @cached_property
+    def label_masks(self) -> dict[str, np.ndarray]:
+        labels = self.nodes["nodeLabels"].map(lambda v: set() if v is None else set(v))
+        return {label: labels.map(lambda s: label in s).to_numpy(dtype=bool) for label in ("Bank", "Company", "Person")}
+
+    def has_label(self, label: str) -> np.ndarray:
+        return self.label_masks[label]
+
+    def bank_regn(self, node_ids: np.ndarray) -> np.ndarray:
+        """``regn_cbr`` of Bank nodes, ``None`` for other or unknown nodes (and snapshots without it)."""
+        out = np.full(len(node_ids), None, dtype=object)
+        if "regn_cbr" not in self.nodes.columns:
+            return out
+        pos = self.node_positions(np.asarray(node_ids, dtype=np.int64))
+        hit = pos >= 0
+        hit[hit] = self.has_label("Bank")[pos[hit]]
+        out[hit] = self.nodes["regn_cbr"].to_numpy(dtype=object)[pos[hit]]
+        return out
+
+
+def export_base_snapshot(gds, *, cfg: RollingWindowConfig, snapshot_dir: Path) -> TemporalSnapshot:
+    """
+    Pull the temporal base graph from Neo4j once and persist it as Parquet.
+
+    Property defaults mirror the native projection in ``ensure_base_graph``.
+    OWNERSHIP and FAMILY relationships are always exported because the
+    temporal FCR is computed from them even when they are not window types.
+    """
+    rel_types = tuple(dict.fromkeys((*cfg.rel_types, *FCR_REL_TYPES)))
+    validate_rel_types(rel_types)
+
+    logger.info("Exporting base snapshot nodes to %s", snapshot_dir)
+    nodes = gds.run_cypher(
+        _SNAPSHOT_NODES_QUERY,
+        params={
+            "minT": _MIN_T,
+            "maxT": _MAX_T,
+            "idProperty": cfg.id_property,
+            "edgeIdProperty": cfg.edge_id_property,
+        },
+    )
+    nodes = nodes.rename(columns={"id_value": cfg.id_property})
+    if cfg.edge_id_property == cfg.id_property:
+        nodes = nodes.drop(columns=["edge_id_value"])
+    else:
+        nodes = nodes.rename(columns={"edge_id_value": cfg.edge_id_property})
+
+    logger.info("Exporting base snapshot relationships (%s)", ", ".join(rel_types))
+    rels = gds.run_cypher(
+        _SNAPSHOT_RELS_QUERY,
+        params={"relTypes": list(rel_types), "minT": _MIN_T, "maxT": _MAX_T},
+    )
+
+    snapshot = TemporalSnapshot.from_frames(
+        nodes,
+        rels,
+        id_property=cfg.id_property,
+        edge_id_property=cfg.edge_id_property,
+    )
+    snapshot.save(snapshot_dir)
+    logger.info("Base snapshot written (nodes=%d rels=%d)", len(snapshot.nodes), len(snapshot.rels))
+    return snapshot
+
+
+@dataclass(frozen=True)
+class WindowGraph:
+    """
+    A materialised window: ``node_rows``/``rel_rows`` index into the snapshot
+    and ``src``/``dst`` are local (0..n-1) endpoint indices of ``rel_rows``.
+    """
+
+    node_rows: np.ndarray
+    rel_rows: np.ndarray
+    src: np.ndarray
+    dst: np.ndarray
+
+    @property
+    def node_count(self) -> int:
+        return int(len(self.node_rows))
+
+    @property
+    def relationship_count(self) -> int:
+        return int(len(self.rel_rows))
+
+
+def active_relationship_mask(
+    snapshot: TemporalSnapshot,
+    *,
+    start_ms: float,
+    end_ms: float,
+    rel_types: tuple[str, ...],
+    include_imputed01: int,
+) -> np.ndarray:
+    """Relationship filter of ``build_filter_predicates`` evaluated on the snapshot."""
+    rels = snapshot.rels
+    rel_type = rels["relationshipType"].to_numpy()
+    return (
+        np.isin(rel_type, list(rel_types))
+        & (rels["tStart"].to_numpy() < end_ms)
+        & (rels["tEnd"].to_numpy() > start_ms)
+        & ((rel_type != "FAMILY") | (float(include_imputed01) == 1.0) | (rels["imputedFlag"].to_numpy() == 0.0))
+    )
+
+
+def materialise_window(
+    snapshot: TemporalSnapshot,
+    *,
+    node_rows: np.ndarray,
+    rel_candidates: np.ndarray,
+) -> WindowGraph:
+    """
+    Apply the ``run_windows`` participant rule to temporally active elements:
+    relationships need both endpoints active; Persons are kept only with a
+    NATURAL ``active_degree > 0``; Banks/Companies are always kept.
+
+    ``node_rows`` are the sorted snapshot rows of temporally active nodes. The
+    work is proportional to the active elements, not to the snapshot size.
+    """
+    rels = snapshot.rels
+    src_pos = snapshot.node_positions(rels["sourceNodeId"].to_numpy()[rel_candidates])
+    dst_pos = snapshot.node_positions(rels["targetNodeId"].to_numpy()[rel_candidates])
+    src_slot = _row_slots(node_rows, src_pos)
+    dst_slot = _row_slots(node_rows, dst_pos)
+    endpoints_ok = (src_slot >= 0) & (dst_slot >= 0)
+    temp_rels = rel_candidates[endpoints_ok]
+    src_slot, dst_slot = src_slot[endpoints_ok], dst_slot[endpoints_ok]
+
+    has_out = np.zeros(len(node_rows), dtype=bool)
+    has_out[src_slot] = True
+    always_kept = snapshot.has_label("Bank")[node_rows] | snapshot.has_label("Company")[node_rows]
+    keep = has_out | always_kept
+
+    rel_keep = keep[src_slot] & keep[dst_slot]
+    local = np.cumsum(keep) - 1
+    return WindowGraph(
+        node_rows=node_rows[keep],
+        rel_rows=temp_rels[rel_keep],
+        src=local[src_slot[rel_keep]],
+        dst=local[dst_slot[rel_keep]],
+    )
+
+
+def _row_slots(sorted_rows: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Index of each position in ``sorted_rows`` (-1 when absent or when the position is -1)."""
+    if len(sorted_rows) == 0:
+        return np.full(len(positions), -1, dtype=np.int64)
+    slot = np.clip(np.searchsorted(sorted_rows, positions), 0, len(sorted_rows) - 1)
+    return np.where(sorted_rows[slot] == positions, slot, -1)
+
+
+def slice_window(
+    snapshot: TemporalSnapshot,
+    w: Window,
+    cfg: RollingWindowConfig,
+    *,
+    index: TemporalIntervalIndex | None = None,
+) -> WindowGraph:
+    """
+    Build the final participant graph for ``w`` (equivalent to the two GDS filters).
+
+    With an ``index`` the temporally active nodes and relationships come from
+    interval-tree queries; without one the snapshot columns are scanned.
+    """
+    if index is not None:
+        return materialise_window(
+            snapshot,
+            node_rows=index.active_nodes(w.start_ms, w.end_ms),
+            rel_candidates=index.active_relationships(
+                w.start_ms,
+                w.end_ms,
+                rel_types=cfg.rel_types,
+                include_imputed01=cfg.include_imputed01,
+            ),
+        )
+
+    nodes = snapshot.nodes
+    node_active = (nodes["tStart"].to_numpy() < float(w.end_ms)) & (nodes["tEnd"].to_numpy() > float(w.start_ms))
+    rel_candidates = np.flatnonzero(
+        active_relationship_mask(
+            snapshot,
+            start_ms=float(w.start_ms),
+            end_ms=float(w.end_ms),
+            rel_types=cfg.rel_types,
+            include_imputed01=cfg.include_imputed01,
+        )
+    )
+    return materialise_window(snapshot, node_rows=np.flatnonzero(node_active), rel_candidates=rel_candidates)
+
+
+def compute_fcr_local(snapshot: TemporalSnapshot, w: Window) -> dict[int, float]:
+    """
+    Temporal FCR with the semantics of ``metrics.compute_fcr_temporal``:
+    for each active Bank/Company, the mean over its distinct OWNERSHIP owners
+    (active in the window) of the owner's distinct non-imputed FAMILY members
+    (open-ended FAMILY bounds count as active). Keyed by Neo4j node id.
+    """
+    start, end = float(w.start_ms), float(w.end_ms)
+    nodes, rels = snapshot.nodes, snapshot.rels
+
+    entity_mask = (snapshot.has_label("Bank") | snapshot.has_label("Company")) & (
+        (nodes["temporal_start"].to_numpy() < end) & (nodes["temporal_end"].to_numpy() > start)
+    )
+    entities = nodes["nodeId"].to_numpy()[entity_mask]
+
+    rel_type = rels["relationshipType"].to_numpy()
+    r_start = rels["temporal_start"].to_numpy()
+    r_end = rels["temporal_end"].to_numpy()
+
+    own = (rel_type == "OWNERSHIP") & (r_start < end) & (r_end > start)
+    ownership = pd.DataFrame(
+        {"entity": rels["targetNodeId"].to_numpy()[own], "owner": rels["sourceNodeId"].to_numpy()[own]}
+    )
+    ownership = ownership[ownership["entity"].isin(entities)].drop_duplicates()
+    if ownership.empty:
+        return {}
+
+    fam = (
+        (rel_type == "FAMILY")
+        & (np.isnan(r_start) | (r_start < end))
+        & (np.isnan(r_end) | (r_end > start))
+        & ~rels["source_imputed"].to_numpy()
+    )
+    a = rels["sourceNodeId"].to_numpy()[fam]
+    b = rels["targetNodeId"].to_numpy()[fam]
+    family = pd.DataFrame({"owner": np.concatenate([a, b]), "member": np.concatenate([b, a])}).drop_duplicates()
+    family_degree = family.groupby("owner").size().rename("owner_family_degree")
+
+    ownership = ownership.join(family_degree, on="owner")
+    ownership["owner_family_degree"] = ownership["owner_family_degree"].fillna(0.0)
+    fcr = ownership.groupby("entity")["owner_family_degree"].mean()
+    return {int(k): float(v) for k, v in fcr.items()}
+
+
+def fcr_intervals_from_snapshot(snapshot: TemporalSnapshot) -> FcrIntervals:
+    """The ``FcrIntervals`` ``FcrIntervals.fetch`` would return for the database the snapshot was exported from."""
+    nodes, rels = snapshot.nodes, snapshot.rels
+    n_start = nodes["temporal_start"].to_numpy()
+    n_end = nodes["temporal_end"].to_numpy()
+    entity = (snapshot.has_label("Bank") | snapshot.has_label("Company")) & ~np.isnan(n_start) & ~np.isnan(n_end)
+
+    rel_type = rels["relationshipType"].to_numpy()
+    r_start = rels["temporal_start"].to_numpy()
+    r_end = rels["temporal_end"].to_numpy()
+    src = rels["sourceNodeId"].to_numpy().astype(np.int64)
+    dst = rels["targetNodeId"].to_numpy().astype(np.int64)
+    target_is_entity = np.isin(dst, nodes["nodeId"].to_numpy()[snapshot.has_label("Bank") | snapshot.has_label("Company")])
+    own = (rel_type == "OWNERSHIP") & target_is_entity & ~np.isnan(r_start) & ~np.isnan(r_end)
+    fam = (rel_type == "FAMILY") & ~rels["source_imputed"].to_numpy()
+
+    return FcrIntervals(
+        entity=nodes["nodeId"].to_numpy().astype(np.int64)[entity],
+        entity_start=n_start[entity],
+        entity_end=n_end[entity],
+        own_owner=src[own],
+        own_entity=dst[own],
+        own_start=r_start[own],
+        own_end=r_end[own],
+        fam_a=src[fam],
+        fam_b=dst[fam],
+        fam_start=r_start[fam],
+        fam_end=r_end[fam],
+    )
+
+
+def run_window_algorithms_local(
+    snapshot: TemporalSnapshot,
+    graph: WindowGraph,
+    cfg: RollingWindowConfig,
+    *,
+    precomputed: dict[str, Any] | None = None,
+    seeds: dict[str, np.ndarray] | None = None,
+    calibrate: bool = False,
+    trace: WindowTrace = NO_TRACE,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """
+    Local counterpart of ``metrics.run_window_algorithms``.
+
+    ``precomputed`` supplies per-node values for some properties (e.g. from
+    ``incremental.IncrementalWindowState``); those algorithms are not run.
+    ``seeds`` holds initial values for ``page_rank``/``eigenvector`` and initial
+    communities for ``louvain`` (see ``WarmStartSeeds``). In approximate
+    centrality mode betweenness and closeness are always sampled on the whole
+    window graph; ``calibrate`` also computes them exactly and records the rank
+    correlations in the stats. Each algorithm run is a stage of ``trace``.
+
+    Returns:
+        (properties, stats): per-node arrays keyed by GDS property name (in the
+        order the GDS pipeline writes them) and algorithm statistics.
+    """
+    n = graph.node_count
+    src, dst = graph.src, graph.dst
+    rels = snapshot.rels
+    weight = rels["weight"].to_numpy()[graph.rel_rows]
+    rel_type = rels["relationshipType"].to_numpy()[graph.rel_rows]
+
+    precomputed = precomputed or {}
+    seeds = seeds or {}
+    properties: dict[str, Any] = {}
+    stats: dict[str, Any] = {}
+
+    if "page_rank" in precomputed:
+        properties["page_rank"] = precomputed["page_rank"]
+    else:
+        logger.info("Running PageRank...")
+        with trace.stage("page_rank", category="algorithm") as span:
+            properties["page_rank"], stats["page_rank_iterations"] = la.page_rank(
+                n,
+                src,
+                dst,
+                weight,
+                damping_factor=cfg.pagerank_damping_factor,
+                max_iterations=cfg.pagerank_max_iterations,
+                tolerance=cfg.pagerank_tolerance,
+                initial=seeds.get("page_rank"),
+            )
+            span["rows"] = n
+
+    if "in_degree" in precomputed and "out_degree" in precomputed:
+        properties["in_degree"] = precomputed["in_degree"]
+        properties["out_degree"] = precomputed["out_degree"]
+    else:
+        logger.info("Running Degree (in/out)...")
+        with trace.stage("degree", category="algorithm") as span:
+            properties["in_degree"] = la.degree(n, src, dst, orientation="REVERSE")
+            properties["out_degree"] = la.degree(n, src, dst, orientation="NATURAL")
+            span["rows"] = n
+
+    if "FAMILY" in cfg.rel_types:
+        if "family_degree" in precomputed:
+            properties["family_degree"] = precomputed["family_degree"]
+        else:
+            logger.info("Running Family Degree...")
+            with trace.stage("family_degree", category="algorithm") as span:
+                family = rel_type == "FAMILY"
+                properties["family_degree"] = la.degree(n, src[family], dst[family], orientation="UNDIRECTED")
+                span["rows"] = n
+
+    if is_approximate(cfg):
+        logger.info("Running sampled Betweenness Centrality...")
+        with trace.stage("betweenness", category="algorithm") as span:
+            properties["betweenness"], stats["betweenness_sampling_size"] = approximate_betweenness(n, src, dst, cfg)
+            span["rows"] = n
+        logger.info("Running landmark Closeness Centrality...")
+        with trace.stage("closeness", category="algorithm") as span:
+            properties["closeness"], stats["closeness_landmarks"] = landmark_closeness(n, src, dst, cfg)
+            span["rows"] = n
+        if calibrate:
+            with trace.stage("centrality_calibration", category="algorithm"):
+                stats.update(
+                    calibrate_centrality(
+                        n,
+                        src,
+                        dst,
+                        betweenness=properties["betweenness"],
+                        closeness=properties["closeness"],
+                    )
+                )
+    else:
+        if "betweenness" in precomputed:
+            properties["betweenness"] = precomputed["betweenness"]
+        else:
+            logger.info("Running Betweenness Centrality...")
+            with trace.stage("betweenness", category="algorithm") as span:
+                properties["betweenness"] = la.betweenness(n, src, dst)
+                span["rows"] = n
+
+        if "closeness" in precomputed:
+            properties["closeness"] = precomputed["closeness"]
+        else:
+            logger.info("Running Closeness Centrality...")
+            with trace.stage("closeness", category="algorithm") as span:
+                properties["closeness"] = la.closeness(n, src, dst)
+                span["rows"] = n
+
+    logger.info("Running Eigenvector Centrality...")
+    with trace.stage("eigenvector", category="algorithm") as span:
+        properties["eigenvector"], stats["eigenvector_iterations"] = la.eigenvector(
+            n,
+            src,
+            dst,
+            max_iterations=cfg.eigenvector_max_iterations,
+            tolerance=cfg.eigenvector_tolerance,
+            initial=seeds.get("eigenvector"),
+        )
+        span["rows"] = n
+
+    node_ids = snapshot.nodes["nodeId"].to_numpy()[graph.node_rows]
+    if cfg.run_wcc:
+        if "wcc" in precomputed:
+            properties["wcc"] = precomputed["wcc"]
+        else:
+            logger.info("Running WCC...")
+            with trace.stage("wcc", category="algorithm") as span:
+                properties["wcc"] = node_ids[la.wcc(n, src, dst)]
+                span["rows"] = n
+
+    if cfg.run_louvain:
+        logger.info("Running Louvain...")
+        with trace.stage("louvain", category="algorithm") as span:
+            levels, stats["louvain_iterations"] = la.louvain(
+                n,
+                src,
+                dst,
+                weight,
+                max_iterations=cfg.louvain_max_iterations,
+                tolerance=cfg.louvain_tolerance,
+                seed_communities=seeds.get("louvain"),
+            )
+            stats["louvain_levels"] = len(levels)
+            stacked = np.column_stack(levels) if levels else np.zeros((n, 0), dtype=np.int64)
+            properties["community_louvain"] = [row.tolist() for row in stacked]
+            span["rows"] = n
+
+    if cfg.run_fastrp:
+        logger.info("Running FastRP...")
+        with trace.stage("fastrp", category="algorithm") as span:
+            embedding = la.fast_rp(
+                n,
+                src,
+                dst,
+                weight,
+                embedding_dimension=cfg.embedding_dimension,
+                random_seed=cfg.embedding_random_seed,
+            )
+            properties["fastrp_embedding"] = embedding.tolist()
+            span["rows"] = n
+
+    if cfg.run_hashgnn or cfg.run_node2vec:
+        logger.warning("HashGNN/Node2Vec are not available in the local engine; use the GDS engine for these embeddings")
+
+    return properties, stats
+
+
+class WarmStartSeeds:
+    """
+    PageRank/eigenvector scores and final Louvain communities of the previous
+    window, keyed by snapshot row, used to seed the next window of a chain.
+
+    Nodes that were not in the previous window start from the cold-start
+    value (``1 - d`` for PageRank, a singleton community for Louvain).
+    Eigenvector seeds get a uniform ``1/n`` added so that no component starts
+    at zero, since power iteration can never leave an all-zero component.
+    """
+
+    def __init__(self, snapshot: TemporalSnapshot):
+        n = len(snapshot.nodes)
+        self._page_rank = np.full(n, np.nan)
+        self._eigenvector = np.full(n, np.nan)
+        self._louvain = np.full(n, -1, dtype=np.int64)
+        self._seeded = False
+
+    def reset(self) -> None:
+        self._seeded = False
+
+    def seeds_for(self, graph: WindowGraph, cfg: RollingWindowConfig) -> dict[str, np.ndarray] | None:
+        if not self._seeded or graph.node_count == 0:
+            return None
+        rows = graph.node_rows
+        n = graph.node_count
+
+        page_rank = self._page_rank[rows]
+        page_rank = np.where(np.isnan(page_rank), 1.0 - cfg.pagerank_damping_factor, page_rank)
+
+        eigenvector = np.nan_to_num(self._eigenvector[rows], nan=0.0) + 1.0 / n
+
+        louvain = self._louvain[rows].copy()
+        unseeded = louvain < 0
+        offset = int(louvain.max()) + 1 if len(louvain) else 0
+        louvain[unseeded] = offset + np.arange(int(unseeded.sum()))
+
+        return {"page_rank": page_rank, "eigenvector": eigenvector, "louvain": louvain}
+
+    def record(self, graph: WindowGraph, properties: dict[str, Any]) -> None:
+        self._page_rank.fill(np.nan)
+        self._eigenvector.fill(np.nan)
+        self._louvain.fill(-1)
+        rows = graph.node_rows
+        self._page_rank[rows] = properties["page_rank"]
+        self._eigenvector[rows] = properties["eigenvector"]
+        if "community_louvain" in properties and graph.node_count:
+            self._louvain[rows] = [levels[-1] for levels in properties["community_louvain"]]
+        self._seeded = True
+
+
+def build_node_frame(
+    snapshot: TemporalSnapshot,
+    graph: WindowGraph,
+    properties: dict[str, Any],
+    cfg: RollingWindowConfig,
+) -> pd.DataFrame:
+    """Assemble the node frame in the layout returned by ``gds.graph.nodeProperties.stream``."""
+    nodes = snapshot.nodes.iloc[graph.node_rows].reset_index(drop=True)
+
+    df = pd.DataFrame({"nodeId": nodes["nodeId"].to_numpy()})
+    for name, values in properties.items():
+        df[name] = values
+    if cfg.export_feature_vectors:
+        df["is_dead"] = nodes["is_dead"].to_numpy()
+    df["gds_id"] = nodes["gds_id"].to_numpy()
+    df["nodeLabels"] = nodes["nodeLabels"].map(list).to_numpy()
+
+    db_node_props = [cfg.id_property]
+    if cfg.export_edges and cfg.edge_id_property != cfg.id_property:
+        db_node_props.append(cfg.edge_id_property)
+    if cfg.export_feature_vectors:
+        db_node_props.extend(["bank_feats", "network_feats"])
+    elif cfg.export_feature_blocks:
+        db_node_props.append("bank_feats")
+    for prop in db_node_props:
+        df[prop] = nodes[prop].map(lambda v: v.tolist() if isinstance(v, np.ndarray) else v).to_numpy()
+
+    df["entity_id"] = nodes["entity_id"].to_numpy()
+    return df
+
+
+def build_edge_frame(snapshot: TemporalSnapshot, graph: WindowGraph, cfg: RollingWindowConfig) -> pd.DataFrame:
+    """Assemble the edge frame produced by ``pipeline.export_window_edges``."""
+    rels = snapshot.rels.iloc[graph.rel_rows]
+    df_edges = pd.DataFrame(
+        {
+            "sourceNodeId": rels["sourceNodeId"].to_numpy(),
+            "targetNodeId": rels["targetNodeId"].to_numpy(),
+            "relationshipType": rels["relationshipType"].to_numpy(),
+        }
+    )
+    node_ids = snapshot.nodes[cfg.edge_id_property].to_numpy()[graph.node_rows]
+    df_edges[f"source_{cfg.edge_id_property}"] = node_ids[graph.src]
+    df_edges[f"target_{cfg.edge_id_property}"] = node_ids[graph.dst]
+    return df_edges
+
+
+def window_graph_fingerprint(snapshot: TemporalSnapshot, graph: WindowGraph, *, params_hash: str) -> str:
+    rels = snapshot.rels
+    return window_fingerprint(
+        params_hash=params_hash,
+        node_ids=snapshot.nodes["nodeId"].to_numpy()[graph.node_rows],
+        source_ids=rels["sourceNodeId"].to_numpy()[graph.rel_rows],
+        target_ids=rels["targetNodeId"].to_numpy()[graph.rel_rows],
+        rel_types=rels["relationshipType"].to_numpy()[graph.rel_rows],
+        weights=rels["weight"].to_numpy()[graph.rel_rows],
+        node_checksums=snapshot.node_checksums[graph.node_rows],
+    )
+
+
+def process_window_local(
+    snapshot: TemporalSnapshot,
+    w: Window,
+    *,
+    cfg: RollingWindowConfig,
+    params_hash: str,
+    expand_embeddings: bool = False,
+    skip_existing: bool = True,
+    index: TemporalIntervalIndex | None = None,
+    state: IncrementalWindowState | None = None,
+    warm_start: WarmStartSeeds | None = None,
+    calibration_window: Window | None = None,
+    profiler: StageProfiler = NO_PROFILER,
+) -> dict[str, Any]:
+    """
+    Slice, compute and write one window; returns its manifest row.
+
+    With ``state`` the window's metrics are derived from the previous window
+    of the chain (see ``incremental``); with ``warm_start`` the iterative
+    algorithms are seeded from it. ``calibration_window`` is the window whose
+    approximate centralities are checked against exact ones. With
+    ``cfg.dedup_windows`` a window whose graph was already computed reuses
+    those outputs (see ``dedup``). Each stage is traced by ``profiler``.
+    """
+    window_graph_name = window_graph_name_for(w)
+    trace = profiler.window(window_graph_name)
+    node_out_path, edges_out_path = window_output_paths(cfg, window_graph_name, params_hash=params_hash)
+
+    need_nodes, need_edges = outputs_needed(
+        cfg,
+        node_out_path=node_out_path,
+        edges_out_path=edges_out_path,
+        skip_existing=skip_existing,
+    )
+    if not need_nodes and not need_edges:
+        logger.info("Skipping %s (outputs exist)", window_graph_name)
+        for chained in (state, warm_start):
+            if chained is not None:
+                chained.reset()
+        return manifest_row(
+            cfg=cfg,
+            w=w,
+            window_graph_name=window_graph_name,
+            params_hash=params_hash,
+            node_count=existing_row_count(node_out_path),
+            edge_count=existing_row_count(edges_out_path),
+            skipped_existing=True,
+        )
+
+    with trace.stage("slice", category="graph") as span:
+        graph = slice_window(snapshot, w, cfg, index=index)
+        span["rows"] = graph.relationship_count
+    logger.info(
+        "Window %s: %d nodes, %d relationships",
+        window_graph_name,
+        graph.node_count,
+        graph.relationship_count,
+    )
+
+    node_count = 0
+    edge_count = 0
+    stats: dict[str, Any] = {}
+    df = None
+
+    hit = None
+    if cfg.dedup_windows:
+        t0 = time.perf_counter()
+        dedup = WindowDedupIndex.for_run(cfg, params_hash)
+        with trace.stage("fingerprint", category="graph") as span:
+            fingerprint = window_graph_fingerprint(snapshot, graph, params_hash=params_hash)
+            span["rows"] = graph.relationship_count
+        if w != calibration_window:
+            hit = dedup.lookup(fingerprint, window_graph_name=window_graph_name, need_nodes=need_nodes, need_edges=need_edges)
+        fingerprint_stats = dedup_stats(fingerprint, hit, time.perf_counter() - t0)
+
+    if hit is not None:
+        # Any chained state still describes the window it last computed, so it stays valid.
+        logger.info("Window %s has the graph of %s; reusing its outputs", window_graph_name, hit.source_window)
+        fcr_map = None
+        if need_nodes:
+            with trace.stage("fcr", category="fcr") as span:
+                fcr_map = compute_fcr_local(snapshot, w)
+                span["rows"] = len(fcr_map)
+        with trace.stage("reuse_outputs", category="io") as span:
+            df, df_edges = reuse_window_outputs(
+                hit,
+                w=w,
+                window_graph_name=window_graph_name,
+                params_hash=params_hash,
+                node_out_path=node_out_path,
+                edges_out_path=edges_out_path,
+                fcr_map=fcr_map,
+                cfg=cfg,
+            )
+            span["rows"] = (len(df) if df is not None else 0) + (len(df_edges) if df_edges is not None else 0)
+        node_count = int(df.shape[0]) if df is not None else 0
+        edge_count = int(df_edges.shape[0]) if df_edges is not None else 0
+    else:
+        if need_nodes:
+            seeds = warm_start.seeds_for(graph, cfg) if warm_start is not None else None
+            calibrate = w == calibration_window
+            if state is not None:
+                with trace.stage("incremental", category="algorithm") as span:
+                    properties, stats = state.compute(graph, seeds=seeds, calibrate=calibrate)
+                    span["rows"] = graph.node_count
+            else:
+                properties, stats = run_window_algorithms_local(
+                    snapshot,
+                    graph,
+                    cfg,
+                    seeds=seeds,
+                    calibrate=calibrate,
+                    trace=trace,
+                )
+            if warm_start is not None:
+                warm_start.record(graph, properties)
+            stats["warm_started"] = seeds is not None
+            with trace.stage("build_node_frame", category="frame") as span:
+                df = build_node_frame(snapshot, graph, properties, cfg)
+                span["rows"] = len(df)
+            with trace.stage("fcr", category="fcr") as span:
+                fcr_map = compute_fcr_local(snapshot, w)
+                span["rows"] = len(fcr_map)
+            with trace.stage("finalise_nodes", category="frame") as span:
+                df = finalise_node_frame(
+                    df,
+                    cfg=cfg,
+                    w=w,
+                    window_graph_name=window_graph_name,
+                    params_hash=params_hash,
+                    fcr_map=fcr_map,
+                    expand_embeddings=expand_embeddings,
+                )
+                span["rows"] = len(df)
+            logger.info("Writing %s (rows=%d cols=%d)", node_out_path, df.shape[0], df.shape[1])
+            with trace.stage("write_nodes", category="io") as span:
+                write_window_output(df, node_out_path, cfg=cfg, part="nodes")
+                span["rows"] = len(df)
+            node_count = int(df.shape[0])
+        else:
+            for chained in (state, warm_start):
+                if chained is not None:
+                    chained.reset()
+
+        if need_edges:
+            with trace.stage("build_edge_frame", category="frame") as span:
+                df_edges = finalise_edge_frame(
+                    build_edge_frame(snapshot, graph, cfg),
+                    cfg=cfg,
+                    w=w,
+                    window_graph_name=window_graph_name,
+                    params_hash=params_hash,
+                )
+                span["rows"] = len(df_edges)
+            logger.info("Writing %s (rows=%d cols=%d)", edges_out_path, df_edges.shape[0], df_edges.shape[1])
+            with trace.stage("write_edges", category="io") as span:
+                write_window_output(df_edges, edges_out_path, cfg=cfg, part="edges")
+                span["rows"] = len(df_edges)
+            edge_count = int(df_edges.shape[0])
+
+        if cfg.dedup_windows:
+            dedup.record(fingerprint, window_graph_name, node_path=node_out_path, edges_path=edges_out_path)
+
+    if cfg.bank_panel and df is not None:
+        with trace.stage("bank_panel", category="io") as span:
+            span["rows"] = write_bank_panel_part(
+                df,
+                cfg=cfg,
+                params_hash=params_hash,
+                window_graph_name=window_graph_name,
+                regn_lookup=lambda banks: snapshot.bank_regn(banks["nodeId"].to_numpy()),
+            )
+
+    row = manifest_row(
+        cfg=cfg,
+        w=w,
+        window_graph_name=window_graph_name,
+        params_hash=params_hash,
+        node_count=node_count,
+        edge_count=edge_count,
+        skipped_existing=False,
+    )
+    row["engine"] = "local"
+    row.update(stats)
+    if cfg.dedup_windows:
+        row.update(fingerprint_stats)
+    return row
+
+
+def _snapshot_regn_lookup(snapshot_dir: Path):
+    snapshot = TemporalSnapshot.load(snapshot_dir)
+    return lambda banks: snapshot.bank_regn(banks["nodeId"].to_numpy())
+
+
+_WORKER_SNAPSHOT: TemporalSnapshot | None = None
+_WORKER_INDEX: TemporalIntervalIndex | None = None
+
+
+def _init_worker(snapshot_dir: str, index_dir: str | None) -> None:
+    global _WORKER_SNAPSHOT, _WORKER_INDEX
+    _WORKER_SNAPSHOT = TemporalSnapshot.load(Path(snapshot_dir))
+    _WORKER_INDEX = TemporalIntervalIndex.load(Path(index_dir)) if index_dir else None
+
+
+def _process_window_in_worker(w: Window, kwargs: dict[str, Any]) -> dict[str, Any]:
+    assert _WORKER_SNAPSHOT is not None, "worker snapshot not initialised"
+    return process_window_local(_WORKER_SNAPSHOT, w, index=_WORKER_INDEX, **kwargs)
+
+
+def _process_chain(
+    snapshot: TemporalSnapshot,
+    chain: list[Window],
+    index: TemporalIntervalIndex | None,
+    incremental: bool,
+    kwargs: dict[str, Any],
+) -> list[dict[str, Any]]:
+    """Process consecutive windows in order, carrying incremental and/or warm-start state."""
+    from incremental import IncrementalWindowState
+
+    cfg: RollingWindowConfig = kwargs["cfg"]
+    state = IncrementalWindowState(snapshot, cfg) if incremental else None
+    warm_start = WarmStartSeeds(snapshot) if cfg.warm_start else None
+    return [
+        process_window_local(snapshot, w, index=index, state=state, warm_start=warm_start, **kwargs)
+        for w in chain
+    ]
+
+
+def _process_chain_in_worker(chain: list[Window], incremental: bool, kwargs: dict[str, Any]) -> list[dict[str, Any]]:
+    assert _WORKER_SNAPSHOT is not None, "worker snapshot not initialised"
+    return _process_chain(_WORKER_SNAPSHOT, chain, _WORKER_INDEX, incremental, kwargs)
+
+
+def run_windows_local(
+    *,
+    cfg: RollingWindowConfig,
+    snapshot_dir: Path,
+    expand_embeddings: bool = False,
+    skip_existing: bool = True,
+    max_workers: int | None = None,
+    show_tqdm: bool = True,
+    use_interval_index: bool = True,
+    incremental: bool = False,
+) -> pd.DataFrame:
+    """
+    Run every window of ``cfg`` on the snapshot in ``snapshot_dir``.
+
+    Windows are independent and are distributed over ``max_workers``
+    processes (defaults to the CPU count; 1 runs in-process). Each worker
+    loads the snapshot once. With ``use_interval_index`` windows are sliced
+    through the temporal interval index persisted in ``<output_dir>/index``
+    (built on first use, rebuilt when the snapshot changes).
+
+    With ``incremental`` or ``cfg.warm_start`` the schedule is split into one
+    contiguous chain per worker and each window builds on the previous one in
+    its chain: incremental mode derives it from the edge delta and records
+    the delta sizes (``delta_*``, ``recomputed_nodes``); warm start seeds
+    PageRank/eigenvector/Louvain, with iterations-to-converge in the manifest. Returns the manifest, which is also written to
+    ``manifest/manifest_{params_hash}.parquet``. With ``cfg.profile_stages``
+    every stage of every window is traced (see ``profiling``).
+    """
+    windows = iter_period_windows(
+        start_year=cfg.start_year,
+        end_start_year=cfg.end_start_year,
+        window_size=cfg.window_size,
+        step_size=cfg.step_size,
+        period_type=cfg.period_type,
+    )
+    validate_centrality_config(cfg)
+    validate_vector_storage(cfg)
+    validate_output_layout(cfg)
+    params_hash = stable_hash_dict(gds_config_metadata(cfg, engine="local"))
+    manifest_path = cfg.output_dir / "manifest" / f"manifest_{params_hash}.parquet"
+    profiler = StageProfiler.for_run(cfg, params_hash, engine="local")
+    if cfg.dedup_windows and cfg.dedup_invalidate:
+        WindowDedupIndex.for_run(cfg, params_hash).clear()
+    kwargs = {
+        "cfg": cfg,
+        "params_hash": params_hash,
+        "expand_embeddings": expand_embeddings,
+        "skip_existing": skip_existing,
+        "calibration_window": calibration_window(windows, cfg),
+        "profiler": profiler,
+    }
+
+    workers = max_workers or os.cpu_count() or 1
+    chained = incremental or cfg.warm_start
+    if chained:
+        workers = min(workers, max(len(windows), 1))
+    logger.info(
+        "Processing %d windows locally (workers=%d, incremental=%s, warm_start=%s, snapshot=%s)",
+        len(windows),
+        workers,
+        incremental,
+        cfg.warm_start,
+        snapshot_dir,
+    )
+
+    snapshot = TemporalSnapshot.load(snapshot_dir)
+    index_dir = cfg.output_dir / INDEX_DIRNAME
+    index = load_or_build_interval_index(snapshot, index_dir) if use_interval_index else None
+
+    manifest_rows: list[dict[str, Any]] = []
+    try:
+        if workers <= 1 and chained:
+            manifest_rows.extend(_process_chain(snapshot, windows, index, incremental, kwargs))
+        elif workers <= 1:
+            for w in tqdm(windows, desc="Rolling windows (local)", unit="window", disable=not show_tqdm):
+                manifest_rows.append(process_window_local(snapshot, w, index=index, **kwargs))
+        else:
+            del snapshot, index
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(str(snapshot_dir), str(index_dir) if use_interval_index else None),
+            ) as pool:
+                if chained:
+                    size = -(-len(windows) // workers)
+                    chains = [windows[i : i + size] for i in range(0, len(windows), size)]
+                    futures = [pool.submit(_process_chain_in_worker, chain, incremental, kwargs) for chain in chains]
+                    unit = "chain"
+                else:
+                    futures = [pool.submit(_process_window_in_worker, w, kwargs) for w in windows]
+                    unit = "window"
+                for fut in tqdm(
+                    as_completed(futures),
+                    total=len(futures),
+                    desc="Rolling windows (local)",
+                    unit=unit,
+                    disable=not show_tqdm,
+                ):
+                    result = fut.result()
+                    manifest_rows.extend(result if isinstance(result, list) else [result])
+    finally:
+        manifest = pd.DataFrame(manifest_rows)
+        if not manifest.empty:
+            manifest = manifest.sort_values("window_start_ms", kind="stable").reset_index(drop=True)
+        logger.info("Writing manifest: %s (windows=%d)", manifest_path, manifest.shape[0])
+        write_parquet(manifest, manifest_path)
+        log_dedup_rate(manifest)
+        if cfg.bank_panel:
+            compact_bank_panel(
+                cfg,
+                params_hash,
+                node_paths={
+                    name: window_output_paths(cfg, name, params_hash=params_hash)[0]
+                    for name in map(window_graph_name_for, windows)
+                },
+                regn_lookup=lambda: _snapshot_regn_lookup(snapshot_dir),
+            )
+        profiler.close(mlflow_experiment=cfg.profile_mlflow_experiment)
+
+    return manifest
+
+
+def compare_window_outputs(
+    local_df: pd.DataFrame,
+    gds_df: pd.DataFrame,
+    *,
+    columns: tuple[str, ...] = (
+        "page_rank",
+        "in_degree",
+        "out_degree",
+        "family_degree",
+        "betweenness",
+        "closeness",
+        "eigenvector",
+    ),
+) -> pd.DataFrame:
+    """
+    Parity report between a local and a GDS node file for the same window.
+
+    Rows are joined on ``nodeId``; returns the node-set agreement and the
+    maximum absolute difference per scalar metric. WCC is compared as a
+    partition (component labels are engine-specific).
+    """
+    merged = local_df.merge(gds_df, on="nodeId", how="outer", suffixes=("_local", "_gds"), indicator=True)
+    report: list[dict[str, Any]] = [
+        {"metric": "node_set", "max_abs_diff": float((merged["_merge"] != "both").sum())}
+    ]
+    both = merged[merged["_merge"] == "both"]
+    for col in columns:
+        if f"{col}_local" in both.columns and f"{col}_gds" in both.columns:
+            diff = (both[f"{col}_local"].astype(float) - both[f"{col}_gds"].astype(float)).abs()
+            report.append({"metric": col, "max_abs_diff": float(diff.max()) if len(diff) else 0.0})
+    if "wcc_local" in both.columns and "wcc_gds" in both.columns:
+        pairs = both[["wcc_local", "wcc_gds"]].drop_duplicates()
+        mismatched = int(pairs["wcc_local"].duplicated().sum() + pairs["wcc_gds"].duplicated().sum())
+        report.append({"metric": "wcc", "max_abs_diff": float(mismatched)})
+    return pd.DataFrame(report)
@@ -1,34 +1,79 @@
 from __future__ import annotations
 
-from typing import Any
+import time
+from dataclasses import dataclass
+from typing import Any, Sequence
 
+import numpy as np
+import pandas as pd
 from graphdatascience import GraphDataScience
 from graphdatascience.graph.graph_object import Graph
 import logging
 
 logger = logging.getLogger(__name__)
 
+from approximation import (
+    betweenness_sample_size,
+    centrality_metadata,
+    is_approximate,
+    landmark_closeness,
+    rank_correlation,
+)
 from config import RollingWindowConfig
+from dates import Window
+from profiling import NO_TRACE, WindowTrace
+from vectors import vector_storage_metadata
 
 
-def run_window_algorithms(gds: GraphDataScience, G: Graph, cfg: RollingWindowConfig) -> list[str]:
+def run_window_algorithms(
+    gds: GraphDataScience,
+    G: Graph,
+    cfg: RollingWindowConfig,
+    stats: dict[str, Any] | None = None,
+    *,
+    client_properties: dict[str, pd.Series] | None = None,
+    calibrate: bool = False,
+    trace: WindowTrace = NO_TRACE,
+) -> list[str]:
+    """
+    Mutate the per-window metrics onto ``G``.
+
+    If ``stats`` is given it is filled with the convergence statistics of the
+    iterative algorithms (iterations run, convergence flag, Louvain levels).
+
+    In approximate centrality mode closeness is computed client-side from the
+    streamed topology and returned in ``client_properties`` (keyed by GDS
+    ``nodeId``) instead of being mutated; attach it to the streamed frame with
+    ``attach_client_properties``. With ``calibrate`` the exact values are
+    streamed as well and their rank correlations land in ``stats``. Each
+    algorithm is a stage of ``trace`` (rows = node properties written).
+    """
     properties_written: list[str] = []
+    stats = {} if stats is None else stats
+    client_properties = {} if client_properties is None else client_properties
+    approximate = is_approximate(cfg)
 
     logger.info("Running PageRank...")
-    gds.pageRank.mutate(
-        G,
-        mutateProperty="page_rank",
-        relationshipWeightProperty="weight",
-        maxIterations=cfg.pagerank_max_iterations,
-        dampingFactor=cfg.pagerank_damping_factor,
-    )
+    with trace.stage("page_rank", category="algorithm") as span:
+        result = gds.pageRank.mutate(
+            G,
+            mutateProperty="page_rank",
+            relationshipWeightProperty="weight",
+            maxIterations=cfg.pagerank_max_iterations,
+            dampingFactor=cfg.pagerank_damping_factor,
+            tolerance=cfg.pagerank_tolerance,
+        )
+        span["rows"] = int(result["nodePropertiesWritten"])
+    stats["page_rank_iterations"] = int(result["ranIterations"])
+    stats["page_rank_converged"] = bool(result["didConverge"])
     properties_written.append("page_rank")
 
     logger.info("Running Degree (in/out)...")
-    gds.degree.mutate(G, mutateProperty="in_degree", orientation="REVERSE")
+    with trace.stage("degree", category="algorithm") as span:
+        gds.degree.mutate(G, mutateProperty="in_degree", orientation="REVERSE")
+        result = gds.degree.mutate(G, mutateProperty="out_degree", orientation="NATURAL")
+        span["rows"] = int(result["nodePropertiesWritten"])
     properties_written.append("in_degree")
-
-    gds.degree.mutate(G, mutateProperty="out_degree", orientation="NATURAL")
     properties_written.append("out_degree")
 
     properties_written.append("out_degree")
@@ -36,13 +81,15 @@ def run_window_algorithms(gds: GraphDataScience, G: Graph, cfg: RollingWindowCon
     # Family connections degree
     if "FAMILY" in G.relationship_types():
         logger.info("Running Family Degree...")
-        gds.degree.mutate(
-            G,
-            mutateProperty="family_degree",
-            relationshipTypes=["FAMILY"],
-            orientation="UNDIRECTED",
-            concurrency=cfg.read_concurrency,
-        )
+        with trace.stage("family_degree", category="algorithm") as span:
+            result = gds.degree.mutate(
+                G,
+                mutateProperty="family_degree",
+                relationshipTypes=["FAMILY"],
+                orientation="UNDIRECTED",
+                concurrency=cfg.read_concurrency,
+            )
+            span["rows"] = int(result["nodePropertiesWritten"])
         properties_written.append("family_degree")
     else:
         # If no FAMILY edges, we can't compute degree directly on them.
@@ -52,100 +99,202 @@ def run_window_algorithms(gds: GraphDataScience, G: Graph, cfg: RollingWindowCon
         pass
 
     # Betweenness centrality
-    logger.info("Running Betweenness Centrality...")
-    gds.betweenness.mutate(
-        G,
-        mutateProperty="betweenness",
-        concurrency=cfg.read_concurrency,
-    )
+    t0 = time.perf_counter()
+    with trace.stage("betweenness", category="algorithm") as span:
+        if approximate:
+            sampling_size = betweenness_sample_size(G.node_count(), cfg)
+            logger.info("Running sampled Betweenness Centrality (samplingSize=%d)...", sampling_size)
+            result = gds.betweenness.mutate(
+                G,
+                mutateProperty="betweenness",
+                samplingSize=sampling_size,
+                samplingSeed=cfg.centrality_sampling_seed,
+                concurrency=cfg.read_concurrency,
+            )
+            stats["betweenness_sampling_size"] = sampling_size
+        else:
+            logger.info("Running Betweenness Centrality...")
+            result = gds.betweenness.mutate(
+                G,
+                mutateProperty="betweenness",
+                concurrency=cfg.read_concurrency,
+            )
+        span["rows"] = int(result["nodePropertiesWritten"])
+    stats["betweenness_time_s"] = time.perf_counter() - t0
     properties_written.append("betweenness")
 
     # Closeness centrality
-    logger.info("Running Closeness Centrality...")
-    gds.closeness.mutate(
-        G,
-        mutateProperty="closeness",
-        concurrency=cfg.read_concurrency,
-    )
-    properties_written.append("closeness")
+    t0 = time.perf_counter()
+    with trace.stage("closeness", category="algorithm") as span:
+        if approximate:
+            logger.info("Running landmark Closeness Centrality...")
+            client_properties["closeness"], stats["closeness_landmarks"] = landmark_closeness_gds(gds, G, cfg)
+            span["rows"] = len(client_properties["closeness"])
+        else:
+            logger.info("Running Closeness Centrality...")
+            result = gds.closeness.mutate(
+                G,
+                mutateProperty="closeness",
+                concurrency=cfg.read_concurrency,
+            )
+            span["rows"] = int(result["nodePropertiesWritten"])
+            properties_written.append("closeness")
+    stats["closeness_time_s"] = time.perf_counter() - t0
+
+    if calibrate and approximate:
+        with trace.stage("centrality_calibration", category="algorithm"):
+            stats.update(calibrate_centrality_gds(gds, G, cfg, closeness=client_properties["closeness"]))
 
     # Eigenvector centrality
     logger.info("Running Eigenvector Centrality...")
-    gds.eigenvector.mutate(
-        G,
-        mutateProperty="eigenvector",
-        maxIterations=20,
-        concurrency=cfg.read_concurrency,
-    )
+    with trace.stage("eigenvector", category="algorithm") as span:
+        result = gds.eigenvector.mutate(
+            G,
+            mutateProperty="eigenvector",
+            maxIterations=cfg.eigenvector_max_iterations,
+            tolerance=cfg.eigenvector_tolerance,
+            concurrency=cfg.read_concurrency,
+        )
+        span["rows"] = int(result["nodePropertiesWritten"])
+    stats["eigenvector_iterations"] = int(result["ranIterations"])
+    stats["eigenvector_converged"] = bool(result["didConverge"])
     properties_written.append("eigenvector")
 
     if cfg.run_wcc:
         logger.info("Running WCC...")
-        gds.wcc.mutate(G, mutateProperty="wcc")
+        with trace.stage("wcc", category="algorithm") as span:
+            result = gds.wcc.mutate(G, mutateProperty="wcc")
+            span["rows"] = int(result["nodePropertiesWritten"])
         properties_written.append("wcc")
 
     if cfg.run_louvain:
         logger.info("Running Louvain...")
-        gds.louvain.mutate(
-            G,
-            mutateProperty="community_louvain",
-            relationshipWeightProperty="weight",
-            maxIterations=20,
-            includeIntermediateCommunities=True,
-            concurrency=cfg.read_concurrency,
-        )
+        with trace.stage("louvain", category="algorithm") as span:
+            result = gds.louvain.mutate(
+                G,
+                mutateProperty="community_louvain",
+                relationshipWeightProperty="weight",
+                maxIterations=cfg.louvain_max_iterations,
+                tolerance=cfg.louvain_tolerance,
+                includeIntermediateCommunities=True,
+                concurrency=cfg.read_concurrency,
+            )
+            span["rows"] = int(result["nodePropertiesWritten"])
+        stats["louvain_levels"] = int(result["ranLevels"])
+        stats["louvain_modularity"] = float(result["modularity"])
         properties_written.append("community_louvain")
 
     if cfg.run_fastrp:
         logger.info("Running FastRP...")
-        gds.fastRP.mutate(
-            G,
-            mutateProperty="fastrp_embedding",
-            embeddingDimension=cfg.embedding_dimension,
-            iterationWeights=[0.2, 0.2, 0.2, 0.2, 0.2],
-            nodeSelfInfluence=0.7,
-            randomSeed=cfg.embedding_random_seed,
-            relationshipWeightProperty="weight",
-            concurrency=cfg.read_concurrency,
-        )
+        with trace.stage("fastrp", category="algorithm") as span:
+            result = gds.fastRP.mutate(
+                G,
+                mutateProperty="fastrp_embedding",
+                embeddingDimension=cfg.embedding_dimension,
+                iterationWeights=[0.2, 0.2, 0.2, 0.2, 0.2],
+                nodeSelfInfluence=0.7,
+                randomSeed=cfg.embedding_random_seed,
+                relationshipWeightProperty="weight",
+                concurrency=cfg.read_concurrency,
+            )
+            span["rows"] = int(result["nodePropertiesWritten"])
         properties_written.append("fastrp_embedding")
 
     if cfg.run_hashgnn:
         logger.info("Running HashGNN...")
-        gds.hashgnn.mutate(
-            G,
-            mutateProperty="hash_gnn_embedding",
-            featureProperties=list(cfg.hashgnn_feature_properties),
-            relationshipTypes=list(cfg.rel_types),
-            binarizeFeatures={
-                "dimension": int(cfg.hashgnn_binarize_dimension),
-                "threshold": float(cfg.hashgnn_binarize_threshold),
-            },
-            iterations=int(cfg.hashgnn_iterations),
-            outputDimension=int(cfg.hashgnn_output_dimension),
-            embeddingDensity=int(cfg.hashgnn_embedding_density),
-            heterogeneous=True,
-            randomSeed=int(cfg.hashgnn_random_seed),
-            concurrency=cfg.read_concurrency,
-        )
+        with trace.stage("hashgnn", category="algorithm") as span:
+            result = gds.hashgnn.mutate(
+                G,
+                mutateProperty="hash_gnn_embedding",
+                featureProperties=list(cfg.hashgnn_feature_properties),
+                relationshipTypes=list(cfg.rel_types),
+                binarizeFeatures={
+                    "dimension": int(cfg.hashgnn_binarize_dimension),
+                    "threshold": float(cfg.hashgnn_binarize_threshold),
+                },
+                iterations=int(cfg.hashgnn_iterations),
+                outputDimension=int(cfg.hashgnn_output_dimension),
+                embeddingDensity=int(cfg.hashgnn_embedding_density),
+                heterogeneous=True,
+                randomSeed=int(cfg.hashgnn_random_seed),
+                concurrency=cfg.read_concurrency,
+            )
+            span["rows"] = int(result["nodePropertiesWritten"])
         properties_written.append("hash_gnn_embedding")
 
     if cfg.run_node2vec:
         logger.info("Running Node2Vec...")
-        gds.node2vec.mutate(
-            G,
-            mutateProperty="node2vec_embedding",
-            embeddingDimension=int(cfg.node2vec_embedding_dimension),
-            iterations=int(cfg.node2vec_iterations),
-            randomSeed=int(cfg.node2vec_random_seed),
-            relationshipWeightProperty="weight",
-            concurrency=cfg.read_concurrency,
-        )
+        with trace.stage("node2vec", category="algorithm") as span:
+            result = gds.node2vec.mutate(
+                G,
+                mutateProperty="node2vec_embedding",
+                embeddingDimension=int(cfg.node2vec_embedding_dimension),
+                iterations=int(cfg.node2vec_iterations),
+                randomSeed=int(cfg.node2vec_random_seed),
+                relationshipWeightProperty="weight",
+                concurrency=cfg.read_concurrency,
+            )
+            span["rows"] = int(result["nodePropertiesWritten"])
         properties_written.append("node2vec_embedding")
 
     return properties_written
 
 
+def landmark_closeness_gds(gds: GraphDataScience, G: Graph, cfg: RollingWindowConfig) -> tuple[pd.Series, int]:
+    """
+    Landmark closeness of ``G`` computed from its streamed topology.
+
+    GDS has no landmark closeness, so the relationships are streamed once and
+    ``approximation.landmark_closeness`` runs locally. Returns the scores
+    indexed by GDS ``nodeId`` and the number of landmarks.
+    """
+    node_ids = np.sort(gds.graph.nodeProperty.stream(G, "betweenness")["nodeId"].to_numpy(dtype=np.int64))
+    rels = gds.graph.relationships.stream(G)
+    src = np.searchsorted(node_ids, rels["sourceNodeId"].to_numpy(dtype=np.int64))
+    dst = np.searchsorted(node_ids, rels["targetNodeId"].to_numpy(dtype=np.int64))
+    values, landmarks = landmark_closeness(len(node_ids), src, dst, cfg)
+    return pd.Series(values, index=node_ids), landmarks
+
+
+def calibrate_centrality_gds(
+    gds: GraphDataScience,
+    G: Graph,
+    cfg: RollingWindowConfig,
+    *,
+    closeness: pd.Series,
+) -> dict[str, Any]:
+    """Stream exact betweenness/closeness of ``G`` and rank-correlate the approximations against them."""
+    logger.info("Calibration window: streaming exact Betweenness/Closeness...")
+    t0 = time.perf_counter()
+    exact_bc = gds.betweenness.stream(G, concurrency=cfg.read_concurrency).set_index("nodeId")["score"]
+    betweenness_exact_time_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    exact_cl = gds.closeness.stream(G, concurrency=cfg.read_concurrency).set_index("nodeId")["score"]
+    closeness_exact_time_s = time.perf_counter() - t0
+
+    approx_bc = gds.graph.nodeProperty.stream(G, "betweenness").set_index("nodeId")["propertyValue"]
+    result = {
+        "centrality_calibration": True,
+        "betweenness_spearman": rank_correlation(approx_bc.reindex(exact_bc.index).to_numpy(), exact_bc.to_numpy()),
+        "closeness_spearman": rank_correlation(closeness.reindex(exact_cl.index).to_numpy(), exact_cl.to_numpy()),
+        "betweenness_exact_time_s": betweenness_exact_time_s,
+        "closeness_exact_time_s": closeness_exact_time_s,
+    }
+    logger.info(
+        "Centrality calibration: betweenness spearman=%.4f, closeness spearman=%.4f",
+        result["betweenness_spearman"],
+        result["closeness_spearman"],
+    )
+    return result
+
+
+def attach_client_properties(df: pd.DataFrame, client_properties: dict[str, pd.Series]) -> pd.DataFrame:
+    """Add properties computed outside GDS to a streamed node frame, joined on ``nodeId``."""
+    for name, values in client_properties.items():
+        df[name] = df["nodeId"].map(values).fillna(0.0)
+    return df
+
+
 def compute_fcr_temporal(
     gds: GraphDataScience,
     cfg: RollingWindowConfig,
@@ -226,7 +375,198 @@ def compute_fcr_temporal(
     return fcr_map
 
 
-def gds_config_metadata(cfg: RollingWindowConfig) -> dict[str, Any]:
+@dataclass(frozen=True)
+class FcrIntervals:
+    """
+    Everything temporal FCR depends on, as flat arrays keyed by Neo4j node id.
+
+    - entities: Bank/Company nodes with both temporal bounds set (a null bound
+      never satisfies the window predicate in Cypher);
+    - ownership: OWNERSHIP edges into those entities, both bounds set;
+    - family: non-imputed FAMILY edges; NaN bounds are open-ended.
+    """
+
+    entity: np.ndarray
+    entity_start: np.ndarray
+    entity_end: np.ndarray
+    own_owner: np.ndarray
+    own_entity: np.ndarray
+    own_start: np.ndarray
+    own_end: np.ndarray
+    fam_a: np.ndarray
+    fam_b: np.ndarray
+    fam_start: np.ndarray
+    fam_end: np.ndarray
+
+    @classmethod
+    def fetch(cls, gds: GraphDataScience) -> "FcrIntervals":
+        """Pull the entity, OWNERSHIP and FAMILY intervals once for the whole run."""
+        logger.info("Fetching FCR intervals (entities, OWNERSHIP, FAMILY) via Cypher...")
+        entities = gds.run_cypher(
+            """
+            MATCH (entity:Bank|Company)
+            WHERE entity.temporal_start IS NOT NULL AND entity.temporal_end IS NOT NULL
+            RETURN id(entity) AS entity, toFloat(entity.temporal_start) AS start, toFloat(entity.temporal_end) AS end
+            """
+        )
+        ownership = gds.run_cypher(
+            """
+            MATCH (owner)-[o:OWNERSHIP]->(entity:Bank|Company)
+            WHERE o.temporal_start IS NOT NULL AND o.temporal_end IS NOT NULL
+            RETURN id(owner) AS owner, id(entity) AS entity,
+                   toFloat(o.temporal_start) AS start, toFloat(o.temporal_end) AS end
+            """
+        )
+        family = gds.run_cypher(
+            """
+            MATCH (a)-[f:FAMILY]->(b)
+            WHERE coalesce(f.source, '') <> 'imputed'
+            RETURN id(a) AS a, id(b) AS b, toFloat(f.temporal_start) AS start, toFloat(f.temporal_end) AS end
+            """
+        )
+        logger.info(
+            "FCR intervals: entities=%d ownership=%d family=%d", len(entities), len(ownership), len(family)
+        )
+        return cls(
+            entity=entities["entity"].to_numpy(dtype=np.int64),
+            entity_start=entities["start"].to_numpy(dtype=np.float64),
+            entity_end=entities["end"].to_numpy(dtype=np.float64),
+            own_owner=ownership["owner"].to_numpy(dtype=np.int64),
+            own_entity=ownership["entity"].to_numpy(dtype=np.int64),
+            own_start=ownership["start"].to_numpy(dtype=np.float64),
+            own_end=ownership["end"].to_numpy(dtype=np.float64),
+            fam_a=family["a"].to_numpy(dtype=np.int64),
+            fam_b=family["b"].to_numpy(dtype=np.int64),
+            fam_start=family["start"].to_numpy(dtype=np.float64),
+            fam_end=family["end"].to_numpy(dtype=np.float64),
+        )
+
+
+def _active_in_windows(
+    start: np.ndarray,
+    end: np.ndarray,
+    window_start: np.ndarray,
+    window_end: np.ndarray,
+    *,
+    open_bounds: bool,
+) -> np.ndarray:
+    """(windows × rows) mask of ``start < window_end AND end > window_start``; NaN bounds are open if ``open_bounds``."""
+    before_end = start[None, :] < window_end[:, None]
+    after_start = end[None, :] > window_start[:, None]
+    if open_bounds:
+        before_end |= np.isnan(start)[None, :]
+        after_start |= np.isnan(end)[None, :]
+    return before_end & after_start
+
+
+def compute_fcr_temporal_bulk(
+    intervals: FcrIntervals,
+    windows: Sequence[Window],
+    *,
+    max_cells: int = 1 << 25,
+) -> pd.DataFrame:
+    """
+    ``compute_fcr_temporal`` for every window in one vectorised pass.
+
+    Per window, an active entity's FCR is the mean over its distinct active
+    OWNERSHIP owners of the owner's distinct active FAMILY members; entities
+    without active owners are absent, as in the per-window query. Windows are
+    processed in chunks so the (window × edge) masks stay below ``max_cells``.
+
+    Returns:
+        One row per (window, entity): ``window_start_ms``, ``window_end_ms``,
+        ``gds_id``, ``fcr_temporal``.
+    """
+    columns = ["window_start_ms", "window_end_ms", "gds_id", "fcr_temporal"]
+    if not windows:
+        return pd.DataFrame(columns=columns)
+
+    window_start = np.array([w.start_ms for w in windows], dtype=np.float64)
+    window_end = np.array([w.end_ms for w in windows], dtype=np.float64)
+
+    # FAMILY is matched undirected: each edge makes both endpoints an owner candidate.
+    fam_owner = np.concatenate([intervals.fam_a, intervals.fam_b])
+    fam_member = np.concatenate([intervals.fam_b, intervals.fam_a])
+    fam_start = np.concatenate([intervals.fam_start, intervals.fam_start])
+    fam_end = np.concatenate([intervals.fam_end, intervals.fam_end])
+
+    # Ownership rows whose entity has no complete bounds can never be active.
+    entity_order = np.argsort(intervals.entity, kind="stable")
+    entity_sorted = intervals.entity[entity_order]
+    pos = np.searchsorted(entity_sorted, intervals.own_entity)
+    pos = np.minimum(pos, max(len(entity_sorted) - 1, 0))
+    known = (entity_sorted[pos] == intervals.own_entity) if len(entity_sorted) else np.zeros(len(pos), dtype=bool)
+    own_entity_pos = entity_order[pos[known]]
+    own_owner = intervals.own_owner[known]
+    own_entity = intervals.own_entity[known]
+    own_start = intervals.own_start[known]
+    own_end = intervals.own_end[known]
+    if len(own_owner) == 0:
+        return pd.DataFrame(columns=columns)
+
+    widest = max(len(fam_owner), len(own_owner), len(entity_sorted), 1)
+    chunk = max(1, max_cells // widest)
+    frames: list[pd.DataFrame] = []
+    for lo in range(0, len(windows), chunk):
+        ws, we = window_start[lo : lo + chunk], window_end[lo : lo + chunk]
+
+        fw, fr = np.nonzero(_active_in_windows(fam_start, fam_end, ws, we, open_bounds=True))
+        family = pd.DataFrame({"window": fw + lo, "owner": fam_owner[fr], "member": fam_member[fr]})
+        degree = family.drop_duplicates().groupby(["window", "owner"]).size().rename("owner_family_degree")
+
+        entity_active = _active_in_windows(intervals.entity_start, intervals.entity_end, ws, we, open_bounds=False)
+        own_active = _active_in_windows(own_start, own_end, ws, we, open_bounds=False) & entity_active[:, own_entity_pos]
+        ow, orow = np.nonzero(own_active)
+        ownership = pd.DataFrame({"window": ow + lo, "entity": own_entity[orow], "owner": own_owner[orow]})
+        ownership = ownership.drop_duplicates().join(degree, on=["window", "owner"])
+        ownership["owner_family_degree"] = ownership["owner_family_degree"].fillna(0.0)
+        frames.append(ownership.groupby(["window", "entity"], sort=True)["owner_family_degree"].mean().reset_index())
+
+    fcr = pd.concat(frames, ignore_index=True)
+    window_idx = fcr["window"].to_numpy()
+    return pd.DataFrame(
+        {
+            "window_start_ms": np.array([w.start_ms for w in windows])[window_idx],
+            "window_end_ms": np.array([w.end_ms for w in windows])[window_idx],
+            "gds_id": fcr["entity"].to_numpy(dtype=np.int64),
+            "fcr_temporal": fcr["owner_family_degree"].to_numpy(dtype=np.float64),
+        }
+    )
+
+
+def fcr_maps_by_window(table: pd.DataFrame) -> dict[tuple[int, int], dict[int, float]]:
+    """Split a ``compute_fcr_temporal_bulk`` table into the per-window ``gds_id -> fcr`` maps ``finalise_node_frame`` takes."""
+    return {
+        (int(start), int(end)): dict(zip(group["gds_id"].tolist(), group["fcr_temporal"].tolist()))
+        for (start, end), group in table.groupby(["window_start_ms", "window_end_ms"], sort=False)
+    }
+
+
+# What runs used before the iteration caps and tolerances were configurable: maxIterations=20
+# for eigenvector and Louvain and the GDS default tolerances.
+_DEFAULT_ITERATION_SETTINGS: dict[str, int | float] = {
+    "pagerank_tolerance": 1e-7,
+    "eigenvector_max_iterations": 20,
+    "eigenvector_tolerance": 1e-7,
+    "louvain_max_iterations": 20,
+    "louvain_tolerance": 1e-4,
+}
+
+
+def iteration_metadata(cfg: RollingWindowConfig, *, engine: str = "gds") -> dict[str, Any]:
+    """Entries of ``gds_config_metadata`` for iteration settings that differ from the defaults (none for the default)."""
+    metadata: dict[str, Any] = {}
+    for key, default in _DEFAULT_ITERATION_SETTINGS.items():
+        value = getattr(cfg, key)
+        if value != default:
+            metadata[key] = type(default)(value)
+    # Warm start only changes results on the local engine; GDS runs cold.
+    if cfg.warm_start and engine == "local":
+        metadata["warm_start"] = True
+    return metadata
+
+
+def gds_config_metadata(cfg: RollingWindowConfig, *, engine: str = "gds") -> dict[str, Any]:
     return {
         "base_graph_name": cfg.base_graph_name,
         "rel_types": list(cfg.rel_types),
@@ -263,4 +603,15 @@ def gds_config_metadata(cfg: RollingWindowConfig) -> dict[str, Any]:
         "node2vec_random_seed": int(cfg.node2vec_random_seed),
         "run_link_prediction": bool(cfg.run_link_prediction),
         "lp_threshold": float(cfg.lp_threshold),
+        # Not recorded for 1 (a horse race in every window, as before) so those runs keep their hash.
+        **(
+            {"lp_retrain_every": int(cfg.lp_retrain_every)}
+            if cfg.run_link_prediction and cfg.lp_retrain_every != 1
+            else {}
+        ),
+        **iteration_metadata(cfg, engine=engine),
+        **centrality_metadata(cfg),
+        **vector_storage_metadata(cfg),
+        # Local results differ numerically from GDS, so local runs get their own outputs; GDS runs keep their hash.
+        **({"engine": engine} if engine != "gds" else {}),
     }
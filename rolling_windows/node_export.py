@@ -0,0 +1,228 @@
+"""
+Row-group-wise node export of large windows (GDS engine).
+
+The whole-window export streams every node property of a window into one
+table, joins and finalises it, and writes it: peak memory is a multiple of
+the file, dominated on global windows by the Person rows' embeddings. With
+``RollingWindowConfig.node_export_batch_size`` (which needs
+``arrow_streaming``) the window's node ids and labels are streamed once,
+split into ranges of that many nodes, and for each range, while the window
+graph exists:
+
+- ``node_batch_query`` reads the range's properties with
+  ``gds.util.nodeProperty``, one row per node and one column per property,
+  and ``node_batch_table`` turns them into an Arrow table,
+- ``arrow_stream`` joins the database properties and ``entity_id`` from the
+  run's ``ArrowNodeStore``, appends the client-side properties, and
+  ``finalise_node_table`` adds the metadata, ``fcr_temporal`` and the vector
+  and feature-block columns,
+- ``NodeBatchWriter`` appends the result to the node file as a row group.
+
+Peak memory is then bounded by the batch size instead of the window size.
+The file holds the same columns and values as the whole-window Arrow path,
+in ``nodeId`` order; in the ``dataset`` layout rows are sorted within each
+batch only. A batch query looks up only the nodes of its range, so the
+server reads every property of the window once in total, whatever the
+number of batches.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from arrow_stream import ArrowNodeStore, append_client_properties, attach_store_columns, finalise_node_table
+from config import RollingWindowConfig
+from dataset import dataset_table, primary_label
+from dates import Window
+from frames import is_dataset_layout
+from profiling import NO_TRACE, WindowTrace
+
+logger = logging.getLogger(__name__)
+
+# Properties are looked up by position in $properties, so their names never enter the query text.
+_NODE_BATCH_QUERY = """
+UNWIND $nodeIds AS nodeId
+RETURN nodeId, {columns}
+"""
+
+
+def node_batch_query(properties: list[str]) -> str:
+    """Cypher returning ``nodeId`` and ``p0``, ``p1``, ... (``properties`` in order) of the nodes in ``$nodeIds``."""
+    columns = ", ".join(
+        f"gds.util.nodeProperty($graphName, nodeId, $properties[{i}]) AS p{i}" for i in range(len(properties))
+    )
+    return _NODE_BATCH_QUERY.format(columns=columns)
+
+
+def validate_node_export(cfg: RollingWindowConfig) -> None:
+    if cfg.node_export_batch_size < 0:
+        raise ValueError(f"node_export_batch_size must be >= 0, got {cfg.node_export_batch_size}")
+    if cfg.node_export_batch_size > 0 and not cfg.arrow_streaming:
+        raise ValueError("node_export_batch_size needs arrow_streaming: batches are joined against its ArrowNodeStore")
+
+
+def node_id_ranges(node_ids: np.ndarray, batch_size: int) -> list[slice]:
+    """Consecutive slices of at most ``batch_size`` positions of ``node_ids`` (one empty slice for no nodes)."""
+    if len(node_ids) == 0:
+        return [slice(0, 0)]
+    return [slice(s, min(s + batch_size, len(node_ids))) for s in range(0, len(node_ids), batch_size)]
+
+
+def node_batch_table(rows: pd.DataFrame, properties: list[str], node_labels: np.ndarray) -> pa.Table:
+    """``nodeId``, ``properties`` and ``nodeLabels`` of the rows of ``node_batch_query``, in request order."""
+    columns: dict[str, pa.Array] = {"nodeId": pa.array(rows["nodeId"].to_numpy(dtype=np.int64))}
+    for i, name in enumerate(properties):
+        columns[name] = pa.array(rows[f"p{i}"].to_numpy(dtype=object), from_pandas=True)
+    columns["nodeLabels"] = pa.array([list(v) for v in node_labels], type=pa.list_(pa.string()))
+    return pa.table(columns)
+
+
+def stream_node_batches(gds: Any, G: Any, properties: list[str], *, batch_size: int) -> Iterator[pa.Table]:
+    """The node properties and labels of ``G`` as tables of at most ``batch_size`` nodes, in ``nodeId`` order."""
+    nodes = gds.graph.nodeProperty.stream(G, "tStart", listNodeLabels=True).sort_values("nodeId")
+    node_ids = nodes["nodeId"].to_numpy(dtype=np.int64)
+    node_labels = nodes["nodeLabels"].to_numpy(dtype=object)
+    query = node_batch_query(properties)
+    for batch in node_id_ranges(node_ids, batch_size):
+        rows = gds.run_cypher(
+            query,
+            params={"graphName": G.name(), "properties": properties, "nodeIds": node_ids[batch].tolist()},
+        )
+        yield node_batch_table(rows, properties, node_labels[batch])
+
+
+def _conform(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """``table`` with the columns and types of the file's ``schema`` (from its first batch)."""
+    extra = sorted(set(table.column_names).difference(schema.names))
+    if extra:
+        raise ValueError(f"Node batch has columns {extra} that the first batch did not have")
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(table.num_rows, field.type))
+            continue
+        column = table[field.name]
+        if column.type != field.type:
+            column = pa.nulls(table.num_rows, field.type) if pa.types.is_null(column.type) else column.cast(field.type)
+        columns.append(column)
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class NodeBatchWriter:
+    """
+    Appends batches to a Parquet file as row groups.
+
+    The file is written next to ``path`` and moved into place on ``close``, so
+    an interrupted export never leaves a partial file behind (like
+    ``parquet.write_table``); leaving the ``with`` block on an error removes it.
+    """
+
+    def __init__(self, path: Path, *, row_group_size: int | None = None):
+        self.path = path
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self._writer: pq.ParquetWriter | None = None
+
+    def write(self, table: pa.Table) -> None:
+        table = table.replace_schema_metadata(None)
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(self._tmp_path, table.schema)
+        else:
+            table = _conform(table, self._writer.schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self.rows += table.num_rows
+
+    def close(self) -> None:
+        if self._writer is None:
+            raise ValueError(f"No node batch was written to {self.path}")
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "NodeBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+@dataclass
+class ExportedNodes:
+    """What post-processing needs to know about a node file written batch by batch."""
+
+    rows: int
+    batches: int
+    # Bank rows of the window (for the bank panel), when collected.
+    banks: pa.Table | None = None
+
+
+def export_node_batches(
+    batches: Iterator[pa.Table],
+    path: Path,
+    *,
+    cfg: RollingWindowConfig,
+    store: ArrowNodeStore,
+    client_properties: dict[str, pd.Series],
+    w: Window,
+    window_graph_name: str,
+    params_hash: str,
+    fcr_map: dict[Any, float] | None,
+    expand_embeddings: bool,
+    collect_banks: bool = False,
+    trace: WindowTrace = NO_TRACE,
+) -> ExportedNodes:
+    """Join, finalise and append each streamed batch to the node file at ``path``; see the module docstring."""
+    dataset = is_dataset_layout(cfg)
+    row_group_size = cfg.dataset_row_group_size if dataset else cfg.node_export_batch_size
+    banks: list[pa.Table] = []
+    n_batches = 0
+    with NodeBatchWriter(path, row_group_size=row_group_size) as writer:
+        while True:
+            with trace.stage("stream_nodes", category="stream") as span:
+                table = next(batches, None)
+                span["rows"] = table.num_rows if table is not None else 0
+            if table is None:
+                break
+            with trace.stage("write_nodes", category="io") as span:
+                table = append_client_properties(table, client_properties)
+                table = attach_store_columns(table, store, cfg=cfg)
+                table = finalise_node_table(
+                    table,
+                    cfg=cfg,
+                    w=w,
+                    window_graph_name=window_graph_name,
+                    params_hash=params_hash,
+                    fcr_map=fcr_map,
+                    expand_embeddings=expand_embeddings,
+                )
+                if collect_banks:
+                    banks.append(table.filter(pc.equal(primary_label(table["nodeLabels"]), "Bank")))
+                writer.write(dataset_table(table, "nodes") if dataset else table)
+                span["rows"] = table.num_rows
+            n_batches += 1
+    logger.info("Wrote %s in %d batches (rows=%d)", path, n_batches, writer.rows)
+    return ExportedNodes(
+        rows=writer.rows,
+        batches=n_batches,
+        banks=pa.concat_tables(banks, promote_options="permissive") if banks else None,
+    )
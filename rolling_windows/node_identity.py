@@ -0,0 +1,235 @@
+"""
+Run-level node identity cache.
+
+Maps the Neo4j internal id (``gds_id``) of every node to its ``entity_id``
+(``coalesce(n.Id, n.neo4jImportId, "GDS_" + id)``, as written to the window
+outputs), ``Id``, ``regn_cbr`` and labels. It is fetched once per database
+state and persisted as a Parquet sidecar ``node_identity_{fingerprint}.parquet``;
+the fingerprint summarises the node population (count, id range, label
+counts), so a sidecar is reused until nodes are added or removed.
+
+In memory the ids are a sorted int64 array, so joins are a ``searchsorted``
+instead of a per-window Cypher round-trip over the whole database.
+
+This module has no flat imports so that loaders outside ``rolling_windows``
+(e.g. ``mlflow_utils.temporal_fcr_loader``) can import it as
+``rolling_windows.node_identity``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_DIRNAME = "node_identity"
+IDENTITY_COLUMNS: tuple[str, ...] = ("entity_id", "Id", "regn_cbr", "labels")
+_FINGERPRINT_KEY = b"node_identity_fingerprint"
+
+_FINGERPRINT_QUERY = """
+MATCH (n)
+WITH count(n) AS nodes, min(id(n)) AS min_id, max(id(n)) AS max_id
+CALL {
+    MATCH (m)
+    UNWIND labels(m) AS label
+    RETURN label, count(*) AS label_count
+    ORDER BY label
+}
+RETURN nodes, min_id, max_id, collect([label, label_count]) AS label_counts
+"""
+
+_IDENTITY_QUERY = """
+MATCH (n)
+RETURN
+    id(n) AS gds_id,
+    coalesce(n.Id, n.neo4jImportId, "GDS_" + toString(id(n))) AS entity_id,
+    n.Id AS Id,
+    n.regn_cbr AS regn_cbr,
+    labels(n) AS labels
+"""
+
+
+def database_fingerprint(gds: Any) -> str:
+    """Short hash of the node population of the database ``gds`` is connected to."""
+    row = gds.run_cypher(_FINGERPRINT_QUERY).iloc[0]
+    payload = {
+        "database": getattr(gds, "database", lambda: None)(),
+        "nodes": int(row["nodes"]),
+        "min_id": None if pd.isna(row["min_id"]) else int(row["min_id"]),
+        "max_id": None if pd.isna(row["max_id"]) else int(row["max_id"]),
+        "label_counts": [[str(label), int(count)] for label, count in row["label_counts"]],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class NodeIdentityIndex:
+    """Node identities sorted by ``gds_id``; columns are aligned with ``gds_id``."""
+
+    fingerprint: str
+    gds_id: np.ndarray
+    entity_id: np.ndarray
+    Id: np.ndarray
+    regn_cbr: np.ndarray
+    labels: np.ndarray
+
+    def __len__(self) -> int:
+        return int(len(self.gds_id))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, *, fingerprint: str) -> "NodeIdentityIndex":
+        gds_id = df["gds_id"].to_numpy(dtype=np.int64)
+        order = np.argsort(gds_id, kind="stable")
+        gds_id = gds_id[order]
+        if len(gds_id) > 1 and np.any(gds_id[1:] == gds_id[:-1]):
+            raise ValueError("Duplicate gds_id in node identity frame")
+
+        def column(name: str) -> np.ndarray:
+            if name not in df.columns:
+                return np.full(len(df), None, dtype=object)
+            return df[name].to_numpy(dtype=object)[order]
+
+        # regn_cbr is stored as text in Neo4j on some nodes and as a number on others.
+        regn = column("regn_cbr")
+        regn = np.array([None if v is None or pd.isna(v) else str(v) for v in regn], dtype=object)
+        labels = np.empty(len(df), dtype=object)
+        for i, v in enumerate(column("labels")):
+            # Assigned one by one: np.array() would turn equal-length tuples into a 2-D array.
+            labels[i] = tuple(v) if v is not None and not isinstance(v, float) else ()
+        return cls(
+            fingerprint=fingerprint,
+            gds_id=gds_id,
+            entity_id=column("entity_id"),
+            Id=column("Id"),
+            regn_cbr=regn,
+            labels=labels,
+        )
+
+    @classmethod
+    def fetch(cls, gds: Any, *, fingerprint: str | None = None) -> "NodeIdentityIndex":
+        fingerprint = fingerprint or database_fingerprint(gds)
+        logger.info("Fetching node identities from Neo4j (fingerprint=%s)", fingerprint)
+        return cls.from_frame(gds.run_cypher(_IDENTITY_QUERY), fingerprint=fingerprint)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "gds_id": self.gds_id,
+                "entity_id": self.entity_id,
+                "Id": self.Id,
+                "regn_cbr": self.regn_cbr,
+                "labels": [list(v) for v in self.labels],
+            }
+        )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(self.to_frame(), preserve_index=False)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), _FINGERPRINT_KEY: self.fingerprint.encode("utf-8")}
+        )
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, path: Path) -> "NodeIdentityIndex":
+        table = pq.read_table(path)
+        metadata = table.schema.metadata or {}
+        fingerprint = metadata.get(_FINGERPRINT_KEY, b"").decode("utf-8")
+        return cls.from_frame(table.to_pandas(), fingerprint=fingerprint)
+
+    def positions(self, gds_ids: Iterable[int] | np.ndarray) -> np.ndarray:
+        """Index of each ``gds_id`` in this cache, ``-1`` where it is unknown."""
+        ids = np.asarray(gds_ids, dtype=np.int64)
+        pos = np.searchsorted(self.gds_id, ids)
+        pos = np.minimum(pos, max(len(self.gds_id) - 1, 0))
+        found = len(self.gds_id) > 0 and self.gds_id[pos] == ids
+        return np.where(found, pos, -1)
+
+    def lookup(self, gds_ids: Iterable[int] | np.ndarray, column: str) -> np.ndarray:
+        """Values of ``column`` for ``gds_ids`` (``None`` / empty labels where unknown)."""
+        if column not in IDENTITY_COLUMNS:
+            raise ValueError(f"Unknown identity column {column!r}; expected one of {IDENTITY_COLUMNS}")
+        pos = self.positions(gds_ids)
+        values = getattr(self, column)
+        missing: Any = () if column == "labels" else None
+        out = np.empty(len(pos), dtype=object)
+        hit = pos >= 0
+        out[hit] = values[pos[hit]]
+        for i in np.flatnonzero(~hit):
+            out[i] = missing
+        return out
+
+    def attach(
+        self,
+        df: pd.DataFrame,
+        columns: Iterable[str] = ("entity_id",),
+        *,
+        on: str = "gds_id",
+    ) -> pd.DataFrame:
+        """Return ``df`` with ``columns`` looked up from its ``on`` column (a left join on ``gds_id``)."""
+        out = df.copy()
+        ids = out[on].to_numpy(dtype=np.int64)
+        for column in columns:
+            out[column] = self.lookup(ids, column)
+        return out
+
+    def bank_regn(self, gds_ids: Iterable[int] | np.ndarray) -> np.ndarray:
+        """``regn_cbr`` for Bank nodes, ``None`` for everything else."""
+        pos = self.positions(gds_ids)
+        out = np.full(len(pos), None, dtype=object)
+        hit = pos >= 0
+        hit[hit] = self.is_bank[pos[hit]]
+        out[hit] = self.regn_cbr[pos[hit]]
+        return out
+
+    @cached_property
+    def is_bank(self) -> np.ndarray:
+        return np.fromiter(("Bank" in labels for labels in self.labels), dtype=bool, count=len(self.labels))
+
+
+def identity_path(cache_dir: Path, fingerprint: str) -> Path:
+    return cache_dir / f"node_identity_{fingerprint}.parquet"
+
+
+def load_or_fetch_node_identity(gds: Any, cache_dir: Path) -> NodeIdentityIndex:
+    """The sidecar in ``cache_dir`` matching the current database, fetching and saving it when missing."""
+    fingerprint = database_fingerprint(gds)
+    path = identity_path(cache_dir, fingerprint)
+    if path.exists():
+        try:
+            identity = NodeIdentityIndex.load(path)
+            logger.info("Loaded node identity cache %s (nodes=%d)", path, len(identity))
+            return identity
+        except Exception as e:
+            logger.warning("Ignoring unreadable node identity cache %s: %s", path, e)
+
+    identity = NodeIdentityIndex.fetch(gds, fingerprint=fingerprint)
+    identity.save(path)
+    logger.info("Saved node identity cache %s (nodes=%d)", path, len(identity))
+    return identity
+
+
+def latest_node_identity(cache_dir: Path) -> NodeIdentityIndex | None:
+    """Most recently written sidecar in ``cache_dir`` (for offline use without a Neo4j connection)."""
+    candidates = sorted(cache_dir.glob("node_identity_*.parquet"), key=lambda p: p.stat().st_mtime)
+    if not candidates:
+        return None
+    return NodeIdentityIndex.load(candidates[-1])
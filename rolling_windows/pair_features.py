@@ -0,0 +1,229 @@
+"""
+Batched pair features for link prediction.
+
+``PairFeatureEngine`` takes a window's node frame once: entity ids are mapped
+to row positions with one hash index, the embedding column becomes a float32
+matrix with a presence mask, community columns become integer codes and the
+centrality columns float32 vectors. Features of ``(source_id, target_id)``
+pairs are then gathered with one fancy index per side and computed as NumPy
+array operations:
+
+- ``fastrp``: Hadamard product, L2 distance and cosine similarity of the two
+  embeddings; pairs where either embedding is missing are flagged by
+  ``valid`` (and dropped by the callers),
+- ``same_{column}``: 1 when both nodes are in the same community (not -1),
+- ``{column}_sum`` / ``{column}_diff``: sum and absolute difference of each
+  centrality in ``NETWORK_FEATURES`` (0 for nodes not in the window). The
+  names are the node-file columns; requested columns the frame lacks are
+  logged, and a ``network`` block without any of them is an error.
+
+``iter_pair_features`` yields the matrix chunk by chunk, so scoring millions
+of SIM_NAME candidates holds one chunk of gathered embeddings at a time.
+
+This module has no flat imports so that ``rolling_windows.link_prediction``
+can import it both inside and outside ``rolling_windows``.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+STRING_FEATURES: tuple[str, ...] = ("lev_dist_last_name", "lev_dist_patronymic", "is_common_surname")
+# Centrality columns of the window node files.
+NETWORK_FEATURES: tuple[str, ...] = ("in_degree", "out_degree", "page_rank", "betweenness", "closeness")
+EMBEDDING_COLUMN = "fastrp_embedding"
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+def _embedding_matrix(values: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """``(matrix, present)`` of an embedding column; rows without a vector are zeros."""
+    arr = pa.array(values, from_pandas=True)
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    if pa.types.is_null(arr.type) or len(arr) == 0:
+        return np.zeros((len(arr), 0), dtype=np.float32), np.zeros(len(arr), dtype=bool)
+    lengths = pc.fill_null(pc.list_value_length(arr), 0).to_numpy(zero_copy_only=False)
+    present = lengths > 0
+    width = int(lengths[present].max()) if present.any() else 0
+    if np.any(lengths[present] != width):
+        raise ValueError(f"Embeddings of different lengths: {sorted(set(lengths[present].tolist()))}")
+    matrix = np.zeros((len(arr), width), dtype=np.float32)
+    if present.any():
+        flat = pc.list_flatten(arr.filter(pa.array(present))).to_numpy(zero_copy_only=False)
+        matrix[present] = flat.reshape(-1, width)
+    return matrix, present
+
+
+def _community_codes(values: pd.Series) -> np.ndarray:
+    """Integer codes of a community column: equal communities get equal codes, missing and -1 get -1."""
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.fillna(-1).to_numpy(dtype=np.int64)
+    # Hierarchical Louvain communities are lists: compared as a whole, as tuples.
+    keys = [
+        None if v is None or (np.ndim(v) == 0 and pd.isna(v)) or (np.ndim(v) == 0 and v == -1)
+        else (tuple(np.asarray(v).tolist()) if np.ndim(v) else v)
+        for v in values
+    ]
+    codes, _ = pd.factorize(pd.Series(keys, dtype=object), use_na_sentinel=True)
+    return codes.astype(np.int64)
+
+
+@dataclass(frozen=True)
+class PairFeatures:
+    """
+    Feature rows of a batch of pairs; ``valid`` is false where a FastRP block lacks an embedding.
+
+    Columns are addressable by block: ``select`` takes the columns of some of
+    the blocks, so the union of every variant's blocks is computed once and
+    each variant reads its subset.
+    """
+
+    matrix: np.ndarray
+    valid: np.ndarray
+    columns: tuple[str, ...]
+    # Column range of each block of ``matrix``, in order.
+    blocks: dict[str, slice] = field(default_factory=dict)
+
+    def select(self, blocks: Sequence[str]) -> "PairFeatures":
+        """The columns of ``blocks`` in the order given (``valid`` only counts if ``fastrp`` is among them)."""
+        missing = [b for b in blocks if b not in self.blocks]
+        if missing:
+            raise KeyError(f"Blocks {missing} were not computed; have {list(self.blocks)}")
+        ranges = [np.arange(self.blocks[b].start, self.blocks[b].stop) for b in blocks]
+        index = np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+        offsets = np.cumsum([0] + [len(r) for r in ranges])
+        return PairFeatures(
+            matrix=self.matrix[:, index],
+            valid=self.valid if "fastrp" in blocks else np.ones(len(self.valid), dtype=bool),
+            columns=tuple(self.columns[i] for i in index),
+            blocks={b: slice(int(offsets[i]), int(offsets[i + 1])) for i, b in enumerate(blocks)},
+        )
+
+
+class PairFeatureEngine:
+    """Node features of one window, addressed by ``entity_id`` (the last row wins for duplicate ids)."""
+
+    def __init__(
+        self,
+        node_df: pd.DataFrame,
+        *,
+        embedding_col: str = EMBEDDING_COLUMN,
+        community_cols: Sequence[str] = ("community_louvain", "wcc"),
+        network_cols: Sequence[str] = NETWORK_FEATURES,
+    ):
+        nodes = node_df[node_df["entity_id"].notna()].drop_duplicates("entity_id", keep="last")
+        self._index = pd.Index(nodes["entity_id"].to_numpy(dtype=object))
+        self.n_nodes = len(nodes)
+
+        self.embedding_dim = 0
+        self._embeddings = np.zeros((self.n_nodes, 0), dtype=np.float32)
+        self._has_embedding = np.zeros(self.n_nodes, dtype=bool)
+        if embedding_col in nodes.columns:
+            self._embeddings, self._has_embedding = _embedding_matrix(nodes[embedding_col])
+            self.embedding_dim = self._embeddings.shape[1]
+        self._norms = np.linalg.norm(self._embeddings, axis=1)
+
+        self._communities = {c: _community_codes(nodes[c]) for c in community_cols if c in nodes.columns}
+        self.network_cols = tuple(c for c in network_cols if c in nodes.columns)
+        missing = [c for c in network_cols if c not in nodes.columns]
+        if missing:
+            logger.warning("Node frame has no network feature columns %s; the network block leaves them out", missing)
+        self._network = {c: nodes[c].to_numpy(dtype=np.float32) for c in self.network_cols}
+
+    def positions(self, entity_ids: Iterable) -> np.ndarray:
+        """Row of each entity id in this window, ``-1`` where it is not a node of the window."""
+        return self._index.get_indexer(pd.Index(np.asarray(entity_ids, dtype=object)))
+
+    def block_columns(self, block: str) -> tuple[str, ...]:
+        """Names of the feature columns of ``block`` (``string``, ``fastrp``, a community column or ``network``)."""
+        if block == "string":
+            return STRING_FEATURES
+        if block == "fastrp":
+            return tuple(f"hadamard_{i}" for i in range(self.embedding_dim)) + ("l2_distance", "cosine_similarity")
+        if block == "network":
+            return tuple(f"{c}_{op}" for c in self.network_cols for op in ("sum", "diff"))
+        return (f"same_{block}",)
+
+    def embedding_features(self, src: np.ndarray, tgt: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """``([hadamard..., l2, cosine], valid)`` for row positions ``src`` and ``tgt``."""
+        valid = (src >= 0) & (tgt >= 0)
+        valid[valid] = self._has_embedding[src[valid]] & self._has_embedding[tgt[valid]]
+        s = np.where(valid, src, 0)
+        t = np.where(valid, tgt, 0)
+        a = self._embeddings[s]
+        b = self._embeddings[t]
+        out = np.empty((len(src), self.embedding_dim + 2), dtype=np.float32)
+        np.multiply(a, b, out=out[:, : self.embedding_dim])
+        out[:, self.embedding_dim] = np.linalg.norm(a - b, axis=1)
+        denom = self._norms[s] * self._norms[t]
+        dot = out[:, : self.embedding_dim].sum(axis=1)
+        out[:, self.embedding_dim + 1] = np.divide(dot, denom, out=np.zeros_like(dot), where=denom > 0)
+        out[~valid] = 0.0
+        return out, valid
+
+    def same_community(self, src: np.ndarray, tgt: np.ndarray, column: str) -> np.ndarray:
+        """1.0 where both rows are in the window, in the same ``column`` community, and that is not -1."""
+        codes = self._communities.get(column)
+        if codes is None:
+            raise KeyError(f"Community column {column!r} is not in the node frame")
+        known = (src >= 0) & (tgt >= 0)
+        c1 = np.where(known, codes[np.where(known, src, 0)], -1)
+        c2 = np.where(known, codes[np.where(known, tgt, 0)], -1)
+        return ((c1 == c2) & (c1 != -1)).astype(np.float32)
+
+    def network_features(self, src: np.ndarray, tgt: np.ndarray) -> np.ndarray:
+        """``{column}_sum`` and ``{column}_diff`` of each centrality (0 for nodes not in the window)."""
+        if not self.network_cols:
+            raise KeyError("None of the network feature columns is in the node frame")
+        out = np.empty((len(src), 2 * len(self.network_cols)), dtype=np.float32)
+        for i, column in enumerate(self.network_cols):
+            values = self._network[column]
+            a = np.where(src >= 0, values[np.where(src >= 0, src, 0)], 0.0)
+            b = np.where(tgt >= 0, values[np.where(tgt >= 0, tgt, 0)], 0.0)
+            out[:, 2 * i] = a + b
+            out[:, 2 * i + 1] = np.abs(a - b)
+        return out
+
+    def pair_features(self, pairs_df: pd.DataFrame, blocks: Sequence[str]) -> PairFeatures:
+        """The ``blocks`` of ``pairs_df`` side by side, in the order given."""
+        src = self.positions(pairs_df["source_id"])
+        tgt = self.positions(pairs_df["target_id"])
+        valid = np.ones(len(pairs_df), dtype=bool)
+        parts: list[np.ndarray] = []
+        columns: list[str] = []
+        spans: dict[str, slice] = {}
+        for block in blocks:
+            if block == "string":
+                part = pairs_df[list(STRING_FEATURES)].to_numpy(dtype=np.float32)
+            elif block == "fastrp":
+                part, present = self.embedding_features(src, tgt)
+                valid &= present
+            elif block == "network":
+                part = self.network_features(src, tgt)
+            else:
+                part = self.same_community(src, tgt, block)[:, None]
+            parts.append(part)
+            spans[block] = slice(len(columns), len(columns) + part.shape[1])
+            columns.extend(self.block_columns(block))
+        matrix = np.hstack(parts) if parts else np.empty((len(pairs_df), 0), dtype=np.float32)
+        return PairFeatures(matrix=matrix, valid=valid, columns=tuple(columns), blocks=spans)
+
+    def iter_pair_features(
+        self,
+        pairs_df: pd.DataFrame,
+        blocks: Sequence[str],
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[tuple[int, PairFeatures]]:
+        """``(offset, features)`` of consecutive chunks of at most ``chunk_size`` pairs."""
+        for start in range(0, len(pairs_df), chunk_size):
+            yield start, self.pair_features(pairs_df.iloc[start : start + chunk_size], blocks)
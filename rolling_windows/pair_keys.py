@@ -0,0 +1,80 @@
+"""
+Order-independent int64 keys of node pairs.
+
+Link prediction tests SIM_NAME pairs against FAMILY edges in either
+direction. ``PairKeyCodec`` numbers entity ids with a run-level dictionary
+(the ``entity_id`` column of the node identity cache, extended by ids it does
+not know) and encodes a pair ``(a, b)`` as ``min * n + max`` of the two
+codes, with ``n`` the dictionary size, so ``(a, b)`` and ``(b, a)`` get the
+same key. Membership tests and anti-joins are then a ``searchsorted`` of one
+int64 array against the sorted keys of the other instead of per-row tuple
+lookups in a Python set.
+
+Pairs with a null id get key ``-1`` and are members of nothing.
+
+This module has no flat imports so that ``rolling_windows.link_prediction``
+can import it both inside and outside ``rolling_windows``.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+# Codes are below 2**31.5 so that ``min * n + max`` fits in an int64.
+MAX_DICTIONARY_SIZE = 3_037_000_499
+
+
+class PairKeyCodec:
+    """Entity id dictionary of a run; an id's code is its position in ``vocabulary``."""
+
+    def __init__(self, vocabulary: Iterable):
+        self.vocabulary = pd.Index(np.asarray(vocabulary, dtype=object))
+        if not self.vocabulary.is_unique:
+            raise ValueError("Duplicate ids in the pair key dictionary")
+        if len(self.vocabulary) > MAX_DICTIONARY_SIZE:
+            raise ValueError(f"{len(self.vocabulary)} ids do not fit in int64 pair keys")
+
+    def __len__(self) -> int:
+        return len(self.vocabulary)
+
+    @classmethod
+    def from_ids(cls, *ids: Iterable, vocabulary: Iterable | None = None) -> "PairKeyCodec":
+        """
+        A dictionary of ``vocabulary`` followed by the other non-null ``ids`` it lacks.
+
+        Ids of ``vocabulary`` keep their codes, so codes of a run-level
+        dictionary are stable across the frames encoded with it.
+        """
+        known = pd.Index([] if vocabulary is None else np.asarray(vocabulary, dtype=object))
+        known = known[known.notna()].unique()
+        seen = pd.Index(np.concatenate([np.asarray(v, dtype=object) for v in ids])) if ids else pd.Index([])
+        seen = seen[seen.notna()].unique()
+        return cls(known.append(seen.difference(known, sort=False)))
+
+    def codes(self, ids: Iterable) -> np.ndarray:
+        """Code of each id, ``-1`` for null or unknown ids."""
+        return self.vocabulary.get_indexer(pd.Index(np.asarray(ids, dtype=object))).astype(np.int64)
+
+    def keys(self, source_ids: Iterable, target_ids: Iterable) -> np.ndarray:
+        """Canonical key of each ``(source, target)`` pair, the same in either direction; ``-1`` if an id is unknown."""
+        a, b = self.codes(source_ids), self.codes(target_ids)
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        return np.where(lo >= 0, lo * np.int64(len(self.vocabulary)) + hi, -1)
+
+    def frame_keys(self, pairs_df: pd.DataFrame) -> np.ndarray:
+        """``keys`` of the ``source_id`` / ``target_id`` columns of ``pairs_df``."""
+        return self.keys(pairs_df["source_id"], pairs_df["target_id"])
+
+
+def isin_keys(keys: np.ndarray, members: np.ndarray) -> np.ndarray:
+    """Whether each key is one of ``members`` (``-1`` never is), by binary search in their sorted keys."""
+    keys = np.asarray(keys, dtype=np.int64)
+    members = np.unique(np.asarray(members, dtype=np.int64))
+    members = members[members >= 0]
+    if len(members) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    pos = np.minimum(np.searchsorted(members, keys), len(members) - 1)
+    return (members[pos] == keys) & (keys >= 0)
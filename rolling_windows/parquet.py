@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import json
+import os
+import threading
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 
 def coerce_float_list_column(df: pd.DataFrame, *, column: str) -> pd.DataFrame:
@@ -74,6 +79,46 @@ def slice_vector_column(
     return df
 
 
+def _fixed_size_table(df: pd.DataFrame, columns: set[str]) -> pa.Table:
+    """
+    ``df`` as an Arrow table whose pandas metadata reads ``columns`` back as object columns.
+
+    pandas records Arrow-backed columns by their type string, which it cannot
+    parse again for fixed-size lists, so ``pd.read_parquet`` would fail.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pandas_metadata = json.loads(table.schema.metadata[b"pandas"])
+    for column in pandas_metadata["columns"]:
+        if column["name"] in columns:
+            column["numpy_type"] = "object"
+    return table.replace_schema_metadata({**table.schema.metadata, b"pandas": json.dumps(pandas_metadata).encode()})
+
+
 def write_parquet(df: pd.DataFrame, path: Path) -> None:
+    """Write ``df`` to ``path`` atomically: an interrupted write never leaves a partial file behind."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    fixed_size = {
+        str(name)
+        for name, dtype in df.dtypes.items()
+        if isinstance(dtype, pd.ArrowDtype) and pa.types.is_fixed_size_list(dtype.pyarrow_dtype)
+    }
+    try:
+        if fixed_size:
+            pq.write_table(_fixed_size_table(df, fixed_size), tmp_path)
+        else:
+            df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def write_table(table: pa.Table, path: Path, *, row_group_size: int | None = None) -> None:
+    """Write an Arrow ``table`` to ``path`` atomically, like ``write_parquet``."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(path, index=False)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        pq.write_table(table, tmp_path, row_group_size=row_group_size)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -1,28 +1,89 @@
 from __future__ import annotations
 
+import contextlib
 import logging
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
 
+import numpy as np
 import pandas as pd
-import pyarrow.parquet as pq
+import pyarrow as pa
 from graphdatascience import GraphDataScience
+from graphdatascience.graph.graph_object import Graph
 from neo4j.exceptions import ServiceUnavailable, SessionExpired, ClientError, GqlError
 from tqdm.auto import tqdm
 
+from approximation import calibration_window, validate_centrality_config
+from arrow_stream import (
+    ArrowNodeStore,
+    append_client_properties,
+    as_frame,
+    attach_store_columns,
+    fetch_node_features,
+    finalise_edge_table,
+    finalise_node_table,
+    join_edge_ids,
+    node_feature_properties,
+    stream_node_table,
+    stream_relationship_table,
+    validate_arrow_streaming,
+)
+from background_writer import BackgroundWriter
+from bank_panel import compact_bank_panel, write_bank_panel_part
+from checkpoint import CheckpointLog, logged_row_count, output_entry, outputs_needed
 from config import Neo4jConfig, RollingWindowConfig, validate_rel_types
-from dates import iter_period_windows
-from gds_client import connect_gds
-from feature_blocks import BANK_FEATS_BLOCKS, BANK_FEATS_DIM, other_bank_feats_indices
+from dates import SuperWindow, Window, group_super_windows, iter_period_windows
+from dedup import (
+    DedupHit,
+    WindowDedupIndex,
+    dedup_stats,
+    log_dedup_rate,
+    node_property_checksums,
+    reuse_window_outputs,
+    window_fingerprint,
+)
+from gds_client import GdsSession, GdsSessionPool, connect_gds
+from frames import (
+    finalise_edge_frame,
+    finalise_node_frame,
+    join_edge_endpoint_ids,
+    manifest_row,
+    validate_output_layout,
+    window_graph_name_for,
+    window_output_paths,
+    write_window_output,
+)
 from hashing import stable_hash_dict
-from metrics import gds_config_metadata, run_window_algorithms, compute_fcr_temporal
-from mlflow_utils.tracking import setup_experiment
-from parquet import coerce_float_list_column, expand_embedding_column, slice_vector_column, write_parquet
-from link_prediction import run_link_prediction_workflow
+from metrics import (
+    FcrIntervals,
+    attach_client_properties,
+    compute_fcr_temporal,
+    compute_fcr_temporal_bulk,
+    fcr_maps_by_window,
+    gds_config_metadata,
+    run_window_algorithms,
+)
+from planner import plan_run
+from profiling import NO_PROFILER, NO_TRACE, RUN_SCOPE, StageProfiler, WindowTrace
+from vectors import read_frame, validate_vector_storage
+from window_projection import WINDOW_MATERIALISATIONS, build_single_pass_projection
+from node_export import ExportedNodes, export_node_batches, stream_node_batches, validate_node_export
+from node_identity import IDENTITY_COLUMNS, IDENTITY_DIRNAME, NodeIdentityIndex, load_or_fetch_node_identity
+from mlflow_utils.tracking import create_parent_run
+from parquet import write_parquet
+from link_prediction import LinkPredictor, run_link_prediction_workflow
 
 logger = logging.getLogger(__name__)
 
+# Defaults for missing temporal bounds (open-ended validity), as in the base projection.
+_MIN_T = -9_007_199_254_740_991.0
+_MAX_T = 9_007_199_254_740_991.0
+
 
 def _load_text(path: Path) -> str:
     return path.read_text(encoding="utf-8")
@@ -52,7 +113,6 @@ def _required_base_node_properties(cfg: RollingWindowConfig) -> set[str]:
     return required
 
 
-
 def ensure_base_graph(
     gds: GraphDataScience,
     *,
@@ -84,17 +144,12 @@ def ensure_base_graph(
     gds.graph.drop(cfg.base_graph_name, failIfMissing=False)
 
     logger.info("Projecting base graph '%s' using Native Projection...", cfg.base_graph_name)
-    
-    # Constants for defaults
-    MIN_T = -9_007_199_254_740_991.0
-    MAX_T = 9_007_199_254_740_991.0
-    
 
     # Node Projection: Label specific to avoid NPE on missing properties
     # Common props (Scalars only - robust)
     base_props = {
-        "tStart": {"property": "temporal_start", "defaultValue": MIN_T},
-        "tEnd": {"property": "temporal_end", "defaultValue": MAX_T},
+        "tStart": {"property": "temporal_start", "defaultValue": _MIN_T},
+        "tEnd": {"property": "temporal_end", "defaultValue": _MAX_T},
         "is_dead": {"property": "is_dead_int", "defaultValue": 0},
         "gds_id": {"property": "gds_id", "defaultValue": -1},
     }
@@ -113,8 +168,8 @@ def ensure_base_graph(
     # Mapped from migration (imputed_flag) and existing properties.
     rel_props = {
         "weight": {"property": "Size", "defaultValue": 1.0},
-        "tStart": {"property": "temporal_start", "defaultValue": MIN_T},
-        "tEnd": {"property": "temporal_end", "defaultValue": MAX_T},
+        "tStart": {"property": "temporal_start", "defaultValue": _MIN_T},
+        "tEnd": {"property": "temporal_end", "defaultValue": _MAX_T},
         "imputedFlag": {"property": "imputed_flag", "defaultValue": 0.0}
     }
 
@@ -182,20 +237,801 @@ def export_window_edges(
         separate_property_columns=True,
         db_node_properties=[edge_id_property],
     )[["nodeId", edge_id_property]]
+    return join_edge_endpoint_ids(rels, node_map, edge_id_property=edge_id_property)
+
+
+_FINGERPRINT_NODE_PROPERTIES: tuple[str, ...] = ("tStart", "tEnd", "is_dead", "gds_id")
+
+
+def window_graph_fingerprint(
+    gds: GraphDataScience,
+    G,
+    *,
+    rel_types: tuple[str, ...],
+    params_hash: str,
+    identity: NodeIdentityIndex,
+) -> str:
+    """
+    ``dedup.window_fingerprint`` of a window graph from its streamed nodes and weighted relationships.
+
+    Node checksums cover the projected node properties and the identity columns
+    the outputs are joined with.
+    """
+    nodes = gds.graph.nodeProperties.stream(G, list(_FINGERPRINT_NODE_PROPERTIES), separate_property_columns=True)
+    node_ids = nodes["nodeId"].to_numpy(dtype=np.int64)
+    properties = {c: nodes[c].to_numpy() for c in _FINGERPRINT_NODE_PROPERTIES}
+    properties.update({c: identity.lookup(node_ids, c) for c in IDENTITY_COLUMNS})
+    rels = gds.graph.relationshipProperty.stream(G, "weight", relationship_types=list(rel_types))
+    return window_fingerprint(
+        params_hash=params_hash,
+        node_ids=node_ids,
+        source_ids=rels["sourceNodeId"].to_numpy(),
+        target_ids=rels["targetNodeId"].to_numpy(),
+        rel_types=rels["relationshipType"].astype(str).to_numpy(),
+        weights=rels["propertyValue"].to_numpy(),
+        node_checksums=node_property_checksums(properties),
+    )
+
+
+@contextmanager
+def materialise_window_graph(
+    gds: GraphDataScience,
+    w: Window,
+    *,
+    cfg: RollingWindowConfig,
+    window_graph_name: str,
+    stats: dict[str, Any],
+    source_graph_name: str | None = None,
+    trace: WindowTrace = NO_TRACE,
+) -> Iterator[Graph]:
+    """
+    Create the participant graph of ``w`` as ``window_graph_name`` and drop it on exit.
+
+    ``cfg.window_materialisation`` selects how:
+
+    - ``filter_chain``: temporal filter of ``source_graph_name`` (a super-window
+      graph enclosing ``w``; the base graph when ``None`` or no longer present)
+      into ``temp_{name}``, ``active_degree`` mutate, participant filter; the
+      temp graph is dropped as soon as the final graph exists;
+    - ``single_pass``: one Cypher aggregation projection from the database
+      (``build_single_pass_projection``); no temp graph and no base graph.
+
+    ``stats`` receives ``materialisation``, ``materialise_time_s``,
+    ``window_graph_bytes`` and ``peak_projection_bytes`` (window-owned
+    projections alive at the same time, i.e. excluding the shared base graph).
+    The projection is the ``materialise`` stage of ``trace``.
+    """
+    mode = cfg.window_materialisation
+    if mode not in WINDOW_MATERIALISATIONS:
+        raise ValueError(f"Unknown window_materialisation {mode!r}; expected one of {WINDOW_MATERIALISATIONS}")
+
+    t0 = time.perf_counter()
+    with trace.stage("materialise", category="graph") as span:
+        gds.graph.drop(window_graph_name, failIfMissing=False)
+        node_filter, rel_filter, base_params = build_filter_predicates(
+            rel_types=cfg.rel_types,
+            include_imputed01=cfg.include_imputed01,
+        )
+        filter_params = {
+            **base_params,
+            "start": float(w.start_ms),
+            "end": float(w.end_ms),
+        }
+
+        if mode == "single_pass":
+            logger.info("Single-pass projection of %s from the database...", window_graph_name)
+            G, _ = gds.graph.cypher.project(
+                build_single_pass_projection(cfg.rel_types),
+                database=gds.database(),
+                graphName=window_graph_name,
+                minT=_MIN_T,
+                maxT=_MAX_T,
+                readConcurrency=int(cfg.read_concurrency),
+                **filter_params,
+            )
+            window_bytes = int(G.size_in_bytes())
+            peak_bytes = window_bytes
+        else:
+            temp_graph_name = f"temp_{window_graph_name}"
+            gds.graph.drop(temp_graph_name, failIfMissing=False)
+            source_name = cfg.base_graph_name
+            if source_graph_name is not None:
+                if gds.graph.exists(source_graph_name)["exists"]:
+                    source_name = source_graph_name
+                else:
+                    logger.warning("Super-window graph %s is gone; filtering %s from the base graph", source_graph_name, window_graph_name)
+            stats["source_graph"] = source_name
+            source_G = gds.graph.get(source_name)
+
+            # --- PASS 1: Temporal Filter ---
+            # Includes all Banks/Companies and all Persons active or defaulting (since Persons lack temporal props)
+            logger.info("Pass 1: Temporal filtering...")
+            temp_G, _ = gds.graph.filter(
+                temp_graph_name,
+                source_G,
+                node_filter,
+                rel_filter,
+                parameters=filter_params,
+                concurrency=cfg.read_concurrency,
+            )
+            try:
+                # --- PASS 2: Degree Filter for Persons ---
+                # Run degree once to find who is actually participant
+                logger.info("Pass 2: Degree mutation for participants...")
+                gds.degree.mutate(temp_G, mutateProperty="active_degree", concurrency=cfg.read_concurrency)
+
+                # Final Filter: Keep only connected Persons OR any Bank/Company
+                # (We keep all banks/companies even if isolates for FCR census)
+                final_node_filter = "n.active_degree > 0.0 OR n:Bank OR n:Company"
+
+                logger.info("Pass 3: Final participant filtering...")
+                G, _ = gds.graph.filter(
+                    window_graph_name,
+                    temp_G,
+                    final_node_filter,
+                    "*", # Keep all relationships from temp_G
+                    concurrency=cfg.read_concurrency
+                )
+                window_bytes = int(G.size_in_bytes())
+                peak_bytes = int(temp_G.size_in_bytes()) + window_bytes
+            finally:
+                # The algorithms only need the final graph.
+                temp_G.drop(failIfMissing=False)
+        node_count, relationship_count = G.node_count(), G.relationship_count()
+        span["rows"] = relationship_count
+
+    stats.update(
+        materialisation=mode,
+        materialise_time_s=time.perf_counter() - t0,
+        window_graph_bytes=window_bytes,
+        peak_projection_bytes=peak_bytes,
+    )
+    logger.info(
+        "Window graph %s ready via %s (nodes=%d rels=%d bytes=%d peak=%d) in %.1fs",
+        window_graph_name,
+        mode,
+        node_count,
+        relationship_count,
+        window_bytes,
+        peak_bytes,
+        stats["materialise_time_s"],
+    )
+    try:
+        yield G
+    finally:
+        G.drop(failIfMissing=False)
+
+
+@dataclass
+class StreamedWindow:
+    """Frames streamed from one window graph, ready for post-processing after the graph is dropped."""
+
+    w: Window
+    window_graph_name: str
+    node_out_path: Path
+    edges_out_path: Path
+    # Arrow tables with ``arrow_streaming`` (database properties and edge ids not joined yet).
+    nodes: pd.DataFrame | pa.Table | None
+    edges: pd.DataFrame | pa.Table | None
+    fcr_map: dict[str, float] | None
+    algorithm_stats: dict[str, Any]
+    attempts: int
+    # Only used for link prediction (database queries; the Neo4j driver is thread-safe).
+    gds: GraphDataScience
+    # Earlier window with the same graph whose outputs are copied instead (``dedup``).
+    dedup_hit: DedupHit | None = None
+    # Node file already written batch by batch while streaming (``node_export_batch_size``).
+    exported_nodes: ExportedNodes | None = None
+
+
+def _window_fcr_map(
+    gds: GraphDataScience,
+    w: Window,
+    *,
+    cfg: RollingWindowConfig,
+    fcr_maps: dict[tuple[int, int], dict[int, float]] | None,
+    trace: WindowTrace,
+) -> dict[int, float]:
+    if fcr_maps is not None:
+        return fcr_maps.get((int(w.start_ms), int(w.end_ms)), {})
+    logger.info("Computing FCR temporal via Cypher...")
+    with trace.stage("fcr", category="fcr") as span:
+        fcr_map = compute_fcr_temporal(gds, cfg, w.start_ms, w.end_ms)
+        span["rows"] = len(fcr_map)
+    return fcr_map
+
+
+def _identity_regn_lookup(identity: NodeIdentityIndex) -> Callable[[pa.Table], Any]:
+    return lambda banks: identity.bank_regn(banks["gds_id"].to_numpy())
+
+
+def _finalise_window(
+    streamed: StreamedWindow,
+    *,
+    cfg: RollingWindowConfig,
+    identity: NodeIdentityIndex,
+    params_hash: str,
+    expand_embeddings: bool,
+    dedup: WindowDedupIndex | None = None,
+    arrow_store: ArrowNodeStore | None = None,
+    link_predictor: LinkPredictor | None = None,
+    trace: WindowTrace = NO_TRACE,
+) -> dict[str, Any]:
+    """
+    CPU and disk half of a window: ID merge, FCR join, frame finalisation, Parquet writes, link prediction.
+
+    A window with a ``dedup_hit`` streamed nothing; its outputs are copied from the earlier window instead.
+    Streamed Arrow tables (``arrow_streaming``) are joined against ``arrow_store`` and written without
+    going through pandas. Each step is a stage of ``trace``.
+    """
+    t0 = time.perf_counter()
+    window_graph_name = streamed.window_graph_name
+    w = streamed.w
+    df = streamed.nodes
+    df_edges = streamed.edges
+    arrow = isinstance(df, pa.Table) or isinstance(df_edges, pa.Table)
+    finalise_nodes = finalise_node_table if arrow else finalise_node_frame
+    finalise_edges = finalise_edge_table if arrow else finalise_edge_frame
+
+    if arrow and df is not None:
+        with trace.stage("identity_merge", category="frame") as span:
+            df = attach_store_columns(df, arrow_store, cfg=cfg)
+            span["rows"] = df.num_rows
+        missing_ids = df["entity_id"].null_count if "entity_id" in df.column_names else df.num_rows
+        if missing_ids > 0:
+            logger.warning("Merged %d nodes, but %d have missing entity_id", df.num_rows, missing_ids)
+    elif df is not None:
+        # Join entity ids from the run-level identity cache (gds_id -> entity_id)
+        if "gds_id" in df.columns:
+            with trace.stage("identity_merge", category="frame") as span:
+                df["gds_id"] = df["gds_id"].astype("int64")
+                df = identity.attach(df, ["entity_id"])
+                span["rows"] = len(df)
+        else:
+            logger.error("gds_id missing from dataframe! Cannot merge IDs.")
+
+        missing_ids = df["entity_id"].isna().sum() if "entity_id" in df.columns else len(df)
+        if missing_ids > 0:
+            logger.warning("Merged %d nodes, but %d have missing entity_id", len(df), missing_ids)
+
+    if not arrow and df is not None and "entity_id" in df.columns:
+        sample_ids = df["entity_id"].dropna().head().tolist()
+        logger.info("IDs fetched successfully. Sample: %s", sample_ids)
+
+    node_count = 0
+    edge_count = 0
+    # Checkpoint entries of the files written here; popped by _checkpoint_window.
+    outputs: dict[str, dict[str, Any]] = {}
+
+    if df is not None:
+        with trace.stage("finalise_nodes", category="frame") as span:
+            df = finalise_nodes(
+                df,
+                cfg=cfg,
+                w=w,
+                window_graph_name=window_graph_name,
+                params_hash=params_hash,
+                fcr_map=streamed.fcr_map,
+                expand_embeddings=expand_embeddings,
+            )
+            span["rows"] = len(df)
+        logger.info("Writing %s (rows=%d cols=%d)", streamed.node_out_path, df.shape[0], df.shape[1])
+        with trace.stage("write_nodes", category="io") as span:
+            write_window_output(df, streamed.node_out_path, cfg=cfg, part="nodes")
+            outputs["nodes"] = output_entry(streamed.node_out_path, root=cfg.output_dir)
+            span["rows"] = len(df)
+        node_count = int(df.shape[0])
+    elif streamed.exported_nodes is not None:
+        node_count = streamed.exported_nodes.rows
+        outputs["nodes"] = output_entry(streamed.node_out_path, root=cfg.output_dir)
+
+    if df_edges is not None:
+        with trace.stage("finalise_edges", category="frame") as span:
+            if arrow:
+                df_edges = join_edge_ids(df_edges, arrow_store, edge_id_property=cfg.edge_id_property)
+            df_edges = finalise_edges(
+                df_edges,
+                cfg=cfg,
+                w=w,
+                window_graph_name=window_graph_name,
+                params_hash=params_hash,
+            )
+            span["rows"] = len(df_edges)
+        logger.info("Writing %s (rows=%d cols=%d)", streamed.edges_out_path, df_edges.shape[0], df_edges.shape[1])
+        with trace.stage("write_edges", category="io") as span:
+            write_window_output(df_edges, streamed.edges_out_path, cfg=cfg, part="edges")
+            outputs["edges"] = output_entry(streamed.edges_out_path, root=cfg.output_dir)
+            span["rows"] = len(df_edges)
+        edge_count = int(df_edges.shape[0])
+
+    fingerprint = streamed.algorithm_stats.get("window_fingerprint")
+    if streamed.dedup_hit is not None:
+        with trace.stage("reuse_outputs", category="io") as span:
+            df, df_edges = reuse_window_outputs(
+                streamed.dedup_hit,
+                w=w,
+                window_graph_name=window_graph_name,
+                params_hash=params_hash,
+                node_out_path=streamed.node_out_path,
+                edges_out_path=streamed.edges_out_path,
+                fcr_map=streamed.fcr_map,
+                cfg=cfg,
+            )
+            span["rows"] = (len(df) if df is not None else 0) + (len(df_edges) if df_edges is not None else 0)
+        if df is not None:
+            node_count = int(df.shape[0])
+            outputs["nodes"] = output_entry(streamed.node_out_path, root=cfg.output_dir)
+        if df_edges is not None:
+            edge_count = int(df_edges.shape[0])
+            outputs["edges"] = output_entry(streamed.edges_out_path, root=cfg.output_dir)
+    elif dedup is not None and fingerprint is not None:
+        dedup.record(fingerprint, window_graph_name, node_path=streamed.node_out_path, edges_path=streamed.edges_out_path)
+
+    panel_nodes = streamed.exported_nodes.banks if streamed.exported_nodes is not None else df
+    if cfg.bank_panel and panel_nodes is not None:
+        with trace.stage("bank_panel", category="io") as span:
+            span["rows"] = write_bank_panel_part(
+                panel_nodes,
+                cfg=cfg,
+                params_hash=params_hash,
+                window_graph_name=window_graph_name,
+                regn_lookup=_identity_regn_lookup(identity),
+            )
+
+    # Link Prediction
+    if cfg.run_link_prediction and df is None and streamed.exported_nodes is not None:
+        # Needs the whole window: the file written batch by batch is read back.
+        df = read_frame(streamed.node_out_path)
+    if cfg.run_link_prediction and df is not None and df_edges is not None:
+        try:
+            with trace.stage("link_prediction", category="model") as span:
+                predicted_edges = run_link_prediction_workflow(
+                    streamed.gds, cfg, window_graph_name, as_frame(df), as_frame(df_edges), predictor=link_predictor
+                )
+                span["rows"] = len(predicted_edges) if predicted_edges is not None else 0
+            if predicted_edges is not None and not predicted_edges.empty:
+                pred_path = cfg.output_dir / "predicted_edges" / f"predicted_edges_{window_graph_name}.parquet"
+                pred_path.parent.mkdir(parents=True, exist_ok=True)
+                write_parquet(predicted_edges, pred_path)
+                logger.info("Saved %d predicted edges to %s", len(predicted_edges), pred_path)
+        except Exception as lp_err:
+            logger.error("Link prediction failed for %s: %s", window_graph_name, lp_err)
+
+    row = manifest_row(
+        cfg=cfg,
+        w=w,
+        window_graph_name=window_graph_name,
+        params_hash=params_hash,
+        node_count=node_count,
+        edge_count=edge_count,
+        skipped_existing=False,
+    )
+    row.update(streamed.algorithm_stats)
+    row["attempts"] = streamed.attempts
+    row["postprocess_time_s"] = time.perf_counter() - t0
+    row["outputs"] = outputs
+    return row
+
+
+def _checkpoint_window(checkpoint: CheckpointLog, timings: dict[str, Any], fut: Future[dict[str, Any]]) -> None:
+    """Done-callback of a window's post-processing future: append its record as soon as its files exist."""
+    if fut.cancelled() or fut.exception() is not None:
+        return
+    row = fut.result()
+    outputs = row.pop("outputs", {})
+    if row.get("skipped_existing"):
+        return
+    checkpoint.append(row["window_graph_name"], status="done", row={**row, **timings}, outputs=outputs)
+
+
+def _completed(row: dict[str, Any]) -> Future[dict[str, Any]]:
+    fut: Future[dict[str, Any]] = Future()
+    fut.set_result(row)
+    return fut
+
+
+TRANSIENT_ERRORS = (ServiceUnavailable, SessionExpired, ClientError, GqlError)
+
+
+def _recover_session(
+    session: GdsSession,
+    error: Exception,
+    *,
+    label: str,
+    attempt: int,
+    max_retries: int,
+    retry_backoff_s: float,
+    reensure_base_graph: Callable[[GraphDataScience], None],
+) -> None:
+    """After a transient Neo4j error: reconnect ``session``, re-ensure the base graph and back off."""
+    # If it's a ClientError, check if it's "GraphNotFound" which is often transient due to session drop
+    err_msg = str(error)
+    is_graph_not_found = "GraphNotFoundException" in err_msg or "does not exist" in err_msg
+    logger.warning(
+        "Transient Neo4j error for %s (attempt %d/%d, is_gnf=%s): %s; retrying in %.1fs",
+        label,
+        attempt,
+        max_retries,
+        is_graph_not_found,
+        err_msg,
+        retry_backoff_s * (2 ** (attempt - 1)),
+    )
+    # Re-connect this session only; other in-flight windows keep theirs.
+    try:
+        logger.info("Re-establishing GDS connection...")
+        # Re-ensure base graph (crucial if DB restarted)
+        reensure_base_graph(session.reconnect())
+    except Exception as conn_err:
+        logger.error("Failed to re-establish connection: %s", conn_err)
+
+    time.sleep(retry_backoff_s * (2 ** (attempt - 1)))
+
+
+def _process_window(
+    session: GdsSession,
+    w: Window,
+    *,
+    writer: BackgroundWriter,
+    identity: NodeIdentityIndex,
+    fcr_maps: dict[tuple[int, int], dict[int, float]] | None,
+    cfg: RollingWindowConfig,
+    params_hash: str,
+    expand_embeddings: bool,
+    skip_existing: bool,
+    max_retries: int,
+    retry_backoff_s: float,
+    reensure_base_graph: Callable[[GraphDataScience], None],
+    checkpoint: CheckpointLog,
+    source_graph_name: str | None = None,
+    calibration_window: Window | None = None,
+    window_concurrency: dict[str, int] | None = None,
+    dedup: WindowDedupIndex | None = None,
+    arrow_store: ArrowNodeStore | None = None,
+    link_predictor: LinkPredictor | None = None,
+    profiler: StageProfiler = NO_PROFILER,
+    progress: Callable[[str], None] | None = None,
+) -> Future[dict[str, Any]]:
+    """
+    Filter, compute and stream one window through ``session``, then queue its post-processing on ``writer``.
 
-    source_col = f"source_{edge_id_property}"
-    target_col = f"target_{edge_id_property}"
-
-    rels = rels.merge(
-        node_map.rename(columns={"nodeId": "sourceNodeId", edge_id_property: source_col}),
-        on="sourceNodeId",
-        how="left",
-    ).merge(
-        node_map.rename(columns={"nodeId": "targetNodeId", edge_id_property: target_col}),
-        on="targetNodeId",
-        how="left",
+    The returned future resolves to the window's manifest row once its outputs
+    are written. Graph names are derived from the window, so windows processed
+    concurrently on different sessions never touch each other's projections.
+    """
+    window_graph_name = window_graph_name_for(w)
+    node_out_path, edges_out_path = window_output_paths(cfg, window_graph_name, params_hash=params_hash)
+    trace = profiler.window(window_graph_name)
+    if window_concurrency is not None:
+        # Per-window concurrency from the pre-flight plan; params_hash stays that of the run.
+        cfg = replace(cfg, read_concurrency=window_concurrency.get(window_graph_name, cfg.read_concurrency))
+    if progress is not None:
+        progress(f"{window_graph_name} | check")
+
+    need_nodes, need_edges = outputs_needed(
+        checkpoint,
+        cfg,
+        window_graph_name=window_graph_name,
+        node_out_path=node_out_path,
+        edges_out_path=edges_out_path,
+        skip_existing=skip_existing,
     )
-    return rels
+
+    if not need_nodes and not need_edges:
+        if progress is not None:
+            progress(f"{window_graph_name} | skip")
+        logger.info(
+            "Skipping %s (outputs exist): nodes=%s edges=%s",
+            window_graph_name,
+            node_out_path,
+            edges_out_path if cfg.export_edges else "(disabled)",
+        )
+        return _completed(
+            manifest_row(
+                cfg=cfg,
+                w=w,
+                window_graph_name=window_graph_name,
+                params_hash=params_hash,
+                node_count=logged_row_count(checkpoint, window_graph_name, "nodes"),
+                edge_count=logged_row_count(checkpoint, window_graph_name, "edges"),
+                skipped_existing=True,
+            )
+        )
+
+    logger.info(
+        "Window %s (start=%d end=%d): filtering base graph and running algorithms",
+        window_graph_name,
+        w.start_ms,
+        w.end_ms,
+    )
+    if progress is not None:
+        progress(f"{window_graph_name} | filter+algs")
+    attempt = 0
+    while attempt <= max_retries:
+        gds = session.gds
+        algorithm_stats: dict[str, Any] = {"read_concurrency": int(cfg.read_concurrency)}
+        try:
+            logger.info("Creating window graph %s (attempt %d/%d)", window_graph_name, attempt + 1, max_retries + 1)
+            with materialise_window_graph(
+                gds,
+                w,
+                cfg=cfg,
+                window_graph_name=window_graph_name,
+                stats=algorithm_stats,
+                source_graph_name=source_graph_name,
+                trace=trace,
+            ) as G:
+                df = None
+                df_edges = None
+                hit = None
+                fcr_map = None
+                exported = None
+
+                if dedup is not None:
+                    t0 = time.perf_counter()
+                    with trace.stage("fingerprint", category="graph"):
+                        fingerprint = window_graph_fingerprint(
+                            gds, G, rel_types=cfg.rel_types, params_hash=params_hash, identity=identity
+                        )
+                    if w != calibration_window:
+                        hit = dedup.lookup(
+                            fingerprint,
+                            window_graph_name=window_graph_name,
+                            need_nodes=need_nodes,
+                            need_edges=need_edges,
+                        )
+                    algorithm_stats.update(dedup_stats(fingerprint, hit, time.perf_counter() - t0))
+                    if hit is not None:
+                        logger.info("Window %s has the graph of %s; reusing its outputs", window_graph_name, hit.source_window)
+
+                if need_nodes and hit is None:
+                    logger.info("Running window algorithms...")
+                    client_properties: dict[str, pd.Series] = {}
+                    properties = run_window_algorithms(
+                        gds,
+                        G,
+                        cfg,
+                        stats=algorithm_stats,
+                        client_properties=client_properties,
+                        calibrate=w == calibration_window,
+                        trace=trace,
+                    )
+                    logger.info("Algorithms completed.")
+
+                    # Determine properties to fetch from GDS (In-Memory) vs DB
+                    if cfg.export_feature_vectors:
+                        properties.extend(["is_dead"])
+
+                    # Ensure gds_id is streamed for ID merging
+                    properties.append("gds_id")
+
+                    properties = _unique_preserve_order(properties)
+
+                    if arrow_store is not None and cfg.node_export_batch_size > 0:
+                        # Batches are joined and written while the graph exists, so FCR is needed first.
+                        fcr_map = _window_fcr_map(gds, w, cfg=cfg, fcr_maps=fcr_maps, trace=trace)
+                        logger.info("Exporting node properties in batches of %d...", cfg.node_export_batch_size)
+                        exported = export_node_batches(
+                            stream_node_batches(gds, G, properties, batch_size=cfg.node_export_batch_size),
+                            node_out_path,
+                            cfg=cfg,
+                            store=arrow_store,
+                            client_properties=client_properties,
+                            w=w,
+                            window_graph_name=window_graph_name,
+                            params_hash=params_hash,
+                            fcr_map=fcr_map,
+                            expand_embeddings=expand_embeddings,
+                            collect_banks=cfg.bank_panel,
+                            trace=trace,
+                        )
+                        algorithm_stats["node_export_batches"] = exported.batches
+                    elif arrow_store is not None:
+                        # Database properties are joined from arrow_store after the graph is dropped.
+                        logger.info("Streaming node properties (Arrow)...")
+                        with trace.stage("stream_nodes", category="stream") as span:
+                            df = stream_node_table(gds, G, properties)
+                            df = append_client_properties(df, client_properties)
+                            span["rows"] = df.num_rows
+                        logger.info("Node streaming completed. Shape: %s", df.shape)
+                    else:
+                        db_node_props = [cfg.id_property]
+                        if cfg.export_edges and cfg.edge_id_property != cfg.id_property:
+                            db_node_props.append(cfg.edge_id_property)
+
+                        if cfg.export_feature_vectors:
+                            db_node_props.extend(["bank_feats", "network_feats"])
+                        elif cfg.export_feature_blocks:
+                            db_node_props.append("bank_feats")
+
+                        logger.info("Streaming node properties...")
+                        with trace.stage("stream_nodes", category="stream") as span:
+                            df = gds.graph.nodeProperties.stream(
+                                G,
+                                properties,
+                                separate_property_columns=True,
+                                db_node_properties=db_node_props,
+                                listNodeLabels=True,
+                            )
+                            df = attach_client_properties(df, client_properties)
+                            span["rows"] = len(df)
+                        logger.info("Node streaming completed. Shape: %s", df.shape if df is not None else "None")
+
+                if need_edges and hit is None:
+                    logger.info("Exporting edges...")
+                    with trace.stage("export_edges", category="stream") as span:
+                        if arrow_store is not None:
+                            # Endpoint ids are joined from arrow_store in post-processing.
+                            df_edges = stream_relationship_table(gds, G, cfg.rel_types)
+                        else:
+                            df_edges = export_window_edges(
+                                gds,
+                                G,
+                                rel_types=cfg.rel_types,
+                                edge_id_property=cfg.edge_id_property,
+                            )
+                        span["rows"] = len(df_edges)
+                    logger.info("Edge export completed. Shape: %s", df_edges.shape if df_edges is not None else "None")
+
+            # The window graph is dropped here; only database queries remain for this session.
+            if need_nodes and exported is None:
+                fcr_map = _window_fcr_map(gds, w, cfg=cfg, fcr_maps=fcr_maps, trace=trace)
+
+            if progress is not None:
+                progress(f"{window_graph_name} | queued")
+            streamed = StreamedWindow(
+                w=w,
+                window_graph_name=window_graph_name,
+                node_out_path=node_out_path,
+                edges_out_path=edges_out_path,
+                nodes=df,
+                edges=df_edges,
+                fcr_map=fcr_map,
+                algorithm_stats=algorithm_stats,
+                attempts=attempt + 1,
+                gds=gds,
+                dedup_hit=hit,
+                exported_nodes=exported,
+            )
+            return writer.submit(
+                _finalise_window,
+                streamed,
+                cfg=cfg,
+                identity=identity,
+                params_hash=params_hash,
+                expand_embeddings=expand_embeddings,
+                dedup=dedup,
+                arrow_store=arrow_store,
+                link_predictor=link_predictor,
+                trace=trace,
+            )
+
+        except TRANSIENT_ERRORS as e:
+            attempt += 1
+            if attempt > max_retries:
+                logger.exception("Window %s failed after %d retries", window_graph_name, max_retries)
+                checkpoint.append(window_graph_name, status="failed", error=str(e))
+                raise
+            _recover_session(
+                session,
+                e,
+                label=window_graph_name,
+                attempt=attempt,
+                max_retries=max_retries,
+                retry_backoff_s=retry_backoff_s,
+                reensure_base_graph=reensure_base_graph,
+            )
+        finally:
+            # Robust cleanup: Always ensure temporary graphs are dropped
+            for graph_name in (f"temp_{window_graph_name}", window_graph_name):
+                _drop_graph_quietly(session, graph_name)
+
+    raise RuntimeError(f"Window {window_graph_name} was not processed")  # unreachable: the loop returns or raises
+
+
+def _window_needs_work(
+    cfg: RollingWindowConfig, w: Window, *, params_hash: str, checkpoint: CheckpointLog, skip_existing: bool
+) -> bool:
+    window_graph_name = window_graph_name_for(w)
+    node_out_path, edges_out_path = window_output_paths(cfg, window_graph_name, params_hash=params_hash)
+    need_nodes, need_edges = outputs_needed(
+        checkpoint,
+        cfg,
+        window_graph_name=window_graph_name,
+        node_out_path=node_out_path,
+        edges_out_path=edges_out_path,
+        skip_existing=skip_existing,
+    )
+    return need_nodes or need_edges
+
+
+@contextmanager
+def super_window_graph(
+    session: GdsSession,
+    sw: SuperWindow | None,
+    *,
+    cfg: RollingWindowConfig,
+    needed: bool,
+    max_retries: int,
+    retry_backoff_s: float,
+    reensure_base_graph: Callable[[GraphDataScience], None],
+    profiler: StageProfiler = NO_PROFILER,
+) -> Iterator[tuple[str | None, dict[str, Any]]]:
+    """
+    Filter the base graph to ``sw`` once so its inner windows are filtered from the smaller graph.
+
+    Yields ``(graph_name, stats)``; ``graph_name`` is ``None`` (filter from the
+    base graph) without a super-window or when none of its windows needs
+    computing. The graph is dropped on exit. The temporal predicates are
+    monotone in the interval, so anything active in an inner window is active
+    in ``sw`` and the inner filters give the same graphs as from the base.
+    Transient Neo4j errors are retried like a window's, on ``session``.
+    """
+    if sw is None or not needed:
+        yield None, {}
+        return
+
+    graph_name = f"rw_{sw.name_suffix}"
+    node_filter, rel_filter, base_params = build_filter_predicates(
+        rel_types=cfg.rel_types,
+        include_imputed01=cfg.include_imputed01,
+    )
+    attempt = 0
+    while True:
+        gds = session.gds
+        t0 = time.perf_counter()
+        try:
+            gds.graph.drop(graph_name, failIfMissing=False)
+            logger.info(
+                "Filtering super-window %s (start=%d end=%d, %d windows)", graph_name, sw.start_ms, sw.end_ms, len(sw.windows)
+            )
+            with profiler.stage(graph_name, "super_window_filter", category="graph"):
+                G, _ = gds.graph.filter(
+                    graph_name,
+                    gds.graph.get(cfg.base_graph_name),
+                    node_filter,
+                    rel_filter,
+                    parameters={**base_params, "start": float(sw.start_ms), "end": float(sw.end_ms)},
+                    concurrency=cfg.read_concurrency,
+                )
+            stats = {
+                "super_window": graph_name,
+                "super_window_filter_time_s": time.perf_counter() - t0,
+                "super_window_graph_bytes": int(G.size_in_bytes()),
+            }
+            logger.info(
+                "Super-window %s ready (nodes=%d rels=%d) in %.1fs",
+                graph_name,
+                G.node_count(),
+                G.relationship_count(),
+                stats["super_window_filter_time_s"],
+            )
+            break
+        except TRANSIENT_ERRORS as e:
+            _drop_graph_quietly(session, graph_name)  # a partial graph from the failed attempt
+            attempt += 1
+            if attempt > max_retries:
+                logger.exception("Super-window %s failed after %d retries", graph_name, max_retries)
+                raise
+            _recover_session(
+                session,
+                e,
+                label=graph_name,
+                attempt=attempt,
+                max_retries=max_retries,
+                retry_backoff_s=retry_backoff_s,
+                reensure_base_graph=reensure_base_graph,
+            )
+    try:
+        yield graph_name, stats
+    finally:
+        _drop_graph_quietly(session, graph_name)
+
+
+def _drop_graph_quietly(session: GdsSession, graph_name: str) -> None:
+    try:
+        session.gds.graph.drop(graph_name, failIfMissing=False)
+    except Exception as drop_err:
+        logger.warning("Could not drop %s: %s", graph_name, drop_err)
 
 
 def run_windows(
@@ -210,12 +1046,32 @@ def run_windows(
     max_retries: int = 3,
     retry_backoff_s: float = 2.0,
     show_tqdm: bool = True,
+    max_in_flight: int = 1,
+    write_queue_size: int = 2,
+    plan_only: bool = False,
 ) -> None:
-    ensure_base_graph(gds, cfg=cfg, cypher_path=base_projection_cypher, rebuild=rebuild_base_graph)
-    base_G = gds.graph.get(cfg.base_graph_name)
-
-    if cfg.run_link_prediction:
-        setup_experiment("exp_014_link_prediction")
+    """Process every window of the schedule through GDS and compact the checkpoint log into the manifest."""
+    validate_centrality_config(cfg)
+    validate_vector_storage(cfg)
+    validate_output_layout(cfg)
+    validate_node_export(cfg)
+    if cfg.arrow_streaming:
+        validate_arrow_streaming(cfg)
+    if cfg.super_window_years < 0:
+        raise ValueError(f"super_window_years must be >= 0, got {cfg.super_window_years}")
+    if cfg.window_materialisation not in WINDOW_MATERIALISATIONS:
+        raise ValueError(
+            f"Unknown window_materialisation {cfg.window_materialisation!r}; expected one of {WINDOW_MATERIALISATIONS}"
+        )
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be >= 1, got {max_in_flight}")
+    if max_in_flight > neo4j_cfg.max_connection_pool_size:
+        logger.warning(
+            "max_in_flight=%d exceeds max_connection_pool_size=%d; limiting to the pool size",
+            max_in_flight,
+            neo4j_cfg.max_connection_pool_size,
+        )
+        max_in_flight = neo4j_cfg.max_connection_pool_size
 
     windows = iter_period_windows(
         start_year=cfg.start_year,
@@ -224,410 +1080,216 @@ def run_windows(
         step_size=cfg.step_size,
         period_type=cfg.period_type,
     )
-
     metadata = gds_config_metadata(cfg)
     params_hash = stable_hash_dict(metadata)
+    calibration = calibration_window(windows, cfg)
+
+    window_concurrency: dict[str, int] | None = None
+    if cfg.preflight_plan or plan_only:
+        # Sizes, memory estimates and order are settled before any graph is projected.
+        plan = plan_run(gds, cfg, windows, params_hash=params_hash, max_in_flight=max_in_flight)
+        if plan_only:
+            return
+        by_name = {window_graph_name_for(w): w for w in windows}
+        windows = [by_name[name] for name in plan["window_graph_name"]]
+        window_concurrency = dict(zip(plan["window_graph_name"], plan["concurrency"].astype(int)))
+
+    profiler = StageProfiler.for_run(cfg, params_hash, engine="gds")
+    run_trace = profiler.window(RUN_SCOPE)
+
+    uses_base_graph = cfg.window_materialisation == "filter_chain"
+    if uses_base_graph:
+        with run_trace.stage("base_graph", category="graph"):
+            ensure_base_graph(gds, cfg=cfg, cypher_path=base_projection_cypher, rebuild=rebuild_base_graph)
+    else:
+        logger.info("Single-pass window materialisation: windows are projected from the database, no base graph")
+    # gds_id -> entity_id/Id/regn_cbr/labels, fetched once per database state instead of once per window.
+    with run_trace.stage("node_identity", category="stream") as span:
+        identity = load_or_fetch_node_identity(gds, cfg.output_dir / IDENTITY_DIRNAME)
+        span["rows"] = len(identity)
+
+    arrow_store = None
+    if cfg.arrow_streaming:
+        if not neo4j_cfg.arrow:
+            logger.warning("arrow_streaming without Neo4jConfig.arrow: streamed frames are converted to Arrow once")
+        # Id, bank_feats and network_feats once per run instead of db_node_properties per window.
+        with run_trace.stage("node_features", category="stream") as span:
+            features = fetch_node_features(gds, node_feature_properties(cfg))
+            arrow_store = ArrowNodeStore.build(identity, features)
+            span["rows"] = features.num_rows if features is not None else 0
+
+    link_predictor = None
+    if cfg.run_link_prediction:
+        # The horse races run on writer threads, which have no active MLflow run: they nest under this one by id.
+        parent_run_id = create_parent_run(
+            "exp_014_link_prediction",
+            run_name=f"link_prediction_{params_hash}",
+            params={"params_hash": params_hash, "lp_retrain_every": cfg.lp_retrain_every},
+        )
+        # SIM_NAME/FAMILY inputs once per run, the horse race once per lp_retrain_every windows.
+        link_predictor = LinkPredictor(
+            cfg,
+            window_names=[window_graph_name_for(w) for w in sorted(windows, key=lambda w: (w.start_ms, w.end_ms))],
+            entity_ids=identity.entity_id,
+            parent_run_id=parent_run_id,
+        )
+
+    fcr_maps = None
+    if cfg.fcr_bulk:
+        # One pass over the OWNERSHIP/FAMILY intervals instead of one database scan per window.
+        t0 = time.perf_counter()
+        with run_trace.stage("fcr_bulk", category="fcr") as span:
+            fcr_maps = fcr_maps_by_window(compute_fcr_temporal_bulk(FcrIntervals.fetch(gds), windows))
+            span["rows"] = len(fcr_maps)
+        logger.info("Computed bulk FCR for %d windows in %.1fs", len(fcr_maps), time.perf_counter() - t0)
+
+    if cfg.warm_start:
+        # GDS PageRank/eigenvector take no seed property, and a seed for Louvain
+        # would have to exist on each freshly filtered window graph.
+        logger.warning("warm_start is only supported by the local engine (--engine local); running cold")
+
+    # One re-projection at a time, however many sessions lost the base graph.
+    base_graph_lock = threading.Lock()
+
+    def reensure_base_graph(session_gds: GraphDataScience) -> None:
+        if not uses_base_graph:
+            return
+        with base_graph_lock:
+            ensure_base_graph(session_gds, cfg=cfg, cypher_path=base_projection_cypher, rebuild=False)
+
+    window_kwargs: dict[str, Any] = dict(
+        cfg=cfg,
+        params_hash=params_hash,
+        expand_embeddings=expand_embeddings,
+        skip_existing=skip_existing,
+        max_retries=max_retries,
+        retry_backoff_s=retry_backoff_s,
+        reensure_base_graph=reensure_base_graph,
+        identity=identity,
+        fcr_maps=fcr_maps,
+        calibration_window=calibration,
+        window_concurrency=window_concurrency,
+        dedup=WindowDedupIndex.for_run(cfg, params_hash) if cfg.dedup_windows else None,
+        arrow_store=arrow_store,
+        link_predictor=link_predictor,
+        profiler=profiler,
+    )
+
+    if cfg.dedup_windows and cfg.dedup_invalidate:
+        window_kwargs["dedup"].clear()
 
-    manifest_rows: list[dict[str, Any]] = []
     manifest_path = cfg.output_dir / "manifest" / f"manifest_{params_hash}.parquet"
+    checkpoint = CheckpointLog.for_run(cfg, params_hash)
+    logger.info("Checkpoint log %s: %d windows recorded", checkpoint.path, len(checkpoint))
+    window_kwargs["checkpoint"] = checkpoint
+
+    # Each entry: a window, its post-processing future and its GDS-side timings.
+    scheduled: list[tuple[str, Future[dict[str, Any]], dict[str, Any]]] = []
+    writer = BackgroundWriter(write_queue_size)
+    window_kwargs["writer"] = writer
+
+    def schedule(w: Window, fut: Future[dict[str, Any]], timings: dict[str, Any]) -> None:
+        scheduled.append((window_graph_name_for(w), fut, timings))
+        fut.add_done_callback(lambda done: _checkpoint_window(checkpoint, timings, done))
 
     try:
         logger.info(
-            "Processing %d windows (period_type=%s start_year=%d end_start_year=%d window_size=%d step_size=%d)",
+            "Processing %d windows (period_type=%s start_year=%d end_start_year=%d window_size=%d step_size=%d max_in_flight=%d write_queue_size=%d)",
             len(windows),
             cfg.period_type,
             cfg.start_year,
             cfg.end_start_year,
             cfg.window_size,
             cfg.step_size,
+            max_in_flight,
+            write_queue_size,
         )
-        pbar = tqdm(windows, desc="Rolling windows", unit="window", disable=not show_tqdm)
-        for w in pbar:
-            window_graph_name = f"rw_{w.name_suffix}"
-            node_out_path = cfg.output_dir / "nodes" / f"node_features_{window_graph_name}.parquet"
-            edges_out_path = cfg.output_dir / "edges" / f"edge_list_{window_graph_name}.parquet"
-            if show_tqdm:
-                pbar.set_postfix_str(f"{window_graph_name} | check")
-
-            required_node_cols: set[str] = set()
-            if cfg.export_feature_vectors:
-                required_node_cols.update({"bank_feats", "network_feats", "is_dead"})
-            if cfg.export_feature_blocks:
-                required_node_cols.update(BANK_FEATS_BLOCKS.keys())
-                required_node_cols.add("other_feats")
-            if cfg.run_hashgnn:
-                required_node_cols.add("hash_gnn_embedding")
-            if cfg.run_node2vec:
-                required_node_cols.add("node2vec_embedding")
-
-            need_nodes = True
-            if skip_existing and node_out_path.exists():
-                existing_node_cols = set(pq.ParquetFile(node_out_path).schema_arrow.names)
-                missing_node_cols = required_node_cols.difference(existing_node_cols)
-                if missing_node_cols:
-                    logger.info(
-                        "Existing node parquet is missing required columns %s; recomputing: %s",
-                        sorted(missing_node_cols),
-                        node_out_path,
-                    )
-                else:
-                    need_nodes = False
-
-            need_edges = bool(cfg.export_edges)
-            if need_edges and skip_existing and edges_out_path.exists():
-                required_edge_cols = {
-                    "sourceNodeId",
-                    "targetNodeId",
-                    "relationshipType",
-                    f"source_{cfg.edge_id_property}",
-                    f"target_{cfg.edge_id_property}",
-                }
-                existing_edge_cols = set(pq.ParquetFile(edges_out_path).schema_arrow.names)
-                missing_edge_cols = required_edge_cols.difference(existing_edge_cols)
-                if missing_edge_cols:
-                    logger.info(
-                        "Existing edge parquet is missing required columns %s; recomputing: %s",
-                        sorted(missing_edge_cols),
-                        edges_out_path,
-                    )
-                else:
-                    need_edges = False
-
-            if not need_nodes and not need_edges:
-                if show_tqdm:
-                    pbar.set_postfix_str(f"{window_graph_name} | skip")
-                logger.info(
-                    "Skipping %s (outputs exist): nodes=%s edges=%s",
-                    window_graph_name,
-                    node_out_path,
-                    edges_out_path if cfg.export_edges else "(disabled)",
-                )
-                node_row_count = pq.ParquetFile(node_out_path).metadata.num_rows if node_out_path.exists() else 0
-                edge_row_count = pq.ParquetFile(edges_out_path).metadata.num_rows if edges_out_path.exists() else 0
-                manifest_rows.append(
-                    {
-                        "window_graph_name": window_graph_name,
-                        "window_start_ms": w.start_ms,
-                        "window_end_ms": w.end_ms,
-                        "window_start_year": w.start_year,
-                        "window_end_year_inclusive": w.end_year_inclusive,
-                        "node_count": int(node_row_count),
-                        "edge_count": int(edge_row_count),
-                        "rel_types": list(cfg.rel_types),
-                        "include_imputed01": int(cfg.include_imputed01),
-                        "export_edges": bool(cfg.export_edges),
-                        "edge_id_property": str(cfg.edge_id_property),
-                        "export_feature_vectors": bool(cfg.export_feature_vectors),
-                        "export_feature_blocks": bool(cfg.export_feature_blocks),
-                        "run_hashgnn": bool(cfg.run_hashgnn),
-                        "run_node2vec": bool(cfg.run_node2vec),
-                        "params_hash": params_hash,
-                        "skipped_existing": True,
-                    }
-                )
-                continue
-
-            logger.info(
-                "Window %s (start=%d end=%d): filtering base graph and running algorithms",
-                window_graph_name,
-                w.start_ms,
-                w.end_ms,
-            )
-            if show_tqdm:
-                pbar.set_postfix_str(f"{window_graph_name} | filter+algs")
-            node_filter, rel_filter, base_params = build_filter_predicates(
-                rel_types=cfg.rel_types,
-                include_imputed01=cfg.include_imputed01,
+        if cfg.super_window_years > 0 and uses_base_graph:
+            groups: list[tuple[SuperWindow | None, list[Window]]] = [
+                (sw, list(sw.windows)) for sw in group_super_windows(windows, years=cfg.super_window_years)
+            ]
+            logger.info("Filtering %d windows through %d super-windows", len(windows), len(groups))
+        else:
+            if cfg.super_window_years > 0:
+                logger.warning("super_window_years only applies to window_materialisation=filter_chain; ignoring")
+            groups = [(None, windows)]
+
+        with contextlib.ExitStack() as stack:
+            pbar = stack.enter_context(
+                tqdm(total=len(windows), desc="Rolling windows", unit="window", disable=not show_tqdm)
             )
+            # Super-window graphs are filtered on this session; with one window in flight the windows use it too.
+            session = GdsSession(gds, lambda: connect_gds(neo4j_cfg))
+            if max_in_flight == 1:
+                progress = pbar.set_postfix_str if show_tqdm else None
+            else:
+                pool = stack.enter_context(GdsSessionPool(neo4j_cfg, max_in_flight))
+                executor = stack.enter_context(
+                    ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="gds-window")
+                )
 
-            filter_params = {
-                **base_params,
-                "start": float(w.start_ms),
-                "end": float(w.end_ms),
-            }
-
-            attempt = 0
-            while attempt <= max_retries:
-                temp_graph_name = f"temp_{window_graph_name}"
-                try:
-                    logger.info("Creating window graph %s (attempt %d/%d)", window_graph_name, attempt + 1, max_retries + 1)
-                    
-                    # Ensure clean slate
-                    gds.graph.drop(window_graph_name, failIfMissing=False)
-                    gds.graph.drop(temp_graph_name, failIfMissing=False)
-
-                    # --- PASS 1: Temporal Filter ---
-                    # Includes all Banks/Companies and all Persons active or defaulting (since Persons lack temporal props)
-                    logger.info("Pass 1: Temporal filtering...")
-                    with gds.graph.filter(
-                        temp_graph_name,
-                        base_G,
-                        node_filter,
-                        rel_filter,
-                        parameters=filter_params,
-                        concurrency=cfg.read_concurrency,
-                    ) as temp_G:
-                        
-                        # --- PASS 2: Degree Filter for Persons ---
-                        # Run degree once to find who is actually participant
-                        logger.info("Pass 2: Degree mutation for participants...")
-                        gds.degree.mutate(temp_G, mutateProperty="active_degree", concurrency=cfg.read_concurrency)
-                        
-                        # Final Filter: Keep only connected Persons OR any Bank/Company
-                        # (We keep all banks/companies even if isolates for FCR census)
-                        final_node_filter = "n.active_degree > 0.0 OR n:Bank OR n:Company"
-                        
-                        logger.info("Pass 3: Final participant filtering...")
-                        with gds.graph.filter(
-                            window_graph_name,
-                            temp_G,
-                            final_node_filter,
-                            "*", # Keep all relationships from temp_G
-                            concurrency=cfg.read_concurrency
-                        ) as G:
-                            df = None
-                            df_edges = None
-
-                            if need_nodes:
-                                logger.info("Running window algorithms...")
-                                properties = run_window_algorithms(gds, G, cfg)
-                                logger.info("Algorithms completed.")
-
-                                # Determine properties to fetch from GDS (In-Memory) vs DB
-                                if cfg.export_feature_vectors:
-                                    properties.extend(["is_dead"])
-                                
-                                # Ensure gds_id is streamed for ID merging
-                                properties.append("gds_id")
-                                
-                                properties = _unique_preserve_order(properties)
-                                
-                                db_node_props = [cfg.id_property]
-                                if cfg.export_edges and cfg.edge_id_property != cfg.id_property:
-                                    db_node_props.append(cfg.edge_id_property)
-                                
-                                if cfg.export_feature_vectors:
-                                    db_node_props.extend(["bank_feats", "network_feats"])
-                                elif cfg.export_feature_blocks:
-                                    db_node_props.append("bank_feats")
-                                
-                                logger.info("Streaming node properties...")
-                                df = gds.graph.nodeProperties.stream(
-                                    G,
-                                    properties,
-                                    separate_property_columns=True,
-                                    db_node_properties=db_node_props,
-                                    listNodeLabels=True,
-                                )
-                                logger.info("Node streaming completed. Shape: %s", df.shape if df is not None else "None")
-
-                            if need_edges:
-                                logger.info("Exporting edges...")
-                                df_edges = export_window_edges(
-                                    gds,
-                                    G,
-                                    rel_types=cfg.rel_types,
-                                    edge_id_property=cfg.edge_id_property,
-                                )
-                                logger.info("Edge export completed. Shape: %s", df_edges.shape if df_edges is not None else "None")
-
-                            # --- Resilient Post-Processing (Inside attempt loop) ---
-                            
-                            # Merge IDs from Cypher using gds_id (Robust fallback)
-                            logger.info("Fetching Node IDs via Cypher (using gds_id match)...")
-                            id_query = f"""
-                            MATCH (n)
-                            RETURN id(n) as gds_id, coalesce(n.Id, n.neo4jImportId, "GDS_" + toString(id(n))) as entity_id
-                            """
-                            ids_df = gds.run_cypher(id_query)
-                            ids_df["gds_id"] = ids_df["gds_id"].astype("int64")
-
-                            # Merge
-                            if df is not None:
-                                if "gds_id" in df.columns:
-                                    df["gds_id"] = df["gds_id"].astype("int64")
-                                    df = df.merge(ids_df, on="gds_id", how="left")
-                                else:
-                                    logger.error("gds_id missing from dataframe! Cannot merge IDs.")
-
-                                missing_ids = df["entity_id"].isna().sum() if "entity_id" in df.columns else len(df)
-                                if missing_ids > 0:
-                                    logger.warning("Merged %d nodes, but %d have missing entity_id", len(df), missing_ids)
-                            
-                            if df is not None and "entity_id" in df.columns:
-                                sample_ids = df["entity_id"].dropna().head().tolist()
-                                logger.info("IDs fetched successfully. Sample: %s", sample_ids)
-
-                            # Compute FCR
-                            node_count = 0
-                            edge_count = 0
-
-                            if df is not None:
-                                df["window_start_ms"] = w.start_ms
-                                df["window_end_ms"] = w.end_ms
-                                df["window_start_year"] = w.start_year
-                                df["window_end_year_inclusive"] = w.end_year_inclusive
-                                df["window_graph_name"] = window_graph_name
-                                df["params_hash"] = params_hash
-
-                                # Degrees & Labels
-                                if "in_degree" in df.columns and "out_degree" in df.columns:
-                                    df["total_degree"] = df["in_degree"] + df["out_degree"]
-                                
-                                # FCR calculation
-                                logger.info("Computing FCR temporal via Cypher...")
-                                fcr_map = compute_fcr_temporal(gds, cfg, w.start_ms, w.end_ms)
-                                if fcr_map:
-                                    # Use gds_id (Persistent Internal ID) to map FCR for robustness
-                                    df["fcr_temporal"] = df["gds_id"].map(fcr_map).fillna(0.0)
-                                    applied = df["fcr_temporal"].gt(0).sum()
-                                    logger.info("Applied fcr_temporal to %d nodes", applied)
-                                else:
-                                    df["fcr_temporal"] = 0.0
-
-                                # --- Feature Transformations ---
-                                if "fastrp_embedding" in df.columns:
-                                    df = coerce_float_list_column(df, column="fastrp_embedding")
-                                if "hash_gnn_embedding" in df.columns:
-                                    df = coerce_float_list_column(df, column="hash_gnn_embedding")
-                                if "node2vec_embedding" in df.columns:
-                                    df = coerce_float_list_column(df, column="node2vec_embedding")
-
-                                if cfg.export_feature_vectors:
-                                    df = coerce_float_list_column(df, column="bank_feats")
-                                    df = coerce_float_list_column(df, column="network_feats")
-                                    
-                                    # Fill missing bank_feats (e.g. for Persons) with zeros for slicing
-                                    if "bank_feats" in df.columns:
-                                        zero_vec = [0.0] * BANK_FEATS_DIM
-                                        df["bank_feats"] = df["bank_feats"].apply(lambda x: zero_vec if x is None or (isinstance(x, list) and not x) else x)
-
-                                if cfg.export_feature_blocks and "bank_feats" in df.columns:
-                                    for block_name, indices in BANK_FEATS_BLOCKS.items():
-                                        df = slice_vector_column(
-                                            df,
-                                            column="bank_feats",
-                                            indices=indices,
-                                            out_column=block_name,
-                                            expected_dim=BANK_FEATS_DIM,
-                                        )
-                                    df = slice_vector_column(
-                                        df,
-                                        column="bank_feats",
-                                        indices=other_bank_feats_indices(),
-                                        out_column="other_feats",
-                                        expected_dim=BANK_FEATS_DIM,
-                                    )
-
-                                if expand_embeddings and "fastrp_embedding" in df.columns:
-                                    emb_df = expand_embedding_column(
-                                        df[["fastrp_embedding"]],
-                                        column="fastrp_embedding",
-                                        dim=cfg.embedding_dimension,
-                                        prefix="emb_",
-                                    )
-                                    df = pd.concat([df, emb_df], axis=1)
-
-                                if show_tqdm:
-                                    pbar.set_postfix_str(f"{window_graph_name} | write_nodes")
-                                logger.info("Writing %s (rows=%d cols=%d)", node_out_path, df.shape[0], df.shape[1])
-                                write_parquet(df, node_out_path)
-                                node_count = int(df.shape[0])
-
-                            if df_edges is not None:
-                                df_edges["window_start_ms"] = w.start_ms
-                                df_edges["window_end_ms"] = w.end_ms
-                                df_edges["window_start_year"] = w.start_year
-                                df_edges["window_end_year_inclusive"] = w.end_year_inclusive
-                                df_edges["window_graph_name"] = window_graph_name
-                                df_edges["params_hash"] = params_hash
-                                df_edges["edge_id_property"] = str(cfg.edge_id_property)
-
-                                if show_tqdm:
-                                    pbar.set_postfix_str(f"{window_graph_name} | write_edges")
-                                logger.info("Writing %s (rows=%d cols=%d)", edges_out_path, df_edges.shape[0], df_edges.shape[1])
-                                write_parquet(df_edges, edges_out_path)
-                                edge_count = int(df_edges.shape[0])
-
-                            # Link Prediction
-                            if cfg.run_link_prediction and df is not None and df_edges is not None:
-                                try:
-                                    predicted_edges = run_link_prediction_workflow(gds, cfg, window_graph_name, df, df_edges)
-                                    if predicted_edges is not None and not predicted_edges.empty:
-                                        pred_path = cfg.output_dir / "predicted_edges" / f"predicted_edges_{window_graph_name}.parquet"
-                                        pred_path.parent.mkdir(parents=True, exist_ok=True)
-                                        write_parquet(predicted_edges, pred_path)
-                                        logger.info("Saved %d predicted edges to %s", len(predicted_edges), pred_path)
-                                except Exception as lp_err:
-                                    logger.error("Link prediction failed for %s: %s", window_graph_name, lp_err)
-
-                            # Record in manifest
-                            manifest_rows.append(
-                                {
-                                    "window_graph_name": window_graph_name,
-                                    "window_start_ms": w.start_ms,
-                                    "window_end_ms": w.end_ms,
-                                    "window_start_year": w.start_year,
-                                    "window_end_year_inclusive": w.end_year_inclusive,
-                                    "node_count": int(node_count),
-                                    "edge_count": int(edge_count),
-                                    "rel_types": list(cfg.rel_types),
-                                    "include_imputed01": int(cfg.include_imputed01),
-                                    "export_edges": bool(cfg.export_edges),
-                                    "edge_id_property": str(cfg.edge_id_property),
-                                    "export_feature_vectors": bool(cfg.export_feature_vectors),
-                                    "export_feature_blocks": bool(cfg.export_feature_blocks),
-                                    "run_hashgnn": bool(cfg.run_hashgnn),
-                                    "run_node2vec": bool(cfg.run_node2vec),
-                                    "params_hash": params_hash,
-                                    "skipped_existing": False,
-                                }
-                            )
-
-                            break # Success! Exit retry loop
-
-                except (ServiceUnavailable, SessionExpired, ClientError, GqlError) as e:
-                    attempt += 1
-                    if attempt > max_retries:
-                        logger.exception("Window %s failed after %d retries", window_graph_name, max_retries)
-                        raise
-                    
-                    # If it's a ClientError, check if it's "GraphNotFound" which is often transient due to session drop
-                    err_msg = str(e)
-                    is_graph_not_found = "GraphNotFoundException" in err_msg or "does not exist" in err_msg
-                    
-                    logger.warning(
-                        "Transient Neo4j error for %s (attempt %d/%d, is_gnf=%s): %s; retrying in %.1fs",
-                        window_graph_name,
-                        attempt,
-                        max_retries,
-                        is_graph_not_found,
-                        err_msg,
-                        retry_backoff_s * (2 ** (attempt - 1)),
+                def run_one(
+                    w: Window, submitted: float, source: str | None
+                ) -> tuple[Window, Future[dict[str, Any]], dict[str, Any]]:
+                    # queue_time_s: until a pooled session was free; wall_time_s: filter, algorithms, streaming.
+                    with pool.session() as window_session:
+                        started = time.perf_counter()
+                        fut = _process_window(window_session, w, source_graph_name=source, **window_kwargs)
+                    return w, fut, {"queue_time_s": started - submitted, "wall_time_s": time.perf_counter() - started}
+
+            for sw, group in groups:
+                needed = any(
+                    _window_needs_work(
+                        cfg, w, params_hash=params_hash, checkpoint=checkpoint, skip_existing=skip_existing
                     )
-                    # Re-connect
-                    try:
-                        logger.info("Re-establishing GDS connection...")
-                        gds = connect_gds(neo4j_cfg)
-                        # Re-ensure base graph (crucial if DB restarted)
-                        ensure_base_graph(gds, cfg=cfg, cypher_path=base_projection_cypher, rebuild=False)
-                        base_G = gds.graph.get(cfg.base_graph_name)
-                    except Exception as conn_err:
-                        logger.error("Failed to re-establish connection: %s", conn_err)
-                    
-                    time.sleep(retry_backoff_s * (2 ** (attempt - 1)))
-                finally:
-                    # Robust cleanup: Always ensure temporary graphs are dropped
-                    gds.graph.drop(temp_graph_name, failIfMissing=False)
-                    # We do NOT drop window_graph_name here because we need it if we didn't finish algorithms?
-                    # Actually, if we are in the 'finally' of the loop iteration, we should drop it IF we are done or failed.
-                    # But the 'with' statement handles it. 
-                    pass
-
-
-
-
+                    for w in group
+                )
+                with super_window_graph(
+                    session,
+                    sw,
+                    cfg=cfg,
+                    needed=needed,
+                    max_retries=max_retries,
+                    retry_backoff_s=retry_backoff_s,
+                    reensure_base_graph=reensure_base_graph,
+                    profiler=profiler,
+                ) as (source, super_stats):
+                    if max_in_flight == 1:
+                        for w in group:
+                            t0 = time.perf_counter()
+                            fut = _process_window(session, w, source_graph_name=source, progress=progress, **window_kwargs)
+                            schedule(w, fut, {"queue_time_s": 0.0, "wall_time_s": time.perf_counter() - t0, **super_stats})
+                            pbar.update(1)
+                    else:
+                        # The super-window graph is dropped only after all of its windows are materialised.
+                        futures = [executor.submit(run_one, w, time.perf_counter(), source) for w in group]
+                        try:
+                            for fut in as_completed(futures):
+                                w, window_fut, timings = fut.result()
+                                schedule(w, window_fut, {**timings, **super_stats})
+                                pbar.update(1)
+                        except BaseException:
+                            for fut in futures:
+                                fut.cancel()
+                            raise
+
+        writer.close()  # surfaces post-processing failures
     finally:
-        manifest = pd.DataFrame(manifest_rows)
-        logger.info("Writing manifest: %s (windows=%d)", manifest_path, manifest.shape[0])
-        write_parquet(manifest, manifest_path)
+        # Windows that finished streaming are always written and logged before compaction, even on interrupt.
+        writer.close(raise_errors=False)
+        for window_graph_name, fut, _ in scheduled:
+            if fut.exception() is not None:
+                logger.error("Post-processing of %s failed: %s", window_graph_name, fut.exception())
+                checkpoint.append(window_graph_name, status="failed", error=str(fut.exception()))
+        log_dedup_rate(checkpoint.compact(manifest_path))
+        if cfg.bank_panel:
+            compact_bank_panel(
+                cfg,
+                params_hash,
+                node_paths={
+                    name: window_output_paths(cfg, name, params_hash=params_hash)[0]
+                    for name in map(window_graph_name_for, windows)
+                },
+                regn_lookup=lambda: _identity_regn_lookup(identity),
+            )
+        profiler.close(mlflow_experiment=cfg.profile_mlflow_experiment)
@@ -0,0 +1,304 @@
+"""
+Pre-flight planning of a GDS run.
+
+Window graphs range from a few thousand nodes (1990s) to the whole database
+(2010s), so one ``read_concurrency`` is either too cautious for the small
+windows or runs the large ones out of heap. Before anything is projected,
+``plan_run``:
+
+1. counts the temporally active nodes and relationships of every window in
+   one vectorised pass over their intervals (``TemporalCounts``, fetched once
+   via Cypher or taken from a local snapshot). The counts ignore the
+   participant rule, so they are an upper bound of the window graph size;
+2. asks GDS for a memory estimate of each configured algorithm on a
+   fictitious graph of that size (``GdsMemoryEstimator``) and picks the
+   highest concurrency, halving from ``read_concurrency``, whose peak fits the
+   per-window budget (the heap budget divided by ``max_in_flight``);
+3. orders the windows largest-first by estimated work, so the heaviest
+   windows never end up as stragglers.
+
+The plan is written to ``plan/plan_{params_hash}.parquet`` and logged as a
+table; ``run_windows`` then follows its order and per-window concurrency.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+import numpy as np
+import pandas as pd
+from graphdatascience import GraphDataScience
+
+from approximation import betweenness_sample_size, is_approximate
+from config import RollingWindowConfig
+from dates import Window
+from frames import window_graph_name_for
+from parquet import write_parquet
+
+if TYPE_CHECKING:
+    from local_engine import TemporalSnapshot
+
+logger = logging.getLogger(__name__)
+
+PLAN_DIRNAME = "plan"
+# Share of the free GDS heap a run may plan for when no explicit budget is configured.
+HEAP_HEADROOM = 0.8
+_BYTES_PER_GB = 1 << 30
+
+# (node_count, relationship_count, concurrency) -> peak bytes
+MemoryEstimator = Callable[[int, int, int], int]
+
+
+@dataclass(frozen=True)
+class TemporalCounts:
+    """Temporal bounds of the base-graph nodes and relationships; NaN bounds are open-ended."""
+
+    node_start: np.ndarray
+    node_end: np.ndarray
+    rel_start: np.ndarray
+    rel_end: np.ndarray
+
+    @classmethod
+    def fetch(cls, gds: GraphDataScience, cfg: RollingWindowConfig) -> "TemporalCounts":
+        """Pull the node and relationship bounds of the base projection once."""
+        logger.info("Fetching node/relationship intervals for the pre-flight plan...")
+        nodes = gds.run_cypher(
+            """
+            MATCH (n:Bank|Company|Person)
+            RETURN toFloat(n.temporal_start) AS start, toFloat(n.temporal_end) AS end
+            """
+        )
+        rels = gds.run_cypher(
+            """
+            MATCH (:Bank|Company|Person)-[r]->(:Bank|Company|Person)
+            WHERE type(r) IN $relTypes
+              AND (type(r) <> 'FAMILY' OR $includeImputed01 = 1 OR coalesce(r.imputed_flag, 0.0) = 0.0)
+            RETURN toFloat(r.temporal_start) AS start, toFloat(r.temporal_end) AS end
+            """,
+            params={"relTypes": list(cfg.rel_types), "includeImputed01": int(cfg.include_imputed01)},
+        )
+        return cls(
+            node_start=nodes["start"].to_numpy(dtype=np.float64),
+            node_end=nodes["end"].to_numpy(dtype=np.float64),
+            rel_start=rels["start"].to_numpy(dtype=np.float64),
+            rel_end=rels["end"].to_numpy(dtype=np.float64),
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "TemporalSnapshot", cfg: RollingWindowConfig) -> "TemporalCounts":
+        """The same bounds from a local base-graph snapshot."""
+        rels = snapshot.rels
+        rel_type = rels["relationshipType"].to_numpy()
+        keep = np.isin(rel_type, list(cfg.rel_types))
+        if not cfg.include_imputed01:
+            keep &= (rel_type != "FAMILY") | (rels["imputedFlag"].to_numpy() == 0.0)
+        return cls(
+            node_start=snapshot.nodes["temporal_start"].to_numpy(dtype=np.float64),
+            node_end=snapshot.nodes["temporal_end"].to_numpy(dtype=np.float64),
+            rel_start=rels["temporal_start"].to_numpy(dtype=np.float64)[keep],
+            rel_end=rels["temporal_end"].to_numpy(dtype=np.float64)[keep],
+        )
+
+    def counts(self, windows: list[Window]) -> pd.DataFrame:
+        """Active node and relationship counts per window."""
+        window_start = np.array([w.start_ms for w in windows], dtype=np.float64)
+        window_end = np.array([w.end_ms for w in windows], dtype=np.float64)
+        return pd.DataFrame(
+            {
+                "window_graph_name": [window_graph_name_for(w) for w in windows],
+                "window_start_ms": [w.start_ms for w in windows],
+                "window_end_ms": [w.end_ms for w in windows],
+                "node_count": _count_active(self.node_start, self.node_end, window_start, window_end),
+                "relationship_count": _count_active(self.rel_start, self.rel_end, window_start, window_end),
+            }
+        )
+
+
+def _count_active(start: np.ndarray, end: np.ndarray, window_start: np.ndarray, window_end: np.ndarray) -> np.ndarray:
+    """
+    Number of intervals with ``start < window_end AND end > window_start`` per window.
+
+    With ``start <= end`` an interval ending at or before the window start also
+    starts before the window end, so the count is a difference of two
+    ``searchsorted`` calls. Inverted intervals are widened to ``end = start``.
+    """
+    start = np.where(np.isnan(start), -np.inf, start)
+    end = np.maximum(np.where(np.isnan(end), np.inf, end), start)
+    started = np.searchsorted(np.sort(start), window_end, side="left")
+    ended = np.searchsorted(np.sort(end), window_start, side="right")
+    return (started - ended).astype(np.int64)
+
+
+class GdsMemoryEstimator:
+    """
+    Peak GDS memory of the configured algorithms on a window graph of a given size.
+
+    Each algorithm's ``mutate.estimate`` runs on a fictitious graph with the
+    window's node and relationship counts; the peak is the largest
+    ``bytesMax`` (which includes the graph itself) plus all the properties
+    the algorithms mutate onto the graph.
+    HashGNN is not estimated: it needs its feature properties on the graph.
+    """
+
+    def __init__(self, gds: GraphDataScience, cfg: RollingWindowConfig):
+        self.gds = gds
+        self.cfg = cfg
+
+    def procedures(self, node_count: int) -> list[tuple[str, dict[str, Any]]]:
+        cfg = self.cfg
+        procs: list[tuple[str, dict[str, Any]]] = [
+            ("pageRank", {"maxIterations": cfg.pagerank_max_iterations}),
+            ("degree", {}),
+        ]
+        if is_approximate(cfg):
+            procs.append(("betweenness", {"samplingSize": max(betweenness_sample_size(node_count, cfg), 1)}))
+        else:
+            procs.extend([("betweenness", {}), ("closeness", {})])
+        procs.append(("eigenvector", {"maxIterations": cfg.eigenvector_max_iterations}))
+        if cfg.run_wcc:
+            procs.append(("wcc", {}))
+        if cfg.run_louvain:
+            procs.append(("louvain", {"maxIterations": cfg.louvain_max_iterations, "includeIntermediateCommunities": True}))
+        if cfg.run_fastrp:
+            procs.append(("fastRP", {"embeddingDimension": cfg.embedding_dimension}))
+        if cfg.run_node2vec:
+            procs.append(("node2vec", {"embeddingDimension": cfg.node2vec_embedding_dimension}))
+        return procs
+
+    def mutated_property_bytes(self, node_count: int) -> int:
+        cfg = self.cfg
+        scalar_properties = 8  # page_rank, degrees, betweenness, closeness, eigenvector, wcc, ...
+        per_node = 8 * scalar_properties
+        if cfg.run_louvain:
+            per_node += 8 * cfg.louvain_max_iterations
+        if cfg.run_fastrp:
+            per_node += 4 * cfg.embedding_dimension
+        if cfg.run_node2vec:
+            per_node += 4 * cfg.node2vec_embedding_dimension
+        if cfg.run_hashgnn:
+            per_node += 8 * cfg.hashgnn_output_dimension
+        return int(node_count) * per_node
+
+    def __call__(self, node_count: int, relationship_count: int, concurrency: int) -> int:
+        graph = {
+            "nodeCount": int(node_count),
+            "relationshipCount": int(relationship_count),
+            "nodeProjection": "*",
+            "relationshipProjection": "*",
+        }
+        peak = 0
+        for proc, config in self.procedures(node_count):
+            result = self.gds.run_cypher(
+                f"CALL gds.{proc}.mutate.estimate($graph, $config) YIELD bytesMax RETURN bytesMax",
+                params={"graph": graph, "config": {**config, "mutateProperty": "_estimate", "concurrency": int(concurrency)}},
+            )
+            peak = max(peak, int(result["bytesMax"].iloc[0]))
+        return peak + self.mutated_property_bytes(node_count)
+
+
+def gds_memory_budget_bytes(gds: GraphDataScience, cfg: RollingWindowConfig) -> int:
+    """``cfg.gds_memory_budget_gb``, or ``HEAP_HEADROOM`` of the free GDS heap."""
+    if cfg.gds_memory_budget_gb is not None:
+        return int(cfg.gds_memory_budget_gb * _BYTES_PER_GB)
+    free_heap = int(gds.run_cypher("CALL gds.systemMonitor() YIELD freeHeap RETURN freeHeap")["freeHeap"].iloc[0])
+    return int(free_heap * HEAP_HEADROOM)
+
+
+def concurrency_candidates(max_concurrency: int) -> list[int]:
+    """``max_concurrency`` halved down to 1, highest first."""
+    out = [max(int(max_concurrency), 1)]
+    while out[-1] > 1:
+        out.append(out[-1] // 2)
+    return out
+
+
+def plan_windows(
+    counts: pd.DataFrame,
+    *,
+    estimate_bytes: MemoryEstimator,
+    budget_bytes: int,
+    max_concurrency: int,
+) -> pd.DataFrame:
+    """
+    Pick a concurrency per window and the processing order.
+
+    ``counts`` is ``TemporalCounts.counts`` output. Each window gets the
+    highest candidate concurrency whose estimate fits ``budget_bytes``;
+    windows that do not fit even at concurrency 1 keep it and are flagged
+    ``fits_budget=False``. Rows come back in processing order (``order``):
+    descending ``relative_cost``, the ``n * (n + m)`` BFS work of exact
+    betweenness/closeness.
+    """
+    rows: list[dict[str, Any]] = []
+    for rec in counts.to_dict("records"):
+        n, m = int(rec["node_count"]), int(rec["relationship_count"])
+        chosen, estimated = 1, 0
+        for concurrency in concurrency_candidates(max_concurrency):
+            chosen, estimated = concurrency, int(estimate_bytes(n, m, concurrency))
+            if estimated <= budget_bytes:
+                break
+        rows.append(
+            {
+                **rec,
+                "relative_cost": float(n) * float(n + m),
+                "estimated_bytes": estimated,
+                "budget_bytes": int(budget_bytes),
+                "concurrency": chosen,
+                "fits_budget": estimated <= budget_bytes,
+            }
+        )
+
+    plan = pd.DataFrame(rows)
+    if plan.empty:
+        return plan
+    plan = plan.sort_values(["relative_cost", "window_start_ms"], ascending=[False, True], kind="stable")
+    plan = plan.reset_index(drop=True)
+    plan.insert(0, "order", np.arange(len(plan)))
+    return plan
+
+
+def log_plan(plan: pd.DataFrame) -> None:
+    if plan.empty:
+        logger.info("Pre-flight plan: no windows")
+        return
+    view = plan[["order", "window_graph_name", "node_count", "relationship_count", "estimated_bytes", "concurrency", "fits_budget"]]
+    view = view.assign(estimated_gb=(plan["estimated_bytes"] / _BYTES_PER_GB).round(2)).drop(columns="estimated_bytes")
+    logger.info(
+        "Pre-flight plan (budget %.2f GB per window):\n%s",
+        plan["budget_bytes"].iloc[0] / _BYTES_PER_GB,
+        view.to_string(index=False),
+    )
+    over = plan.loc[~plan["fits_budget"], "window_graph_name"].tolist()
+    if over:
+        logger.warning("Windows over the memory budget even at concurrency 1: %s", ", ".join(over))
+
+
+def plan_path(cfg: RollingWindowConfig, params_hash: str) -> Path:
+    return cfg.output_dir / PLAN_DIRNAME / f"plan_{params_hash}.parquet"
+
+
+def plan_run(
+    gds: GraphDataScience,
+    cfg: RollingWindowConfig,
+    windows: list[Window],
+    *,
+    params_hash: str,
+    max_in_flight: int = 1,
+) -> pd.DataFrame:
+    """Count, estimate and order ``windows``; writes and logs the plan before anything is projected."""
+    counts = TemporalCounts.fetch(gds, cfg).counts(windows)
+    budget = gds_memory_budget_bytes(gds, cfg) // max(int(max_in_flight), 1)
+    plan = plan_windows(
+        counts,
+        estimate_bytes=GdsMemoryEstimator(gds, cfg),
+        budget_bytes=budget,
+        max_concurrency=cfg.read_concurrency,
+    )
+    path = plan_path(cfg, params_hash)
+    logger.info("Writing pre-flight plan: %s (windows=%d)", path, len(plan))
+    write_parquet(plan, path)
+    log_plan(plan)
+    return plan
@@ -0,0 +1,262 @@
+"""
+Per-stage profiling of a rolling-window run.
+
+With ``RollingWindowConfig.profile_stages`` every stage of every window
+(materialisation, each algorithm, node streaming, FCR, frame finalisation,
+Parquet writes, ...) appends one JSON line to
+``profile/trace_{run_id}.jsonl`` as it finishes, recording its wall time, the
+rows it produced, the process RSS after it and how far it raised the peak
+RSS. ``StageProfiler.close`` writes the run's trace as
+``profile/trace_{run_id}.parquet``, logs the hottest stages and, with
+``profile_mlflow_experiment``, logs per-window stage times and per-stage
+totals as MLflow metrics through ``mlflow_utils.tracking``.
+
+Stages do not nest, so the wall times of a window add up to its traced time.
+RSS figures are per process: with several windows in flight on threads (GDS
+engine) a stage's peak growth may be caused by a concurrent window, and GDS
+algorithms use server memory, which is not visible here (see ``planner``).
+
+``summarise_trace`` ranks the stages of one or more traces by total wall time;
+``run_pipeline.py --profile-summary TRACE`` prints it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+import pandas as pd
+
+from config import RollingWindowConfig
+from parquet import write_parquet
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIRNAME = "profile"
+# ``window_graph_name`` of the stages that serve the whole run (base graph, bulk FCR, ...).
+RUN_SCOPE = "run"
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def peak_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * _MAXRSS_UNIT
+
+
+def current_rss_bytes() -> int | None:
+    """Resident set size of this process (Linux only; ``None`` elsewhere)."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _delta(after: int | None, before: int | None) -> int | None:
+    return after - before if after is not None and before is not None else None
+
+
+class StageProfiler:
+    """
+    Trace writer of one run; a profiler without a ``trace_path`` records nothing.
+
+    Safe to use from several threads, and picklable so that worker processes
+    of the local engine append to the same trace.
+    """
+
+    def __init__(self, trace_path: Path | None, *, run_id: str = "", params_hash: str = "", engine: str = ""):
+        self.trace_path = trace_path
+        self.run_id = run_id
+        self.params_hash = params_hash
+        self.engine = engine
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_run(cls, cfg: RollingWindowConfig, params_hash: str, *, engine: str) -> "StageProfiler":
+        if not cfg.profile_stages:
+            return NO_PROFILER
+        run_id = f"{params_hash[:12]}_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{os.getpid()}"
+        trace_path = cfg.output_dir / PROFILE_DIRNAME / f"trace_{run_id}.jsonl"
+        logger.info("Profiling stages to %s", trace_path)
+        return cls(trace_path, run_id=run_id, params_hash=params_hash, engine=engine)
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.trace_path is not None
+
+    def window(self, window_graph_name: str) -> "WindowTrace":
+        return WindowTrace(self, window_graph_name)
+
+    @contextmanager
+    def stage(self, window_graph_name: str, stage: str, *, category: str) -> Iterator[dict[str, Any]]:
+        """
+        Time the body as ``stage`` of ``window_graph_name``.
+
+        Yields a dict in which the body may set ``rows`` (and any other
+        scalar attribute to record with the stage).
+        """
+        span: dict[str, Any] = {}
+        if not self.enabled:
+            yield span
+            return
+        started_at = time.time()
+        rss_before = current_rss_bytes()
+        peak_before = peak_rss_bytes()
+        t0 = time.perf_counter()
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            wall_time_s = time.perf_counter() - t0
+            rss_after = current_rss_bytes()
+            peak_after = peak_rss_bytes()
+            self._append(
+                {
+                    "run_id": self.run_id,
+                    "params_hash": self.params_hash,
+                    "engine": self.engine,
+                    "window_graph_name": window_graph_name,
+                    "category": category,
+                    "stage": stage,
+                    "started_at": started_at,
+                    "wall_time_s": wall_time_s,
+                    "rows": span.pop("rows", None),
+                    "rss_bytes": rss_after,
+                    "rss_delta_bytes": _delta(rss_after, rss_before),
+                    "peak_rss_bytes": peak_after,
+                    "peak_rss_growth_bytes": _delta(peak_after, peak_before),
+                    "pid": os.getpid(),
+                    "thread": threading.current_thread().name,
+                    "error": error,
+                    **span,
+                }
+            )
+
+    def _append(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, default=str, separators=(",", ":")) + "\n"
+        with self._lock:
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+            # One write per line in append mode, so lines from worker processes do not interleave.
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def close(self, *, mlflow_experiment: str | None = None, top: int = 10) -> pd.DataFrame:
+        """Write the run's trace as Parquet, log its hottest stages and optionally log it to MLflow."""
+        if not self.enabled or not self.trace_path.exists():
+            return pd.DataFrame()
+        trace = load_trace(self.trace_path)
+        parquet_path = self.trace_path.with_suffix(".parquet")
+        logger.info("Writing stage trace: %s (stages=%d)", parquet_path, trace.shape[0])
+        write_parquet(trace, parquet_path)
+        summary = summarise_trace(trace)
+        logger.info("Hottest stages of run %s:\n%s", self.run_id, summary.head(top).to_string(index=False))
+        if mlflow_experiment:
+            log_trace_to_mlflow(trace, summary, experiment_name=mlflow_experiment, run_id=self.run_id)
+        return trace
+
+
+class WindowTrace:
+    """``StageProfiler.stage`` bound to one window, handed to the code that processes it."""
+
+    def __init__(self, profiler: StageProfiler, window_graph_name: str):
+        self.profiler = profiler
+        self.window_graph_name = window_graph_name
+
+    def stage(self, stage: str, *, category: str = "stage"):
+        return self.profiler.stage(self.window_graph_name, stage, category=category)
+
+
+NO_PROFILER = StageProfiler(None)
+NO_TRACE = NO_PROFILER.window("")
+
+
+def load_trace(path: Path) -> pd.DataFrame:
+    """A trace written by ``StageProfiler`` (``.jsonl`` or ``.parquet``), or a directory of Parquet traces."""
+    path = Path(path)
+    if path.is_dir():
+        return pd.concat([pd.read_parquet(p) for p in sorted(path.glob("trace_*.parquet"))], ignore_index=True)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    records: list[dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A killed run can leave a truncated last line.
+                continue
+    return pd.DataFrame(records)
+
+
+def summarise_trace(trace: pd.DataFrame) -> pd.DataFrame:
+    """One row per ``(category, stage)``, hottest first: call counts, wall-time distribution, rows and RSS."""
+    if trace.empty:
+        return pd.DataFrame()
+    rows = pd.to_numeric(trace["rows"], errors="coerce")
+    grouped = trace.assign(rows=rows).groupby(["category", "stage"], sort=False)
+    summary = grouped.agg(
+        calls=("wall_time_s", "size"),
+        windows=("window_graph_name", "nunique"),
+        total_wall_s=("wall_time_s", "sum"),
+        mean_wall_s=("wall_time_s", "mean"),
+        p95_wall_s=("wall_time_s", lambda s: float(s.quantile(0.95))),
+        max_wall_s=("wall_time_s", "max"),
+        rows=("rows", "sum"),
+        max_peak_rss_bytes=("peak_rss_bytes", "max"),
+        peak_rss_growth_bytes=("peak_rss_growth_bytes", "sum"),
+    ).reset_index()
+    summary["share_of_wall"] = summary["total_wall_s"] / float(trace["wall_time_s"].sum() or 1.0)
+    summary["rows_per_s"] = summary["rows"] / summary["total_wall_s"].where(summary["total_wall_s"] > 0)
+    return summary.sort_values("total_wall_s", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def log_trace_to_mlflow(trace: pd.DataFrame, summary: pd.DataFrame, *, experiment_name: str, run_id: str) -> None:
+    """Per-window stage wall times (one step per window, in start order) and per-stage totals."""
+    from mlflow_utils.tracking import log_metrics_run
+
+    order = trace.groupby("window_graph_name")["started_at"].min().sort_values().index
+    per_window = trace.pivot_table(index="window_graph_name", columns="stage", values="wall_time_s", aggfunc="sum")
+    metrics_by_step: dict[int | None, dict[str, float]] = {
+        step: {f"stage.{stage}.wall_time_s": float(v) for stage, v in per_window.loc[name].dropna().items()}
+        for step, name in enumerate(order)
+    }
+    metrics_by_step[None] = {
+        f"total.{row.stage}.{key}": float(getattr(row, key))
+        for row in summary.itertuples(index=False)
+        for key in ("total_wall_s", "share_of_wall")
+    }
+    log_metrics_run(
+        experiment_name,
+        run_name=f"profile_{run_id}",
+        metrics_by_step=metrics_by_step,
+        params={"run_id": run_id, "params_hash": trace["params_hash"].iloc[0], "engine": trace["engine"].iloc[0]},
+    )
@@ -8,9 +8,18 @@ import sys
 # Add project root to sys.path to allow importing mlflow_utils
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+from arrow_stream import benchmark_streaming_paths
+from checkpoint import CheckpointLog
 from config import RollingWindowConfig, load_neo4j_config, parse_rel_types
 from gds_client import connect_gds
+from dataset import OUTPUT_LAYOUTS
+from hashing import stable_hash_dict
+from metrics import gds_config_metadata
 from pipeline import run_windows
+from profiling import load_trace, summarise_trace
+from sim_name import DEFAULT_WRITE_BATCH_SIZE, precompute_sim_name, sim_name_path
+from local_engine import SNAPSHOT_META_FILE, export_base_snapshot, run_windows_local
+from vectors import VECTOR_STORAGES
 
 try:
     import yaml
@@ -105,6 +114,97 @@ def _build_parser() -> argparse.ArgumentParser:
 
     p.add_argument("--embedding-dimension", type=int, default=128, help="FastRP embedding dimension.")
     p.add_argument("--embedding-random-seed", type=int, default=42, help="FastRP random seed.")
+
+    p.add_argument("--pagerank-max-iterations", type=int, default=defaults.pagerank_max_iterations, help="PageRank iteration cap.")
+    p.add_argument("--pagerank-tolerance", type=float, default=defaults.pagerank_tolerance, help="PageRank convergence tolerance.")
+    p.add_argument(
+        "--eigenvector-max-iterations",
+        type=int,
+        default=defaults.eigenvector_max_iterations,
+        help="Eigenvector centrality iteration cap.",
+    )
+    p.add_argument(
+        "--eigenvector-tolerance",
+        type=float,
+        default=defaults.eigenvector_tolerance,
+        help="Eigenvector centrality convergence tolerance.",
+    )
+    p.add_argument(
+        "--louvain-max-iterations",
+        type=int,
+        default=defaults.louvain_max_iterations,
+        help="Louvain iteration cap per level.",
+    )
+    p.add_argument("--louvain-tolerance", type=float, default=defaults.louvain_tolerance, help="Louvain modularity tolerance.")
+    p.add_argument(
+        "--warm-start",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Seed PageRank/eigenvector/Louvain from the previous window (--engine local).",
+    )
+    p.add_argument(
+        "--window-materialisation",
+        choices=["filter_chain", "single_pass"],
+        default=defaults.window_materialisation,
+        help=(
+            "How GDS window graphs are built: filter_chain (filter the base graph twice) or single_pass "
+            "(one Cypher projection of the participant graph; no temp graph and no base graph)."
+        ),
+    )
+    p.add_argument(
+        "--super-window-years",
+        type=int,
+        default=defaults.super_window_years,
+        help=(
+            "Filter the base graph once per block of this many window start years and filter each window "
+            "from its block's graph (filter_chain only; 0 = off)."
+        ),
+    )
+    p.add_argument(
+        "--centrality-mode",
+        choices=["exact", "approximate"],
+        default=defaults.centrality_mode,
+        help="Betweenness/closeness: exact, or approximate (sampled betweenness sources, landmark closeness).",
+    )
+    p.add_argument(
+        "--betweenness-sampling-size",
+        type=int,
+        default=defaults.betweenness_sampling_size,
+        help="Betweenness source nodes in approximate mode (0 = derive from --betweenness-target-error).",
+    )
+    p.add_argument(
+        "--betweenness-target-error",
+        type=float,
+        default=defaults.betweenness_target_error,
+        help="Target additive error of normalised betweenness when --betweenness-sampling-size is 0.",
+    )
+    p.add_argument(
+        "--closeness-landmarks",
+        type=int,
+        default=defaults.closeness_landmarks,
+        help="Landmark nodes for approximate closeness.",
+    )
+    p.add_argument(
+        "--centrality-sampling-seed",
+        type=int,
+        default=defaults.centrality_sampling_seed,
+        help="Seed for betweenness sources and closeness landmarks.",
+    )
+    p.add_argument(
+        "--centrality-calibration-start-year",
+        type=int,
+        default=defaults.centrality_calibration_start_year,
+        help=(
+            "Start year of the window also computed exactly in approximate mode; the rank correlations are "
+            "recorded in its manifest row (default: the first window)."
+        ),
+    )
+    p.add_argument(
+        "--fcr-bulk",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.fcr_bulk,
+        help="Compute temporal FCR for all windows in one vectorised pass (--no-fcr-bulk: one Cypher query per window).",
+    )
     p.add_argument(
         "--expand-embeddings",
         action="store_true",
@@ -123,6 +223,141 @@ def _build_parser() -> argparse.ArgumentParser:
         default=2.0,
         help="Exponential backoff base (seconds) between per-window retries.",
     )
+    p.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=1,
+        help="Windows processed concurrently by the GDS engine, each on its own session (capped by the driver pool size).",
+    )
+    p.add_argument(
+        "--dedup-windows",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.dedup_windows,
+        help=(
+            "Fingerprint each window graph and reuse the outputs of an earlier window with an identical graph "
+            "(only the window metadata columns and fcr_temporal are rewritten)."
+        ),
+    )
+    p.add_argument(
+        "--dedup-invalidate",
+        action="store_true",
+        help="Forget the window fingerprints of this configuration before the run (e.g. after editing node properties).",
+    )
+    p.add_argument(
+        "--arrow-streaming",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.arrow_streaming,
+        help=(
+            "Keep streamed nodes/relationships as Arrow tables up to the Parquet write, joining database "
+            "properties and edge ids from a run-level store (GDS engine; use with --arrow)."
+        ),
+    )
+    p.add_argument(
+        "--node-export-batch-size",
+        type=int,
+        default=defaults.node_export_batch_size,
+        help=(
+            "Stream, finalise and write window nodes in batches of N nodes, one Parquet row group each, "
+            "bounding peak memory by N instead of the window size (0: whole window; needs --arrow-streaming)."
+        ),
+    )
+    p.add_argument(
+        "--benchmark-arrow-streaming",
+        type=int,
+        default=None,
+        metavar="NODES",
+        help="Time the pandas and Arrow post-processing of a synthetic window of NODES nodes (4x edges) and exit.",
+    )
+    p.add_argument(
+        "--preflight-plan",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.preflight_plan,
+        help=(
+            "Estimate window sizes and GDS memory first, write plan/plan_<params_hash>.parquet, and run the "
+            "windows largest-first with the per-window concurrency that fits the memory budget."
+        ),
+    )
+    p.add_argument(
+        "--plan-only",
+        action="store_true",
+        help="Write the pre-flight plan and exit without running any window.",
+    )
+    p.add_argument(
+        "--profile-stages",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.profile_stages,
+        help=(
+            "Trace wall time, rows and RSS of every stage of every window to "
+            "<output-dir>/profile/trace_<run_id>.jsonl (and .parquet when the run ends)."
+        ),
+    )
+    p.add_argument(
+        "--profile-mlflow-experiment",
+        default=defaults.profile_mlflow_experiment,
+        help="Also log the stage trace as MLflow metrics to this experiment.",
+    )
+    p.add_argument(
+        "--profile-summary",
+        type=Path,
+        default=None,
+        help="Print the hottest stages of a trace (.jsonl/.parquet, or a profile/ directory) and exit.",
+    )
+    p.add_argument(
+        "--profile-top",
+        type=int,
+        default=20,
+        help="Stages shown by --profile-summary.",
+    )
+    p.add_argument(
+        "--compact-manifest",
+        action="store_true",
+        help="Fold the checkpoint log into manifest/manifest_<params_hash>.parquet and exit (GDS engine).",
+    )
+    p.add_argument(
+        "--precompute-sim-name",
+        action="store_true",
+        help=(
+            "Score SIM_NAME candidates offline (rapidfuzz, same rules as 005_0_precompute_sim_name.cypher), "
+            "write <output-dir>/sim_name/sim_name_candidates.parquet and exit."
+        ),
+    )
+    p.add_argument(
+        "--sim-name-workers",
+        type=int,
+        default=None,
+        help="Worker processes for --precompute-sim-name (default: CPU count).",
+    )
+    p.add_argument(
+        "--sim-name-write-back",
+        action="store_true",
+        help="Also MERGE the --precompute-sim-name candidates into Neo4j as SIM_NAME relationships (UNWIND batches).",
+    )
+    p.add_argument(
+        "--sim-name-write-batch-size",
+        type=int,
+        default=DEFAULT_WRITE_BATCH_SIZE,
+        help="Pairs per UNWIND transaction of --sim-name-write-back.",
+    )
+    p.add_argument(
+        "--sim-name-transliterate",
+        action="store_true",
+        help=(
+            "Also block people on their surname transliterated to Cyrillic and on its phonetic key, "
+            "adding cross-script pairs to those of the Cypher query."
+        ),
+    )
+    p.add_argument(
+        "--gds-memory-budget-gb",
+        type=float,
+        default=defaults.gds_memory_budget_gb,
+        help="GDS heap budget shared by the in-flight windows (default: 80%% of the free GDS heap).",
+    )
+    p.add_argument(
+        "--write-queue-size",
+        type=int,
+        default=2,
+        help="Streamed windows queued for background post-processing/Parquet writing (0 = write inline).",
+    )
 
     p.add_argument(
         "--output-dir",
@@ -152,6 +387,37 @@ def _build_parser() -> argparse.ArgumentParser:
         default=True,
         help="Export bank_feats-derived feature blocks (e.g., legal_feats, state_feats) to the node panel parquet.",
     )
+    p.add_argument(
+        "--vector-storage",
+        choices=VECTOR_STORAGES,
+        default=defaults.vector_storage,
+        help=(
+            "Storage of embeddings and feature vectors: list<double> with feature blocks as columns (list), or "
+            "FixedSizeList<float32> with blocks resolved from bank_feats when read (fixed_size; see vectors.py)."
+        ),
+    )
+    p.add_argument(
+        "--output-layout",
+        choices=OUTPUT_LAYOUTS,
+        default=defaults.output_layout,
+        help=(
+            "Window outputs as one node/edge file per window (files), or as a hive-partitioned dataset "
+            "dataset/{nodes,edges}/params_hash=/period_type=/window_graph_name= read with dataset.read_window_frame "
+            "(dataset)."
+        ),
+    )
+    p.add_argument(
+        "--dataset-row-group-size",
+        type=int,
+        default=defaults.dataset_row_group_size,
+        help="Rows per Parquet row group with --output-layout dataset (smaller groups prune finer on label/time filters).",
+    )
+    p.add_argument(
+        "--bank-panel",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.bank_panel,
+        help="Also write the Bank rows' scalar metrics of all windows to bank_panel/bank_panel_{params_hash}.parquet.",
+    )
 
     p.add_argument(
         "--hashgnn",
@@ -195,6 +461,50 @@ def _build_parser() -> argparse.ArgumentParser:
         help="Run intra-window link prediction.",
     )
     p.add_argument("--lp-threshold", type=float, default=0.7, help="Link prediction probability threshold.")
+    p.add_argument(
+        "--lp-retrain-every",
+        type=int,
+        default=defaults.lp_retrain_every,
+        help=(
+            "Rerun the link prediction horse race every N windows (in time order) and score the windows in "
+            "between with the cached model; 0 trains once per run, 1 retrains in every window."
+        ),
+    )
+
+    p.add_argument(
+        "--engine",
+        choices=["gds", "local"],
+        default="gds",
+        help="Window engine: 'gds' filters and runs algorithms on the GDS server; 'local' uses a Parquet snapshot.",
+    )
+    p.add_argument(
+        "--snapshot-dir",
+        default=None,
+        help="Base-graph snapshot directory for --engine local (default: <output-dir>/snapshot).",
+    )
+    p.add_argument(
+        "--export-snapshot",
+        action="store_true",
+        help="Re-export the base-graph snapshot from Neo4j before running the local engine.",
+    )
+    p.add_argument(
+        "--local-workers",
+        type=int,
+        default=None,
+        help="Worker processes for --engine local (default: CPU count).",
+    )
+    p.add_argument(
+        "--interval-index",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Slice local windows through the persisted temporal interval index (<output-dir>/index).",
+    )
+    p.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Derive each local window from the previous one (edge deltas) instead of recomputing from scratch.",
+    )
 
     p.add_argument(
         "--log-level",
@@ -241,7 +551,15 @@ def main() -> None:
 
     _setup_logging(level=str(args.log_level).upper(), log_file=args.log_file)
 
-    neo4j_cfg = load_neo4j_config(env_file=args.env_file, arrow=bool(args.arrow), show_progress=bool(args.show_progress))
+    if args.benchmark_arrow_streaming is not None:
+        print(benchmark_streaming_paths(int(args.benchmark_arrow_streaming)).to_string(index=False))
+        return
+
+    if args.profile_summary is not None:
+        summary = summarise_trace(load_trace(args.profile_summary))
+        print(summary.head(int(args.profile_top)).to_string(index=False))
+        return
+
     rel_types = parse_rel_types(args.rel_types)
     hashgnn_feature_properties = _parse_csv_words(list(args.hashgnn_feature_properties))
 
@@ -280,11 +598,39 @@ def main() -> None:
         read_concurrency=args.read_concurrency,
         embedding_dimension=args.embedding_dimension,
         embedding_random_seed=args.embedding_random_seed,
+        pagerank_max_iterations=int(args.pagerank_max_iterations),
+        pagerank_tolerance=float(args.pagerank_tolerance),
+        eigenvector_max_iterations=int(args.eigenvector_max_iterations),
+        eigenvector_tolerance=float(args.eigenvector_tolerance),
+        louvain_max_iterations=int(args.louvain_max_iterations),
+        louvain_tolerance=float(args.louvain_tolerance),
+        warm_start=bool(args.warm_start),
+        fcr_bulk=bool(args.fcr_bulk),
+        window_materialisation=str(args.window_materialisation),
+        super_window_years=int(args.super_window_years),
+        centrality_mode=str(args.centrality_mode),
+        betweenness_sampling_size=int(args.betweenness_sampling_size),
+        betweenness_target_error=float(args.betweenness_target_error),
+        closeness_landmarks=int(args.closeness_landmarks),
+        centrality_sampling_seed=int(args.centrality_sampling_seed),
+        centrality_calibration_start_year=args.centrality_calibration_start_year,
+        preflight_plan=bool(args.preflight_plan),
+        dedup_windows=bool(args.dedup_windows),
+        dedup_invalidate=bool(args.dedup_invalidate),
+        arrow_streaming=bool(args.arrow_streaming),
+        node_export_batch_size=args.node_export_batch_size,
+        profile_stages=bool(args.profile_stages),
+        profile_mlflow_experiment=args.profile_mlflow_experiment,
+        gds_memory_budget_gb=args.gds_memory_budget_gb,
         output_dir=Path(args.output_dir) / run_name,
         export_edges=bool(args.export_edges),
         edge_id_property=str(args.edge_id_property),
         export_feature_vectors=bool(args.export_feature_vectors),
         export_feature_blocks=bool(args.export_feature_blocks),
+        vector_storage=args.vector_storage,
+        output_layout=args.output_layout,
+        dataset_row_group_size=args.dataset_row_group_size,
+        bank_panel=args.bank_panel,
         run_louvain=not args.no_louvain,
         run_wcc=not args.no_wcc,
         run_fastrp=not args.no_fastrp,
@@ -302,11 +648,15 @@ def main() -> None:
         node2vec_random_seed=int(args.node2vec_random_seed),
         run_link_prediction=bool(args.link_prediction),
         lp_threshold=float(args.lp_threshold),
+        lp_retrain_every=args.lp_retrain_every,
     )
 
 
     base_projection_cypher = Path(args.base_projection_cypher)
 
+    def _neo4j_cfg():
+        return load_neo4j_config(env_file=args.env_file, arrow=bool(args.arrow), show_progress=bool(args.show_progress))
+
     try:
         from tqdm.contrib.logging import logging_redirect_tqdm
 
@@ -315,6 +665,45 @@ def main() -> None:
         tqdm_logging_ctx = contextlib.nullcontext()
 
     with tqdm_logging_ctx:
+        if args.precompute_sim_name:
+            with connect_gds(_neo4j_cfg()) as gds:
+                stats = precompute_sim_name(
+                    gds,
+                    sim_name_path(cfg.output_dir),
+                    workers=args.sim_name_workers,
+                    transliterate_names=bool(args.sim_name_transliterate),
+                    write_back=bool(args.sim_name_write_back),
+                    write_batch_size=int(args.sim_name_write_batch_size),
+                )
+            print(
+                f"SIM_NAME: {stats.candidates} candidates, {stats.compared} pairs scored in {stats.seconds:.1f}s "
+                f"({stats.pairs_per_s:,.0f} pairs/s), {stats.written} written"
+            )
+            return
+
+        if args.engine == "local":
+            snapshot_dir = Path(args.snapshot_dir) if args.snapshot_dir else Path(args.output_dir) / "snapshot"
+            if args.export_snapshot or not (snapshot_dir / SNAPSHOT_META_FILE).exists():
+                with connect_gds(_neo4j_cfg()) as gds:
+                    export_base_snapshot(gds, cfg=cfg, snapshot_dir=snapshot_dir)
+            run_windows_local(
+                cfg=cfg,
+                snapshot_dir=snapshot_dir,
+                expand_embeddings=bool(args.expand_embeddings),
+                skip_existing=bool(args.skip_existing),
+                max_workers=args.local_workers,
+                show_tqdm=bool(args.show_progress),
+                use_interval_index=bool(args.interval_index),
+                incremental=bool(args.incremental),
+            )
+            return
+
+        if args.compact_manifest:
+            params_hash = stable_hash_dict(gds_config_metadata(cfg))
+            CheckpointLog.for_run(cfg, params_hash).compact(cfg.output_dir / "manifest" / f"manifest_{params_hash}.parquet")
+            return
+
+        neo4j_cfg = _neo4j_cfg()
         with connect_gds(neo4j_cfg) as gds:
             run_windows(
                 gds,
@@ -327,6 +716,9 @@ def main() -> None:
                 max_retries=int(args.max_retries),
                 retry_backoff_s=float(args.retry_backoff_seconds),
                 show_tqdm=bool(args.show_progress),
+                max_in_flight=int(args.max_in_flight),
+                write_queue_size=int(args.write_queue_size),
+                plan_only=bool(args.plan_only),
             )
 
 
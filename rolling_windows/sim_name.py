@@ -0,0 +1,418 @@
+"""
+Offline SIM_NAME candidate generation.
+
+``queries/cypher/005_0_precompute_sim_name.cypher`` scores Person pairs inside
+Neo4j, one ``apoc.text.levenshteinSimilarity`` call per pair in a serial
+``apoc.periodic.iterate``. This engine produces the same pairs in Python:
+
+- the names of every Person with a ``FirstName`` and a ``LastName`` of at
+  least 3 characters are exported once (``PERSON_NAMES_QUERY``), with their
+  ``elementId``,
+- people are blocked on the first 3 characters of the upper-cased surname;
+  within a block, ``p1`` is any of them and ``p2`` any with a ``MiddleName``
+  and a larger ``elementId`` (compared as strings, as in Cypher),
+- surname (``LastName`` / ``LastName``) and patronymic (``p1.FirstName`` /
+  ``p2.MiddleName``) similarities are computed for tiles of a block at once
+  with ``rapidfuzz.process.cdist``; the similarity is APOC's
+  ``(longer - distance) / longer`` on the raw, case-sensitive names,
+- a pair is kept when ``surname_sim > 0.7 OR patronymic_sim > 0.4`` and it is
+  not already connected by FAMILY or SIM_NAME in either direction
+  (``EXISTING_PAIRS_QUERY``, matched on ``pair_keys``), and flagged
+  ``is_common_surname`` when either surname is in ``COMMON_SURNAMES``.
+
+Blocks are split into tiles of ``tile_size`` sources by ``tile_size``
+targets (tiles without a target after their first source are skipped) and
+scored over a process pool. The pairs are written to Parquet
+(``source_element_id``, ``target_element_id``, ``lev_dist_last_name``,
+``lev_dist_patronymic``, ``is_common_surname``) and, with ``write_back``,
+merged into Neo4j as SIM_NAME relationships in UNWIND batches.
+
+With ``transliterate_names`` every person gets two more block keys: the
+prefix of the surname upper-cased with Latin letters transliterated to
+Cyrillic and Ё read as Е (``transliterate``), so ``Ivanov`` and ``Иванов``
+meet, and the prefix of its ``phonetic_key``, so ``Евтушенко`` and
+``Эвтушенко`` meet. Those blocks compare the transliterated names. A pair
+found by several blocks is kept once (by ``PairKeyCodec`` key) with the
+scores of its raw-name block, so the output is that of the Cypher query plus
+the pairs only the extra keys find.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein
+
+from pair_keys import PairKeyCodec, isin_keys
+from parquet import write_table
+
+logger = logging.getLogger(__name__)
+
+SIM_NAME_DIRNAME = "sim_name"
+SURNAME_THRESHOLD = 0.7
+PATRONYMIC_THRESHOLD = 0.4
+BLOCK_PREFIX = 3
+DEFAULT_TILE_SIZE = 1024
+DEFAULT_WRITE_BATCH_SIZE = 10_000
+
+# Upper-cased surnames flagged with is_common_surname = 1 (as in 005_0_precompute_sim_name.cypher).
+COMMON_SURNAMES = frozenset(
+    {
+        "КУЗНЕЦОВ", "КУЗНЕЦОВА", "ИВАНОВ", "ИВАНОВА", "ПОПОВ", "ПОПОВА", "СМИРНОВ", "СМИРНОВА",
+        "ВАСИЛЬЕВ", "ВАСИЛЬЕВА", "ПЕТРОВ", "ПЕТРОВА", "КОЗЛОВ", "КОЗЛОВА", "МОРОЗОВ", "МОРОЗОВА",
+        "НОВИКОВ", "НОВИКОВА", "ВОЛКОВ", "ВОЛКОВА", "СОКОЛОВ", "СОКОЛОВА", "ПАВЛОВ", "ПАВЛОВА",
+        "ЛЕБЕДЕВ", "ЛЕБЕДЕВА", "СЕМЕНОВ", "СЕМЕНОВА", "ЕГОРОВ", "ЕГОРОВА",
+    }
+)
+
+PERSON_NAMES_QUERY = """
+MATCH (p:Person)
+WHERE p.FirstName IS NOT NULL
+  AND p.LastName IS NOT NULL
+  AND size(p.LastName) >= 3
+RETURN elementId(p) AS element_id, p.LastName AS last_name, p.FirstName AS first_name, p.MiddleName AS middle_name
+"""
+
+EXISTING_PAIRS_QUERY = """
+MATCH (p1:Person)-[:FAMILY|SIM_NAME]-(p2:Person)
+WHERE elementId(p1) < elementId(p2)
+RETURN DISTINCT elementId(p1) AS source_element_id, elementId(p2) AS target_element_id
+"""
+
+WRITE_BACK_QUERY = """
+UNWIND $rows AS row
+MATCH (p1:Person) WHERE elementId(p1) = row.source_element_id
+MATCH (p2:Person) WHERE elementId(p2) = row.target_element_id
+MERGE (p1)-[r:SIM_NAME]->(p2)
+SET r.lev_dist_last_name = row.lev_dist_last_name,
+    r.lev_dist_patronymic = row.lev_dist_patronymic,
+    r.is_common_surname = row.is_common_surname,
+    r.created_at = datetime()
+RETURN count(*) AS written
+"""
+
+OUTPUT_COLUMNS: tuple[str, ...] = (
+    "source_element_id",
+    "target_element_id",
+    "lev_dist_last_name",
+    "lev_dist_patronymic",
+    "is_common_surname",
+)
+
+_DIGRAPHS = {"SHCH": "Щ", "ZH": "Ж", "KH": "Х", "TS": "Ц", "CH": "Ч", "SH": "Ш", "YU": "Ю", "YA": "Я", "YE": "Е"}
+_DIGRAPH_RE = re.compile("|".join(sorted(_DIGRAPHS, key=len, reverse=True)))
+_LETTERS = str.maketrans("ABVGDEZIJKLMNOPRSTUFHCYXWQЁ", "АБВГДЕЗИЙКЛМНОПРСТУФХЦЫКВКЕ")
+
+
+# Vowels reduced, voiced consonants devoiced, soft and hard signs dropped.
+_PHONETIC = str.maketrans("ОЯЭЕЫЮБВГДЗЙ", "ААИИИУПФКТСИ", "ЬЪ")
+_REPEATS_RE = re.compile(r"(.)\1+")
+
+
+def transliterate(name: str) -> str:
+    """``name`` upper-cased, with Latin letters spelled in Cyrillic and Ё as Е."""
+    return _DIGRAPH_RE.sub(lambda m: _DIGRAPHS[m.group(0)], name.upper()).translate(_LETTERS)
+
+
+def phonetic_key(name: str) -> str:
+    """``transliterate(name)`` with letters that sound alike merged and repeated letters collapsed."""
+    return _REPEATS_RE.sub(r"\1", transliterate(name).translate(_PHONETIC))
+
+
+def levenshtein_similarity(a: Sequence[str], b: Sequence[str]) -> np.ndarray:
+    """
+    ``apoc.text.levenshteinSimilarity`` of every pair of ``a`` x ``b``.
+
+    ``(longer - distance) / longer`` from the integer edit distance, as APOC
+    computes it, so thresholds compare exactly; 1.0 for two empty strings.
+    """
+    distance = process.cdist(a, b, scorer=Levenshtein.distance, dtype=np.int32, workers=1)
+    la = np.fromiter(map(len, a), dtype=np.int32, count=len(a))
+    lb = np.fromiter(map(len, b), dtype=np.int32, count=len(b))
+    longer = np.maximum(la[:, None], lb[None, :])
+    return np.divide(longer - distance, longer, out=np.ones(distance.shape), where=longer > 0)
+
+
+# Block key columns of ``prepare_people`` and the spelling (index into ``_Names.forms``) their blocks compare.
+_BLOCK_KEYS: tuple[tuple[str, int], ...] = (("block", 0), ("block_translit", 1), ("block_phonetic", 1))
+_NAME_COLUMNS: tuple[str, ...] = ("last_name", "first_name", "middle_name")
+
+
+def prepare_people(names: pd.DataFrame, *, transliterate_names: bool = False) -> pd.DataFrame:
+    """
+    The people of ``PERSON_NAMES_QUERY`` with their block keys and flags.
+
+    Adds ``rank`` (order of ``element_id`` as a string), ``block``,
+    ``is_target`` (has a ``MiddleName``) and ``is_common``; with
+    ``transliterate_names`` also the transliterated names
+    (``{column}_translit``) and the ``block_translit`` and ``block_phonetic``
+    keys.
+    """
+    people = names[names["first_name"].notna() & names["last_name"].notna()].copy()
+    for column in _NAME_COLUMNS:
+        people[column] = people[column].map(lambda v: None if pd.isna(v) else str(v)).astype(object)
+    people = people[people["last_name"].str.len() >= BLOCK_PREFIX]
+    people = people.drop_duplicates("element_id").sort_values("element_id", kind="stable").reset_index(drop=True)
+    people["rank"] = np.arange(len(people), dtype=np.int64)
+    people["is_target"] = people["middle_name"].notna()
+    upper = people["last_name"].str.upper()
+    people["is_common"] = upper.isin(COMMON_SURNAMES)
+    people["block"] = upper.str.slice(0, BLOCK_PREFIX)
+    if transliterate_names:
+        for column in _NAME_COLUMNS:
+            people[f"{column}_translit"] = (
+                people[column].map(lambda v: None if pd.isna(v) else transliterate(v)).astype(object)
+            )
+        people["block_translit"] = people["last_name_translit"].str.slice(0, BLOCK_PREFIX)
+        people["block_phonetic"] = people["last_name"].map(phonetic_key).str.slice(0, BLOCK_PREFIX)
+    return people
+
+
+@dataclass(frozen=True)
+class _Block:
+    # Sources and targets of a block sorted by rank.
+    sources: np.ndarray
+    targets: np.ndarray
+    # Spelling the block compares: 0 raw names, 1 transliterated.
+    form: int = 0
+
+
+@dataclass(frozen=True)
+class _Names:
+    rank: np.ndarray
+    # (last_name, first_name, middle_name) of each spelling.
+    forms: list[tuple[np.ndarray, np.ndarray, np.ndarray]]
+    blocks: list[_Block]
+
+
+def _names(people: pd.DataFrame) -> _Names:
+    forms = [tuple(people[c].to_numpy(dtype=object) for c in _NAME_COLUMNS)]
+    if "last_name_translit" in people.columns:
+        forms.append(tuple(people[f"{c}_translit"].to_numpy(dtype=object) for c in _NAME_COLUMNS))
+    blocks = []
+    seen: set[tuple[int, bytes]] = set()
+    is_target = people["is_target"].to_numpy()
+    for column, form in _BLOCK_KEYS:
+        if column not in people.columns:
+            continue
+        for _, rows in people.groupby(column, sort=True).indices.items():
+            # ``people`` is sorted by rank, so are the rows of each block.
+            # A block with the same people and spelling as an earlier one would only repeat its pairs.
+            if not is_target[rows].any() or (form, rows.tobytes()) in seen:
+                continue
+            seen.add((form, rows.tobytes()))
+            blocks.append(_Block(sources=rows, targets=rows[is_target[rows]], form=form))
+    return _Names(rank=people["rank"].to_numpy(), forms=forms, blocks=blocks)
+
+
+def _tiles(names: _Names, tile_size: int) -> list[tuple[int, slice, slice]]:
+    """``(block, sources, targets)`` tiles of at most ``tile_size`` x ``tile_size`` pairs that can hold a pair."""
+    tiles = []
+    for b, block in enumerate(names.blocks):
+        target_ranks = names.rank[block.targets]
+        for s in range(0, len(block.sources), tile_size):
+            # Only targets after the tile's first source can satisfy elementId(p1) < elementId(p2).
+            first = int(np.searchsorted(target_ranks, names.rank[block.sources[s]], side="right"))
+            for t in range(first, len(block.targets), tile_size):
+                tiles.append((b, slice(s, s + tile_size), slice(t, t + tile_size)))
+    return tiles
+
+
+def _score_tile(names: _Names, block: int, sources: slice, targets: slice) -> tuple[np.ndarray, ...]:
+    """Pairs of a tile of ``block`` (``p1`` before ``p2``) passing a threshold, their spelling and the tile's size."""
+    form = names.blocks[block].form
+    last_name, first_name, middle_name = names.forms[form]
+    sources = names.blocks[block].sources[sources]
+    targets = names.blocks[block].targets[targets]
+    surname = levenshtein_similarity(last_name[sources], last_name[targets])
+    patronymic = levenshtein_similarity(first_name[sources], middle_name[targets])
+    keep = (names.rank[sources][:, None] < names.rank[targets][None, :]) & (
+        (surname > SURNAME_THRESHOLD) | (patronymic > PATRONYMIC_THRESHOLD)
+    )
+    i, j = np.nonzero(keep)
+    return sources[i], targets[j], surname[i, j], patronymic[i, j], np.full(len(i), form, np.int8), surname.size
+
+
+_WORKER_NAMES: _Names | None = None
+
+
+def _init_worker(names: _Names) -> None:
+    global _WORKER_NAMES
+    _WORKER_NAMES = names
+
+
+def _score_tiles_in_worker(tiles: list[tuple[int, slice, slice]]) -> list[tuple[np.ndarray, ...]]:
+    assert _WORKER_NAMES is not None, "worker names not initialised"
+    return [_score_tile(_WORKER_NAMES, *tile) for tile in tiles]
+
+
+@dataclass(frozen=True)
+class SimNameStats:
+    people: int
+    blocks: int
+    # Pairs whose similarities were computed
+    compared: int
+    candidates: int
+    # Pairs passing the thresholds that are already FAMILY or SIM_NAME
+    excluded: int
+    seconds: float
+    written: int = 0
+
+    @property
+    def pairs_per_s(self) -> float:
+        return self.compared / self.seconds if self.seconds > 0 else 0.0
+
+
+def sim_name_candidates(
+    names: pd.DataFrame,
+    existing: pd.DataFrame | None = None,
+    *,
+    workers: int | None = None,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    transliterate_names: bool = False,
+) -> tuple[pd.DataFrame, SimNameStats]:
+    """
+    SIM_NAME pairs of the people in ``names`` (``PERSON_NAMES_QUERY``) that are not in ``existing``.
+
+    Tiles are scored over ``workers`` processes (default: CPU count; 1 runs
+    in-process). Pairs are sorted by element ids; a pair found by several
+    blocks keeps the scores of the first spelling that found it (raw names).
+    """
+    if tile_size < 1:
+        raise ValueError(f"tile_size must be >= 1, got {tile_size}")
+    started = time.perf_counter()
+    people = prepare_people(names, transliterate_names=transliterate_names)
+    data = _names(people)
+    tiles = _tiles(data, tile_size)
+    workers = min(workers or os.cpu_count() or 1, max(len(tiles), 1))
+    logger.info(
+        "Scoring SIM_NAME pairs of %d people in %d blocks (%d tiles, workers=%d)",
+        len(people),
+        len(data.blocks),
+        len(tiles),
+        workers,
+    )
+
+    if workers <= 1:
+        results = [_score_tile(data, *tile) for tile in tiles]
+    else:
+        # Interleaved so every worker gets a share of the large blocks.
+        chunks = [tiles[i::workers * 4] for i in range(workers * 4)]
+        # Spawned, not forked: by now the Neo4j driver has started its threads.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(data,),
+        ) as pool:
+            results = [r for chunk in pool.map(_score_tiles_in_worker, chunks) for r in chunk]
+
+    src = np.concatenate([r[0] for r in results]) if results else np.empty(0, np.int64)
+    tgt = np.concatenate([r[1] for r in results]) if results else np.empty(0, np.int64)
+    element_ids = people["element_id"].to_numpy(dtype=object)
+    pairs = pd.DataFrame(
+        {
+            "source_element_id": element_ids[src],
+            "target_element_id": element_ids[tgt],
+            "lev_dist_last_name": np.concatenate([r[2] for r in results]) if results else np.empty(0),
+            "lev_dist_patronymic": np.concatenate([r[3] for r in results]) if results else np.empty(0),
+            "is_common_surname": (people["is_common"].to_numpy()[src] | people["is_common"].to_numpy()[tgt]).astype(
+                np.int64
+            ),
+        }
+    )
+
+    codec = PairKeyCodec.from_ids(vocabulary=element_ids)
+    if len(data.forms) > 1 and len(pairs):
+        forms = np.concatenate([r[4] for r in results])
+        pairs = pairs.iloc[np.argsort(forms, kind="stable")]
+        first = ~pd.Index(codec.keys(pairs["source_element_id"], pairs["target_element_id"])).duplicated()
+        logger.info("Dropped %d SIM_NAME pairs found by more than one block", int((~first).sum()))
+        pairs = pairs[first]
+
+    excluded = 0
+    if existing is not None and len(existing) and len(pairs):
+        known = isin_keys(
+            codec.keys(pairs["source_element_id"], pairs["target_element_id"]),
+            codec.keys(existing["source_element_id"], existing["target_element_id"]),
+        )
+        excluded = int(known.sum())
+        pairs = pairs[~known]
+    pairs = pairs.sort_values(["source_element_id", "target_element_id"], kind="stable").reset_index(drop=True)
+
+    stats = SimNameStats(
+        people=len(people),
+        blocks=len(data.blocks),
+        compared=int(sum(r[5] for r in results)),
+        candidates=len(pairs),
+        excluded=excluded,
+        seconds=time.perf_counter() - started,
+    )
+    logger.info(
+        "SIM_NAME: %d candidates (%d already FAMILY/SIM_NAME) from %d scored pairs in %.1fs (%.0f pairs/s)",
+        stats.candidates,
+        stats.excluded,
+        stats.compared,
+        stats.seconds,
+        stats.pairs_per_s,
+    )
+    return pairs, stats
+
+
+def sim_name_path(output_dir: Path) -> Path:
+    return Path(output_dir) / SIM_NAME_DIRNAME / "sim_name_candidates.parquet"
+
+
+def write_back_sim_name(gds: Any, pairs: pd.DataFrame, *, batch_size: int = DEFAULT_WRITE_BATCH_SIZE) -> int:
+    """MERGE ``pairs`` as SIM_NAME relationships in UNWIND batches of ``batch_size``; returns the pairs written."""
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be >= 1, got {batch_size}")
+    written = 0
+    started = time.perf_counter()
+    for start in range(0, len(pairs), batch_size):
+        rows = pairs.iloc[start : start + batch_size][list(OUTPUT_COLUMNS)].to_dict("records")
+        result = gds.run_cypher(WRITE_BACK_QUERY, params={"rows": rows})
+        written += int(result["written"].iloc[0]) if len(result) else 0
+    seconds = time.perf_counter() - started
+    logger.info("Wrote %d SIM_NAME relationships in %.1fs (%.0f pairs/s)", written, seconds, written / seconds if seconds else 0.0)
+    return written
+
+
+def precompute_sim_name(
+    gds: Any,
+    output_path: Path,
+    *,
+    workers: int | None = None,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    transliterate_names: bool = False,
+    write_back: bool = False,
+    write_batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+) -> SimNameStats:
+    """Export names, score SIM_NAME candidates, write them to ``output_path`` and optionally back to Neo4j."""
+    names = gds.run_cypher(PERSON_NAMES_QUERY)
+    existing = gds.run_cypher(EXISTING_PAIRS_QUERY)
+    logger.info("Exported %d Person names and %d FAMILY/SIM_NAME pairs", len(names), len(existing))
+    pairs, stats = sim_name_candidates(
+        names,
+        existing,
+        workers=workers,
+        tile_size=tile_size,
+        transliterate_names=transliterate_names,
+    )
+    write_table(pa.Table.from_pandas(pairs, preserve_index=False), output_path)
+    logger.info("Wrote %s (rows=%d)", output_path, len(pairs))
+    if write_back:
+        stats = replace(stats, written=write_back_sim_name(gds, pairs, batch_size=write_batch_size))
+    return stats
@@ -0,0 +1,213 @@
+"""
+Storage of vector columns in the window node files.
+
+Embeddings (``fastrp_embedding``, ``hash_gnn_embedding``, ``node2vec_embedding``)
+and feature vectors (``bank_feats``, ``network_feats``) are written according to
+``RollingWindowConfig.vector_storage``:
+
+- ``list`` (default): ``list<double>`` columns, and with
+  ``export_feature_blocks`` every block of ``bank_feats`` is written as its own
+  column (a copy of the block's indices).
+- ``fixed_size``: ``FixedSizeList<float32>`` columns, and the blocks are not
+  written; ``read_node_features`` / ``feature_block_matrix`` resolve them from
+  ``bank_feats`` with ``feature_blocks.feature_block_indices`` when the file is
+  read.
+
+A fixed-size column is one contiguous float32 buffer, so ``read_vector_matrix``
+returns it as a 2-D NumPy array without copying it out of the Arrow column or
+building per-row Python objects. Missing vectors (e.g. no ``network_feats``)
+are written as zero rows, like missing ``bank_feats`` in both storages: the
+Parquet reader of pyarrow rejects null rows in fixed-size list columns.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from config import RollingWindowConfig
+from feature_blocks import BANK_FEATS_DIM, feature_block_indices
+
+VECTOR_STORAGES: tuple[str, ...] = ("list", "fixed_size")
+EMBEDDING_COLUMNS: tuple[str, ...] = ("fastrp_embedding", "hash_gnn_embedding", "node2vec_embedding")
+VECTOR_COLUMNS: tuple[str, ...] = EMBEDDING_COLUMNS + ("bank_feats", "network_feats")
+
+
+def validate_vector_storage(cfg: RollingWindowConfig) -> None:
+    if cfg.vector_storage not in VECTOR_STORAGES:
+        raise ValueError(f"Unknown vector_storage {cfg.vector_storage!r}; expected one of {VECTOR_STORAGES}")
+
+
+def is_fixed_size(cfg: RollingWindowConfig) -> bool:
+    return cfg.vector_storage == "fixed_size"
+
+
+def vector_storage_metadata(cfg: RollingWindowConfig) -> dict[str, Any]:
+    """Entries of ``gds_config_metadata`` describing the vector storage (none for the default)."""
+    if not is_fixed_size(cfg):
+        return {}
+    return {"vector_storage": cfg.vector_storage}
+
+
+def vector_dimensions(cfg: RollingWindowConfig) -> dict[str, int | None]:
+    """Expected width of each vector column; ``None`` where it is only known from the data."""
+    return {
+        "fastrp_embedding": cfg.embedding_dimension,
+        "hash_gnn_embedding": cfg.hashgnn_output_dimension,
+        "node2vec_embedding": cfg.node2vec_embedding_dimension,
+        "bank_feats": BANK_FEATS_DIM,
+        "network_feats": None,
+    }
+
+
+def _as_arrow(values: pd.Series | pa.Array | pa.ChunkedArray) -> pa.Array:
+    if isinstance(values, pd.Series):
+        values = pa.array(values, from_pandas=True)
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    return values
+
+
+def vector_matrix(
+    values: pd.Series | pa.Array | pa.ChunkedArray,
+    *,
+    column: str,
+    dim: int | None = None,
+    fill_missing: bool = False,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ``(matrix, present)``: the rows of a list column as a 2-D float64 matrix.
+
+    Null and empty rows are zero rows with ``present`` false; they are an error
+    unless ``fill_missing``. Every other row must have ``dim`` values (the
+    width of the first row when ``dim`` is ``None``).
+    """
+    arr = _as_arrow(values)
+    if pa.types.is_null(arr.type):
+        lengths = np.zeros(len(arr), dtype=np.int64)
+    else:
+        lengths = pc.fill_null(pc.list_value_length(arr), 0).to_numpy(zero_copy_only=False)
+    present = lengths > 0
+    if not fill_missing and not present.all():
+        raise ValueError(f"Vector column '{column}' contains nulls; cannot slice reliably")
+    width = dim if dim is not None else (int(lengths[present][0]) if present.any() else 0)
+    if np.any(lengths[present] != width):
+        raise ValueError(f"Expected dim={width} for '{column}', got lengths {sorted(set(lengths[present].tolist()))}")
+    matrix = np.zeros((len(arr), width), dtype=np.float64)
+    if present.any():
+        matrix[present] = pc.list_flatten(arr).to_numpy(zero_copy_only=False).reshape(-1, width)
+    return matrix, present
+
+
+def list_array(matrix: np.ndarray) -> pa.ListArray:
+    """``list<double>`` array of the rows of ``matrix``."""
+    n, width = matrix.shape
+    offsets = pa.array(np.arange(n + 1, dtype=np.int32) * width)
+    return pa.ListArray.from_arrays(offsets, pa.array(np.ascontiguousarray(matrix, dtype=np.float64).ravel()))
+
+
+def fixed_size_array(matrix: np.ndarray) -> pa.FixedSizeListArray:
+    """``FixedSizeList<float32>`` array of the rows of ``matrix``."""
+    values = pa.array(np.ascontiguousarray(matrix, dtype=np.float32).ravel())
+    return pa.FixedSizeListArray.from_arrays(values, matrix.shape[1])
+
+
+def fixed_size_column(
+    values: pd.Series | pa.Array | pa.ChunkedArray, *, column: str, dim: int | None
+) -> pa.FixedSizeListArray:
+    """A vector column as ``FixedSizeList<float32>``; missing vectors become zero rows."""
+    matrix, _ = vector_matrix(values, column=column, dim=dim, fill_missing=True)
+    return fixed_size_array(matrix)
+
+
+def fixed_size_vector_columns(df: pd.DataFrame, *, cfg: RollingWindowConfig) -> pd.DataFrame:
+    """Replace the vector columns of ``df`` by Arrow-backed ``FixedSizeList<float32>`` columns."""
+    for column, dim in vector_dimensions(cfg).items():
+        if column in df.columns:
+            array = fixed_size_column(df[column], column=column, dim=dim)
+            df[column] = pd.Series(pd.arrays.ArrowExtensionArray(array), index=df.index)
+    return df
+
+
+def _fixed_size_types(arrow_type: pa.DataType) -> Any:
+    return pd.ArrowDtype(arrow_type) if pa.types.is_fixed_size_list(arrow_type) else None
+
+
+def read_frame(path: Path) -> pd.DataFrame:
+    """A node/edge file as pandas, keeping fixed-size vector columns Arrow-backed so they are rewritten as such."""
+    return pq.read_table(path).to_pandas(types_mapper=_fixed_size_types)
+
+
+def column_matrix(column: pa.ChunkedArray | pa.Array, *, column_name: str = "vector") -> np.ndarray:
+    """
+    A vector column as a 2-D array.
+
+    ``FixedSizeList`` columns in one chunk are returned as a view of their
+    value buffer; list columns are converted.
+    """
+    if isinstance(column, pa.ChunkedArray):
+        column = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    if pa.types.is_fixed_size_list(column.type):
+        width = column.type.list_size
+        values = column.values.slice(column.offset * width, len(column) * width)
+        if values.null_count == 0:
+            return values.to_numpy(zero_copy_only=True).reshape(len(column), width)
+    matrix, _ = vector_matrix(column, column=column_name, fill_missing=True)
+    return matrix
+
+
+def read_vector_matrix(path: Path, column: str) -> np.ndarray:
+    """One vector column of a node file as a 2-D array (see ``column_matrix``)."""
+    table = pq.read_table(path, columns=[column], memory_map=True)
+    return column_matrix(table[column], column_name=column)
+
+
+def feature_block_matrix(bank_feats: np.ndarray, block: str) -> np.ndarray:
+    """The ``block`` columns of a ``bank_feats`` matrix."""
+    indices = feature_block_indices()[block]
+    start, stop = indices[0], indices[-1] + 1
+    if indices == list(range(start, stop)):
+        return bank_feats[:, start:stop]  # contiguous: a view
+    return bank_feats[:, indices]
+
+
+def read_node_features(
+    path: Path,
+    columns: Iterable[str] | None = None,
+    *,
+    blocks: Iterable[str] | bool = False,
+) -> pd.DataFrame:
+    """
+    A node file as pandas, with feature ``blocks`` (``True`` for all) as columns.
+
+    Blocks written by the ``list`` storage are read as they are; with the
+    ``fixed_size`` storage they are resolved from ``bank_feats``.
+    Fixed-size vectors stay Arrow-backed (``pd.ArrowDtype``).
+    """
+    all_blocks = feature_block_indices()
+    wanted = list(all_blocks) if blocks is True else list(blocks or ())
+    unknown = sorted(set(wanted).difference(all_blocks))
+    if unknown:
+        raise ValueError(f"Unknown feature blocks {unknown}; expected some of {sorted(all_blocks)}")
+
+    names = pq.read_schema(path).names
+    columns = list(names if columns is None else columns)
+    stored = [b for b in wanted if b in names]
+    resolved = [b for b in wanted if b not in names]
+    read = list(dict.fromkeys(columns + stored + (["bank_feats"] if resolved else [])))
+    table = pq.read_table(path, columns=read, memory_map=True)
+
+    if resolved:
+        bank = column_matrix(table["bank_feats"], column_name="bank_feats")
+        for block in resolved:
+            table = table.append_column(block, fixed_size_array(feature_block_matrix(bank, block)))
+        if "bank_feats" not in columns:
+            table = table.drop_columns(["bank_feats"])
+
+    return table.to_pandas(types_mapper=_fixed_size_types)
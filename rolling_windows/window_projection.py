@@ -0,0 +1,164 @@
+"""
+Single-pass window materialisation.
+
+``build_single_pass_projection`` is the Cypher aggregation projection that
+``pipeline.materialise_window_graph`` runs with ``single_pass``: it builds a
+window's final participant graph straight from the database, with the same
+nodes and relationships as the ``filter_chain`` (temporal filter ->
+``active_degree`` mutate -> participant filter) and as
+``local_engine.materialise_window``:
+
+- relationships active in the window whose endpoints are active and kept,
+- every active Bank and Company,
+- every active Person with an active outgoing relationship to an active node
+  (the NATURAL ``active_degree > 0`` rule), including Persons all of whose
+  targets are dropped, which stay as isolated nodes.
+
+The branches are data (``SINGLE_PASS_BRANCHES``) from which the Cypher is
+rendered, so they can be checked against the local engine in tests without a
+database. This module has no GDS or MLflow imports.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from config import validate_rel_types
+
+WINDOW_MATERIALISATIONS: tuple[str, ...] = ("filter_chain", "single_pass")
+
+
+@dataclass(frozen=True)
+class ProjectionBranch:
+    """
+    One UNION branch of the single-pass projection.
+
+    A branch returns either active relationships ``s -> t`` between active
+    nodes (``relationship``) or node-only rows of active ``s`` with one of
+    ``source_labels``. With ``requires_out_edge`` the kept node (``t`` of a
+    relationship row, ``s`` of a node row) needs an active outgoing
+    relationship to an active node unless it has one of ``exempt_labels``.
+    """
+
+    relationship: bool
+    source_labels: tuple[str, ...] = ()
+    requires_out_edge: bool = False
+    exempt_labels: tuple[str, ...] = ()
+
+    @property
+    def kept_var(self) -> str:
+        return "t" if self.relationship else "s"
+
+
+# Participant graph of one window: the union of these branches.
+SINGLE_PASS_BRANCHES: tuple[ProjectionBranch, ...] = (
+    # Active relationships into a kept node: a Bank/Company, or a Person with an active out-edge.
+    ProjectionBranch(relationship=True, requires_out_edge=True, exempt_labels=("Bank", "Company")),
+    # Every active Bank/Company, as node-only rows.
+    ProjectionBranch(relationship=False, source_labels=("Bank", "Company")),
+    # Active Persons with an active out-edge, as node-only rows (their targets may all be dropped).
+    ProjectionBranch(relationship=False, source_labels=("Person",), requires_out_edge=True),
+)
+
+_RELATIONSHIP_ROWS = """
+    MATCH (s)-[r:{rel_pattern}]->(t)
+    WHERE {rel_pred} AND {s_pred} AND {t_pred}{keep}
+    RETURN s, r, t"""
+
+_NODE_ROWS = """
+    MATCH (s:{labels})
+    WHERE {s_pred}{keep}
+    RETURN s, null AS r, null AS t"""
+
+_ACTIVE_OUT_EDGE = """EXISTS {{
+        MATCH ({var})-[r2:{rel_pattern}]->(u)
+        WHERE {r2_pred} AND {u_pred}
+    }}"""
+
+_SINGLE_PASS_PROJECTION = """
+CALL {{{branches}
+}}
+RETURN gds.graph.project(
+    $graphName,
+    s,
+    t,
+    {{
+        sourceNodeLabels: [l IN labels(s) WHERE l IN ['Bank', 'Company', 'Person']],
+        targetNodeLabels: CASE WHEN t IS NULL THEN null ELSE [l IN labels(t) WHERE l IN ['Bank', 'Company', 'Person']] END,
+        sourceNodeProperties: {s_props},
+        targetNodeProperties: CASE WHEN t IS NULL THEN null ELSE {t_props} END,
+        relationshipType: type(r),
+        relationshipProperties: CASE WHEN r IS NULL THEN null ELSE {{
+            weight: toFloat(coalesce(r.Size, 1.0)),
+            tStart: toFloat(coalesce(r.temporal_start, $minT)),
+            tEnd: toFloat(coalesce(r.temporal_end, $maxT)),
+            imputedFlag: toFloat(coalesce(r.imputed_flag, 0.0))
+        }} END
+    }},
+    {{readConcurrency: $readConcurrency}}
+)
+"""
+
+
+def _single_pass_node_predicate(var: str) -> str:
+    return (
+        f"({var}:Bank OR {var}:Company OR {var}:Person) "
+        f"AND coalesce({var}.temporal_start, $minT) < $end AND coalesce({var}.temporal_end, $maxT) > $start"
+    )
+
+
+def _single_pass_rel_predicate(var: str) -> str:
+    return (
+        f"coalesce({var}.temporal_start, $minT) < $end AND coalesce({var}.temporal_end, $maxT) > $start "
+        f"AND (type({var}) <> 'FAMILY' OR $includeImputed01 = 1.0 OR coalesce({var}.imputed_flag, 0.0) = 0.0)"
+    )
+
+
+def _single_pass_node_properties(var: str) -> str:
+    # Same properties/defaults as the base graph projection in ensure_base_graph.
+    return (
+        "{"
+        f"tStart: toFloat(coalesce({var}.temporal_start, $minT)), "
+        f"tEnd: toFloat(coalesce({var}.temporal_end, $maxT)), "
+        f"is_dead: coalesce({var}.is_dead_int, 0), "
+        f"gds_id: coalesce({var}.gds_id, -1)"
+        "}"
+    )
+
+
+def _keep_condition(branch: ProjectionBranch, rel_pattern: str) -> str:
+    if not branch.requires_out_edge:
+        return ""
+    var = branch.kept_var
+    exists = _ACTIVE_OUT_EDGE.format(
+        var=var,
+        rel_pattern=rel_pattern,
+        r2_pred=_single_pass_rel_predicate("r2"),
+        u_pred=_single_pass_node_predicate("u"),
+    )
+    alternatives = [f"{var}:{label}" for label in branch.exempt_labels] + [exists]
+    return f"\n      AND ({' OR '.join(alternatives)})"
+
+
+def _branch_query(branch: ProjectionBranch, rel_pattern: str) -> str:
+    keep = _keep_condition(branch, rel_pattern)
+    if branch.relationship:
+        return _RELATIONSHIP_ROWS.format(
+            rel_pattern=rel_pattern,
+            rel_pred=_single_pass_rel_predicate("r"),
+            s_pred=_single_pass_node_predicate("s"),
+            t_pred=_single_pass_node_predicate("t"),
+            keep=keep,
+        )
+    return _NODE_ROWS.format(labels="|".join(branch.source_labels), s_pred=_single_pass_node_predicate("s"), keep=keep)
+
+
+def build_single_pass_projection(rel_types: tuple[str, ...]) -> str:
+    """Cypher aggregation projection that yields a window's final participant graph in one step."""
+    validate_rel_types(rel_types)
+    rel_pattern = "|".join(rel_types)
+    return _SINGLE_PASS_PROJECTION.format(
+        branches="\n    UNION".join(_branch_query(b, rel_pattern) for b in SINGLE_PASS_BRANCHES),
+        s_props=_single_pass_node_properties("s"),
+        t_props=_single_pass_node_properties("t"),
+    )
@@ -0,0 +1,136 @@
+"""
+Tests for the Arrow streaming path (rolling_windows/arrow_stream.py).
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "rolling_windows"))
+
+from arrow_stream import (  # noqa: E402
+    append_client_properties,
+    attach_store_columns,
+    benchmark_streaming_paths,
+    finalise_edge_table,
+    finalise_node_table,
+    join_edge_ids,
+    synthetic_window,
+)
+from config import RollingWindowConfig  # noqa: E402
+from dates import Window  # noqa: E402
+from frames import finalise_edge_frame, finalise_node_frame, join_edge_endpoint_ids  # noqa: E402
+from node_export import export_node_batches, node_batch_query, node_id_ranges, stream_node_batches  # noqa: E402
+
+
+def _assert_same_table(expected: pd.DataFrame, actual: pa.Table) -> None:
+    expected_table = pa.Table.from_pandas(expected, preserve_index=False).replace_schema_metadata(None)
+    assert actual.column_names == expected_table.column_names
+    assert actual.cast(expected_table.schema).equals(expected_table)
+
+
+def test_arrow_path_writes_the_pandas_path_columns():
+    cfg = RollingWindowConfig()
+    window = synthetic_window(150, 600, cfg=cfg, seed=3)
+    w = Window(start_year=2014, end_year_inclusive=2016, start_ms=1, end_ms=2)
+    meta = dict(cfg=cfg, w=w, window_graph_name="rw_2014_2016", params_hash="abc")
+
+    df = window.identity.attach(window.nodes.copy(), ["entity_id"])
+    df = finalise_node_frame(df, fcr_map=window.fcr_map, expand_embeddings=True, **meta)
+    table = attach_store_columns(window.node_table, window.store, cfg=cfg)
+    table = finalise_node_table(table, fcr_map=window.fcr_map, expand_embeddings=True, **meta)
+    _assert_same_table(df, table)
+
+    node_map = window.nodes[["nodeId", cfg.edge_id_property]]
+    df_edges = join_edge_endpoint_ids(window.relationships, node_map, edge_id_property=cfg.edge_id_property)
+    df_edges = finalise_edge_frame(df_edges, **meta)
+    edges = join_edge_ids(window.relationship_table, window.store, edge_id_property=cfg.edge_id_property)
+    _assert_same_table(df_edges, finalise_edge_table(edges, **meta))
+
+    summary = benchmark_streaming_paths(200, cfg=cfg, repeat=1)
+    assert set(summary["path"]) == {"pandas", "arrow"}
+    assert summary.loc[summary["part"] == "edges", "rows"].eq(800).all()
+
+
+def test_unknown_nodes_get_nulls_and_zero_client_properties():
+    cfg = RollingWindowConfig()
+    window = synthetic_window(20, 10, cfg=cfg)
+    known = window.node_table["nodeId"].to_numpy()
+    # A node outside the identity cache and the feature query.
+    streamed = pa.table({"nodeId": pa.array([known[0], 999_999]), "gds_id": pa.array([known[0], 999_999])})
+    streamed = append_client_properties(streamed, {"closeness": pd.Series([0.5, np.nan], index=[known[0], known[1]])})
+    table = attach_store_columns(streamed, window.store, cfg=cfg)
+
+    assert table["closeness"].to_pylist() == [0.5, 0.0]
+    assert table["entity_id"].to_pylist() == [f"E{known[0]}", None]
+    assert table["Id"].to_pylist()[1] is None
+    assert table["network_feats"].to_pylist()[1] is None
+
+
+class _BatchQueryGds:
+    """The two GDS calls of ``node_export.stream_node_batches``, answered from a synthetic window's node table."""
+
+    def __init__(self, node_table: pa.Table):
+        self.nodes = node_table.to_pandas().set_index("nodeId", drop=False)
+        self.graph = SimpleNamespace(nodeProperty=SimpleNamespace(stream=self._stream_ids))
+        self.batch_sizes: list[int] = []
+
+    def _stream_ids(self, G, prop: str, **config) -> pd.DataFrame:
+        assert config == {"listNodeLabels": True}
+        return self.nodes[["nodeId", "nodeLabels"]].sample(frac=1.0, random_state=0).reset_index(drop=True)
+
+    def run_cypher(self, query: str, params: dict) -> pd.DataFrame:
+        assert query == node_batch_query(params["properties"])
+        self.batch_sizes.append(len(params["nodeIds"]))
+        nodes = self.nodes.loc[params["nodeIds"]]
+        return pd.DataFrame(
+            {
+                "nodeId": nodes["nodeId"].to_numpy(),
+                **{
+                    f"p{i}": nodes[prop].map(lambda v: v.tolist() if isinstance(v, np.ndarray) else v).to_numpy()
+                    for i, prop in enumerate(params["properties"])
+                },
+            }
+        )
+
+
+def test_batched_node_export_writes_the_whole_window_file(tmp_path):
+    cfg = RollingWindowConfig(arrow_streaming=True, node_export_batch_size=64)
+    window = synthetic_window(300, 10, cfg=cfg, seed=5)
+    w = Window(start_year=2014, end_year_inclusive=2016, start_ms=1, end_ms=2)
+    meta = dict(cfg=cfg, w=w, window_graph_name="rw_2014_2016", params_hash="abc", expand_embeddings=True)
+    properties = [c for c in window.node_table.column_names if c not in ("nodeId", "nodeLabels")]
+    client_properties = {"closeness": pd.Series(np.linspace(0, 1, 300), index=window.node_table["nodeId"].to_numpy())}
+
+    whole = append_client_properties(window.node_table, client_properties)
+    whole = finalise_node_table(attach_store_columns(whole, window.store, cfg=cfg), fcr_map=window.fcr_map, **meta)
+
+    gds = _BatchQueryGds(window.node_table)
+    graph = SimpleNamespace(name=lambda: "rw_2014_2016")
+    exported = export_node_batches(
+        stream_node_batches(gds, graph, properties, batch_size=cfg.node_export_batch_size),
+        tmp_path / "nodes.parquet",
+        store=window.store,
+        client_properties=client_properties,
+        fcr_map=window.fcr_map,
+        collect_banks=True,
+        **meta,
+    )
+    assert exported.rows == 300 and exported.batches == 5
+    # Each query reads only the nodes of its batch.
+    assert gds.batch_sizes == [64, 64, 64, 64, 44]
+    assert pq.ParquetFile(tmp_path / "nodes.parquet").metadata.num_row_groups == 5
+    written = pq.read_table(tmp_path / "nodes.parquet")
+    assert written.column_names == whole.column_names
+    order = pc.sort_indices(whole, sort_keys=[("nodeId", "ascending")])
+    assert written.equals(whole.take(order).cast(written.schema))
+    assert exported.banks.num_rows == sum("Bank" in labels for labels in whole["nodeLabels"].to_pylist())
+
+    assert node_id_ranges(np.array([], dtype=np.int64), 10) == [slice(0, 0)]
@@ -0,0 +1,73 @@
+"""
+Tests for the bounded background queue of window post-processing (rolling_windows/background_writer.py).
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "rolling_windows"))
+
+from background_writer import BackgroundWriter  # noqa: E402
+
+
+def test_jobs_run_in_submission_order_and_close_flushes_them():
+    done: list[int] = []
+
+    def write(i: int) -> int:
+        time.sleep(0.01)
+        done.append(i)
+        return i * i
+
+    writer = BackgroundWriter(max_pending=3)
+    futures = [writer.submit(write, i) for i in range(10)]
+    writer.close()
+
+    assert done == list(range(10))
+    assert all(f.done() for f in futures)
+    assert [f.result() for f in futures] == [i * i for i in range(10)]
+
+
+def test_submit_blocks_while_max_pending_jobs_are_outstanding():
+    release = threading.Event()
+    writer = BackgroundWriter(max_pending=2)
+    writer.submit(release.wait)
+    writer.submit(release.wait)
+
+    third = threading.Thread(target=writer.submit, args=(lambda: None,))
+    third.start()
+    third.join(timeout=0.2)
+    assert third.is_alive()
+
+    release.set()
+    third.join(timeout=5)
+    assert not third.is_alive()
+    writer.close()
+
+
+@pytest.mark.parametrize("max_pending", [0, 2])
+def test_worker_failures_are_raised_on_the_calling_thread_at_close(max_pending):
+    def write(i: int) -> int:
+        if i in (1, 3):
+            raise OSError(f"disk full writing {i}")
+        return i
+
+    writer = BackgroundWriter(max_pending=max_pending)
+    futures = [writer.submit(write, i) for i in range(5)]
+    with pytest.raises(OSError, match="writing 1"):
+        writer.close()
+    # Every other job still ran, and a failure is raised only once.
+    assert [f.result() for f in futures if f.exception() is None] == [0, 2, 4]
+    writer.close()
+
+
+def test_close_without_raising_leaves_failures_to_the_futures():
+    with pytest.raises(KeyboardInterrupt):
+        with BackgroundWriter(max_pending=1) as writer:
+            fut = writer.submit(lambda: 1 / 0)
+            raise KeyboardInterrupt
+    assert isinstance(fut.exception(), ZeroDivisionError)
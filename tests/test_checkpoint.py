@@ -0,0 +1,91 @@
+"""
+Tests for the append-only checkpoint log (rolling_windows/checkpoint.py).
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "rolling_windows"))
+
+from checkpoint import CheckpointLog, output_entry, outputs_needed  # noqa: E402
+from config import RollingWindowConfig  # noqa: E402
+from frames import required_edge_columns, required_node_columns, window_output_paths  # noqa: E402
+from parquet import write_parquet  # noqa: E402
+
+
+def _write_outputs(cfg: RollingWindowConfig, name: str, rows: int = 3) -> tuple[Path, Path]:
+    node_path, edges_path = window_output_paths(cfg, name, params_hash="abc")
+    write_parquet(pd.DataFrame({c: range(rows) for c in sorted(required_node_columns(cfg))}), node_path)
+    write_parquet(pd.DataFrame({c: range(rows) for c in sorted(required_edge_columns(cfg) | {"x"})}), edges_path)
+    return node_path, edges_path
+
+
+def test_resume_reads_the_log_and_survives_a_torn_line(tmp_path):
+    cfg = RollingWindowConfig(output_dir=tmp_path)
+    log = CheckpointLog.for_run(cfg, "abc")
+    node_path, edges_path = _write_outputs(cfg, "rw_2010_2012")
+    log.append(
+        "rw_2010_2012",
+        status="done",
+        row={"window_graph_name": "rw_2010_2012", "window_start_ms": 2, "node_count": 3},
+        outputs={
+            "nodes": output_entry(node_path, root=tmp_path),
+            "edges": output_entry(edges_path, root=tmp_path),
+        },
+    )
+    # A hard kill mid-append leaves a partial last line.
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write('{"window_graph_name": "rw_2011_2013", "sta')
+
+    resumed = CheckpointLog.for_run(cfg, "abc")
+    kwargs = dict(window_graph_name="rw_2010_2012", node_out_path=node_path, edges_out_path=edges_path)
+    assert len(resumed) == 1
+    assert outputs_needed(resumed, cfg, skip_existing=True, **kwargs) == (False, False)
+    assert outputs_needed(resumed, cfg, skip_existing=False, **kwargs) == (True, True)
+
+    # A rewritten file no longer matches its entry; the other output is still reused.
+    write_parquet(pd.DataFrame({c: range(50) for c in sorted(required_node_columns(cfg))}), node_path)
+    assert outputs_needed(resumed, cfg, skip_existing=True, **kwargs) == (True, False)
+
+
+def test_legacy_outputs_are_adopted_and_compaction_merges_runs(tmp_path):
+    cfg = RollingWindowConfig(output_dir=tmp_path)
+    manifest_path = tmp_path / "manifest" / "manifest_abc.parquet"
+    write_parquet(
+        pd.DataFrame(
+            [
+                {"window_graph_name": "rw_2010_2012", "window_start_ms": 2, "node_count": 3, "skipped_existing": False},
+                {"window_graph_name": "rw_2009_2011", "window_start_ms": 1, "node_count": 7, "skipped_existing": False},
+            ]
+        ),
+        manifest_path,
+    )
+    node_path, edges_path = _write_outputs(cfg, "rw_2010_2012")
+    log = CheckpointLog.for_run(cfg, "abc")
+    kwargs = dict(window_graph_name="rw_2010_2012", node_out_path=node_path, edges_out_path=edges_path)
+    assert outputs_needed(log, cfg, skip_existing=True, **kwargs) == (False, False)
+    assert log.latest("rw_2010_2012")["status"] == "adopted"
+
+    log.append(
+        "rw_2011_2013",
+        status="done",
+        row={"window_graph_name": "rw_2011_2013", "window_start_ms": 3, "node_count": 9, "wall_time_s": 1.5},
+    )
+    log.append("rw_2012_2014", status="failed", error="boom")
+    log.append("rw_2011_2013", status="done", row={"window_graph_name": "rw_2011_2013", "window_start_ms": 3, "node_count": 10})
+
+    manifest = log.compact(manifest_path).set_index("window_graph_name")
+    assert manifest.loc["rw_2009_2011", "node_count"] == 7  # earlier run, untouched
+    assert manifest.loc["rw_2010_2012", "status"] == "adopted"
+    assert manifest.loc["rw_2010_2012", "node_count"] == 3  # adopted keeps its earlier row
+    assert manifest.loc["rw_2010_2012", "nodes_rows"] == 3
+    assert manifest.loc["rw_2011_2013", "node_count"] == 10  # latest record wins
+    assert manifest.loc["rw_2012_2014", "status"] == "failed"
+    assert pd.read_parquet(manifest_path).shape[0] == 4
+
+    # The compacted log has one line per window and still drives resume.
+    assert sum(1 for _ in open(log.path, encoding="utf-8")) == 3
+    assert outputs_needed(CheckpointLog.for_run(cfg, "abc"), cfg, skip_existing=True, **kwargs) == (False, False)
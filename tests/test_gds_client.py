@@ -0,0 +1,82 @@
+"""
+Tests for the shared-driver GDS session pool (rolling_windows/gds_client.py).
+"""
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "rolling_windows"))
+
+import gds_client  # noqa: E402
+from config import Neo4jConfig  # noqa: E402
+from gds_client import GdsSessionPool  # noqa: E402
+
+
+class FakeDriver:
+    def __init__(self, connected: bool = True):
+        self.connected = connected
+        self.closed = False
+
+    def verify_connectivity(self) -> None:
+        if not self.connected:
+            raise ConnectionError("connection reset")
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def drivers(monkeypatch):
+    created: list[FakeDriver] = []
+
+    def connect_driver(cfg):
+        created.append(FakeDriver())
+        return created[-1]
+
+    monkeypatch.setattr(gds_client, "connect_driver", connect_driver)
+    monkeypatch.setattr(gds_client, "gds_for_driver", lambda driver, cfg: ("client", driver))
+    return created
+
+
+def _cfg(pool_size: int = 4) -> Neo4jConfig:
+    return Neo4jConfig(uri="bolt://localhost:7687", user="neo4j", password="x", max_connection_pool_size=pool_size)
+
+
+def test_sessions_share_one_driver_and_block_when_all_are_busy(drivers):
+    with pytest.raises(ValueError):
+        GdsSessionPool(_cfg(pool_size=2), size=3)
+
+    with GdsSessionPool(_cfg(), size=2) as pool:
+        with pool.session() as a, pool.session() as b:
+            assert a.gds[1] is b.gds[1] is drivers[0]
+            waiter = threading.Thread(target=lambda: pool.session().__enter__())
+            waiter.start()
+            waiter.join(timeout=0.2)
+            assert waiter.is_alive()  # no idle client until a session is returned
+        waiter.join(timeout=5)
+        assert not waiter.is_alive()
+    assert len(drivers) == 1 and drivers[0].closed
+
+
+def test_reconnect_replaces_a_dead_driver_and_closes_it(drivers):
+    pool = GdsSessionPool(_cfg(), size=1)
+    with pool.session() as session:
+        # A live driver is kept; the session only gets a fresh client.
+        session.reconnect()
+        assert len(drivers) == 1
+
+        drivers[0].connected = False
+        client = session.reconnect()
+        assert len(drivers) == 2
+        assert drivers[0].closed and not drivers[1].closed
+        assert client[1] is session.gds[1] is drivers[1]
+
+    # The replaced client goes back into the pool.
+    with pool.session() as session:
+        assert session.gds[1] is drivers[1]
+    pool.close()
+    assert drivers[1].closed
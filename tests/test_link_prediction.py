@@ -0,0 +1,77 @@
+"""
+Tests for the run-level model cache of link prediction (rolling_windows/link_prediction.py).
+"""
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("mlflow")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from rolling_windows import link_prediction  # noqa: E402
+from rolling_windows.config import RollingWindowConfig  # noqa: E402
+from rolling_windows.link_prediction import LinkPredictor  # noqa: E402
+
+
+@pytest.fixture
+def trainings(monkeypatch):
+    """Calls of a fake horse race; epoch 0 blocks until ``release`` is set."""
+    calls: list[tuple[int, str, str | None]] = []
+    release = threading.Event()
+
+    def run_horse_race(inputs, df_nodes, lp_config, *, cfg, window_graph_name, epoch, parent_run_id):
+        calls.append((epoch, window_graph_name, parent_run_id))
+        if epoch == 0:
+            assert release.wait(timeout=5)
+        return object()
+
+    monkeypatch.setattr(link_prediction, "run_horse_race", run_horse_race)
+    return calls, release
+
+
+def test_each_epoch_is_trained_once_and_only_its_windows_wait(trainings):
+    calls, release = trainings
+    names = [f"rw_{2010 + i}_{2011 + i}" for i in range(4)]
+    predictor = LinkPredictor(RollingWindowConfig(lp_retrain_every=2), window_names=names, parent_run_id="parent")
+    models: dict[str, object] = {}
+
+    def model(name: str) -> None:
+        models[name] = predictor.model(predictor.epoch(name), None, window_graph_name=name)
+
+    epoch0 = [threading.Thread(target=model, args=(name,)) for name in names[:2]]
+    for thread in epoch0:
+        thread.start()
+    # Epoch 1 trains and is reused while epoch 0 is still training.
+    model(names[2])
+    model(names[3])
+    assert models[names[2]] is models[names[3]]
+    assert all(thread.is_alive() for thread in epoch0) and len(calls) == 2
+
+    release.set()
+    for thread in epoch0:
+        thread.join(timeout=5)
+    assert models[names[0]] is models[names[1]] is not models[names[2]]
+    assert sorted(epoch for epoch, _, _ in calls) == [0, 1]
+    assert {parent for _, _, parent in calls} == {"parent"}
+
+
+def test_a_failed_training_is_raised_to_its_waiters_and_retried(monkeypatch):
+    attempts: list[str] = []
+
+    def run_horse_race(inputs, df_nodes, lp_config, *, cfg, window_graph_name, epoch, parent_run_id):
+        attempts.append(window_graph_name)
+        if len(attempts) == 1:
+            raise RuntimeError("tracking server unavailable")
+        return "fitted"
+
+    monkeypatch.setattr(link_prediction, "run_horse_race", run_horse_race)
+    predictor = LinkPredictor(RollingWindowConfig(lp_retrain_every=0))
+    with pytest.raises(RuntimeError):
+        predictor.model(0, None, window_graph_name="rw_2010_2011")
+    assert predictor.model(0, None, window_graph_name="rw_2011_2012") == "fitted"
+    assert predictor.model(0, None, window_graph_name="rw_2012_2013") == "fitted"
+    assert attempts == ["rw_2010_2011", "rw_2011_2012"]
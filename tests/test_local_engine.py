@@ -0,0 +1,940 @@
+"""
+Tests for the offline rolling-window engine (rolling_windows/local_engine.py).
+
+The kernels are checked against reference implementations on a small fixture
+graph. The GDS parity test runs when ROLLING_WINDOWS_GDS_PARITY_DIR points at a
+directory holding a base snapshot (`snapshot/`) and GDS node outputs for the
+same graph (`nodes/node_features_rw_*.parquet`).
+"""
+import os
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+# Add project root and the flat-import package directory to sys.path
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "rolling_windows"))
+
+import local_algorithms as la  # noqa: E402
+from bank_panel import bank_panel_parts_dir, read_bank_panel  # noqa: E402
+from config import RollingWindowConfig  # noqa: E402
+from dataset import latest_params_hash, open_window_dataset, read_window_frame, window_filter  # noqa: E402
+from dates import Window, group_super_windows, iter_period_windows, year_start_ms  # noqa: E402
+from hashing import stable_hash_dict  # noqa: E402
+from interval_index import IntervalTree, TemporalIntervalIndex, load_or_build_interval_index  # noqa: E402
+from metrics import compute_fcr_temporal_bulk, fcr_maps_by_window  # noqa: E402
+from metrics import gds_config_metadata  # noqa: E402
+from planner import TemporalCounts, plan_windows  # noqa: E402
+from profiling import load_trace, summarise_trace  # noqa: E402
+from feature_blocks import feature_block_indices  # noqa: E402
+from vectors import read_node_features, read_vector_matrix  # noqa: E402
+from window_projection import SINGLE_PASS_BRANCHES, build_single_pass_projection  # noqa: E402
+from pair_features import NETWORK_FEATURES, PairFeatureEngine  # noqa: E402
+from mlflow_utils.rolling_window_loader import ROLLING_WINDOW_COLUMNS, RollingWindowDataLoader  # noqa: E402
+from local_engine import (  # noqa: E402
+    TemporalSnapshot,
+    active_relationship_mask,
+    compare_window_outputs,
+    compute_fcr_local,
+    fcr_intervals_from_snapshot,
+    process_window_local,
+    run_window_algorithms_local,
+    run_windows_local,
+    slice_window,
+)
+
+NAN = float("nan")
+MIN_T = -9_007_199_254_740_991.0
+MAX_T = 9_007_199_254_740_991.0
+
+
+def _fixture_snapshot() -> TemporalSnapshot:
+    y2010, y2012, y2015, y2030 = (year_start_ms(y) for y in (2010, 2012, 2015, 2030))
+    nodes = pd.DataFrame(
+        {
+            "nodeId": [10, 11, 12, 20, 21, 30, 31, 32, 33],
+            "nodeLabels": [["Bank"], ["Bank"], ["Bank"], ["Company"], ["Company"], ["Person"], ["Person"], ["Person"], ["Person"]],
+            "temporal_start": [y2010, y2010, y2015, y2010, NAN, NAN, NAN, NAN, NAN],
+            "temporal_end": [y2030, y2015, y2030, y2030, NAN, NAN, NAN, NAN, NAN],
+            "is_dead": [0, 1, 0, 0, 0, 0, 0, 0, 0],
+            "Id": ["B0", "B1", "B2", "C0", "C1", "P0", "P1", "P2", "P3"],
+            "bank_feats": [list(np.arange(60, dtype=float))] * 3 + [None] * 6,
+            "network_feats": [[1.0, 2.0]] * 3 + [None] * 6,
+            "regn_cbr": ["1481", "912", "2268", None, None, None, None, None, None],
+        }
+    )
+    nodes["tStart"] = nodes["temporal_start"].fillna(MIN_T)
+    nodes["tEnd"] = nodes["temporal_end"].fillna(MAX_T)
+    nodes["gds_id"] = nodes["nodeId"]
+    nodes["entity_id"] = nodes["Id"]
+
+    rels = pd.DataFrame(
+        [
+            # relId, source, target, type, weight, start, end, imputedFlag, source_imputed
+            (1, 30, 10, "OWNERSHIP", 0.6, y2010, y2030, 0.0, False),
+            (2, 31, 10, "OWNERSHIP", 0.4, y2010, y2030, 0.0, False),
+            (3, 20, 11, "OWNERSHIP", 1.0, y2010, y2012, 0.0, False),
+            (4, 30, 31, "FAMILY", 1.0, NAN, NAN, 0.0, False),
+            (5, 30, 32, "FAMILY", 1.0, NAN, NAN, 1.0, True),
+            (6, 31, 20, "MANAGEMENT", 1.0, y2010, NAN, 0.0, False),
+            (7, 33, 21, "MANAGEMENT", 1.0, y2015, NAN, 0.0, False),
+            (8, 21, 12, "OWNERSHIP", 1.0, y2015, y2030, 0.0, False),
+        ],
+        columns=[
+            "relId",
+            "sourceNodeId",
+            "targetNodeId",
+            "relationshipType",
+            "weight",
+            "temporal_start",
+            "temporal_end",
+            "imputedFlag",
+            "source_imputed",
+        ],
+    )
+    rels["tStart"] = rels["temporal_start"].fillna(MIN_T)
+    rels["tEnd"] = rels["temporal_end"].fillna(MAX_T)
+    return TemporalSnapshot.from_frames(nodes, rels)
+
+
+def _random_snapshot(seed: int = 11, n_nodes: int = 120, n_rels: int = 400) -> TemporalSnapshot:
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(["Bank", "Company", "Person"], size=n_nodes, p=[0.2, 0.3, 0.5])
+    start_year = rng.integers(2000, 2012, size=n_nodes)
+    open_ended = rng.random(n_nodes) < 0.3
+    nodes = pd.DataFrame(
+        {
+            "nodeId": np.arange(n_nodes) * 3 + 1,
+            "nodeLabels": [[label] for label in labels],
+            "temporal_start": [float(year_start_ms(int(y))) for y in start_year],
+            "temporal_end": [NAN if o else float(year_start_ms(int(y) + 6)) for y, o in zip(start_year, open_ended)],
+            "is_dead": 0,
+            "Id": [f"N{i}" for i in range(n_nodes)],
+            "bank_feats": None,
+            "network_feats": None,
+        }
+    )
+    nodes["tStart"] = nodes["temporal_start"].fillna(MIN_T)
+    nodes["tEnd"] = nodes["temporal_end"].fillna(MAX_T)
+    nodes["gds_id"] = nodes["nodeId"]
+    nodes["entity_id"] = nodes["Id"]
+
+    rel_start = rng.integers(2000, 2014, size=n_rels)
+    rels = pd.DataFrame(
+        {
+            "relId": np.arange(n_rels),
+            "sourceNodeId": nodes["nodeId"].to_numpy()[rng.integers(0, n_nodes, size=n_rels)],
+            "targetNodeId": nodes["nodeId"].to_numpy()[rng.integers(0, n_nodes, size=n_rels)],
+            "relationshipType": rng.choice(["OWNERSHIP", "MANAGEMENT", "FAMILY"], size=n_rels),
+            "weight": rng.uniform(0.1, 1.0, size=n_rels),
+            "temporal_start": [float(year_start_ms(int(y))) for y in rel_start],
+            "temporal_end": [float(year_start_ms(int(y) + int(d))) for y, d in zip(rel_start, rng.integers(1, 5, size=n_rels))],
+            "imputedFlag": (rng.random(n_rels) < 0.2).astype(float),
+        }
+    )
+    rels["source_imputed"] = rels["imputedFlag"] == 1.0
+    rels["tStart"] = rels["temporal_start"]
+    rels["tEnd"] = rels["temporal_end"]
+    return TemporalSnapshot.from_frames(nodes, rels)
+
+
+def _window(start_year: int, end_year_exclusive: int) -> Window:
+    return Window(
+        start_year=start_year,
+        end_year_inclusive=end_year_exclusive - 1,
+        start_ms=year_start_ms(start_year),
+        end_ms=year_start_ms(end_year_exclusive),
+    )
+
+
+def _random_digraph(n: int = 40, p: float = 0.08, seed: int = 7) -> nx.DiGraph:
+    return nx.gnp_random_graph(n, p, seed=seed, directed=True)
+
+
+def _edges(G: nx.DiGraph) -> tuple[np.ndarray, np.ndarray]:
+    arr = np.array(list(G.edges()), dtype=np.int64).reshape(-1, 2)
+    return arr[:, 0], arr[:, 1]
+
+
+def test_slice_window_applies_temporal_and_participant_rules():
+    snapshot = _fixture_snapshot()
+    graph = slice_window(snapshot, _window(2010, 2013), RollingWindowConfig())
+
+    node_ids = set(snapshot.nodes["nodeId"].to_numpy()[graph.node_rows].tolist())
+    # Bank 12 starts in 2015; Person 32 only has an imputed FAMILY edge;
+    # Person 33's MANAGEMENT edge starts in 2015.
+    assert node_ids == {10, 11, 20, 21, 30, 31}
+    rel_ids = set(snapshot.rels["relId"].to_numpy()[graph.rel_rows].tolist())
+    assert rel_ids == {1, 2, 3, 4, 6}
+
+    # The imputed FAMILY edge passes the temporal filter only with include_imputed01=1,
+    # and Person 32 still drops out afterwards because it has no outgoing edges.
+    w = _window(2010, 2013)
+    for include_imputed01, expected in ((0, False), (1, True)):
+        active = active_relationship_mask(
+            snapshot,
+            start_ms=w.start_ms,
+            end_ms=w.end_ms,
+            rel_types=RollingWindowConfig().rel_types,
+            include_imputed01=include_imputed01,
+        )
+        assert bool(active[snapshot.rels["relId"].to_numpy() == 5][0]) is expected
+    with_imputed = slice_window(snapshot, w, RollingWindowConfig(include_imputed01=1))
+    assert 32 not in set(snapshot.nodes["nodeId"].to_numpy()[with_imputed.node_rows].tolist())
+
+
+def _single_pass_graph(snapshot: TemporalSnapshot, w: Window, cfg: RollingWindowConfig) -> tuple[set, set]:
+    """``(node ids, relationship ids)`` the ``SINGLE_PASS_BRANCHES`` of the single-pass projection select on ``snapshot``."""
+    nodes, rels = snapshot.nodes, snapshot.rels
+    labels = {label: snapshot.has_label(label) for label in ("Bank", "Company", "Person")}
+    node_active = (labels["Bank"] | labels["Company"] | labels["Person"]) & (
+        (nodes["tStart"].to_numpy() < w.end_ms) & (nodes["tEnd"].to_numpy() > w.start_ms)
+    )
+    src = snapshot.node_positions(rels["sourceNodeId"].to_numpy())
+    dst = snapshot.node_positions(rels["targetNodeId"].to_numpy())
+    rel_active = active_relationship_mask(
+        snapshot,
+        start_ms=w.start_ms,
+        end_ms=w.end_ms,
+        rel_types=cfg.rel_types,
+        include_imputed01=cfg.include_imputed01,
+    )
+    rel_active &= node_active[src] & node_active[dst]
+    has_out = np.zeros(len(nodes), dtype=bool)
+    has_out[src[rel_active]] = True
+
+    node_keep = np.zeros(len(nodes), dtype=bool)
+    rel_keep = np.zeros(len(rels), dtype=bool)
+    for branch in SINGLE_PASS_BRANCHES:
+        # Nodes that pass the branch's active out-edge requirement.
+        passes = np.ones(len(nodes), dtype=bool)
+        if branch.requires_out_edge:
+            passes = has_out.copy()
+            for label in branch.exempt_labels:
+                passes |= labels[label]
+
+        if branch.relationship:
+            rows = np.flatnonzero(rel_active & passes[dst])
+            rel_keep[rows] = True
+            node_keep[src[rows]] = node_keep[dst[rows]] = True
+        else:
+            sources = np.logical_or.reduce([labels[label] for label in branch.source_labels])
+            node_keep |= node_active & sources & passes
+    return set(nodes["nodeId"].to_numpy()[node_keep].tolist()), set(rels["relId"].to_numpy()[rel_keep].tolist())
+
+
+def test_single_pass_projection_matches_participant_graph():
+    query = build_single_pass_projection(RollingWindowConfig().rel_types)
+    assert query.count("UNION") == len(SINGLE_PASS_BRANCHES) - 1
+    fixture, random = _fixture_snapshot(), _random_snapshot()
+    cases = [(fixture, _window(2010, 2013)), (fixture, _window(2014, 2017))]
+    cases += [(random, _window(y, y + 3)) for y in range(2000, 2012)]
+
+    isolated_persons = 0
+    for snapshot, w in cases:
+        for include_imputed01 in (0, 1):
+            cfg = RollingWindowConfig(include_imputed01=include_imputed01)
+            graph = slice_window(snapshot, w, cfg)
+            node_ids = set(snapshot.nodes["nodeId"].to_numpy()[graph.node_rows].tolist())
+            rel_ids = set(snapshot.rels["relId"].to_numpy()[graph.rel_rows].tolist())
+            assert _single_pass_graph(snapshot, w, cfg) == (node_ids, rel_ids), (w, include_imputed01)
+
+            # Persons kept only by the third branch: an active out-edge, but only to dropped Persons.
+            kept_sources = set(snapshot.rels["sourceNodeId"].to_numpy()[graph.rel_rows].tolist())
+            persons = snapshot.nodes["nodeId"].to_numpy()[graph.node_rows[snapshot.has_label("Person")[graph.node_rows]]]
+            isolated_persons += len(set(persons.tolist()) - kept_sources)
+    assert isolated_persons > 0
+
+
+def test_super_windows_contain_their_windows_temporal_graphs():
+    snapshot = _random_snapshot()
+    cfg = RollingWindowConfig()
+    windows = iter_period_windows(start_year=2000, end_start_year=2011, window_size=3, step_size=1, period_type="yearly")
+    groups = group_super_windows(windows, years=4)
+
+    assert [w for sw in groups for w in sw.windows] == windows
+    assert [sw.name_suffix for sw in groups] == ["sw_2000_2003", "sw_2004_2007", "sw_2008_2011"]
+
+    def active(start_ms: int, end_ms: int) -> tuple[np.ndarray, np.ndarray]:
+        nodes = snapshot.nodes
+        node_mask = (nodes["tStart"].to_numpy() < float(end_ms)) & (nodes["tEnd"].to_numpy() > float(start_ms))
+        rel_mask = active_relationship_mask(
+            snapshot,
+            start_ms=float(start_ms),
+            end_ms=float(end_ms),
+            rel_types=cfg.rel_types,
+            include_imputed01=cfg.include_imputed01,
+        )
+        return node_mask, rel_mask
+
+    # Filtering an inner window from its super-window graph must see everything the base graph would.
+    for sw in groups:
+        sw_nodes, sw_rels = active(sw.start_ms, sw.end_ms)
+        for w in sw.windows:
+            assert sw.start_ms <= w.start_ms and w.end_ms <= sw.end_ms
+            w_nodes, w_rels = active(w.start_ms, w.end_ms)
+            assert not np.any(w_nodes & ~sw_nodes)
+            assert not np.any(w_rels & ~sw_rels)
+
+
+def test_interval_tree_matches_linear_scan():
+    rng = np.random.default_rng(3)
+    starts = rng.integers(0, 1_000, size=2_000).astype(float)
+    ends = starts + rng.integers(1, 300, size=2_000)
+    starts[:50], ends[50:100] = MIN_T, MAX_T  # open-ended bounds
+    ends[100:110] = starts[100:110] - 5  # inverted intervals still follow the scan predicate
+    tree = IntervalTree.build(np.arange(len(starts)), starts, ends, leaf_size=16)
+
+    for qs, qe in [(0, 10), (250, 500), (999, 1_000), (-1, 2_000), (400, 400)]:
+        expected = np.flatnonzero((starts < qe) & (ends > qs))
+        np.testing.assert_array_equal(tree.query(qs, qe), expected)
+
+
+def test_interval_index_slices_like_scan_and_persists(tmp_path):
+    snapshot = _fixture_snapshot()
+    index = load_or_build_interval_index(snapshot, tmp_path / "index")
+    reloaded = TemporalIntervalIndex.load(tmp_path / "index")
+    assert reloaded.fingerprint == index.fingerprint
+
+    for include_imputed01 in (0, 1):
+        cfg = RollingWindowConfig(include_imputed01=include_imputed01)
+        for w in (_window(2010, 2013), _window(2014, 2017), _window(2000, 2040)):
+            scanned = slice_window(snapshot, w, cfg)
+            indexed = slice_window(snapshot, w, cfg, index=reloaded)
+            np.testing.assert_array_equal(indexed.node_rows, scanned.node_rows)
+            np.testing.assert_array_equal(indexed.rel_rows, scanned.rel_rows)
+            np.testing.assert_array_equal(indexed.src, scanned.src)
+            np.testing.assert_array_equal(indexed.dst, scanned.dst)
+
+
+def test_betweenness_matches_networkx():
+    G = _random_digraph()
+    src, dst = _edges(G)
+    expected = nx.betweenness_centrality(G, normalized=False)
+    got = la.betweenness(G.number_of_nodes(), src, dst)
+    np.testing.assert_allclose(got, [expected[i] for i in range(G.number_of_nodes())], atol=1e-9)
+
+
+def test_closeness_accumulates_incoming_distances():
+    G = _random_digraph()
+    n = G.number_of_nodes()
+    farness = np.zeros(n)
+    component = np.zeros(n)
+    for s in range(n):
+        for v, d in nx.single_source_shortest_path_length(G, s).items():
+            if v != s:
+                farness[v] += d
+                component[v] += 1
+    expected = np.divide(component, farness, out=np.zeros(n), where=farness > 0)
+    src, dst = _edges(G)
+    np.testing.assert_allclose(la.closeness(n, src, dst), expected, atol=1e-12)
+
+
+def test_page_rank_converges_to_linear_solution():
+    G = _random_digraph()
+    n = G.number_of_nodes()
+    src, dst = _edges(G)
+    weight = np.linspace(0.5, 2.0, len(src))
+    scores, iterations = la.page_rank(n, src, dst, weight, max_iterations=500, tolerance=1e-12)
+
+    out_w = np.bincount(src, weights=weight, minlength=n)
+    T = np.zeros((n, n))
+    for s, t, w in zip(src, dst, weight):
+        T[t, s] += w / out_w[s]
+    expected = np.linalg.solve(np.eye(n) - 0.85 * T, np.full(n, 0.15))
+    np.testing.assert_allclose(scores, expected, atol=1e-9)
+    assert iterations < 500
+
+
+def test_wcc_and_louvain_partitions():
+    G = nx.DiGraph()
+    for offset in (0, 5):
+        G.add_edges_from((offset + i, offset + j) for i in range(5) for j in range(5) if i < j)
+    G.add_edge(4, 5)
+    G.add_node(10)
+    n = G.number_of_nodes()
+    src, dst = _edges(G)
+
+    components = la.wcc(n, src, dst)
+    assert len(set(components[:10])) == 1 and components[10] == 10
+
+    levels, _ = la.louvain(n, src, dst)
+    final = levels[-1]
+    assert len(set(final[:5])) == 1 and len(set(final[5:10])) == 1
+    assert final[0] != final[5]
+
+
+def test_fcr_local_matches_cypher_semantics():
+    snapshot = _fixture_snapshot()
+    fcr = compute_fcr_local(snapshot, _window(2010, 2013))
+    # Bank 10: owners P0 (1 official FAMILY member) and P1 (1) -> 1.0
+    # Bank 11: owner C0 has no FAMILY edges -> 0.0
+    # Company 20 has no owners and Company 21 has no temporal bounds -> absent
+    assert fcr == {10: 1.0, 11: 0.0}
+
+
+def test_bulk_fcr_matches_per_window_query():
+    fixture = _fixture_snapshot()
+    snapshot = _random_snapshot(seed=5, n_nodes=150, n_rels=900)
+    # Open-ended FAMILY bounds on some edges, as stored in Neo4j
+    rels = snapshot.rels.copy()
+    family = np.flatnonzero(rels["relationshipType"].to_numpy() == "FAMILY")
+    rels.loc[family[::3], "temporal_start"] = NAN
+    rels.loc[family[1::4], "temporal_end"] = NAN
+    snapshot = TemporalSnapshot.from_frames(snapshot.nodes, rels)
+
+    windows = [_window(y, y + 3) for y in range(2000, 2016)]
+    for snap in (fixture, snapshot):
+        # max_cells forces several window chunks
+        table = compute_fcr_temporal_bulk(fcr_intervals_from_snapshot(snap), windows, max_cells=2000)
+        maps = fcr_maps_by_window(table)
+        for w in windows:
+            expected = compute_fcr_local(snap, w)
+            got = maps.get((w.start_ms, w.end_ms), {})
+            assert got.keys() == expected.keys()
+            for k, v in expected.items():
+                assert got[k] == pytest.approx(v)
+        assert any(maps.values())
+
+
+def test_approximate_centrality_is_calibrated_against_exact():
+    snapshot = _random_snapshot(seed=9, n_nodes=300, n_rels=1500)
+    w = _window(2004, 2010)
+    exact_cfg = RollingWindowConfig(run_fastrp=False, run_louvain=False)
+    graph = slice_window(snapshot, w, exact_cfg)
+    exact, _ = run_window_algorithms_local(snapshot, graph, exact_cfg)
+
+    # Sampling every node reproduces the exact values.
+    full = RollingWindowConfig(
+        run_fastrp=False,
+        run_louvain=False,
+        centrality_mode="approximate",
+        betweenness_sampling_size=graph.node_count,
+        closeness_landmarks=graph.node_count,
+    )
+    props, _ = run_window_algorithms_local(snapshot, graph, full)
+    np.testing.assert_allclose(props["betweenness"], exact["betweenness"])
+    np.testing.assert_allclose(props["closeness"], exact["closeness"])
+
+    sampled = RollingWindowConfig(
+        run_fastrp=False,
+        run_louvain=False,
+        centrality_mode="approximate",
+        betweenness_sampling_size=graph.node_count // 3,
+        closeness_landmarks=graph.node_count // 3,
+    )
+    props, stats = run_window_algorithms_local(snapshot, graph, sampled, calibrate=True)
+    assert stats["betweenness_sampling_size"] == stats["closeness_landmarks"] == graph.node_count // 3
+    assert stats["centrality_calibration"] is True
+    assert stats["betweenness_spearman"] > 0.7
+    assert stats["closeness_spearman"] > 0.7
+
+    # Approximate settings change params_hash; exact runs keep the keys they always had.
+    assert "centrality_mode" not in gds_config_metadata(exact_cfg)
+    assert gds_config_metadata(sampled)["closeness_landmarks"] == graph.node_count // 3
+
+
+def test_preflight_plan_counts_and_concurrency():
+    snapshot = _random_snapshot()
+    cfg = RollingWindowConfig()
+    windows = [_window(y, y + 3) for y in range(2000, 2012)]
+    counts = TemporalCounts.from_snapshot(snapshot, cfg).counts(windows)
+
+    for w, rec in zip(windows, counts.to_dict("records")):
+        nodes = snapshot.nodes
+        active_nodes = (nodes["tStart"] < w.end_ms) & (nodes["tEnd"] > w.start_ms)
+        active_rels = active_relationship_mask(
+            snapshot,
+            start_ms=float(w.start_ms),
+            end_ms=float(w.end_ms),
+            rel_types=cfg.rel_types,
+            include_imputed01=cfg.include_imputed01,
+        )
+        assert rec["node_count"] == int(active_nodes.sum())
+        assert rec["relationship_count"] == int(active_rels.sum())
+        # Upper bound of the participant graph
+        graph = slice_window(snapshot, w, cfg)
+        assert graph.node_count <= rec["node_count"] and graph.relationship_count <= rec["relationship_count"]
+
+    # Memory grows with graph size and concurrency; the largest windows come first.
+    plan = plan_windows(
+        counts,
+        estimate_bytes=lambda n, m, c: (n + m) * c,
+        budget_bytes=int((counts["node_count"] + counts["relationship_count"]).median() * 2),
+        max_concurrency=8,
+    )
+    assert plan["order"].tolist() == list(range(len(windows)))
+    assert plan["relative_cost"].is_monotonic_decreasing
+    assert set(plan["concurrency"]) <= {8, 4, 2, 1}
+    fits = plan["fits_budget"]
+    assert (plan.loc[fits, "estimated_bytes"] <= plan.loc[fits, "budget_bytes"]).all()
+    assert (plan.loc[~fits, "concurrency"] == 1).all()
+    small = plan.loc[plan["node_count"].idxmin()]
+    large = plan.loc[plan["node_count"].idxmax()]
+    assert small["concurrency"] >= large["concurrency"]
+
+
+def test_network_pair_features_use_the_node_file_columns(tmp_path):
+    cfg = RollingWindowConfig(output_dir=tmp_path, run_fastrp=False)
+    process_window_local(_fixture_snapshot(), _window(2010, 2013), cfg=cfg, params_hash="test")
+    nodes = pd.read_parquet(tmp_path / "nodes" / "node_features_rw_2010_2012.parquet")
+
+    engine = PairFeatureEngine(nodes)
+    assert engine.network_cols == NETWORK_FEATURES
+    pairs = pd.DataFrame({"source_id": ["P0", "B0"], "target_id": ["B0", "C0"]})
+    features = engine.pair_features(pairs, ["network"])
+    assert features.columns == tuple(f"{c}_{op}" for c in NETWORK_FEATURES for op in ("sum", "diff"))
+    by_id = nodes.set_index("entity_id")
+    expected = by_id.loc["P0", list(NETWORK_FEATURES)] + by_id.loc["B0", list(NETWORK_FEATURES)]
+    np.testing.assert_allclose(features.matrix[0, ::2], expected.to_numpy(dtype=float), rtol=1e-6)
+
+
+def test_process_window_writes_gds_schema(tmp_path):
+    snapshot = _fixture_snapshot()
+    cfg = RollingWindowConfig(output_dir=tmp_path, run_fastrp=True, embedding_dimension=8)
+    w = _window(2010, 2013)
+    row = process_window_local(snapshot, w, cfg=cfg, params_hash="test")
+
+    nodes = pd.read_parquet(tmp_path / "nodes" / "node_features_rw_2010_2012.parquet")
+    edges = pd.read_parquet(tmp_path / "edges" / "edge_list_rw_2010_2012.parquet")
+    assert row["node_count"] == len(nodes) == 6
+    assert row["edge_count"] == len(edges) == 5
+    for col in (
+        "nodeId", "page_rank", "in_degree", "out_degree", "family_degree", "betweenness",
+        "closeness", "eigenvector", "wcc", "community_louvain", "fastrp_embedding", "is_dead",
+        "gds_id", "nodeLabels", "Id", "bank_feats", "network_feats", "entity_id", "window_start_ms",
+        "window_graph_name", "params_hash", "total_degree", "fcr_temporal", "state_feats", "other_feats",
+    ):
+        assert col in nodes.columns, col
+    assert {"source_Id", "target_Id", "relationshipType", "edge_id_property"} <= set(edges.columns)
+    assert nodes.set_index("nodeId").loc[10, "fcr_temporal"] == 1.0
+
+
+def test_fixed_size_vectors_resolve_feature_blocks_when_read(tmp_path):
+    snapshot = _fixture_snapshot()
+    w = _window(2010, 2013)
+    paths = {}
+    for storage in ("list", "fixed_size"):
+        cfg = RollingWindowConfig(
+            output_dir=tmp_path / storage, run_fastrp=True, embedding_dimension=8, vector_storage=storage
+        )
+        process_window_local(snapshot, w, cfg=cfg, params_hash="test")
+        paths[storage] = tmp_path / storage / "nodes" / "node_features_rw_2010_2012.parquet"
+
+    schema = pq.read_schema(paths["fixed_size"])
+    for col in ("fastrp_embedding", "bank_feats", "network_feats"):
+        assert pa.types.is_fixed_size_list(schema.field(col).type), col
+    assert not set(feature_block_indices()) & set(schema.names)
+
+    bank = read_vector_matrix(paths["fixed_size"], "bank_feats")
+    assert bank.dtype == np.float32 and bank.shape == (6, 60)
+    assert not bank.flags.owndata  # a view of the Arrow buffer
+
+    expected = pd.read_parquet(paths["list"])
+    resolved = read_node_features(paths["fixed_size"], ["nodeId"], blocks=True)
+    assert resolved["nodeId"].tolist() == expected["nodeId"].tolist()
+    for block in feature_block_indices():
+        np.testing.assert_allclose(np.vstack(resolved[block].tolist()), np.vstack(expected[block].tolist()))
+    np.testing.assert_allclose(
+        read_vector_matrix(paths["fixed_size"], "fastrp_embedding"),
+        np.vstack(expected["fastrp_embedding"].tolist()),
+        rtol=1e-6,
+    )
+    # Plain pandas readers still work: fixed-size vectors come back as arrays.
+    plain = pd.read_parquet(paths["fixed_size"])
+    np.testing.assert_allclose(np.vstack(plain["bank_feats"].tolist()), bank)
+
+
+def test_run_windows_local_is_worker_independent(tmp_path):
+    snapshot = _fixture_snapshot()
+    snapshot.save(tmp_path / "snapshot")
+    base = dict(start_year=2010, end_start_year=2014, window_size=2, step_size=1, run_fastrp=False)
+
+    serial = run_windows_local(
+        cfg=RollingWindowConfig(output_dir=tmp_path / "serial", **base),
+        snapshot_dir=tmp_path / "snapshot",
+        max_workers=1,
+        show_tqdm=False,
+    )
+    parallel = run_windows_local(
+        cfg=RollingWindowConfig(output_dir=tmp_path / "parallel", **base),
+        snapshot_dir=tmp_path / "snapshot",
+        max_workers=2,
+        show_tqdm=False,
+    )
+    pd.testing.assert_series_equal(serial["node_count"], parallel["node_count"])
+    for name in serial["window_graph_name"]:
+        a = pd.read_parquet(tmp_path / "serial" / "nodes" / f"node_features_{name}.parquet")
+        b = pd.read_parquet(tmp_path / "parallel" / "nodes" / f"node_features_{name}.parquet")
+        report = compare_window_outputs(a, b)
+        assert (report["max_abs_diff"] == 0).all()
+
+
+def test_partitioned_dataset_pushes_down_labels_and_time(tmp_path):
+    _fixture_snapshot().save(tmp_path / "snapshot")
+    base = dict(start_year=2010, end_start_year=2016, window_size=2, step_size=1, run_fastrp=False, dedup_windows=True)
+    files = run_windows_local(
+        cfg=RollingWindowConfig(output_dir=tmp_path / "files", **base),
+        snapshot_dir=tmp_path / "snapshot",
+        max_workers=1,
+        show_tqdm=False,
+    )
+    run_windows_local(
+        cfg=RollingWindowConfig(output_dir=tmp_path / "ds", output_layout="dataset", dataset_row_group_size=2, **base),
+        snapshot_dir=tmp_path / "snapshot",
+        max_workers=1,
+        show_tqdm=False,
+    )
+    params_hash = files["params_hash"].iloc[0]
+    assert not (tmp_path / "ds" / "nodes").exists()
+    assert (
+        tmp_path / "ds" / "dataset" / "nodes" / f"params_hash={params_hash}" / "period_type=yearly"
+        / "window_graph_name=rw_2010_2011" / "part-0.parquet"
+    ).exists()
+
+    node_files = [tmp_path / "files" / "nodes" / f"node_features_{name}.parquet" for name in files["window_graph_name"]]
+    expected = pd.concat([pd.read_parquet(path) for path in node_files], ignore_index=True)
+    is_bank = expected["nodeLabels"].map(lambda labels: "Bank" in labels)
+    columns = ["Id", "page_rank", "in_degree", "window_start_year", "window_end_year_inclusive"]
+    banks = expected[is_bank]
+    start_ms, end_ms = year_start_ms(2013), year_start_ms(2015)
+    banks = banks[(banks["window_end_ms"] > start_ms) & (banks["window_start_ms"] < end_ms)]
+    actual = read_window_frame(
+        tmp_path / "ds", columns, params_hash=params_hash, labels=["Bank"], start_ms=start_ms, end_ms=end_ms
+    )
+    assert list(actual.columns) == columns
+    key = ["window_start_year", "Id"]
+    pd.testing.assert_frame_equal(
+        actual.sort_values(key).reset_index(drop=True),
+        banks[columns].sort_values(key).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+    # Bank rows are sorted first, so their filter reads only the row groups holding banks.
+    dataset = open_window_dataset(tmp_path / "ds", params_hash=params_hash)
+    total = sum(f.metadata.num_row_groups for f in dataset.get_fragments())
+    bank_filter = window_filter(labels=["Bank"])
+    kept = sum(len(f.split_by_row_group(bank_filter)) for f in dataset.get_fragments(filter=bank_filter))
+    banks_per_window = expected[is_bank].groupby("window_graph_name").size()
+    assert kept == int(np.ceil(banks_per_window / 2).sum()) < total
+
+    # Partition keys come back as the window metadata columns they replace.
+    whole = read_window_frame(tmp_path / "ds", params_hash=params_hash, windows=["rw_2015_2016"])
+    assert set(whole["window_graph_name"]) == {"rw_2015_2016"}
+    assert set(whole["params_hash"]) == {params_hash} and set(whole["period_type"]) == {"yearly"}
+    assert len(whole) == files.set_index("window_graph_name").loc["rw_2015_2016", "node_count"]
+
+
+def test_loader_reads_one_run_of_a_shared_dataset(tmp_path):
+    _fixture_snapshot().save(tmp_path / "snapshot")
+    base = dict(start_year=2010, end_start_year=2014, step_size=1, run_fastrp=False, output_layout="dataset")
+    runs = [
+        run_windows_local(
+            cfg=RollingWindowConfig(output_dir=tmp_path / "out", **base, **settings),
+            snapshot_dir=tmp_path / "snapshot",
+            max_workers=1,
+            show_tqdm=False,
+        )
+        for settings in (dict(window_size=2, run_wcc=False), dict(window_size=3, run_louvain=False))
+    ]
+    older, newer = (run["params_hash"].iloc[0] for run in runs)
+    assert older != newer
+    # The manifest of the second run is the newest, whatever the file system's mtime resolution.
+    manifest = tmp_path / "out" / "manifest" / f"manifest_{older}.parquet"
+    os.utime(manifest, (manifest.stat().st_atime - 60, manifest.stat().st_mtime - 60))
+    assert latest_params_hash(tmp_path / "out") == newer
+
+    loader = RollingWindowDataLoader.__new__(RollingWindowDataLoader)
+    loader.output_dir = str(tmp_path / "out")
+    loader.dataset_dir = str(tmp_path / "out" / "dataset" / "nodes")
+    loader.bank_panel_dir = str(tmp_path / "out" / "bank_panel")
+    for params_hash, run in ((None, runs[1]), (older, runs[0]), (newer, runs[1])):
+        df = loader.load_all_rolling_windows(columns=ROLLING_WINDOW_COLUMNS, labels=["Bank"], params_hash=params_hash)
+        expected_hash = run["params_hash"].iloc[0]
+        missing = "community_louvain" if expected_hash == newer else "wcc"
+        assert list(df.columns) == [c for c in ROLLING_WINDOW_COLUMNS if c != missing]
+        expected_banks = read_window_frame(tmp_path / "out", ["Id"], params_hash=expected_hash, labels=["Bank"])
+        assert len(df) == len(expected_banks) > 0
+        assert set(zip(df["window_start_year"], df["window_end_year_inclusive"])) == set(
+            zip(run["window_start_year"], run["window_end_year_inclusive"])
+        )
+
+
+def test_bank_panel_holds_sorted_bank_metrics_of_every_window(tmp_path):
+    _fixture_snapshot().save(tmp_path / "snapshot")
+    base = dict(start_year=2010, end_start_year=2014, window_size=2, step_size=1, run_fastrp=False)
+    # Written without the panel, then rerun with it: one window is recomputed (a part), the
+    # skipped ones are read back from their node files; the third run merges with that panel.
+    for bank_panel, rerun in ((False, None), (True, "rw_2011_2012"), (True, "rw_2013_2014")):
+        if rerun is not None:
+            (tmp_path / "nodes" / f"node_features_{rerun}.parquet").unlink()
+        manifest = run_windows_local(
+            cfg=RollingWindowConfig(output_dir=tmp_path, bank_panel=bank_panel, **base),
+            snapshot_dir=tmp_path / "snapshot",
+            max_workers=2,
+            show_tqdm=False,
+            skip_existing=True,
+        )
+    params_hash = manifest["params_hash"].iloc[0]
+    assert not bank_panel_parts_dir(RollingWindowConfig(output_dir=tmp_path), params_hash).exists()
+    panel = read_bank_panel(tmp_path, params_hash)
+
+    nodes = pd.concat(
+        [pd.read_parquet(path) for path in sorted((tmp_path / "nodes").glob("node_features_*.parquet"))],
+        ignore_index=True,
+    )
+    banks = nodes[nodes["nodeLabels"].map(lambda labels: "Bank" in labels)]
+    assert set(panel["window_graph_name"]) == set(banks["window_graph_name"]) and panel["window_graph_name"].nunique() == 5
+    assert len(panel) == len(banks)
+    assert list(panel.columns[:4]) == ["window_graph_name", "regn_cbr", "Id", "entity_id"]
+    assert {"fcr_temporal", "page_rank", "louvain_level_0", "window_start_ms"} <= set(panel.columns)
+    assert not any(c.startswith("emb_") or c in {"bank_feats", "community_louvain", "nodeLabels"} for c in panel.columns)
+    assert dict(zip(panel["Id"], panel["regn_cbr"])) == {"B0": "1481", "B1": "912", "B2": "2268"}
+    order = panel[["regn_cbr", "window_start_ms", "Id"]]
+    pd.testing.assert_frame_equal(order, order.sort_values(list(order.columns)))
+
+    key = ["window_graph_name", "Id"]
+    expected = banks.sort_values(key).reset_index(drop=True)
+    actual = panel.sort_values(key).reset_index(drop=True)
+    for column in ("page_rank", "in_degree", "fcr_temporal", "is_dead"):
+        np.testing.assert_allclose(actual[column].astype(float), expected[column].astype(float))
+    louvain = expected["community_louvain"].map(lambda levels: levels[0] if np.ndim(levels) else levels)
+    np.testing.assert_array_equal(actual["louvain_level_0"].to_numpy(), louvain.to_numpy())
+
+
+def test_identical_windows_are_deduplicated(tmp_path):
+    _fixture_snapshot().save(tmp_path / "snapshot")
+    # From 2015 on every relationship and node of the fixture is active, so all windows share one graph.
+    base = dict(start_year=2014, end_start_year=2019, window_size=2, step_size=1, run_fastrp=False)
+    plain = run_windows_local(
+        cfg=RollingWindowConfig(output_dir=tmp_path / "plain", **base),
+        snapshot_dir=tmp_path / "snapshot",
+        max_workers=1,
+        show_tqdm=False,
+    )
+    dedup = run_windows_local(
+        cfg=RollingWindowConfig(output_dir=tmp_path / "dedup", dedup_windows=True, **base),
+        snapshot_dir=tmp_path / "snapshot",
+        max_workers=1,
+        show_tqdm=False,
+    )
+
+    assert dedup["dedup_hit"].tolist() == [False, False, True, True, True, True]
+    assert dedup["dedup_source_window"].iloc[2:].eq("rw_2015_2016").all()
+    assert dedup["window_fingerprint"].iloc[1:].nunique() == 1
+    assert dedup["window_fingerprint"].iloc[0] != dedup["window_fingerprint"].iloc[1]
+    pd.testing.assert_series_equal(plain["edge_count"], dedup["edge_count"])
+    for name in plain["window_graph_name"]:
+        for kind, stem in (("nodes", "node_features"), ("edges", "edge_list")):
+            a = pd.read_parquet(tmp_path / "plain" / kind / f"{stem}_{name}.parquet")
+            b = pd.read_parquet(tmp_path / "dedup" / kind / f"{stem}_{name}.parquet")
+            pd.testing.assert_frame_equal(a, b, check_like=True)
+
+
+def test_node_property_edits_invalidate_dedup_entries(tmp_path):
+    snapshot = _fixture_snapshot()
+    snapshot.save(tmp_path / "snapshot")
+    cfg = RollingWindowConfig(
+        output_dir=tmp_path / "out",
+        dedup_windows=True,
+        start_year=2014,
+        end_start_year=2019,
+        window_size=2,
+        step_size=1,
+        run_fastrp=False,
+    )
+    first = run_windows_local(cfg=cfg, snapshot_dir=tmp_path / "snapshot", max_workers=1, show_tqdm=False)
+
+    # Same graph, but Bank 12 was renamed: no window may reuse outputs holding the old Id.
+    nodes = snapshot.nodes.copy()
+    nodes.loc[nodes["nodeId"] == 12, ["Id", "entity_id"]] = "B2-renamed"
+    TemporalSnapshot.from_frames(nodes, snapshot.rels).save(tmp_path / "snapshot")
+    second = run_windows_local(
+        cfg=cfg, snapshot_dir=tmp_path / "snapshot", skip_existing=False, max_workers=1, show_tqdm=False
+    )
+
+    assert set(second["window_fingerprint"]).isdisjoint(first["window_fingerprint"])
+    assert second["dedup_hit"].tolist() == [False, False, True, True, True, True]
+    for name in second["window_graph_name"].iloc[1:]:
+        ids = pd.read_parquet(tmp_path / "out" / "nodes" / f"node_features_{name}.parquet")["Id"]
+        assert "B2-renamed" in set(ids) and "B2" not in set(ids), name
+
+    # --dedup-invalidate forgets every registered window before the run.
+    dedup_dir = next((tmp_path / "out" / "dedup").iterdir())
+    (dedup_dir / "stale.json").write_text('{"window_graph_name": "rw_1999_2000", "nodes": null, "edges": null}')
+    run_windows_local(
+        cfg=replace(cfg, dedup_invalidate=True),
+        snapshot_dir=tmp_path / "snapshot",
+        skip_existing=False,
+        max_workers=1,
+        show_tqdm=False,
+    )
+    assert not (dedup_dir / "stale.json").exists()
+    assert len(list(dedup_dir.glob("*.json"))) == 2
+
+def test_stage_profile_traces_every_window(tmp_path):
+    _fixture_snapshot().save(tmp_path / "snapshot")
+    cfg = RollingWindowConfig(
+        output_dir=tmp_path / "out",
+        start_year=2010,
+        end_start_year=2013,
+        window_size=2,
+        step_size=1,
+        run_fastrp=False,
+        profile_stages=True,
+    )
+    manifest = run_windows_local(cfg=cfg, snapshot_dir=tmp_path / "snapshot", max_workers=2, show_tqdm=False)
+
+    traces = sorted((tmp_path / "out" / "profile").glob("trace_*.parquet"))
+    assert len(traces) == 1
+    trace = load_trace(traces[0])
+    assert set(trace["window_graph_name"]) == set(manifest["window_graph_name"])
+    per_window = trace.groupby("window_graph_name")["stage"].apply(set)
+    for stages in per_window:
+        assert {"slice", "page_rank", "betweenness", "louvain", "fcr", "write_nodes", "write_edges"} <= stages
+    assert trace.loc[trace["stage"] == "write_nodes"].set_index("window_graph_name")["rows"].to_dict() == dict(
+        zip(manifest["window_graph_name"], manifest["node_count"])
+    )
+    assert (trace["wall_time_s"] >= 0).all() and trace["error"].isna().all()
+
+    summary = summarise_trace(load_trace(traces[0].with_suffix(".jsonl")))
+    assert summary["total_wall_s"].is_monotonic_decreasing
+    assert summary["share_of_wall"].sum() == pytest.approx(1.0)
+    assert summary.set_index("stage").loc["page_rank", "windows"] == len(manifest)
+
+
+def test_incremental_windows_match_full_recompute(tmp_path):
+    _random_snapshot().save(tmp_path / "snapshot")
+    base = dict(
+        start_year=2002,
+        end_start_year=2011,
+        window_size=3,
+        step_size=1,
+        run_fastrp=False,
+        export_feature_vectors=False,
+        export_feature_blocks=False,
+    )
+    full = run_windows_local(
+        cfg=RollingWindowConfig(output_dir=tmp_path / "full", **base),
+        snapshot_dir=tmp_path / "snapshot",
+        max_workers=1,
+        show_tqdm=False,
+    )
+    incremental = run_windows_local(
+        cfg=RollingWindowConfig(output_dir=tmp_path / "incremental", **base),
+        snapshot_dir=tmp_path / "snapshot",
+        max_workers=1,
+        show_tqdm=False,
+        incremental=True,
+    )
+
+    assert incremental["incremental"].tolist() == [False] + [True] * (len(incremental) - 1)
+    assert (incremental["recomputed_nodes"] <= incremental["node_count"]).all()
+    assert incremental["delta_rels_added"].iloc[1:].sum() > 0
+    for name in full["window_graph_name"]:
+        a = pd.read_parquet(tmp_path / "full" / "nodes" / f"node_features_{name}.parquet")
+        b = pd.read_parquet(tmp_path / "incremental" / "nodes" / f"node_features_{name}.parquet")
+        report = compare_window_outputs(a, b).set_index("metric")["max_abs_diff"]
+        assert report["node_set"] == 0 and report["wcc"] == 0, name
+        for exact in ("in_degree", "out_degree", "family_degree", "betweenness", "closeness", "eigenvector"):
+            assert report[exact] < 1e-9, (name, exact)
+        assert report["page_rank"] < 1e-5, name
+        pd.testing.assert_series_equal(a["wcc"], b["wcc"])
+
+
+def test_warm_start_converges_to_cold_scores_in_fewer_iterations(tmp_path):
+    _random_snapshot(n_nodes=300, n_rels=1_200).save(tmp_path / "snapshot")
+    base = dict(
+        start_year=2002,
+        end_start_year=2011,
+        window_size=3,
+        step_size=1,
+        run_fastrp=False,
+        export_feature_vectors=False,
+        export_feature_blocks=False,
+        pagerank_max_iterations=200,
+        pagerank_tolerance=1e-9,
+        eigenvector_max_iterations=500,
+        eigenvector_tolerance=1e-9,
+    )
+    runs = {
+        warm: run_windows_local(
+            cfg=RollingWindowConfig(output_dir=tmp_path / str(warm), warm_start=warm, **base),
+            snapshot_dir=tmp_path / "snapshot",
+            max_workers=1,
+            show_tqdm=False,
+        )
+        for warm in (False, True)
+    }
+    cold, warm = runs[False], runs[True]
+    assert warm["warm_started"].tolist() == [False] + [True] * (len(warm) - 1)
+    assert warm["page_rank_iterations"].iloc[1:].sum() < cold["page_rank_iterations"].iloc[1:].sum()
+
+    for name in cold["window_graph_name"]:
+        a = pd.read_parquet(tmp_path / "False" / "nodes" / f"node_features_{name}.parquet")
+        b = pd.read_parquet(tmp_path / "True" / "nodes" / f"node_features_{name}.parquet")
+        report = compare_window_outputs(a, b, columns=("page_rank",)).set_index("metric")["max_abs_diff"]
+        assert report["page_rank"] < 1e-7, name
+
+
+def test_iteration_settings_enter_params_hash_only_when_they_change_results():
+    default = gds_config_metadata(RollingWindowConfig())
+    assert not {"pagerank_tolerance", "eigenvector_max_iterations", "louvain_tolerance", "warm_start"} & set(default)
+
+    tuned = gds_config_metadata(RollingWindowConfig(eigenvector_max_iterations=50, louvain_tolerance=1e-3))
+    assert tuned["eigenvector_max_iterations"] == 50 and tuned["louvain_tolerance"] == 1e-3
+    assert "pagerank_tolerance" not in tuned
+
+    # Warm start only seeds the local engine; GDS runs stay cold and keep their hash.
+    warm = RollingWindowConfig(warm_start=True)
+    assert gds_config_metadata(warm) == default
+    assert gds_config_metadata(warm, engine="local")["warm_start"] is True
+
+
+def test_local_and_gds_runs_have_different_params_hashes():
+    cfg = RollingWindowConfig()
+    gds_metadata, local_metadata = gds_config_metadata(cfg), gds_config_metadata(cfg, engine="local")
+    assert "engine" not in gds_metadata
+    assert local_metadata == {**gds_metadata, "engine": "local"}
+    assert stable_hash_dict(gds_metadata) != stable_hash_dict(local_metadata)
+
+
+@pytest.mark.skipif(
+    not os.environ.get("ROLLING_WINDOWS_GDS_PARITY_DIR"),
+    reason="set ROLLING_WINDOWS_GDS_PARITY_DIR to a snapshot + GDS window output fixture",
+)
+def test_parity_with_gds_output(tmp_path):
+    fixture = Path(os.environ["ROLLING_WINDOWS_GDS_PARITY_DIR"])
+    snapshot = TemporalSnapshot.load(fixture / "snapshot")
+    gds_files = sorted((fixture / "nodes").glob("node_features_rw_*.parquet"))
+    assert gds_files, f"no GDS node outputs under {fixture / 'nodes'}"
+
+    for gds_file in gds_files:
+        gds_df = pd.read_parquet(gds_file)
+        first = gds_df.iloc[0]
+        w = Window(
+            start_year=int(first["window_start_year"]),
+            end_year_inclusive=int(first["window_end_year_inclusive"]),
+            start_ms=int(first["window_start_ms"]),
+            end_ms=int(first["window_end_ms"]),
+        )
+        cfg = RollingWindowConfig(output_dir=tmp_path, run_fastrp=False)
+        process_window_local(snapshot, w, cfg=cfg, params_hash="parity", skip_existing=False)
+        local_df = pd.read_parquet(tmp_path / "nodes" / f"node_features_rw_{w.name_suffix}.parquet")
+
+        report = compare_window_outputs(local_df, gds_df).set_index("metric")["max_abs_diff"]
+        assert report["node_set"] == 0
+        for exact in ("in_degree", "out_degree", "family_degree", "betweenness", "wcc"):
+            if exact in report:
+                assert report[exact] < 1e-6, exact
+        for iterative in ("page_rank", "eigenvector", "closeness"):
+            if iterative in report:
+                assert report[iterative] < 1e-3, iterative
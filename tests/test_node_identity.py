@@ -0,0 +1,66 @@
+"""
+Tests for the run-level node identity cache (rolling_windows/node_identity.py).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from rolling_windows.node_identity import (  # noqa: E402
+    IDENTITY_DIRNAME,
+    NodeIdentityIndex,
+    identity_path,
+    latest_node_identity,
+)
+
+
+def _identity_frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "gds_id": [42, 7, 13, 3],
+            "entity_id": ["B1", "P1", "C1", "GDS_3"],
+            "Id": ["B1", "P1", "C1", None],
+            "regn_cbr": [1481, None, "999", None],
+            "labels": [["Bank"], ["Person"], ["Company"], ["Person"]],
+        }
+    )
+
+
+def test_lookup_matches_merge_and_survives_round_trip(tmp_path):
+    identity = NodeIdentityIndex.from_frame(_identity_frame(), fingerprint="abc")
+    path = identity_path(tmp_path / IDENTITY_DIRNAME, identity.fingerprint)
+    identity.save(path)
+    loaded = latest_node_identity(tmp_path / IDENTITY_DIRNAME)
+
+    assert loaded is not None and loaded.fingerprint == "abc"
+    assert np.all(np.diff(loaded.gds_id) > 0)
+
+    window = pd.DataFrame({"gds_id": np.array([13, 42, 5, 3], dtype=np.int64), "page_rank": [0.1, 0.2, 0.3, 0.4]})
+    attached = loaded.attach(window, ["entity_id"])
+    merged = window.merge(_identity_frame()[["gds_id", "entity_id"]], on="gds_id", how="left")
+    assert attached["entity_id"].tolist()[:2] == merged["entity_id"].tolist()[:2] == ["C1", "B1"]
+    assert attached["entity_id"].isna().tolist() == merged["entity_id"].isna().tolist()
+
+    # regn_cbr only for Bank nodes, as text regardless of how Neo4j stored it
+    assert loaded.bank_regn([42, 13, 7, 5]).tolist() == ["1481", None, None, None]
+    assert loaded.lookup([13, 5], "labels").tolist() == [("Company",), ()]
+
+
+def test_temporal_fcr_loader_maps_regn_from_sidecar(tmp_path):
+    from mlflow_utils.temporal_fcr_loader import TemporalFCRLoader
+
+    (tmp_path / "nodes").mkdir()
+    NodeIdentityIndex.from_frame(_identity_frame(), fingerprint="abc").save(
+        identity_path(tmp_path / IDENTITY_DIRNAME, "abc")
+    )
+    loader = TemporalFCRLoader(base_dir=str(tmp_path))
+    df = pd.DataFrame({"gds_id": [42, 13, 7], "entity_id": ["B1", "C1", "P1"], "fcr_temporal": [0.5, 0.0, 0.0]})
+
+    out = loader._rename_columns(df)
+
+    assert out["regn"].tolist() == ["1481"]
+    assert out["family_connection_ratio_temporal"].tolist() == [0.5]
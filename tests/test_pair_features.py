@@ -0,0 +1,133 @@
+"""
+Tests for the batched pair features of link prediction (rolling_windows/pair_features.py).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from rolling_windows.pair_features import PairFeatureEngine  # noqa: E402
+
+
+def _node_frame() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    embeddings = [rng.normal(size=4).astype(np.float32) for _ in range(5)]
+    embeddings[3] = None  # no embedding
+    return pd.DataFrame(
+        {
+            "entity_id": ["A", "B", "C", "D", "E"],
+            "fastrp_embedding": embeddings,
+            "community_louvain": [[1, 7], [1, 7], [1, 8], [2, 9], [2, 9]],
+            "wcc": [5, 5, -1, -1, 6],
+            "in_degree": [1.0, 2.0, 3.0, 4.0, 5.0],
+            "page_rank": [0.1, 0.2, 0.3, 0.4, 0.5],
+        }
+    )
+
+
+def _pairs() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "source_id": ["A", "A", "C", "D", "E", "X"],
+            "target_id": ["B", "C", "D", "E", "B", "A"],
+            "lev_dist_last_name": [0.9, 0.8, 0.7, 0.6, 0.5, 0.4],
+            "lev_dist_patronymic": [0.1, 0.2, 0.3, 0.4, 0.5, 0.6],
+            "is_common_surname": [0.0, 1.0, 0.0, 1.0, 0.0, 1.0],
+        }
+    )
+
+
+def _row_wise(pairs: pd.DataFrame, nodes: pd.DataFrame) -> list:
+    """The pair features computed one pair at a time, as link prediction used to."""
+    by_id = nodes.set_index("entity_id")
+    rows = []
+    for src, tgt in zip(pairs["source_id"], pairs["target_id"]):
+        known = src in by_id.index and tgt in by_id.index
+        a = by_id.loc[src, "fastrp_embedding"] if src in by_id.index else None
+        b = by_id.loc[tgt, "fastrp_embedding"] if tgt in by_id.index else None
+        if a is None or b is None:
+            rows.append(None)
+            continue
+        a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+        row = list(a * b) + [np.linalg.norm(a - b), a @ b / (np.linalg.norm(a) * np.linalg.norm(b))]
+        for col in ("community_louvain", "wcc"):
+            c1, c2 = by_id.loc[src, col], by_id.loc[tgt, col]
+            row.append(float(known and c1 == c2 and c1 != -1))
+        for col in ("in_degree", "page_rank"):
+            s = by_id.loc[src, col] if src in by_id.index else 0
+            t = by_id.loc[tgt, col] if tgt in by_id.index else 0
+            row += [s + t, abs(s - t)]
+        rows.append(row)
+    return rows
+
+
+def test_batched_features_match_row_wise_features_in_every_chunk():
+    nodes, pairs = _node_frame(), _pairs()
+    engine = PairFeatureEngine(nodes)
+    blocks = ["fastrp", "community_louvain", "wcc", "network"]
+    expected = _row_wise(pairs, nodes)
+
+    features = engine.pair_features(pairs, blocks)
+    assert features.matrix.dtype == np.float32
+    assert features.valid.tolist() == [row is not None for row in expected]
+    assert features.columns[-6:] == (
+        "same_community_louvain",
+        "same_wcc",
+        "in_degree_sum",
+        "in_degree_diff",
+        "page_rank_sum",
+        "page_rank_diff",
+    )
+    for got, want in zip(features.matrix[features.valid], [r for r in expected if r is not None]):
+        np.testing.assert_allclose(got, want, rtol=1e-5, atol=1e-6)
+
+    chunks = list(engine.iter_pair_features(pairs, ["string"] + blocks, chunk_size=4))
+    assert [offset for offset, _ in chunks] == [0, 4]
+    matrix = np.vstack([c.matrix for _, c in chunks])
+    np.testing.assert_array_equal(matrix[:, 3:], features.matrix)
+    np.testing.assert_array_equal(matrix[:, :3], pairs.iloc[:, 2:].to_numpy(dtype=np.float32))
+
+
+def test_missing_nodes_get_zero_network_features_and_no_shared_community():
+    engine = PairFeatureEngine(_node_frame())
+    pairs = pd.DataFrame({"source_id": ["X", "C"], "target_id": ["E", "D"]})
+    src, tgt = engine.positions(pairs["source_id"]), engine.positions(pairs["target_id"])
+
+    assert src.tolist() == [-1, 2]
+    np.testing.assert_allclose(engine.network_features(src, tgt)[0], [5.0, 5.0, 0.5, 0.5])
+    # C and D are both outside any WCC component (-1), which is not a shared community.
+    assert engine.same_community(src, tgt, "wcc").tolist() == [0.0, 0.0]
+
+
+def test_variants_select_their_columns_from_the_union_cache():
+    nodes, pairs = _node_frame(), _pairs()
+    engine = PairFeatureEngine(nodes)
+    cache = engine.pair_features(pairs, ["string", "fastrp", "community_louvain", "wcc", "network"])
+
+    for blocks in (["string"], ["string", "fastrp", "wcc"], ["fastrp", "network", "community_louvain"]):
+        selected = cache.select(blocks)
+        direct = engine.pair_features(pairs, blocks)
+        np.testing.assert_array_equal(selected.matrix, direct.matrix)
+        assert selected.columns == direct.columns
+        assert selected.blocks == direct.blocks
+        # Only FastRP blocks drop pairs without embeddings.
+        assert selected.valid.tolist() == direct.valid.tolist() == [
+            "fastrp" not in blocks or v for v in cache.valid
+        ]
+
+
+def test_missing_network_columns_are_logged_and_an_empty_network_block_fails(caplog):
+    nodes = _node_frame()
+    with caplog.at_level("WARNING"):
+        engine = PairFeatureEngine(nodes)
+    assert "'out_degree', 'betweenness', 'closeness'" in caplog.text
+    assert engine.block_columns("network") == ("in_degree_sum", "in_degree_diff", "page_rank_sum", "page_rank_diff")
+
+    engine = PairFeatureEngine(nodes.drop(columns=["in_degree", "page_rank"]))
+    with pytest.raises(KeyError, match="network feature columns"):
+        engine.pair_features(_pairs(), ["network"])
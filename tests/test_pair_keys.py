@@ -0,0 +1,48 @@
+"""
+Tests for the order-independent pair keys of link prediction (rolling_windows/pair_keys.py).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from rolling_windows.pair_keys import PairKeyCodec, isin_keys  # noqa: E402
+
+
+def test_keys_are_order_independent_and_keep_dictionary_codes():
+    codec = PairKeyCodec.from_ids(["Z", "B", None], ["A", "Y", "A"], vocabulary=["A", "B", "C", "A", None])
+
+    # Dictionary ids keep their codes; ids it lacks are appended once.
+    assert codec.vocabulary.tolist() == ["A", "B", "C", "Z", "Y"]
+    assert codec.codes(["B", "Y", "nope", None]).tolist() == [1, 4, -1, -1]
+    keys = codec.keys(["A", "Z", "A", None], ["Z", "A", "B", "A"])
+    assert keys[0] == keys[1] == 0 * 5 + 3
+    assert keys[2] != keys[0]
+    assert keys[3] == -1
+
+
+def test_anti_join_matches_set_lookup_in_either_direction():
+    rng = np.random.default_rng(1)
+    ids = np.array([f"P{i}" for i in range(50)], dtype=object)
+    sim = pd.DataFrame({"source_id": ids[rng.integers(0, 50, 400)], "target_id": ids[rng.integers(0, 50, 400)]})
+    family = pd.DataFrame({"source_id": ids[rng.integers(0, 50, 80)], "target_id": ids[rng.integers(0, 50, 80)]})
+    sim.loc[3, "source_id"] = None
+    family.loc[0, "source_id"] = None
+
+    family_set = set(zip(family["source_id"], family["target_id"]))
+    expected = [
+        (s, t) in family_set or (t, s) in family_set
+        for s, t in zip(sim["source_id"], sim["target_id"])
+        if pd.notna(s) and pd.notna(t)
+    ]
+
+    codec = PairKeyCodec.from_ids(sim["source_id"], sim["target_id"], family["source_id"], family["target_id"])
+    is_family = isin_keys(codec.frame_keys(sim), codec.frame_keys(family))
+    assert not is_family[3]
+    assert is_family[sim["source_id"].notna().to_numpy()].tolist() == expected
+    assert is_family.any() and not is_family.all()
+    assert not isin_keys(codec.frame_keys(sim), np.array([], dtype=np.int64)).any()
@@ -0,0 +1,162 @@
+"""
+Tests for the offline SIM_NAME candidate engine (rolling_windows/sim_name.py).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "rolling_windows"))
+
+from sim_name import (  # noqa: E402
+    COMMON_SURNAMES,
+    OUTPUT_COLUMNS,
+    WRITE_BACK_QUERY,
+    levenshtein_similarity,
+    phonetic_key,
+    sim_name_candidates,
+    transliterate,
+    write_back_sim_name,
+)
+
+
+def _levenshtein(a: str, b: str) -> int:
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+    return row[-1]
+
+
+def _apoc_similarity(a: str, b: str) -> float:
+    longer = max(len(a), len(b))
+    return 1.0 if longer == 0 else (longer - _levenshtein(a, b)) / longer
+
+
+def _cypher_pairs(names: pd.DataFrame, existing: set) -> set:
+    """The pairs 005_0_precompute_sim_name.cypher would create, one pair at a time."""
+    people = [r for r in names.astype(object).where(names.notna(), None).itertuples()]
+    people = [r for r in people if r.first_name is not None and len(r.last_name) >= 3]
+    out = set()
+    for p1 in people:
+        for p2 in people:
+            if p2.middle_name is None or p1.last_name.upper()[:3] != p2.last_name.upper()[:3]:
+                continue
+            if not p1.element_id < p2.element_id or frozenset((p1.element_id, p2.element_id)) in existing:
+                continue
+            surname = _apoc_similarity(p1.last_name, p2.last_name)
+            patronymic = _apoc_similarity(p1.first_name, p2.middle_name)
+            if surname > 0.7 or patronymic > 0.4:
+                common = int(p1.last_name.upper() in COMMON_SURNAMES or p2.last_name.upper() in COMMON_SURNAMES)
+                out.add((p1.element_id, p2.element_id, round(surname, 12), round(patronymic, 12), common))
+    return out
+
+
+def _names() -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    surnames = ["Иванов", "Иванова", "Иваненко", "Петров", "Петрова", "Петриков", "Козлов", "Ко", "Smith", "Smyth"]
+    first = ["Пётр", "Иван", "Анна", "Сергей", "John"]
+    middle = ["Петровна", "Иванович", "Сергеевич", None, "Johnson"]
+    n = 120
+    return pd.DataFrame(
+        {
+            # Element ids compare as strings: "4:db:10" < "4:db:9".
+            "element_id": [f"4:db:{i}" for i in rng.permutation(n)],
+            "last_name": rng.choice(surnames, n),
+            "first_name": [None if i % 17 == 0 else first[i % len(first)] for i in range(n)],
+            "middle_name": [middle[i % len(middle)] for i in rng.permutation(n)],
+        }
+    )
+
+
+def test_similarity_is_apocs_ratio_of_the_integer_distance():
+    sim = levenshtein_similarity(["Иванов", "abc", ""], ["Иванова", "ABC", ""])
+    assert sim[0, 0] == 6 / 7
+    assert sim[1, 1] == 0.0
+    assert sim[2, 2] == 1.0
+
+
+@pytest.mark.parametrize("workers, tile_size", [(1, 1024), (1, 7), (2, 5)])
+def test_candidates_match_the_cypher_query(workers, tile_size):
+    names = _names()
+    ids = names["element_id"].tolist()
+    existing = pd.DataFrame({"source_element_id": ids[1:40:3], "target_element_id": ids[0:39:3]})
+    existing_set = {frozenset(p) for p in zip(existing["source_element_id"], existing["target_element_id"])}
+
+    pairs, stats = sim_name_candidates(names, existing, workers=workers, tile_size=tile_size)
+
+    got = {
+        (r.source_element_id, r.target_element_id, round(r.lev_dist_last_name, 12), round(r.lev_dist_patronymic, 12), r.is_common_surname)
+        for r in pairs.itertuples()
+    }
+    assert got == _cypher_pairs(names, existing_set)
+    assert len(got) == len(pairs) == stats.candidates > 0
+    assert stats.compared > 0 and stats.pairs_per_s > 0
+    assert list(pairs["source_element_id"]) == sorted(pairs["source_element_id"])
+
+
+def test_transliterated_and_phonetic_keys():
+    assert transliterate("Ivanov") == transliterate("Иванов") == "ИВАНОВ"
+    assert transliterate("Shchukin") == "ЩУКИН" and transliterate("Семёнов") == "СЕМЕНОВ"
+    assert phonetic_key("Евтушенко") == phonetic_key("Эвтушенко") == "ИФТУШИНКА"
+    assert phonetic_key("Козлофф") == phonetic_key("Kozlov")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_transliteration_adds_cross_script_pairs_to_the_query_pairs(workers):
+    names = pd.concat(
+        [
+            _names(),
+            pd.DataFrame(
+                {
+                    "element_id": ["4:db:900", "4:db:901", "4:db:902", "4:db:903"],
+                    "last_name": ["Ivanov", "Иванов", "Евтушенко", "Эвтушенко"],
+                    "first_name": ["Ivan", "Пётр", "Анна", "Анна"],
+                    "middle_name": [None, "Иванович", None, "Сергеевна"],
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+    query_pairs, _ = sim_name_candidates(names, workers=1, tile_size=16)
+    pairs, stats = sim_name_candidates(names, workers=workers, tile_size=16, transliterate_names=True)
+
+    key = ["source_element_id", "target_element_id"]
+    merged = pairs.merge(query_pairs, on=key, how="left", suffixes=("", "_query"), indicator=True)
+    # Every query pair is kept once, with the query's scores.
+    assert not pairs.duplicated(key).any()
+    assert (merged["_merge"] == "both").sum() == len(query_pairs)
+    both = merged[merged["_merge"] == "both"]
+    for column in OUTPUT_COLUMNS[2:]:
+        np.testing.assert_array_equal(both[column], both[f"{column}_query"])
+    added = set(map(tuple, merged.loc[merged["_merge"] == "left_only", key].to_numpy()))
+    assert {("4:db:900", "4:db:901"), ("4:db:902", "4:db:903")} <= added
+    assert stats.candidates == len(pairs) > len(query_pairs)
+
+
+class _WriteBackGds:
+    def __init__(self):
+        self.batches: list[list[dict]] = []
+
+    def run_cypher(self, query: str, params: dict) -> pd.DataFrame:
+        assert query == WRITE_BACK_QUERY
+        self.batches.append(params["rows"])
+        return pd.DataFrame({"written": [len(params["rows"])]})
+
+
+def test_write_back_merges_pairs_in_unwind_batches():
+    pairs, _ = sim_name_candidates(_names(), workers=1)
+    gds = _WriteBackGds()
+    assert write_back_sim_name(gds, pairs, batch_size=7) == len(pairs)
+    assert [len(rows) for rows in gds.batches] == [7] * (len(pairs) // 7) + ([len(pairs) % 7] if len(pairs) % 7 else [])
+    assert [row["source_element_id"] for rows in gds.batches for row in rows] == list(pairs["source_element_id"])
+    assert set(gds.batches[0][0]) == set(OUTPUT_COLUMNS)
+
+    assert write_back_sim_name(_WriteBackGds(), pairs.iloc[:0]) == 0
+    with pytest.raises(ValueError):
+        write_back_sim_name(gds, pairs, batch_size=0)